@@ -10,6 +10,9 @@ from pathlib import Path
 backend_path = Path(__file__).parent.parent / "backend"
 sys.path.insert(0, str(backend_path))
 
+# Import route modules on first request rather than during the cold start
+os.environ.setdefault("LAZY_ROUTERS", "true")
+
 # Import FastAPI app
 from app.main import app
 
@@ -1,10 +1,16 @@
 """API dependencies (authentication, etc.)"""
-from fastapi import HTTPException, Header, Depends
+import hmac
+from fastapi import HTTPException, Header, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
 from datetime import datetime
+from typing import Optional
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.rate_limit import rate_limiter, retry_after_header
+from app.core.shards import ensure_shard_schema, shard_session
 from app.models.api_key import APIKey
+from app.services.api_keys import authenticate, key_prefix
+from app.services.shard_directory import shard_directory
 
 
 async def verify_api_key(
@@ -15,15 +21,7 @@ async def verify_api_key(
     if not x_api_key:
         raise HTTPException(status_code=401, detail="API key required")
     
-    result = await db.execute(
-        select(APIKey).where(
-            and_(
-                APIKey.key == x_api_key,
-                APIKey.is_active == True
-            )
-        )
-    )
-    api_key_obj = result.scalar_one_or_none()
+    api_key_obj = await authenticate(db, x_api_key)
     
     if not api_key_obj:
         raise HTTPException(status_code=401, detail="Invalid or inactive API key")
@@ -32,9 +30,46 @@ async def verify_api_key(
     if api_key_obj.expires_at and datetime.utcnow() > api_key_obj.expires_at:
         raise HTTPException(status_code=401, detail="API key has expired")
     
+    # Per-key quota, charged only for verified keys
+    if settings.RATE_LIMIT_ENABLED:
+        retry_after = await rate_limiter.check(["key:" + key_prefix(x_api_key)])
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": retry_after_header(retry_after)}
+            )
+    
     return api_key_obj
 
 
+async def verify_admin(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Require the operator token (ADMIN_TOKEN) on routes that act beyond one tenant"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin operations are disabled (ADMIN_TOKEN is not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
 
 
-
+async def get_tenant_db(
+    request: Request,
+    api_key_obj: APIKey = Depends(verify_api_key)
+) -> AsyncSession:
+    """Database session for the authenticated tenant's consent data (on its shard)
+    
+    Like get_db for the primary, the shard's tables are checked once per
+    process, for instances that skip the startup hook (Vercel/Mangum).
+    While the tenant is being moved to another shard, deletions are refused
+    (the copy doesn't replay them) and, during the short cutover, all writes.
+    """
+    placement = await shard_directory.placement(api_key_obj.id)
+    await ensure_shard_schema(placement.shard)
+    writing = request.method not in ("GET", "HEAD")
+    if (placement.frozen and writing) or (placement.moving and request.method == "DELETE"):
+        raise HTTPException(
+            status_code=503,
+            detail="Consent data for this API key is being moved; retry shortly",
+            headers={"Retry-After": "5"}
+        )
+    async with shard_session(placement.shard) as session:
+        yield session
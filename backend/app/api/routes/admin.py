@@ -2,9 +2,12 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-import secrets
-import string
+from typing import Optional
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.profiling import profiler
+from app.api.dependencies import verify_admin
+from app.api.schemas import AdminErasureJobCreate
 from app.models.api_key import APIKey
 from pydantic import BaseModel
 
@@ -19,19 +22,27 @@ class APIKeyCreate(BaseModel):
 @router.get("/api-keys")
 async def list_api_keys(db: AsyncSession = Depends(get_db)):
     """List all API keys"""
-    result = await db.execute(select(APIKey).order_by(APIKey.created_at.desc()))
-    keys = result.scalars().all()
+    from app.core.shards import PRIMARY
+    from app.models.tenant_shard import TenantShard
+    result = await db.execute(
+        select(APIKey, TenantShard.shard, TenantShard.status)
+        .outerjoin(TenantShard, TenantShard.api_key_id == APIKey.id)
+        .order_by(APIKey.created_at.desc())
+    )
     
     return [
         {
-            "key": key.key,
+            "id": str(key.id),
+            "key_prefix": key.key_prefix or key.key[:settings.API_KEY_PREFIX_LENGTH],
             "customer_name": key.customer_name,
             "customer_email": key.customer_email,
             "is_active": key.is_active,
             "created_at": key.created_at.isoformat(),
-            "expires_at": key.expires_at.isoformat() if key.expires_at else None
+            "expires_at": key.expires_at.isoformat() if key.expires_at else None,
+            "shard": shard or PRIMARY,
+            "shard_status": shard_status or "active"
         }
-        for key in keys
+        for key, shard, shard_status in result.all()
     ]
 
 @router.post("/api-keys")
@@ -39,29 +50,15 @@ async def create_api_key(
     key_data: APIKeyCreate,
     db: AsyncSession = Depends(get_db)
 ):
-    """Create a new API key (for testing/admin)"""
-    # Generate API key
-    alphabet = string.ascii_letters + string.digits
-    api_key = ''.join(secrets.choice(alphabet) for _ in range(32))
-    
-    # Ensure uniqueness
-    while True:
-        result = await db.execute(
-            select(APIKey).where(APIKey.key == api_key)
-        )
-        if not result.scalar_one_or_none():
-            break
-        api_key = ''.join(secrets.choice(alphabet) for _ in range(32))
-    
-    # Create API key
-    api_key_obj = APIKey(
-        key=api_key,
-        customer_name=key_data.customer_name,
-        customer_email=key_data.customer_email,
-        is_active=True
-    )
+    """Create a new API key (for testing/admin)
+    Only a hash of the key is stored, so it is returned this once
+    """
+    from app.services.api_keys import issue_api_key
+    api_key_obj, api_key = await issue_api_key(db, key_data.customer_name, key_data.customer_email)
     
-    db.add(api_key_obj)
+    # Place the tenant's consent data on a shard
+    from app.services.shard_directory import assign_new_tenant
+    shard = await assign_new_tenant(db, api_key_obj.id)
     await db.commit()
     await db.refresh(api_key_obj)
     
@@ -70,6 +67,257 @@ async def create_api_key(
         "customer_name": api_key_obj.customer_name,
         "customer_email": api_key_obj.customer_email,
         "created_at": api_key_obj.created_at.isoformat(),
+        "shard": shard,
         "warning": "Save this API key - it won't be shown again!"
     }
 
+
+async def _admin_api_key(db: AsyncSession, api_key_id: str) -> APIKey:
+    import uuid
+    try:
+        api_key_obj = await db.get(APIKey, uuid.UUID(api_key_id))
+    except ValueError:
+        api_key_obj = None
+    if api_key_obj is None:
+        raise HTTPException(status_code=404, detail="API key not found")
+    return api_key_obj
+
+
+@router.post("/api-keys/{api_key_id}/deactivate", dependencies=[Depends(verify_admin)])
+async def deactivate_api_key(api_key_id: str, db: AsyncSession = Depends(get_db)):
+    """Stop accepting a key; this worker forgets it at once, others within API_KEY_CACHE_SECONDS"""
+    from app.services.api_keys import api_key_cache, key_digest
+    api_key_obj = await _admin_api_key(db, api_key_id)
+    api_key_obj.is_active = False
+    await db.commit()
+    digest = key_digest(api_key_obj)
+    if digest:
+        api_key_cache.evict(digest)
+    return {"id": str(api_key_obj.id), "is_active": False}
+
+
+@router.delete("/api-keys/{api_key_id}", dependencies=[Depends(verify_admin)])
+async def delete_api_key(api_key_id: str, db: AsyncSession = Depends(get_db)):
+    """Delete a key that has no data; erase the tenant first (POST /api/admin/erasure-jobs) or deactivate it"""
+    from sqlalchemy import delete
+    from app.core.shards import shard_session
+    from app.models.retention_policy import RetentionPolicy
+    from app.models.tenant_shard import TenantShard
+    from app.services.api_keys import api_key_cache, key_digest, key_in_use
+    from app.services.shard_directory import shard_directory
+    api_key_obj = await _admin_api_key(db, api_key_id)
+    placement = await shard_directory.load(db, api_key_obj.id)
+    async with shard_session(placement.shard) as tenant_db:
+        if await key_in_use(tenant_db, api_key_obj.id):
+            raise HTTPException(
+                status_code=409,
+                detail="The API key still has configs or consent data; erase them first or deactivate the key"
+            )
+    digest = key_digest(api_key_obj)
+    await db.execute(delete(TenantShard).where(TenantShard.api_key_id == api_key_obj.id))
+    await db.execute(delete(RetentionPolicy).where(RetentionPolicy.api_key_id == api_key_obj.id))
+    await db.delete(api_key_obj)
+    await db.commit()
+    if digest:
+        api_key_cache.evict(digest)
+    shard_directory.invalidate(api_key_obj.id)
+    return {"id": api_key_id, "deleted": True}
+
+
+
+class ProfilingRequest(BaseModel):
+    requests: int = 10
+    path_prefix: Optional[str] = None
+
+
+@router.get("/profiling")
+async def get_profiling_status():
+    """Show the state of the on-demand request profiler"""
+    return profiler.status()
+
+
+@router.post("/profiling", dependencies=[Depends(verify_admin)])
+async def arm_profiling(profiling_data: ProfilingRequest):
+    """Profile the next N requests (optionally only those under path_prefix)"""
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled")
+    
+    profiler.arm(profiling_data.requests, profiling_data.path_prefix)
+    return profiler.status()
+
+
+@router.get("/ingest", dependencies=[Depends(verify_admin)])
+async def get_ingest_status():
+    """Consent beacon buffer statistics for this worker"""
+    from app.services.ingest import ingest_buffer
+    return {"pending": ingest_buffer.pending, "running": ingest_buffer.running, **ingest_buffer.stats}
+
+
+@router.get("/tasks", dependencies=[Depends(verify_admin)])
+async def get_task_status():
+    """Background task queues (depth, oldest task age) and periodic jobs for this worker"""
+    from app.core.tasks import runtime
+    return runtime.stats()
+
+
+@router.get("/widget")
+async def get_widget_report():
+    """Delivered widget sizes (bootstrap, chunks and typical page-load paths)"""
+    from app.services.widget_assets import get_widget_bundle
+    bundle = get_widget_bundle()
+    if bundle is None:
+        raise HTTPException(status_code=404, detail="Widget file not found")
+    return bundle.report()
+
+
+@router.get("/events", dependencies=[Depends(verify_admin)])
+async def get_event_stream_status():
+    """Open config event streams on this worker"""
+    from app.services.config_events import config_event_hub
+    return config_event_hub.stats()
+
+
+async def _fan_out(query_shard):
+    """Run ``query_shard(db)`` on every shard concurrently; returns {shard: result}"""
+    import asyncio
+    from app.core.shards import shard_names, shard_session
+
+    async def run(name):
+        async with shard_session(name) as shard_db:
+            return await query_shard(shard_db)
+
+    names = shard_names()
+    return dict(zip(names, await asyncio.gather(*(run(name) for name in names))))
+
+
+@router.get("/audit", dependencies=[Depends(verify_admin)])
+async def get_audit_status():
+    """Unsealed consent history rows and the latest seal, per shard"""
+    from sqlalchemy import func
+    from app.models.audit_seal import AuditSeal
+    from app.models.consent_history import ConsentHistory
+
+    async def shard_status(shard_db):
+        unsealed = await shard_db.scalar(
+            select(func.count()).select_from(ConsentHistory).where(ConsentHistory.chain_seq.is_(None))
+        )
+        last_sealed_at = await shard_db.scalar(select(func.max(AuditSeal.sealed_at)))
+        return {"unsealed": unsealed, "last_sealed_at": last_sealed_at.isoformat() if last_sealed_at else None}
+
+    shards = await _fan_out(shard_status)
+    sealed_times = [status["last_sealed_at"] for status in shards.values() if status["last_sealed_at"]]
+    return {
+        "unsealed": sum(status["unsealed"] for status in shards.values()),
+        "last_sealed_at": max(sealed_times) if sealed_times else None,
+        "shards": shards
+    }
+
+
+@router.post("/audit/seal", dependencies=[Depends(verify_admin)])
+async def seal_audit_log():
+    """Seal pending consent history now (for deployments without a background sealer, e.g. a cron job)"""
+    from app.services.audit_chain import seal_shards
+    sealed = await seal_shards(settings.AUDIT_SEAL_BATCH_SIZE)
+    return {"sealed": sum(sealed.values()), "shards": sealed}
+
+
+@router.get("/shards", dependencies=[Depends(verify_admin)])
+async def get_shards(db: AsyncSession = Depends(get_db)):
+    """Configured shards with their tenants, consents and tenants being moved"""
+    from sqlalchemy import func
+    from app.core.shards import PRIMARY
+    from app.models.consent import Consent
+    from app.models.tenant_shard import TenantShard
+    from app.services.shard_directory import shard_directory
+
+    result = await db.execute(
+        select(TenantShard.shard, TenantShard.status, func.count()).group_by(TenantShard.shard, TenantShard.status)
+    )
+    tenants, moving = {}, {}
+    for shard, status, count in result.all():
+        tenants[shard] = tenants.get(shard, 0) + count
+        if status != "active":
+            moving[shard] = moving.get(shard, 0) + count
+    unplaced = await db.scalar(
+        select(func.count()).select_from(APIKey)
+        .outerjoin(TenantShard, TenantShard.api_key_id == APIKey.id)
+        .where(TenantShard.api_key_id.is_(None))
+    )
+    tenants[PRIMARY] = tenants.get(PRIMARY, 0) + unplaced
+
+    async def consent_count(shard_db):
+        return await shard_db.scalar(select(func.count()).select_from(Consent))
+
+    consents = await _fan_out(consent_count)
+    return {
+        "shards": [
+            {"name": name, "tenants": tenants.get(name, 0), "moving": moving.get(name, 0), "consents": count}
+            for name, count in consents.items()
+        ],
+        "new_tenants": settings.SHARD_NEW_TENANTS,
+        "directory_cache": shard_directory.stats()
+    }
+
+
+@router.get("/retention", dependencies=[Depends(verify_admin)])
+async def get_retention_status(db: AsyncSession = Depends(get_db)):
+    """Progress of the current retention pass and totals of the last one (including reclaimed space)"""
+    from app.services.jobs import job_state
+    from app.services.retention import JOB_NAME
+    return await job_state(db, JOB_NAME) or {"state": None, "running": False}
+
+
+@router.post("/retention/run", dependencies=[Depends(verify_admin)])
+async def run_retention_now(max_batches: Optional[int] = None):
+    """Run or resume a retention pass now (max_batches bounds the work done by this request)"""
+    from app.services.retention import run_retention
+    state = await run_retention(max_batches=max_batches)
+    if state is None:
+        raise HTTPException(status_code=409, detail="A retention pass is running on another worker")
+    return state
+
+
+@router.post("/erasure-jobs", status_code=202, dependencies=[Depends(verify_admin)])
+async def create_erasure_job_admin(job_data: AdminErasureJobCreate, db: AsyncSession = Depends(get_db)):
+    """Queue erasure or anonymization for a tenant; without subjects, every consent record of the tenant (offboarding)
+    Erasing a whole tenant needs confirm_tenant set to the same api_key_id
+    """
+    import uuid
+    from app.api.routes.erasure import validate_subjects
+    from app.services.erasure import create_erasure_job, job_response
+    try:
+        api_key_id = uuid.UUID(job_data.api_key_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="API key not found")
+    if await db.get(APIKey, api_key_id) is None:
+        raise HTTPException(status_code=404, detail="API key not found")
+    if job_data.subjects is None and job_data.confirm_tenant != job_data.api_key_id:
+        raise HTTPException(
+            status_code=422, detail="Erasing every record of a tenant needs confirm_tenant set to its api_key_id"
+        )
+    subjects = validate_subjects(job_data.subjects)
+    job = await create_erasure_job(db, api_key_id, job_data.mode, subjects)
+    return job_response(job)
+
+
+@router.get("/erasure-jobs", dependencies=[Depends(verify_admin)])
+async def list_erasure_jobs(status: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    """Erasure jobs of all tenants, newest first"""
+    from app.models.erasure_job import ErasureJob
+    from app.services.erasure import job_response
+    query = select(ErasureJob).order_by(ErasureJob.created_at.desc()).limit(200)
+    if status:
+        query = query.where(ErasureJob.status == status)
+    result = await db.execute(query)
+    return [{"api_key_id": str(job.api_key_id), **job_response(job)} for job in result.scalars().all()]
+
+
+@router.post("/erasure-jobs/run", status_code=202, dependencies=[Depends(verify_admin)])
+async def run_erasure_jobs_now(max_batches: Optional[int] = None):
+    """Start a run of the queued erasure jobs in the background (max_batches bounds the work per job)
+    Follow progress with GET /api/admin/erasure-jobs
+    """
+    from app.services.erasure import erasure_run_queue, run_pending_erasures
+    if not erasure_run_queue.submit(run_pending_erasures, max_batches):
+        raise HTTPException(status_code=409, detail="An erasure run is already queued")
+    return {"queued": True, "max_batches": max_batches}
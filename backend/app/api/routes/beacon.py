@@ -0,0 +1,226 @@
+"""Public consent beacon - widget submissions keyed by published script ID"""
+from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Request, Response
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, ensure_schema
+from app.core.responses import orjson
+from app.services.config_cache import config_cache
+from app.services.config_versions import version_resolver
+from app.services.ingest import (
+    ConsentEvent, InteractionEvent, beacon_consent_id, dispatch_webhooks, ingest_buffer, write_batch
+)
+import json
+import re
+import zlib
+
+router = APIRouter(prefix="/api/beacon", tags=["Beacon"])
+
+_VERSION = re.compile(r"^[0-9a-f]{12}$")
+
+# Widget interactions accepted in event batches
+INTERACTION_TYPES = {"preferences_opened", "language_switched", "category_toggled"}
+
+
+def _loads(body: bytes):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def _valid_categories(value, allowed) -> bool:
+    return (
+        isinstance(value, dict)
+        and all(key in allowed and isinstance(flag, bool) for key, flag in value.items())
+    )
+
+
+@router.post("/{script_id}", status_code=204)
+async def consent_beacon(script_id: str, request: Request):
+    """
+    Record a consent decision from the widget
+    No API key: authorised by the published script ID, like /api/config.
+    Accepts navigator.sendBeacon / fetch keepalive bodies (text/plain JSON):
+    {"consent_id", "session_id", "categories", "previous_categories"?, "action"?, "config_version"?, "user_id"?}
+    """
+    cached = await _published_config(script_id)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Script configuration not found or not published")
+
+    body = await request.body()
+    if len(body) > settings.BEACON_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Beacon payload too large")
+    try:
+        payload = _loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid beacon payload")
+    client_consent_id = payload.get("consent_id")
+    session_id = payload.get("session_id")
+    categories = payload.get("categories")
+    previous = payload.get("previous_categories")
+    action = payload.get("action") or "created"
+    user_id = payload.get("user_id")
+    if not (isinstance(client_consent_id, str) and 0 < len(client_consent_id) <= 100):
+        raise HTTPException(status_code=422, detail="consent_id is required")
+    if not (isinstance(session_id, str) and 0 < len(session_id) <= 255):
+        raise HTTPException(status_code=422, detail="session_id is required")
+    if not isinstance(action, str) or len(action) > 50:
+        raise HTTPException(status_code=422, detail="Invalid action")
+    if user_id is not None and not (isinstance(user_id, str) and 0 < len(user_id) <= 255):
+        raise HTTPException(status_code=422, detail="Invalid user_id")
+    if not _valid_categories(categories, cached.categories):
+        raise HTTPException(status_code=422, detail="Categories do not match the published configuration")
+    if previous is not None and not _valid_categories(previous, cached.categories):
+        previous = None
+    config_version_id = await _shown_config_version(cached, payload.get("config_version"))
+
+    event = ConsentEvent(
+        consent_id=beacon_consent_id(script_id, session_id, client_consent_id),
+        api_key_id=cached.api_key_id,
+        script_id=script_id,
+        session_id=session_id,
+        categories=categories,
+        previous_categories=previous,
+        action=action,
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent"),
+        referer=request.headers.get("referer"),
+        accept_language=request.headers.get("accept-language"),
+        received_at=datetime.utcnow(),
+        webhook_url=cached.webhook_url,
+        config_version_id=config_version_id,
+        user_id=user_id
+    )
+
+    if settings.BEACON_SYNC_WRITES:
+        # Serverless: nothing runs after the response, so write before returning
+        if await write_batch([event]):
+            raise HTTPException(status_code=503, detail="Consent data is being moved", headers={"Retry-After": "5"})
+        dispatch_webhooks([event])
+    elif not ingest_buffer.submit(event):
+        raise HTTPException(status_code=503, detail="Consent ingestion is overloaded", headers={"Retry-After": "1"})
+
+    return Response(status_code=204)
+
+
+@router.post("/{script_id}/events", status_code=204)
+async def interaction_beacon(script_id: str, request: Request):
+    """
+    Record a batch of widget interactions as consent history
+    Body is JSON, optionally gzip-compressed (detected by magic bytes):
+    {"v": 1, "c": consent_id, "s": session_id, "t": base_ms, "e": [[type, offset_ms, data, count], ...]}
+    """
+    cached = await _published_config(script_id)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Script configuration not found or not published")
+
+    body = await request.body()
+    if len(body) > settings.BEACON_EVENTS_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Event batch too large")
+    if body[:2] == b"\x1f\x8b":
+        body = _gunzip(body, settings.BEACON_EVENTS_MAX_DECODED_BYTES)
+    try:
+        payload = _loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    if not isinstance(payload, dict) or payload.get("v") != 1:
+        raise HTTPException(status_code=400, detail="Unsupported event batch format")
+    client_consent_id = payload.get("c")
+    session_id = payload.get("s")
+    base = payload.get("t")
+    entries = payload.get("e")
+    if not (isinstance(client_consent_id, str) and 0 < len(client_consent_id) <= 100):
+        raise HTTPException(status_code=422, detail="Consent ID is required")
+    if not (isinstance(session_id, str) and 0 < len(session_id) <= 255):
+        raise HTTPException(status_code=422, detail="Session ID is required")
+    if not isinstance(entries, list) or len(entries) > settings.BEACON_EVENTS_MAX_EVENTS:
+        raise HTTPException(status_code=422, detail="Invalid event list")
+
+    consent_id = beacon_consent_id(script_id, session_id, client_consent_id)
+    ip_address = request.client.host if request.client else None
+    user_agent = request.headers.get("user-agent")
+    received_at = datetime.utcnow()
+    events = []
+    for entry in entries:
+        # Unknown or malformed entries are skipped so newer widgets don't lose the whole batch
+        if not (isinstance(entry, list) and len(entry) == 4 and entry[0] in INTERACTION_TYPES):
+            continue
+        action, offset, data, count = entry
+        if data is not None and not _valid_event_data(data):
+            data = None
+        events.append(InteractionEvent(
+            consent_id=consent_id,
+            api_key_id=cached.api_key_id,
+            session_id=session_id,
+            action=action,
+            count=count if isinstance(count, int) and count > 0 else 1,
+            data=data,
+            client_time=_client_time(base, offset),
+            ip_address=ip_address,
+            user_agent=user_agent,
+            received_at=received_at
+        ))
+
+    if not events:
+        return Response(status_code=204)
+    if settings.BEACON_SYNC_WRITES:
+        if await write_batch(events):
+            raise HTTPException(status_code=503, detail="Consent data is being moved", headers={"Retry-After": "5"})
+    elif not ingest_buffer.submit_many(events):
+        raise HTTPException(status_code=503, detail="Consent ingestion is overloaded", headers={"Retry-After": "1"})
+
+    return Response(status_code=204)
+
+
+def _gunzip(body: bytes, max_size: int) -> bytes:
+    """Decompress a gzip body, refusing anything that inflates past max_size"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(body, max_size)
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Invalid gzip body")
+    if decompressor.unconsumed_tail:
+        raise HTTPException(status_code=413, detail="Event batch too large")
+    return data
+
+
+def _valid_event_data(data) -> bool:
+    return (
+        isinstance(data, dict)
+        and len(data) <= 4
+        and all(
+            isinstance(key, str) and len(key) <= 50
+            and (isinstance(value, bool) or (isinstance(value, str) and len(value) <= 100))
+            for key, value in data.items()
+        )
+    )
+
+
+def _client_time(base, offset):
+    """Client clock for an event (base and offset are epoch milliseconds)"""
+    if not isinstance(base, (int, float)) or not isinstance(offset, (int, float)):
+        return None
+    try:
+        return datetime.utcfromtimestamp(0) + timedelta(milliseconds=base + offset)
+    except OverflowError:
+        return None
+
+
+async def _shown_config_version(cached, version):
+    """Snapshot the visitor saw; only looked up when it isn't the one published now"""
+    if not isinstance(version, str) or version == cached.version or not _VERSION.match(version):
+        return cached.version_id
+    async with AsyncSessionLocal() as db:
+        version_id = await version_resolver.resolve(db, cached.script_id, version)
+    return version_id or cached.version_id
+
+
+async def _published_config(script_id: str):
+    """Cached config lookup; only opens a session on a cache miss"""
+    hit, cached = config_cache.lookup(script_id)
+    if hit:
+        return cached
+    await ensure_schema()
+    async with AsyncSessionLocal() as db:
+        return await config_cache.load(db, script_id)
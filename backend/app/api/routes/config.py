@@ -1,50 +1,132 @@
 """Script Configuration Routes - OneTrust-style"""
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
+from typing import Optional
 import secrets
 import string
 from app.core.database import get_db
 from app.api.dependencies import verify_api_key
 from app.models.api_key import APIKey
 from app.models.script_config import ScriptConfig
-from app.api.schemas import ScriptConfigCreate, ScriptConfigUpdate, ScriptConfigResponse
+from app.models.script_config_version import ScriptConfigVersion
+from app.api.schemas import ScriptConfigCreate, ScriptConfigUpdate, ScriptConfigResponse, ScriptConfigRollback
+from app.core.config import settings
+from app.core.profiling import mark_long_lived
+from app.core.responses import PreEncodedJSONResponse, json_dumps, precompressed_response
+from app.services.config_cache import config_cache
+from app.services.config_events import (
+    config_event_hub, format_sse, notify_config_change, script_topic, tenant_topic
+)
+from app.services.config_versions import find_version, publish_snapshot
+from app.services.language_packs import negotiate_language
 
 router = APIRouter(prefix="/api", tags=["Script Configuration"])
 
 
 @router.get("/config/{script_id}")
-async def get_script_config(script_id: str, db: AsyncSession = Depends(get_db)):
+async def get_script_config(script_id: str, request: Request, v: str = None, db: AsyncSession = Depends(get_db)):
     """
     Public endpoint to get script configuration by script ID
     Used by the widget to fetch its configuration
     No authentication required (public config)
+    ETag is the published snapshot version; ?v=<version> of the current snapshot is cacheable for a year
     """
-    result = await db.execute(
-        select(ScriptConfig).where(
-            and_(
-                ScriptConfig.script_id == script_id,
-                ScriptConfig.is_published == True,
-                ScriptConfig.is_active == True
-            )
-        )
-    )
-    config = result.scalar_one_or_none()
+    cached = await config_cache.load(db, script_id)
     
-    if not config:
+    if not cached:
         raise HTTPException(status_code=404, detail="Script configuration not found or not published")
     
-    return {
-        "script_id": config.script_id,
-        "domain": config.domain,
-        "categories": config.categories,
-        "banner_config": config.banner_config,
-        "default_language": config.default_language,
-        "supported_languages": config.supported_languages,
-        "cookie_policy_url": config.cookie_policy_url,
-        "webhook_url": config.webhook_url,
-        "external_tool_url": config.external_tool_url
-    }
+    etag = f'"{cached.version}"'
+    headers = {"ETag": etag}
+    if v and v == cached.version:
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    # Body was encoded once when the config was cached
+    return PreEncodedJSONResponse(cached.body, headers=headers)
+
+
+@router.get("/config/{script_id}/i18n")
+async def get_negotiated_language_pack(script_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Public endpoint: widget strings in the visitor's language
+    Picked from the config's languages by Accept-Language (Content-Language names the choice)
+    """
+    cached = await config_cache.load(db, script_id)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Script configuration not found or not published")
+
+    language = negotiate_language(
+        request.headers.get("accept-language"), cached.supported_languages, cached.default_language
+    )
+    return _language_pack_response(
+        cached, language, request,
+        cache_control=f"public, max-age={settings.LANGUAGE_PACK_MAX_AGE_SECONDS}",
+        vary="Accept-Language, Accept-Encoding"
+    )
+
+
+@router.get("/config/{script_id}/i18n/{language}")
+async def get_language_pack(script_id: str, language: str, request: Request,
+                            v: str = None, db: AsyncSession = Depends(get_db)):
+    """
+    Public endpoint: widget strings for one language
+    ?v=<version> (from the config's language_packs) makes the response cacheable for a year
+    """
+    cached = await config_cache.load(db, script_id)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Script configuration not found or not published")
+
+    pack = cached.language_packs.get(language)
+    if v and pack is not None and v == pack.version:
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        cache_control = f"public, max-age={settings.LANGUAGE_PACK_MAX_AGE_SECONDS}"
+    return _language_pack_response(cached, language, request, cache_control=cache_control, vary="Accept-Encoding")
+
+
+@router.get("/config/{script_id}/events")
+async def stream_config_events(script_id: str, request: Request, since: str = None,
+                               db: AsyncSession = Depends(get_db)):
+    """
+    Public endpoint: Server-Sent Events whenever the published config changes
+    Starts with the current version (skipped if it matches Last-Event-ID), so caches can keep
+    /api/config/{script_id}?v=<version> until told otherwise.
+    ?since=<version> long-polls instead: returns at once if the version differs, else waits for a change (204 on timeout)
+    """
+    cached = await config_cache.load(db, script_id)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Script configuration not found or not published")
+    # Streams outlive the request; don't hold a connection for them
+    await db.close()
+    mark_long_lived(request.scope)
+
+    current = {"type": "version", "script_id": script_id, "version": cached.version}
+    if since is not None:
+        if since != cached.version:
+            return PreEncodedJSONResponse(json_dumps(current), headers={"Cache-Control": "no-store"})
+        return await _long_poll(script_topic(script_id))
+
+    initial = None if request.headers.get("last-event-id") == cached.version else current
+    return _event_stream(script_topic(script_id), initial, script_id=script_id, version=cached.version)
+
+
+def _language_pack_response(cached, language: str, request: Request, cache_control: str, vary: str):
+    pack = cached.language_packs.get(language)
+    if pack is None:
+        if language not in cached.supported_languages:
+            raise HTTPException(status_code=404, detail="Language not supported by this configuration")
+        # Supported but nothing to download (built-in English): the widget uses its own strings
+        return PreEncodedJSONResponse(
+            b"{}", headers={"Content-Language": language, "Cache-Control": cache_control, "Vary": vary}
+        )
+    return precompressed_response(
+        pack, request, "application/json", cache_control,
+        headers={"Content-Language": language, "Vary": vary}
+    )
 
 
 @router.post("/script-configs", response_model=dict)
@@ -86,6 +168,7 @@ async def create_script_config(
         banner_config=config_data.banner_config,
         default_language=config_data.default_language,
         supported_languages=config_data.supported_languages,
+        language_packs=config_data.language_packs,
         cookie_policy_url=config_data.cookie_policy_url,
         webhook_url=config_data.webhook_url,
         external_tool_url=config_data.external_tool_url,
@@ -135,6 +218,64 @@ async def list_script_configs(
     }
 
 
+@router.get("/script-configs/events")
+async def stream_tenant_config_events(
+    request: Request,
+    wait: bool = False,
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_db)
+):
+    """Server-Sent Events for every change (including draft edits) to this API key's script configurations
+    ?wait=true long-polls for the next event instead (204 on timeout)
+    """
+    topic = tenant_topic(api_key_obj.id)
+    await db.close()
+    mark_long_lived(request.scope)
+    if wait:
+        return await _long_poll(topic)
+    return _event_stream(topic, None)
+
+
+def _event_stream(topic: str, initial: Optional[dict], script_id: str = None, version: str = None):
+    """SSE response for a topic; per-script streams also re-check the cached version on each heartbeat"""
+    if not config_event_hub.accepting():
+        raise HTTPException(status_code=503, detail="Too many open event streams", headers={"Retry-After": "30"})
+
+    async def body():
+        sent_version = version
+        yield b"retry: 5000\n\n"
+        if initial is not None:
+            yield format_sse(initial)
+        async for event in config_event_hub.listen(topic, settings.CONFIG_EVENTS_HEARTBEAT_SECONDS):
+            if event is None and script_id:
+                # Catches changes made on other workers (without a relay) once this worker's cache expires
+                hit, cached = config_cache.lookup(script_id)
+                if hit and cached and cached.version != sent_version:
+                    event = {"type": "version", "script_id": script_id, "version": cached.version}
+            if event is not None and event.get("version"):
+                sent_version = event["version"]
+            yield format_sse(event)
+
+    return StreamingResponse(
+        body(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _long_poll(topic: str):
+    """Wait for the next event on a topic, up to one heartbeat interval"""
+    if not config_event_hub.accepting():
+        raise HTTPException(status_code=503, detail="Too many open event streams", headers={"Retry-After": "30"})
+    events = config_event_hub.listen(topic, settings.CONFIG_EVENTS_HEARTBEAT_SECONDS)
+    try:
+        event = await events.__anext__()
+    finally:
+        await events.aclose()
+    if event is None:
+        return Response(status_code=204, headers={"Cache-Control": "no-store"})
+    return PreEncodedJSONResponse(json_dumps(event), headers={"Cache-Control": "no-store"})
+
+
 @router.get("/script-configs/{script_id}")
 async def get_script_config_detail(
     script_id: str,
@@ -162,11 +303,13 @@ async def get_script_config_detail(
         "banner_config": config.banner_config,
         "default_language": config.default_language,
         "supported_languages": config.supported_languages,
+        "language_packs": config.language_packs or {},
         "cookie_policy_url": config.cookie_policy_url,
         "webhook_url": config.webhook_url,
         "external_tool_url": config.external_tool_url,
         "is_published": config.is_published,
         "is_active": config.is_active,
+        "published_version_id": str(config.published_version_id) if config.published_version_id else None,
         "created_at": config.created_at.isoformat(),
         "updated_at": config.updated_at.isoformat() if config.updated_at else None,
         "script_tag": f'<script src="http://localhost:8000/widget/consent-widget.js" data-domain-script="{config.script_id}" charset="UTF-8"></script>'
@@ -180,7 +323,9 @@ async def update_script_config(
     api_key_obj: APIKey = Depends(verify_api_key),
     db: AsyncSession = Depends(get_db)
 ):
-    """Update script configuration"""
+    """Update the draft script configuration
+    Visitors keep getting the published snapshot until the config is published again
+    """
     result = await db.execute(
         select(ScriptConfig).where(
             and_(
@@ -196,11 +341,23 @@ async def update_script_config(
     
     # Update fields
     update_data = config_update.dict(exclude_unset=True)
+    publish = update_data.pop("is_published", None)
     for key, value in update_data.items():
         setattr(config, key, value)
     
+    if publish:
+        await publish_snapshot(db, config)
+    elif publish is False:
+        config.is_published = False
+    
     await db.commit()
     await db.refresh(config)
+    cached = await config_cache.refresh(db, config)
+    if publish is not None or "is_active" in update_data:
+        # What visitors get may have changed: notify the public stream too
+        notify_config_change(config, "published" if cached else "unpublished", cached.version if cached else None)
+    else:
+        notify_config_change(config, "draft_updated", public=False)
     
     return {
         "script_id": config.script_id,
@@ -208,7 +365,8 @@ async def update_script_config(
         "config": {
             "domain": config.domain,
             "is_published": config.is_published,
-            "is_active": config.is_active
+            "is_active": config.is_active,
+            "published_version_id": str(config.published_version_id) if config.published_version_id else None
         }
     }
 
@@ -219,7 +377,9 @@ async def publish_script_config(
     api_key_obj: APIKey = Depends(verify_api_key),
     db: AsyncSession = Depends(get_db)
 ):
-    """Publish script configuration (makes it accessible to widget)"""
+    """Publish script configuration (makes it accessible to widget)
+    Freezes the current draft into an immutable snapshot; publishing unchanged content reuses the last one
+    """
     result = await db.execute(
         select(ScriptConfig).where(
             and_(
@@ -233,14 +393,97 @@ async def publish_script_config(
     if not config:
         raise HTTPException(status_code=404, detail="Script configuration not found")
     
-    config.is_published = True
+    version = await publish_snapshot(db, config)
     await db.commit()
+    await db.refresh(config)
+    config_cache.put(config, version)
+    notify_config_change(config, "published", version.version)
     
     return {
         "script_id": config.script_id,
         "message": "Script configuration published",
+        "version": version.version,
+        "version_id": str(version.id),
         "script_tag": f'<script src="http://localhost:8000/widget/consent-widget.js" data-domain-script="{config.script_id}" charset="UTF-8"></script>'
     }
 
 
+@router.get("/script-configs/{script_id}/versions")
+async def list_script_config_versions(
+    script_id: str,
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_db)
+):
+    """List published snapshots of a script configuration, newest first"""
+    result = await db.execute(
+        select(ScriptConfig).where(
+            and_(
+                ScriptConfig.script_id == script_id,
+                ScriptConfig.api_key_id == api_key_obj.id
+            )
+        )
+    )
+    config = result.scalar_one_or_none()
+    
+    if not config:
+        raise HTTPException(status_code=404, detail="Script configuration not found")
+    
+    result = await db.execute(
+        select(ScriptConfigVersion)
+        .where(ScriptConfigVersion.script_config_id == config.id)
+        .order_by(ScriptConfigVersion.created_at.desc())
+    )
+    
+    return {
+        "script_id": config.script_id,
+        "versions": [
+            {
+                "version_id": str(version.id),
+                "version": version.version,
+                "content_hash": version.content_hash,
+                "is_current": version.id == config.published_version_id,
+                "created_at": version.created_at.isoformat() if version.created_at else None
+            }
+            for version in result.scalars().all()
+        ]
+    }
+
 
+@router.post("/script-configs/{script_id}/rollback")
+async def rollback_script_config(
+    script_id: str,
+    rollback_data: ScriptConfigRollback,
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_db)
+):
+    """Serve an earlier published snapshot again (the draft is left as it is)"""
+    result = await db.execute(
+        select(ScriptConfig).where(
+            and_(
+                ScriptConfig.script_id == script_id,
+                ScriptConfig.api_key_id == api_key_obj.id
+            )
+        )
+    )
+    config = result.scalar_one_or_none()
+    
+    if not config:
+        raise HTTPException(status_code=404, detail="Script configuration not found")
+    
+    version = await find_version(db, config, rollback_data.version)
+    if not version:
+        raise HTTPException(status_code=404, detail="Version not found for this configuration")
+    
+    config.published_version_id = version.id
+    config.is_published = True
+    await db.commit()
+    await db.refresh(config)
+    config_cache.put(config, version)
+    notify_config_change(config, "rolled_back", version.version)
+    
+    return {
+        "script_id": config.script_id,
+        "message": "Script configuration rolled back",
+        "version": version.version,
+        "version_id": str(version.id)
+    }
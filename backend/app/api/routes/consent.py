@@ -1,19 +1,25 @@
 """Consent Management Routes"""
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 from typing import Optional
 import uuid
-from app.core.database import get_db
-from app.api.dependencies import verify_api_key
+from app.api.dependencies import get_tenant_db, verify_api_key
 from app.models.api_key import APIKey
 from app.models.consent import Consent
 from app.models.consent_history import ConsentHistory
 from app.models.script_config import ScriptConfig
 from app.api.schemas import ConsentRequest, ConsentResponse, ConsentStatus
-import asyncio
-import aiohttp
+from app.core.responses import PreEncodedJSONResponse, json_dumps, model_response
+from app.services.webhooks import queue_webhook
+from app.services.audit_chain import history_proof
+from app.services.config_versions import version_resolver
+from app.services.data_subjects import link_session
+from app.services.idempotency import (
+    IdempotencyConflict, idempotency_store, request_fingerprint, request_keys, session_slot, store_keys
+)
 
 router = APIRouter(prefix="/api/v1", tags=["Consent"])
 
@@ -23,7 +29,7 @@ async def check_consent(
     session_id: str,
     script_id: Optional[str] = None,
     api_key_obj: APIKey = Depends(verify_api_key),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
 ):
     """Check if user has given consent"""
     query = select(Consent).where(
@@ -41,19 +47,14 @@ async def check_consent(
     consent = result.scalar_one_or_none()
     
     if consent and consent.is_active():
-        return {
-            "has_consent": True,
-            "consent_id": str(consent.id),
-            "categories": consent.consent_categories,
-            "last_updated": consent.updated_at
-        }
+        return model_response(ConsentStatus(
+            has_consent=True,
+            consent_id=str(consent.id),
+            categories=consent.consent_categories,
+            last_updated=consent.updated_at
+        ))
     
-    return {
-        "has_consent": False,
-        "consent_id": None,
-        "categories": None,
-        "last_updated": None
-    }
+    return model_response(ConsentStatus(has_consent=False))
 
 
 @router.post("/consent/create", response_model=ConsentResponse)
@@ -61,70 +62,138 @@ async def create_consent(
     consent_data: ConsentRequest,
     request: Request,
     script_id: Optional[str] = None,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     api_key_obj: APIKey = Depends(verify_api_key),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
 ):
-    """Create a new consent record"""
-    # Get IP address
-    ip_address = consent_data.ip_address or request.client.host if request.client else None
-    
-    # Get script config if script_id provided
-    script_config = None
-    if script_id:
-        result = await db.execute(
-            select(ScriptConfig).where(
-                and_(
-                    ScriptConfig.script_id == script_id,
-                    ScriptConfig.api_key_id == api_key_obj.id
-                )
-            )
-        )
-        script_config = result.scalar_one_or_none()
+    """Create a new consent record
     
-    # Create consent
-    consent = Consent(
-        session_id=consent_data.session_id,
-        user_id=consent_data.user_id,
-        api_key_id=api_key_obj.id,
-        script_id=script_id,
-        consent_categories=consent_data.consent_categories,
-        ip_address=ip_address,
-        user_agent=consent_data.user_agent,
-        status="active",
-        expires_at=datetime.utcnow() + timedelta(days=365)  # 1 year expiry
+    Retries are safe: requests with the same Idempotency-Key, or identical
+    submissions within CONSENT_DEDUP_WINDOW_SECONDS, return the original
+    result instead of writing again.
+    """
+    # Read once: a rollback below expires api_key_obj
+    api_key_id = api_key_obj.id
+    fingerprint = request_fingerprint(
+        api_key_id, script_id, consent_data.session_id, consent_data.consent_categories,
+        consent_data.user_id, consent_data.action
     )
+    keys = request_keys(idempotency_key, session_slot(api_key_id, script_id, consent_data.session_id))
     
-    db.add(consent)
-    await db.commit()
-    await db.refresh(consent)
+    try:
+        replay = await idempotency_store.lookup(db, api_key_id, keys, fingerprint)
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    if replay is not None:
+        return replayed_response(replay)
     
-    # Create history record
-    history = ConsentHistory(
-        consent_id=consent.id,
-        session_id=consent.session_id,
-        action=consent_data.action or "created",
-        new_categories=consent.consent_categories,
-        ip_address=ip_address,
-        user_agent=consent_data.user_agent,
-        extra_metadata={
-            "referer": request.headers.get("referer"),
-            "accept_language": request.headers.get("accept-language"),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    )
-    db.add(history)
-    await db.commit()
+    async with idempotency_store.claim(api_key_id, keys, fingerprint) as complete:
+        # Get IP address
+        ip_address = consent_data.ip_address or request.client.host if request.client else None
+        
+        # Get script config if script_id provided
+        script_config = None
+        if script_id:
+            result = await db.execute(
+                select(ScriptConfig).where(
+                    and_(
+                        ScriptConfig.script_id == script_id,
+                        ScriptConfig.api_key_id == api_key_id
+                    )
+                )
+            )
+            script_config = result.scalar_one_or_none()
+        config_version_id = await _shown_config_version(db, script_config, consent_data.config_version)
+        
+        # Create consent
+        now = datetime.utcnow()
+        consent = Consent(
+            id=uuid.uuid4(),
+            session_id=consent_data.session_id,
+            user_id=consent_data.user_id,
+            api_key_id=api_key_id,
+            script_id=script_id,
+            config_version_id=config_version_id,
+            consent_categories=consent_data.consent_categories,
+            ip_address=ip_address,
+            user_agent=consent_data.user_agent,
+            status="active",
+            created_at=now,
+            updated_at=now,
+            expires_at=now + timedelta(days=365)  # 1 year expiry
+        )
+        
+        # Create history record
+        history = ConsentHistory(
+            consent_id=consent.id,
+            session_id=consent.session_id,
+            api_key_id=api_key_id,
+            action=consent_data.action or "created",
+            new_categories=consent.consent_categories,
+            ip_address=ip_address,
+            user_agent=consent_data.user_agent,
+            timestamp=now,
+            extra_metadata={
+                "referer": request.headers.get("referer"),
+                "accept_language": request.headers.get("accept-language"),
+                "timestamp": now.isoformat()
+            }
+        )
+        
+        response = ConsentResponse(
+            consent_id=str(consent.id),
+            status=consent.status,
+            timestamp=consent.created_at,
+            expires_at=consent.expires_at
+        )
+        response_data = response.model_dump(mode="json")
+        
+        # Consent, history and idempotency records are written in one transaction
+        db.add(consent)
+        await db.flush()
+        await link_session(db, api_key_id, consent.user_id, consent.session_id, now)
+        db.add(history)
+        try:
+            stored = await store_keys(db, api_key_id, keys, fingerprint, consent.id, response_data)
+            if stored:
+                await db.commit()
+        except IntegrityError:
+            stored = False
+        if not stored:
+            # Another worker stored the same request first; return its result
+            await db.rollback()
+            try:
+                found = await idempotency_store.lookup_db(db, api_key_id, keys, fingerprint)
+            except IdempotencyConflict:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            if found is None:
+                raise HTTPException(status_code=409, detail="A concurrent request for this session is in progress; retry")
+            complete(found[1])
+            return replayed_response(found[1])
+        complete(response_data)
     
     # Send webhook if configured
     if script_config and script_config.webhook_url:
-        asyncio.create_task(send_webhook(script_config.webhook_url, consent, "created"))
-    
-    return {
-        "consent_id": str(consent.id),
-        "status": consent.status,
-        "timestamp": consent.created_at,
-        "expires_at": consent.expires_at
-    }
+        queue_webhook(script_config.webhook_url, consent, "created")
+    
+    return model_response(response)
+
+
+async def _shown_config_version(db: AsyncSession, script_config: Optional[ScriptConfig],
+                                version: Optional[str]) -> Optional[uuid.UUID]:
+    """Snapshot the user saw: the version the caller reports, else the one published now"""
+    if script_config is None:
+        return None
+    if version:
+        version_id = await version_resolver.resolve(db, script_config.script_id, version)
+        if version_id is not None:
+            return version_id
+    return script_config.published_version_id
+
+
+def replayed_response(response_data: dict):
+    """Return a stored create result, flagged as a replay"""
+    return PreEncodedJSONResponse(json_dumps(response_data), headers={"Idempotent-Replayed": "true"})
 
 
 @router.put("/consent/{consent_id}", response_model=ConsentResponse)
@@ -133,7 +202,7 @@ async def update_consent(
     consent_data: ConsentRequest,
     request: Request,
     api_key_obj: APIKey = Depends(verify_api_key),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
 ):
     """Update an existing consent"""
     consent_uuid = uuid.UUID(consent_id)
@@ -153,10 +222,24 @@ async def update_consent(
     # Store previous categories for history
     previous_categories = consent.consent_categories.copy()
     
+    script_config = None
+    if consent.script_id:
+        result = await db.execute(
+            select(ScriptConfig).where(ScriptConfig.script_id == consent.script_id)
+        )
+        script_config = result.scalar_one_or_none()
+    
     # Update consent
     consent.consent_categories = consent_data.consent_categories
+    consent.config_version_id = (
+        await _shown_config_version(db, script_config, consent_data.config_version) or consent.config_version_id
+    )
     consent.ip_address = consent_data.ip_address or request.client.host if request.client else consent.ip_address
     consent.user_agent = consent_data.user_agent or consent.user_agent
+    now = datetime.utcnow()
+    # Same clock as the other write paths; shard moves copy changed rows by it
+    consent.updated_at = now
+    await link_session(db, consent.api_key_id, consent_data.user_id or consent.user_id, consent.session_id, now)
     
     await db.commit()
     await db.refresh(consent)
@@ -165,55 +248,59 @@ async def update_consent(
     history = ConsentHistory(
         consent_id=consent.id,
         session_id=consent.session_id,
+        api_key_id=consent.api_key_id,
         action=consent_data.action or "updated",
         previous_categories=previous_categories,
         new_categories=consent.consent_categories,
         ip_address=consent.ip_address,
         user_agent=consent.user_agent,
+        timestamp=now,
         extra_metadata={
             "referer": request.headers.get("referer"),
             "accept_language": request.headers.get("accept-language"),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": now.isoformat()
         }
     )
     db.add(history)
     await db.commit()
     
     # Send webhook if configured
-    if consent.script_id:
-        result = await db.execute(
-            select(ScriptConfig).where(ScriptConfig.script_id == consent.script_id)
-        )
-        script_config = result.scalar_one_or_none()
-        if script_config and script_config.webhook_url:
-            asyncio.create_task(send_webhook(script_config.webhook_url, consent, "updated"))
-    
-    return {
-        "consent_id": str(consent.id),
-        "status": consent.status,
-        "timestamp": consent.updated_at or consent.created_at,
-        "expires_at": consent.expires_at
-    }
+    if script_config and script_config.webhook_url:
+        queue_webhook(script_config.webhook_url, consent, "updated")
+    
+    return model_response(ConsentResponse(
+        consent_id=str(consent.id),
+        status=consent.status,
+        timestamp=consent.updated_at or consent.created_at,
+        expires_at=consent.expires_at
+    ))
 
 
-async def send_webhook(webhook_url: str, consent: Consent, action: str):
-    """Send consent data to webhook URL"""
+@router.get("/consent/history/{history_id}/proof")
+async def get_history_proof(
+    history_id: str,
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_tenant_db)
+):
+    """Merkle inclusion proof of a consent history record against its audit seal"""
     try:
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "consent_id": str(consent.id),
-                "session_id": consent.session_id,
-                "action": action,
-                "categories": consent.consent_categories,
-                "status": consent.status,
-                "created_at": consent.created_at.isoformat(),
-                "updated_at": consent.updated_at.isoformat() if consent.updated_at else None,
-                "expires_at": consent.expires_at.isoformat() if consent.expires_at else None
-            }
-            async with session.post(webhook_url, json=payload, timeout=aiohttp.ClientTimeout(total=5)) as response:
-                if response.status == 200:
-                    return await response.json()
-    except Exception as e:
-        print(f"Error sending webhook: {e}")
-        return None
-
+        history_uuid = uuid.UUID(history_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="History record not found")
+    result = await db.execute(
+        select(ConsentHistory).where(
+            and_(
+                ConsentHistory.id == history_uuid,
+                ConsentHistory.api_key_id == api_key_obj.id
+            )
+        )
+    )
+    history = result.scalar_one_or_none()
+    
+    if not history:
+        raise HTTPException(status_code=404, detail="History record not found")
+    
+    proof = await history_proof(db, history)
+    if proof is None:
+        raise HTTPException(status_code=409, detail="History record is not sealed yet")
+    return proof
@@ -0,0 +1,46 @@
+"""Data Subject Access and Erasure Routes"""
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.responses import FastJSONResponse
+from app.api.dependencies import get_tenant_db, verify_api_key
+from app.models.api_key import APIKey
+from app.services.data_subjects import erase_footprint, find_footprint
+
+router = APIRouter(prefix="/api/v1", tags=["Data Subjects"])
+
+
+def _require_subject(user_id: Optional[str], session_id: Optional[str]):
+    if not user_id and not session_id:
+        raise HTTPException(status_code=422, detail="Provide user_id and/or session_id")
+
+
+@router.get("/data-subjects/footprint")
+async def get_footprint(
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_tenant_db)
+):
+    """Everything stored about a data subject: consents, their history and grievances
+    With user_id, every session the user was seen with is included
+    """
+    _require_subject(user_id, session_id)
+    footprint = await find_footprint(db, api_key_obj.id, user_id, session_id)
+    return FastJSONResponse(footprint)
+
+
+@router.delete("/data-subjects/footprint")
+async def erase_subject(
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_tenant_db)
+):
+    """Erase a data subject's consents, history and grievances in one transaction
+    Sealed history leaves a content-free tombstone so the audit chain stays verifiable
+    """
+    _require_subject(user_id, session_id)
+    erased = await erase_footprint(db, api_key_obj.id, user_id, session_id)
+    await db.commit()
+    return {"user_id": user_id, "session_id": session_id, "erased": erased}
@@ -0,0 +1,80 @@
+"""Bulk Erasure Routes"""
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+from typing import List, Optional
+import uuid
+from app.core.config import settings
+from app.core.database import get_db
+from app.api.dependencies import verify_api_key
+from app.api.schemas import ErasureJobCreate, ErasureSubject
+from app.models.api_key import APIKey
+from app.models.erasure_job import ErasureJob
+from app.services.erasure import create_erasure_job, job_response
+
+router = APIRouter(prefix="/api/v1", tags=["Erasure"])
+
+
+def validate_subjects(subjects: Optional[List[ErasureSubject]]) -> Optional[List[dict]]:
+    """Subjects as stored on the job; each needs a user_id or a session_id"""
+    if subjects is None:
+        return None
+    if len(subjects) > settings.ERASURE_MAX_SUBJECTS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.ERASURE_MAX_SUBJECTS} subjects per job")
+    if any(not subject.user_id and not subject.session_id for subject in subjects):
+        raise HTTPException(status_code=422, detail="Every subject needs a user_id or a session_id")
+    return [subject.model_dump(exclude_none=True) for subject in subjects]
+
+
+@router.post("/erasure-jobs", status_code=202)
+async def create_job(
+    job_data: ErasureJobCreate,
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_db)
+):
+    """Queue erasure (mode=delete) or anonymization of many data subjects
+    The job runs in the background in small batches; poll GET /api/v1/erasure-jobs/{job_id}
+    """
+    subjects = validate_subjects(job_data.subjects)
+    job = await create_erasure_job(db, api_key_obj.id, job_data.mode, subjects)
+    return job_response(job)
+
+
+@router.get("/erasure-jobs")
+async def list_jobs(
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_db)
+):
+    """This API key's erasure jobs, newest first"""
+    result = await db.execute(
+        select(ErasureJob)
+        .where(ErasureJob.api_key_id == api_key_obj.id)
+        .order_by(ErasureJob.created_at.desc())
+        .limit(100)
+    )
+    return [job_response(job) for job in result.scalars().all()]
+
+
+@router.get("/erasure-jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_db)
+):
+    """Status and progress of an erasure job"""
+    try:
+        job_uuid = uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Erasure job not found")
+    result = await db.execute(
+        select(ErasureJob).where(
+            and_(
+                ErasureJob.id == job_uuid,
+                ErasureJob.api_key_id == api_key_obj.id
+            )
+        )
+    )
+    job = result.scalar_one_or_none()
+    if not job:
+        raise HTTPException(status_code=404, detail="Erasure job not found")
+    return job_response(job)
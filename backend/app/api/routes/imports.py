@@ -0,0 +1,65 @@
+"""Bulk Consent Import Routes"""
+from fastapi import APIRouter, HTTPException, Depends, Request
+from typing import Literal, Optional
+import json
+import re
+import uuid
+from app.core.config import settings
+from app.api.dependencies import verify_api_key
+from app.models.api_key import APIKey
+from app.services.consent_import import ConsentImportError, import_progress, run_import, skip_bytes
+
+router = APIRouter(prefix="/api/v1", tags=["Consent Import"])
+
+_IMPORT_ID = re.compile(r"^[A-Za-z0-9._:-]{1,80}$")
+
+
+def _category_map(value: Optional[str]) -> dict:
+    if not value:
+        return {}
+    try:
+        mapping = json.loads(value)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="category_map must be a JSON object")
+    if not isinstance(mapping, dict) or not all(isinstance(target, str) for target in mapping.values()):
+        raise HTTPException(status_code=422, detail="category_map must map category names to category names")
+    return mapping
+
+
+@router.post("/consent-imports")
+async def import_consents(
+    request: Request,
+    script_id: str,
+    format: Literal["csv", "ndjson"] = "csv",
+    import_id: Optional[str] = None,
+    category_map: Optional[str] = None,
+    api_key_obj: APIKey = Depends(verify_api_key)
+):
+    """Import historical consents from another CMP, streamed as the request body
+    CSV (header row) or NDJSON; category_map is a JSON object such as {"C0002": "analytics"}.
+    Re-send the same body with the same import_id to resume an interrupted import.
+    """
+    if import_id is None:
+        import_id = uuid.uuid4().hex
+    elif not _IMPORT_ID.match(import_id):
+        raise HTTPException(status_code=422, detail="import_id may only use letters, digits and . _ : -")
+    mapping = _category_map(category_map)
+    try:
+        return await run_import(
+            lambda offset: skip_bytes(request.stream(), offset),
+            api_key_obj.id, script_id, format, import_id, mapping, workers=settings.IMPORT_WORKERS
+        )
+    except ConsentImportError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+
+@router.get("/consent-imports/{import_id}")
+async def get_import(
+    import_id: str,
+    api_key_obj: APIKey = Depends(verify_api_key)
+):
+    """Progress and throughput of an import"""
+    report = await import_progress(api_key_obj.id, import_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return report
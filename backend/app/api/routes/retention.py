@@ -0,0 +1,64 @@
+"""Retention Policy Routes"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.database import get_db
+from app.api.dependencies import verify_api_key
+from app.api.schemas import RetentionPolicyUpdate
+from app.models.api_key import APIKey
+from app.models.retention_policy import RetentionPolicy
+
+router = APIRouter(prefix="/api/v1", tags=["Retention"])
+
+
+def _policy_response(policy):
+    compact_days = policy.compact_history_after_days if policy else None
+    inactive_days = policy.inactive_consent_retention_days if policy else None
+    return {
+        "compact_history_after_days": compact_days,
+        "inactive_consent_retention_days": inactive_days,
+        "effective": {
+            "compact_history_after_days":
+                settings.RETENTION_COMPACT_HISTORY_AFTER_DAYS if compact_days is None else compact_days,
+            "inactive_consent_retention_days":
+                settings.RETENTION_INACTIVE_CONSENT_DAYS if inactive_days is None else inactive_days
+        }
+    }
+
+
+@router.get("/retention-policy")
+async def get_retention_policy(
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_db)
+):
+    """Retention windows for this API key's consents (null fields use the server default)"""
+    result = await db.execute(
+        select(RetentionPolicy).where(RetentionPolicy.api_key_id == api_key_obj.id)
+    )
+    return _policy_response(result.scalar_one_or_none())
+
+
+@router.put("/retention-policy")
+async def update_retention_policy(
+    policy_data: RetentionPolicyUpdate,
+    api_key_obj: APIKey = Depends(verify_api_key),
+    db: AsyncSession = Depends(get_db)
+):
+    """Set retention windows in days (0 disables a rule)
+    History older than compact_history_after_days is summarized, keeping the first and last
+    records and every withdrawal; consents that ended more than inactive_consent_retention_days
+    ago are deleted
+    """
+    result = await db.execute(
+        select(RetentionPolicy).where(RetentionPolicy.api_key_id == api_key_obj.id)
+    )
+    policy = result.scalar_one_or_none()
+    if policy is None:
+        policy = RetentionPolicy(api_key_id=api_key_obj.id)
+        db.add(policy)
+    for key, value in policy_data.model_dump(exclude_unset=True).items():
+        setattr(policy, key, value)
+    await db.commit()
+    await db.refresh(policy)
+    return _policy_response(policy)
@@ -0,0 +1,46 @@
+"""Widget delivery - bootstrap script and versioned chunks"""
+from fastapi import APIRouter, HTTPException, Request
+from app.core.config import settings
+from app.core.responses import PrecompressedBody, precompressed_response
+from app.services.widget_assets import get_widget_bundle
+
+router = APIRouter(prefix="/widget", tags=["Widget"])
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+def script_response(asset: PrecompressedBody, request: Request, cache_control: str):
+    return precompressed_response(asset, request, "application/javascript", cache_control)
+
+
+@router.get("/consent-widget.js")
+async def get_widget(request: Request):
+    """Serve the widget bootstrap (short cache; it carries the chunk manifest)"""
+    bundle = get_widget_bundle()
+    if bundle is None:
+        return {"error": "Widget file not found"}
+    return script_response(
+        bundle.bootstrap, request, f"public, max-age={settings.WIDGET_BOOTSTRAP_MAX_AGE_SECONDS}"
+    )
+
+
+@router.get("/chunks/{filename}")
+async def get_widget_chunk(filename: str, request: Request):
+    """
+    Serve a widget chunk
+    <name>.<version>.js is cached for a year; <name>.js (no manifest) is revalidated.
+    A stale version is answered with the current chunk, uncached.
+    """
+    bundle = get_widget_bundle()
+    name, _, version = filename[:-3].partition(".") if filename.endswith(".js") else (None, "", "")
+    asset = bundle.chunks.get(name) if bundle is not None and name else None
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Widget chunk not found")
+
+    if not version:
+        cache_control = f"public, max-age={settings.WIDGET_BOOTSTRAP_MAX_AGE_SECONDS}"
+    elif version == asset.version:
+        cache_control = IMMUTABLE_CACHE
+    else:
+        cache_control = "no-cache"
+    return script_response(asset, request, cache_control)
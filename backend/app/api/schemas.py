@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response validation"""
-from pydantic import BaseModel
-from typing import Optional, List, Dict
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Literal
 from datetime import datetime
 
 
@@ -11,6 +11,7 @@ class ScriptConfigCreate(BaseModel):
     banner_config: Dict
     default_language: str = "en"
     supported_languages: List[str] = ["en"]
+    language_packs: Dict[str, Dict[str, Dict[str, str]]] = {}
     cookie_policy_url: Optional[str] = None
     webhook_url: Optional[str] = None
     external_tool_url: Optional[str] = None
@@ -23,6 +24,7 @@ class ScriptConfigUpdate(BaseModel):
     banner_config: Optional[Dict] = None
     default_language: Optional[str] = None
     supported_languages: Optional[List[str]] = None
+    language_packs: Optional[Dict[str, Dict[str, Dict[str, str]]]] = None
     cookie_policy_url: Optional[str] = None
     webhook_url: Optional[str] = None
     external_tool_url: Optional[str] = None
@@ -30,6 +32,10 @@ class ScriptConfigUpdate(BaseModel):
     is_published: Optional[bool] = None
 
 
+class ScriptConfigRollback(BaseModel):
+    version: str  # Snapshot id or content hash (at least 12 characters)
+
+
 class ScriptConfigResponse(BaseModel):
     script_id: str
     domain: str
@@ -55,6 +61,7 @@ class ConsentRequest(BaseModel):
     action: Optional[str] = None
     ip_address: Optional[str] = None
     user_agent: Optional[str] = None
+    config_version: Optional[str] = None  # Published config version the banner was rendered from
 
 
 class ConsentResponse(BaseModel):
@@ -71,6 +78,32 @@ class ConsentStatus(BaseModel):
     last_updated: Optional[datetime] = None
 
 
+# Retention Schemas
+class RetentionPolicyUpdate(BaseModel):
+    # Days; null uses the server default, 0 disables
+    compact_history_after_days: Optional[int] = Field(None, ge=0)
+    inactive_consent_retention_days: Optional[int] = Field(None, ge=0)
+
+
+# Erasure Schemas
+class ErasureSubject(BaseModel):
+    # user_id covers every session the user was seen with
+    user_id: Optional[str] = None
+    session_id: Optional[str] = None
+
+
+class ErasureJobCreate(BaseModel):
+    mode: Literal["delete", "anonymize"] = "delete"
+    subjects: List[ErasureSubject] = Field(..., min_length=1)
+
+
+class AdminErasureJobCreate(BaseModel):
+    api_key_id: str
+    mode: Literal["delete", "anonymize"] = "delete"
+    subjects: Optional[List[ErasureSubject]] = None  # None erases every record of the tenant
+    confirm_tenant: Optional[str] = None  # Must repeat api_key_id when subjects is None
+
+
 # Grievance Schemas
 class GrievanceRequest(BaseModel):
     session_id: str
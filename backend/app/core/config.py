@@ -1,6 +1,6 @@
 """Application configuration"""
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 
 
@@ -16,6 +16,10 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = int(os.getenv("PORT", "8000"))  # Support Railway/Render PORT env var
     
+    # Serverless
+    # Vercel sets VERCEL=1; import route modules on first request instead of at startup
+    LAZY_ROUTERS: bool = bool(os.getenv("VERCEL"))
+    
     # Database
     # Vercel provides POSTGRES_URL, Railway/Render provide DATABASE_URL
     DATABASE_URL: str = os.getenv("POSTGRES_URL") or os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./consent_manager.db")
@@ -23,16 +27,111 @@ class Settings(BaseSettings):
     # For Railway/Render: Set DATABASE_URL environment variable
     # For Vercel Postgres: POSTGRES_URL is automatically provided
     
+    # Tenant shards: extra databases for consent data, by name, e.g. '{"eu2": "postgresql+asyncpg://..."}'.
+    # DATABASE_URL is the shard "primary" and keeps API keys, configs, jobs and the shard directory.
+    SHARD_DATABASE_URLS: Dict[str, str] = {}
+    SHARD_NEW_TENANTS: List[str] = ["primary"]  # New API keys are spread over these shards
+    SHARD_DIRECTORY_CACHE_SECONDS: float = 5.0  # How long a worker trusts its cached tenant placement
+
+    # Schema migrations (alembic upgrade head, see core/migrations.py)
+    MIGRATION_LOCK_TIMEOUT_MS: int = 2000  # Longest a DDL statement waits for its table lock before retrying
+    MIGRATION_LOCK_RETRIES: int = 10
+    MIGRATION_BACKFILL_BATCH_SIZE: int = 5000  # Rows per backfill transaction
+    MIGRATION_BACKFILL_MAX_DUTY_CYCLE: float = 0.5  # Share of time spent in backfill batches; the rest is sleep
+
     # CORS
     CORS_ORIGINS: List[str] = ["*"]  # In production, specify actual origins
     
     # Security
-    SECRET_KEY: str = "your-secret-key-change-in-production"
+    SECRET_KEY: str = "your-secret-key-change-in-production"  # Also keys the API key hashes: changing it invalidates every key
     API_KEY_LENGTH: int = 32
+    API_KEY_PREFIX_LENGTH: int = 8  # Leading characters stored in clear to find a key's row
+    API_KEY_PLAINTEXT_FALLBACK: bool = True  # Accept keys not yet migrated by scripts/hash_api_keys.py
+    API_KEY_CACHE_SECONDS: float = 10.0  # Verified keys are trusted this long per worker (other workers see a revocation after it); 0 disables
+    API_KEY_CACHE_MAX_ENTRIES: int = 10000
+    ADMIN_TOKEN: str = ""  # Sent as "X-Admin-Token" to operator routes (/api/admin except the key list/create and widget and profiler status); unset disables them
     
     # Widget
     WIDGET_CDN_URL: str = os.getenv("WIDGET_CDN_URL", "http://localhost:8000/widget/consent-widget.js")
+
+    # Published config cache (per worker)
+    CONFIG_CACHE_TTL_SECONDS: float = 60.0
+    CONFIG_CACHE_NEGATIVE_TTL_SECONDS: float = 10.0  # Unknown/unpublished script IDs
+    CONFIG_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Rate limiting ("<requests per second>/<burst>")
+    RATE_LIMIT_ENABLED: bool = False  # Needs the real client IP: behind a proxy, run uvicorn with --proxy-headers
+    RATE_LIMIT_IP: str = "20/60"  # Per client IP, all /api/ routes
+    RATE_LIMIT_API_KEY: str = "100/300"  # Per verified API key
+    RATE_LIMIT_SCRIPT: str = "200/600"  # Per script_id (public config, consent create)
+    RATE_LIMIT_QUOTAS: Dict[str, str] = {}  # Per-tenant overrides, e.g. {"script:abc123": "500/1000", "key:AbCdEfGh": "50/100"}
+    RATE_LIMIT_REDIS_URL: str = ""  # Share buckets across workers (requires redis)
+    RATE_LIMIT_MAX_BUCKETS: int = 100000
+    
+    # Consent create idempotency
+    IDEMPOTENCY_KEY_TTL_SECONDS: float = 86400.0  # How long an Idempotency-Key replays its result
+    CONSENT_DEDUP_WINDOW_SECONDS: float = 10.0  # Repeats of a session's latest submission within this window replay it; 0 disables
+    IDEMPOTENCY_MEMORY_MAX_ENTRIES: int = 50000
+    IDEMPOTENCY_SWEEP_INTERVAL_SECONDS: float = 300.0
+
+    # Background tasks (see core/tasks.py)
+    TASK_DRAIN_SECONDS: float = 20.0  # On shutdown, how long queued and running work may finish before it is cancelled
+    WEBHOOK_CONCURRENCY: int = 20  # Webhook requests in flight per worker
+    WEBHOOK_MAX_PENDING: int = 10000  # Queued webhooks before new ones are dropped
+
+    # Public consent beacon (widget -> /api/beacon/{script_id})
+    BEACON_BATCH_SIZE: int = 500  # Events per insert transaction
+    BEACON_FLUSH_INTERVAL_MS: float = 50.0
+    BEACON_MAX_PENDING: int = 50000  # Buffered events before the endpoint answers 503
+    BEACON_WRITE_ATTEMPTS: int = 5  # Tries per batch before its events are dropped (counted in /api/admin/ingest)
+    BEACON_RETRY_BACKOFF_MS: float = 200.0  # Wait after the first failed write; doubles per retry, up to 10s
+    BEACON_MAX_BYTES: int = 4096
+    BEACON_SYNC_WRITES: bool = bool(os.getenv("VERCEL"))  # Write inline where nothing runs after the response
+    BEACON_EVENTS_MAX_BYTES: int = 16384  # Interaction batch as sent (usually gzip)
+    BEACON_EVENTS_MAX_DECODED_BYTES: int = 65536
+    BEACON_EVENTS_MAX_EVENTS: int = 200
     
+    # Widget delivery
+    WIDGET_BOOTSTRAP_MAX_AGE_SECONDS: int = 300  # Hashed chunk URLs are cached for a year
+    LANGUAGE_PACK_MAX_AGE_SECONDS: int = 300  # Unversioned / negotiated language pack URLs
+    
+    # Config change events (Server-Sent Events / long-poll)
+    CONFIG_EVENTS_HEARTBEAT_SECONDS: float = 20.0  # Comment line on idle streams; also the long-poll timeout
+    CONFIG_EVENTS_MAX_SUBSCRIBERS: int = 10000  # Open streams per worker before answering 503
+    CONFIG_EVENTS_REDIS_URL: str = ""  # Relay events to other workers (requires redis)
+    
+    # Consent history sealing (hash chain + Merkle roots, see services/audit_chain.py)
+    AUDIT_SEAL_INTERVAL_SECONDS: float = 10.0  # How long new history rows can stay unsealed
+    AUDIT_SEAL_BATCH_SIZE: int = 5000  # Rows per seal transaction
+    
+    # Consent retention (tenants override with /api/v1/retention-policy; 0 disables)
+    RETENTION_COMPACT_HISTORY_AFTER_DAYS: int = 0  # Summarize superseded history rows older than this
+    RETENTION_INACTIVE_CONSENT_DAYS: int = 0  # Delete revoked/expired consents this long after they ended
+    RETENTION_INTERVAL_SECONDS: float = 3600.0  # Background pass interval (a pass resumes where the last stopped)
+    RETENTION_BATCH_SIZE: int = 200  # Consents per transaction
+    RETENTION_MAX_DUTY_CYCLE: float = 0.25  # Share of time spent in batches; the rest is sleep
+    RETENTION_LEASE_SECONDS: float = 300.0  # Another worker may take over a pass after this much silence
+    
+    # Bulk erasure / anonymization jobs (see services/erasure.py)
+    ERASURE_INTERVAL_SECONDS: float = 30.0  # How often the background worker picks up queued jobs
+    ERASURE_BATCH_SIZE: int = 500  # Rows per transaction
+    ERASURE_MAX_DUTY_CYCLE: float = 0.25  # Share of time spent in batches; the rest is sleep
+    ERASURE_LEASE_SECONDS: float = 300.0  # Another worker may take over a job after this much silence
+    ERASURE_MAX_SUBJECTS: int = 100000  # Data subjects per job
+
+    # Bulk import of historical consents (see services/consent_import.py)
+    IMPORT_CHUNK_SIZE: int = 5000  # Records per validation chunk and write transaction
+    IMPORT_WORKERS: int = 0  # Validation processes for the API endpoint; 0 validates in the web worker
+    IMPORT_LEASE_SECONDS: float = 300.0  # Another run may resume an import after this much silence
+    
+    # Profiling
+    PROFILING_ENABLED: bool = False  # Allow admins to arm the sampling profiler
+    PROFILING_TOKEN: str = ""  # If set, "X-Profile-Request: <token>" profiles a single request
+    PROFILING_OUTPUT_DIR: str = "profiles"  # Folded-stack (flamegraph) output
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILING_MAX_REQUESTS: int = 100  # Upper bound for one armed profiling run
+    SLOW_REQUEST_THRESHOLD_MS: float = 1000.0  # Log SQL + timings above this; 0 disables
+
     class Config:
         env_file = ".env"
         case_sensitive = True
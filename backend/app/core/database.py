@@ -1,44 +1,125 @@
 """Database configuration and session management"""
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import asyncio
+from typing import Optional
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.core.config import settings
-
-# Create async engine
-# For SQLite, we need to set check_same_thread=False
-connect_args = {}
-if "sqlite" in settings.DATABASE_URL:
-    connect_args = {"check_same_thread": False}
-
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    connect_args=connect_args
-)
-
-# Create session factory
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False
-)
+from app.core.profiling import install_query_timer
 
 # Base class for models
 Base = declarative_base()
 
+# The engine and session factory are created on first use so that importing
+# the app (e.g. on a serverless cold start) doesn't load the database driver.
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+
+_schema_ready = False
+_schema_lock = asyncio.Lock()
+
+
+def create_engine_for(url: str) -> AsyncEngine:
+    """Async engine with the app's connection options (also used for tenant shards)"""
+    # For SQLite, we need to set check_same_thread=False
+    connect_args = {}
+    if "sqlite" in url:
+        connect_args = {"check_same_thread": False}
+
+    engine = create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        connect_args=connect_args
+    )
+    install_query_timer()
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """Return the shared async engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine_for(settings.DATABASE_URL)
+    return _engine
+
+
+def get_sessionmaker() -> async_sessionmaker:
+    """Return the shared session factory, creating it on first use"""
+    global _sessionmaker
+    if _sessionmaker is None:
+        _sessionmaker = async_sessionmaker(
+            get_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False
+        )
+    return _sessionmaker
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Open a new session (kept for callers that predate lazy engine creation)"""
+    return get_sessionmaker()()
+
+
+def dialect_insert(table, dialect_name: str):
+    """INSERT construct with ON CONFLICT support for the given dialect"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on {dialect_name}")
+    return insert(table)
+
 
 async def get_db() -> AsyncSession:
     """Dependency for getting database session"""
-    async with AsyncSessionLocal() as session:
+    if not _schema_ready:
+        await ensure_schema()
+    async with get_sessionmaker()() as session:
         try:
             yield session
         finally:
             await session.close()
 
 
+def _missing_tables(sync_conn) -> list:
+    existing = set(inspect(sync_conn).get_table_names())
+    return [name for name in Base.metadata.tables if name not in existing]
+
+
+async def ensure_schema():
+    """Create missing tables once per process.
+
+    Used when the lifespan doesn't run (Vercel/Mangum). A single table-name
+    lookup is enough on warm databases; create_all only runs if something
+    is actually missing.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    async with _schema_lock:
+        if _schema_ready:
+            return
+        import app.models  # noqa: F401  (register every table on Base.metadata)
+        async with get_engine().begin() as conn:
+            if await conn.run_sync(_missing_tables):
+                await conn.run_sync(Base.metadata.create_all)
+        _schema_ready = True
+
+
 async def init_db():
-    """Initialize database (create tables)"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Initialize database (create tables, including on every configured shard)
 
+    Only missing tables are created; changes to existing tables ship as
+    Alembic revisions (backend/migrations).
+    """
+    global _schema_ready
+    import app.models  # noqa: F401
+    from app.core.shards import ensure_shard_schema, shard_names
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    _schema_ready = True
+    for name in shard_names():
+        await ensure_shard_schema(name)
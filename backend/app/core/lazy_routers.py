@@ -0,0 +1,41 @@
+"""Deferred router registration for serverless cold starts"""
+import importlib
+from typing import Dict, Iterable, Tuple
+
+# Paths that need the full route table (OpenAPI schema and docs UIs)
+FULL_SCHEMA_PATHS = ("/docs", "/redoc", "/openapi.json")
+
+
+def include_router_module(app, module_path: str):
+    """Import a route module and include its ``router`` on the app"""
+    module = importlib.import_module(module_path)
+    app.include_router(module.router)
+    # The schema is cached on first generation; rebuild it with the new routes
+    app.openapi_schema = None
+
+
+class LazyRouterMiddleware:
+    """Imports route modules the first time a request path needs them.
+
+    ``routers`` maps a module path to the URL prefixes it serves. Each module
+    is imported and included at most once; afterwards requests go straight
+    through to the (now complete) route table.
+    """
+
+    def __init__(self, app, fastapi_app, routers: Dict[str, Iterable[str]]):
+        self.app = app
+        self.fastapi_app = fastapi_app
+        self.pending: Dict[str, Tuple[str, ...]] = {
+            module_path: tuple(prefixes) for module_path, prefixes in routers.items()
+        }
+
+    def _load(self, path: str):
+        for module_path, prefixes in list(self.pending.items()):
+            if path.startswith(FULL_SCHEMA_PATHS) or path.startswith(prefixes):
+                include_router_module(self.fastapi_app, module_path)
+                del self.pending[module_path]
+
+    async def __call__(self, scope, receive, send):
+        if self.pending and scope["type"] in ("http", "websocket"):
+            self._load(scope.get("path", ""))
+        await self.app(scope, receive, send)
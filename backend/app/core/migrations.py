@@ -0,0 +1,291 @@
+"""Online schema changes for Alembic revisions (backend/migrations).
+
+Revisions run against live databases while the app keeps writing, so on
+Postgres the helpers here:
+
+- run each DDL statement in its own transaction with ``lock_timeout``
+  (``MIGRATION_LOCK_TIMEOUT_MS``) and retry it if the lock isn't granted.
+  An ALTER TABLE queued behind a long transaction would otherwise queue
+  every write to the table behind itself.
+- build and drop indexes ``CONCURRENTLY``. A failed build leaves an
+  INVALID index; the next run drops and rebuilds it.
+- add columns nullable (or with a constant default), without a table
+  rewrite; ``backfill`` fills them in small committed batches and
+  ``set_not_null`` constrains them afterwards without a long lock.
+
+Every helper looks at the live schema first and skips what is already
+there, so a failed revision can simply be re-run, and revisions apply
+cleanly to tables that ``init_db`` created from the current models. On a
+tenant shard, changes to tables it doesn't hold (core/shards.py) are
+skipped. SQLite gets plain DDL (and a table rebuild where it can't alter
+a column in place).
+"""
+import time
+from typing import Callable, Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+from app.core.shards import PRIMARY, SHARDED_TABLES
+
+LOCK_NOT_AVAILABLE = "55P03"  # Postgres SQLSTATE raised when lock_timeout expires
+
+
+def shard() -> str:
+    """Name of the database being migrated"""
+    return op.get_context().opts.get("shard", PRIMARY)
+
+
+def holds(table: str) -> bool:
+    """Whether the database being migrated has ``table`` (shards only hold consent data)"""
+    return shard() == PRIMARY or table in SHARDED_TABLES
+
+
+def is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def has_table(table: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def is_nullable(table: str, column: str) -> bool:
+    return next(c["nullable"] for c in sa.inspect(op.get_bind()).get_columns(table) if c["name"] == column)
+
+
+def has_index(table: str, name: str) -> bool:
+    return any(index["name"] == name for index in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def has_foreign_key(table: str, columns: Sequence[str], referred_table: str) -> bool:
+    return any(
+        fk["constrained_columns"] == list(columns) and fk["referred_table"] == referred_table
+        for fk in sa.inspect(op.get_bind()).get_foreign_keys(table)
+    )
+
+
+def _pg_index_valid(name: str) -> Optional[bool]:
+    """False for an index left INVALID by an interrupted concurrent build, None if there is none"""
+    return op.get_bind().execute(
+        sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(CAST(:name AS text))"),
+        {"name": name}
+    ).scalar()
+
+
+def _pg_has_constraint(table: str, name: str) -> bool:
+    return op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_constraint WHERE conname = :name AND conrelid = to_regclass(CAST(:table AS text))"),
+        {"name": name, "table": table}
+    ).scalar() is not None
+
+
+def _retrying(statement: Callable):
+    """Run ``statement()``, retrying with backoff while Postgres reports lock timeouts"""
+    for attempt in range(settings.MIGRATION_LOCK_RETRIES + 1):
+        try:
+            return statement()
+        except DBAPIError as e:
+            if getattr(e.orig, "pgcode", None) != LOCK_NOT_AVAILABLE or attempt == settings.MIGRATION_LOCK_RETRIES:
+                raise
+            op.get_bind().rollback()
+            wait = min(0.5 * 2 ** attempt, 30.0)
+            print(f"Lock not granted within {settings.MIGRATION_LOCK_TIMEOUT_MS}ms, retrying in {wait:.1f}s")
+            time.sleep(wait)
+
+
+def configure_session(connection):
+    """Postgres session settings for migrating: bounded lock waits, no statement timeout
+
+    With ``lock_timeout`` set, plain ``op`` calls in a revision's transaction
+    also give up instead of queueing writes behind them; the revision fails
+    and can be re-run.
+    """
+    connection.execute(sa.text(f"SET lock_timeout = {int(settings.MIGRATION_LOCK_TIMEOUT_MS)}"))
+    connection.execute(sa.text("SET statement_timeout = 0"))
+
+
+def _online(statement: Callable, lock_timeout_ms: Optional[int] = None):
+    """Run ``statement()`` (one DDL statement) in its own transaction, retrying on lock timeouts
+
+    On SQLite it simply runs in the revision's transaction.
+    """
+    if not is_postgres():
+        statement()
+        return
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        if lock_timeout_ms is None:
+            _retrying(statement)
+            return
+        bind.execute(sa.text(f"SET lock_timeout = {int(lock_timeout_ms)}"))
+        try:
+            _retrying(statement)
+        finally:
+            bind.execute(sa.text(f"SET lock_timeout = {int(settings.MIGRATION_LOCK_TIMEOUT_MS)}"))
+
+
+def create_table(name: str, *elements) -> bool:
+    """op.create_table unless the table exists; returns whether it was created
+
+    On a shard, foreign keys to tables the shard doesn't hold are left out
+    (as in core/shards.shard_metadata).
+    """
+    if not holds(name) or has_table(name):
+        return False
+    elements = [
+        element for element in elements
+        if not isinstance(element, sa.ForeignKeyConstraint)
+        or holds(element.elements[0].target_fullname.split(".")[0])
+    ]
+    op.create_table(name, *elements)
+    return True
+
+
+def add_column(table: str, column: sa.Column):
+    """Add a column without rewriting the table
+
+    The column must be nullable or have a constant ``server_default``; to
+    make a new column NOT NULL, add it nullable, ``backfill`` it, then
+    ``set_not_null``. Add foreign keys with ``add_foreign_key``.
+    """
+    if not holds(table) or has_column(table, column.name):
+        return
+    if not column.nullable and column.server_default is None:
+        raise ValueError(f"{table}.{column.name}: add it nullable, backfill it, then set_not_null")
+    if column.foreign_keys:
+        raise ValueError(f"{table}.{column.name}: add the foreign key with add_foreign_key")
+    _online(lambda: op.add_column(table, column))
+
+
+def create_index(name: str, table: str, columns: Sequence[str], unique: bool = False, where: Optional[str] = None):
+    """Build an index without blocking writes; ``where`` (SQL) makes it partial"""
+    if not holds(table):
+        return
+    condition = sa.text(where) if where else None
+    if not is_postgres():
+        if not has_index(table, name):
+            op.create_index(name, table, list(columns), unique=unique, sqlite_where=condition)
+        return
+    valid = _pg_index_valid(name)
+    if valid:
+        return
+    if valid is False:
+        print(f"Dropping index {name} left invalid by an interrupted build")
+        _online(lambda: op.drop_index(name, table_name=table, postgresql_concurrently=True), lock_timeout_ms=0)
+    # No lock_timeout: the SHARE UPDATE EXCLUSIVE lock doesn't block reads or writes while it
+    # waits, and a concurrent build waits for every older transaction, which a timeout would abort
+    _online(
+        lambda: op.create_index(
+            name, table, list(columns), unique=unique, postgresql_concurrently=True, postgresql_where=condition
+        ),
+        lock_timeout_ms=0
+    )
+
+
+def drop_index(name: str, table: str):
+    if not holds(table) or not has_index(table, name):
+        return
+    if is_postgres():
+        _online(lambda: op.drop_index(name, table_name=table, postgresql_concurrently=True), lock_timeout_ms=0)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def add_foreign_key(name: str, table: str, columns: Sequence[str], referred_table: str, referred_columns: Sequence[str]):
+    """Add a foreign key, checking existing rows without blocking writes (NOT VALID, then VALIDATE)
+
+    Skipped where either table lives on another database, and on SQLite
+    (which can't add constraints to an existing table).
+    """
+    if not holds(table) or not holds(referred_table) or not is_postgres():
+        return
+    if not _pg_has_constraint(table, name):
+        if has_foreign_key(table, columns, referred_table):
+            return  # Created by create_all under Postgres' default name
+        _online(lambda: op.create_foreign_key(
+            name, table, referred_table, list(columns), list(referred_columns), postgresql_not_valid=True
+        ))
+    _online(lambda: op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"))
+
+
+def backfill(table: str, values: str, where: str, batch_size: Optional[int] = None, key: str = "id") -> int:
+    """UPDATE table SET <values> WHERE <where>, in batches of committed transactions; returns rows updated
+
+    ``values`` and ``where`` are SQL. Rows are walked in ``key`` order, so
+    each batch locks at most ``batch_size`` rows for a moment, and the
+    helper sleeps between batches to stay under
+    ``MIGRATION_BACKFILL_MAX_DUTY_CYCLE``. Row locks held by the app are
+    waited for up to ``MIGRATION_LOCK_TIMEOUT_MS``. ``where`` should exclude rows
+    already done (e.g. ``new_column IS NULL``) so a re-run resumes.
+    """
+    if not holds(table):
+        return 0
+    batch_size = batch_size or settings.MIGRATION_BACKFILL_BATCH_SIZE
+    first_batch = sa.text(f"SELECT {key} FROM {table} WHERE ({where}) ORDER BY {key} LIMIT :limit")
+    next_batch = sa.text(f"SELECT {key} FROM {table} WHERE ({where}) AND {key} > :after ORDER BY {key} LIMIT :limit")
+    update_batch = sa.text(
+        f"UPDATE {table} SET {values} WHERE {key} IN :keys AND ({where})"
+    ).bindparams(sa.bindparam("keys", expanding=True))
+    max_duty_cycle = settings.MIGRATION_BACKFILL_MAX_DUTY_CYCLE
+
+    updated, after = 0, None
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            started = time.perf_counter()
+            if after is None:
+                keys = bind.execute(first_batch, {"limit": batch_size}).scalars().all()
+            else:
+                keys = bind.execute(next_batch, {"after": after, "limit": batch_size}).scalars().all()
+            if not keys:
+                break
+            _retrying(lambda: bind.execute(update_batch, {"keys": keys}))
+            updated += len(keys)
+            after = keys[-1]
+            print(f"{table}: backfilled {updated} rows")
+            if 0 < max_duty_cycle < 1:
+                time.sleep((time.perf_counter() - started) * (1 - max_duty_cycle) / max_duty_cycle)
+    return updated
+
+
+def set_not_null(table: str, column: str):
+    """Make a backfilled column NOT NULL without scanning the table under an exclusive lock
+
+    A NOT VALID check constraint is validated while writes continue; Postgres
+    12+ then uses it to skip the scan in SET NOT NULL. SQLite can't change a
+    column in place, so it is left nullable there.
+    """
+    if not holds(table) or not is_nullable(table, column):
+        return
+    if not is_postgres():
+        print(f"SQLite can't make {table}.{column} NOT NULL in place; left nullable")
+        return
+    check = f"{table}_{column}_not_null"
+    if not _pg_has_constraint(table, check):
+        _online(lambda: op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID"))
+    _online(lambda: op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}"))
+    _online(lambda: op.alter_column(table, column, nullable=False))
+    _online(lambda: op.drop_constraint(check, table, type_="check"))
+
+
+def drop_not_null(table: str, column: str):
+    """Let a column be NULL: a catalog change on Postgres, a table rebuild on SQLite
+
+    SQLite can't alter a column, so Alembic's batch mode copies the table
+    into a new one with the column nullable (indexes and constraints are
+    carried over) and swaps it in, all in the revision's transaction.
+    """
+    if not holds(table) or is_nullable(table, column):
+        return
+    if not is_postgres():
+        existing = next(c for c in sa.inspect(op.get_bind()).get_columns(table) if c["name"] == column)
+        with op.batch_alter_table(table, recreate="always") as batch:
+            batch.alter_column(column, existing_type=existing["type"], nullable=True)
+        return
+    _online(lambda: op.alter_column(table, column, nullable=True))
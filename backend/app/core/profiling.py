@@ -0,0 +1,244 @@
+"""On-demand request profiling and slow-request logging"""
+import asyncio
+import contextvars
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.slow_requests")
+
+# (statement, duration_ms) pairs collected for the current request
+_request_queries: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_queries", default=None
+)
+
+
+def untrace_current_task():
+    """Stop collecting SQL into the request that spawned this (long-lived) task"""
+    _request_queries.set(None)
+
+
+def mark_long_lived(scope: dict):
+    """Keep an intentionally long request (event stream, long-poll) out of the slow-request log"""
+    scope["long_lived"] = True
+
+
+class StackSampler:
+    """Samples one asyncio task's stack at a fixed interval into folded-stack counts.
+
+    The sampler thread reads the event loop thread's current frame and counts
+    it only while ``task`` is the task running there, so other requests and
+    background work on the same worker stay out of the profile. Samples taken
+    while the task is suspended (waiting on the database, a lock or another
+    task's turn) are counted as ``(waiting)``.
+
+    The output format (one ``frame;frame;frame count`` line per unique stack)
+    is what flamegraph.pl, speedscope and inferno consume directly.
+    """
+
+    def __init__(self, interval_ms: float, task: Optional[asyncio.Task] = None):
+        self.interval = interval_ms / 1000.0
+        self.task = task or asyncio.current_task()
+        self.counts: Counter = Counter()
+        self._loop = self.task.get_loop()
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+    def _run(self):
+        root = self.task.get_name()
+        while not self._stop.wait(self.interval):
+            frame = None
+            if asyncio.current_task(self._loop) is self.task:
+                frame = sys._current_frames().get(self._loop_thread)
+                # The loop may have switched tasks while the frames were collected
+                if asyncio.current_task(self._loop) is not self.task:
+                    frame = None
+            if frame is None:
+                self.counts[f"{root};(waiting)"] += 1
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.append(root)
+            self.counts[";".join(reversed(stack))] += 1
+
+
+class ProfilingController:
+    """Tracks how many upcoming requests should be profiled"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._path_prefix: Optional[str] = None
+        self._active = False
+        self.recent_files: List[str] = []
+
+    def arm(self, requests: int, path_prefix: Optional[str] = None):
+        with self._lock:
+            self._remaining = max(0, min(requests, settings.PROFILING_MAX_REQUESTS))
+            self._path_prefix = path_prefix
+
+    def status(self) -> dict:
+        return {
+            "remaining": self._remaining,
+            "path_prefix": self._path_prefix,
+            "active": self._active,
+            "output_dir": settings.PROFILING_OUTPUT_DIR,
+            "recent_files": list(self.recent_files),
+        }
+
+    def acquire(self, path: str, header_token: Optional[str]) -> bool:
+        """Claim the profiler for one request; only one request is sampled at a time"""
+        forced = bool(settings.PROFILING_TOKEN) and header_token == settings.PROFILING_TOKEN
+        with self._lock:
+            if self._active:
+                return False
+            if not forced:
+                if self._remaining <= 0:
+                    return False
+                if self._path_prefix and not path.startswith(self._path_prefix):
+                    return False
+                self._remaining -= 1
+            self._active = True
+            return True
+
+    def release(self, filename: Optional[str]):
+        with self._lock:
+            self._active = False
+            if filename:
+                self.recent_files = (self.recent_files + [filename])[-20:]
+
+
+profiler = ProfilingController()
+
+
+def _write_folded(counts: Counter, method: str, path: str) -> str:
+    os.makedirs(settings.PROFILING_OUTPUT_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    filename = os.path.join(
+        settings.PROFILING_OUTPUT_DIR,
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{method}-{slug}.folded"
+    )
+    with open(filename, "w") as f:
+        for stack, count in counts.most_common():
+            f.write(f"{stack} {count}\n")
+    return filename
+
+
+def install_query_timer():
+    """Record SQL statements and timings for requests that are being traced.
+
+    Listens on the Engine class so every engine (including ones created
+    later) is covered. Called when the first engine is created so that
+    importing this module doesn't pull in SQLAlchemy.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_queries.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _request_queries.get()
+    if queries is not None and conn.info.get("query_start"):
+        started = conn.info["query_start"].pop()
+        queries.append((statement, (time.perf_counter() - started) * 1000))
+
+
+class ProfilingMiddleware:
+    """ASGI middleware for armed profiling runs and the slow-request log"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path", "")
+        header_token = None
+        if settings.PROFILING_TOKEN:
+            for name, value in scope.get("headers", []):
+                if name == b"x-profile-request":
+                    header_token = value.decode("latin-1")
+                    break
+
+        sampler = None
+        if settings.PROFILING_ENABLED and profiler.acquire(path, header_token):
+            sampler = StackSampler(settings.PROFILING_SAMPLE_INTERVAL_MS)
+            sampler.start()
+
+        trace = sampler is not None or settings.SLOW_REQUEST_THRESHOLD_MS > 0
+        queries: Optional[List[Tuple[str, float]]] = [] if trace else None
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        status_code = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if sampler is not None:
+                    elapsed = (time.perf_counter() - started) * 1000
+                    db_ms = sum(duration for _, duration in queries)
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", f"db;dur={db_ms:.1f}, app;dur={elapsed:.1f}".encode()))
+                    message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_queries.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            filename = None
+            if sampler is not None:
+                try:
+                    # Joining the sampler and writing the file block; keep them off the event loop
+                    filename = await asyncio.get_running_loop().run_in_executor(
+                        None, lambda: _write_folded(sampler.stop(), scope.get("method", ""), path)
+                    )
+                finally:
+                    profiler.release(filename)
+            if (queries is not None and not scope.get("long_lived")
+                    and 0 < settings.SLOW_REQUEST_THRESHOLD_MS <= elapsed_ms):
+                _log_slow_request(scope, status_code, elapsed_ms, queries, filename)
+
+
+def _log_slow_request(scope, status_code, elapsed_ms, queries, profile_file):
+    db_ms = sum(duration for _, duration in queries)
+    lines = [
+        f"slow request: {scope.get('method')} {scope.get('path')} status={status_code} "
+        f"total={elapsed_ms:.1f}ms db={db_ms:.1f}ms queries={len(queries)}"
+        + (f" profile={profile_file}" if profile_file else "")
+    ]
+    for statement, duration in queries:
+        lines.append(f"  {duration:8.2f}ms  {' '.join(statement.split())}")
+    logger.warning("\n".join(lines))
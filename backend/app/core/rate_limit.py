@@ -0,0 +1,234 @@
+"""Token-bucket rate limiting for public and authenticated endpoints.
+
+Requests are checked in ASGI middleware, before routing, so a rejected
+request never opens a database session. There each request draws from:
+
+- ``ip:<client ip>`` for every ``/api/`` request,
+- ``script:<script_id>`` for requests that name a script (public config,
+  consent beacon, consent create with ``?script_id=``).
+
+Authenticated requests also draw from ``key:<key prefix>``, charged by
+``verify_api_key`` once the key is verified, so an unknown or forged key
+can't spend a tenant's quota.
+
+A request takes one token from each of its buckets or from none: if any
+bucket is empty nothing is taken, so a client that is over its IP limit
+doesn't drain the script bucket it shares with every other visitor.
+
+Limits are written as ``"<tokens per second>/<burst>"``. Defaults come from
+settings and individual tenants can be given their own quota via
+``RATE_LIMIT_QUOTAS`` (e.g. ``{"script:abc123def456": "500/1000"}``).
+
+The IP is the ASGI client address. Behind a load balancer that is the
+balancer's, so run uvicorn with ``--proxy-headers`` (as render.yaml does)
+before setting ``RATE_LIMIT_ENABLED``; otherwise every visitor shares one
+IP bucket.
+
+Buckets live in process memory by default. When ``RATE_LIMIT_REDIS_URL`` is
+set (and the redis package is installed) buckets are kept in Redis so the
+limits hold across workers; if Redis is unreachable the local buckets are
+used instead.
+"""
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from app.core.config import settings
+
+_SCRIPT_PATH = re.compile(r"^/api/(?:config|beacon)/([^/]+)")
+
+# Atomically refill every bucket and take one token from each, or from none if any is empty.
+# ARGV: now, then rate and burst per key. Returns the wait in ms (0 when allowed).
+_REDIS_TOKEN_BUCKETS = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local retry_ms = 0
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2])
+  local burst = tonumber(ARGV[i * 2 + 1])
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local available = tonumber(state[1]) or burst
+  local ts = tonumber(state[2]) or now
+  available = math.min(burst, available + (now - ts) * rate)
+  if available < 1 then
+    retry_ms = math.max(retry_ms, math.ceil((1 - available) / rate * 1000))
+  end
+  tokens[i] = available
+end
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2])
+  local burst = tonumber(ARGV[i * 2 + 1])
+  local available = tokens[i]
+  if retry_ms == 0 then
+    available = available - 1
+  end
+  redis.call('HSET', key, 'tokens', available, 'ts', now)
+  redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+end
+return retry_ms
+"""
+
+
+def parse_limit(limit: str) -> Tuple[float, float]:
+    """Parse "<rate>/<burst>" into (tokens per second, bucket size)"""
+    rate, _, burst = limit.partition("/")
+    rate = float(rate)
+    return rate, float(burst) if burst else rate
+
+
+class LocalBuckets:
+    """In-process token buckets (LRU-bounded)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [tokens, last_refill]
+
+    def _refill(self, key: str, rate: float, burst: float, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [burst, now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        return bucket
+
+    def take(self, limits: List[Tuple[str, float, float]]) -> float:
+        """Take a token from every (key, rate, burst) bucket; returns 0 if allowed
+
+        Otherwise nothing is taken and the seconds until all of them have a
+        token are returned.
+        """
+        now = time.monotonic()
+        buckets = [(self._refill(key, rate, burst, now), rate) for key, rate, burst in limits]
+        retry_after = max(((1 - bucket[0]) / rate for bucket, rate in buckets if bucket[0] < 1), default=0.0)
+        if retry_after > 0:
+            return retry_after
+        for bucket, _ in buckets:
+            bucket[0] -= 1
+        return 0.0
+
+
+class RedisBuckets:
+    """Token buckets shared across workers through Redis"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis_asyncio  # Optional dependency, only needed for shared limits
+        self.client = redis_asyncio.from_url(url)
+        self.script = self.client.register_script(_REDIS_TOKEN_BUCKETS)
+
+    async def take(self, limits: List[Tuple[str, float, float]]) -> float:
+        args = [time.time()]
+        for _, rate, burst in limits:
+            args += [rate, burst]
+        retry_ms = await self.script(keys=[f"ratelimit:{key}" for key, _, _ in limits], args=args)
+        return int(retry_ms) / 1000
+
+
+class RateLimiter:
+    """Resolves the buckets for a request and checks them"""
+
+    def __init__(self):
+        self.local = LocalBuckets(settings.RATE_LIMIT_MAX_BUCKETS)
+        self.shared: Optional[RedisBuckets] = None
+        if settings.RATE_LIMIT_REDIS_URL:
+            try:
+                self.shared = RedisBuckets(settings.RATE_LIMIT_REDIS_URL)
+            except ImportError:
+                print("RATE_LIMIT_REDIS_URL is set but redis is not installed; using per-worker limits")
+        self.defaults = {
+            "ip": parse_limit(settings.RATE_LIMIT_IP),
+            "key": parse_limit(settings.RATE_LIMIT_API_KEY),
+            "script": parse_limit(settings.RATE_LIMIT_SCRIPT),
+        }
+        self.quotas: Dict[str, Tuple[float, float]] = {
+            key: parse_limit(limit) for key, limit in settings.RATE_LIMIT_QUOTAS.items()
+        }
+
+    def limit_for(self, key: str) -> Tuple[float, float]:
+        quota = self.quotas.get(key)
+        if quota is not None:
+            return quota
+        return self.defaults[key.partition(":")[0]]
+
+    async def check(self, keys: List[str]) -> float:
+        """Return 0 if the request may proceed, otherwise the Retry-After in seconds
+
+        A token is taken from every bucket, or from none if any is empty.
+        """
+        limits = [(key, *self.limit_for(key)) for key in keys]
+        limits = [(key, rate, burst) for key, rate, burst in limits if rate > 0]
+        if not limits:
+            return 0.0
+        if self.shared is not None:
+            try:
+                return await self.shared.take(limits)
+            except Exception as e:
+                print(f"Rate limit backend unavailable, using local buckets: {e}")
+        return self.local.take(limits)
+
+
+def request_keys(scope) -> List[str]:
+    """Bucket keys checked in the middleware: client IP, then script (API keys are checked once verified)"""
+    keys = []
+    path = scope.get("path", "")
+
+    client = scope.get("client")
+    if client:
+        keys.append("ip:" + client[0])
+
+    script_id = None
+    match = _SCRIPT_PATH.match(path)
+    if match:
+        script_id = match.group(1)
+    elif b"script_id=" in scope.get("query_string", b""):
+        script_id = parse_qs(scope["query_string"].decode("latin-1")).get("script_id", [None])[0]
+    if script_id:
+        keys.append("script:" + script_id)
+    return keys
+
+
+def retry_after_header(retry_after: float) -> str:
+    return str(max(1, math.ceil(retry_after)))
+
+
+rate_limiter = RateLimiter()
+
+
+class RateLimitMiddleware:
+    """Rejects over-limit /api/ requests with 429 before any route or dependency runs"""
+
+    def __init__(self, app):
+        self.app = app
+        self.limiter = rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not settings.RATE_LIMIT_ENABLED
+            or scope["type"] != "http"
+            or scope.get("method") == "OPTIONS"
+            or not scope.get("path", "").startswith("/api/")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await self.limiter.check(request_keys(scope))
+        if retry_after > 0:
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", retry_after_header(retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": b'{"detail":"Rate limit exceeded"}'})
+            return
+
+        await self.app(scope, receive, send)
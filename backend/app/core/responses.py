@@ -0,0 +1,85 @@
+"""Fast JSON encoding for API responses"""
+import gzip
+import hashlib
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+def _default(value: Any):
+    """Fallback encoder for the stdlib path (orjson handles these natively)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: orjson when available, compact stdlib JSON otherwise"""
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+class PreEncodedJSONResponse(Response):
+    """Response for bodies that are already encoded JSON bytes"""
+    media_type = "application/json"
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Serialize a response model directly, skipping FastAPI's jsonable_encoder pass"""
+    return PreEncodedJSONResponse(model.model_dump_json().encode("utf-8"), status_code=status_code)
+
+
+@dataclass(frozen=True)
+class PrecompressedBody:
+    """A response body encoded once, with its gzip form and a content version"""
+    body: bytes
+    gzipped: bytes
+    version: str
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+
+def precompress(body: bytes) -> PrecompressedBody:
+    return PrecompressedBody(
+        body=body,
+        gzipped=gzip.compress(body, compresslevel=9, mtime=0),
+        version=hashlib.sha256(body).hexdigest()[:12]
+    )
+
+
+def precompressed_response(payload: PrecompressedBody, request: Request, media_type: str,
+                           cache_control: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serve a precompressed body with ETag revalidation; gzip when the client accepts it"""
+    headers = {"ETag": payload.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding", **(headers or {})}
+    if request.headers.get("if-none-match") == payload.etag:
+        return Response(status_code=304, headers=headers)
+    body = payload.body
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = payload.gzipped
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=media_type, headers=headers)
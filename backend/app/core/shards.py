@@ -0,0 +1,129 @@
+"""Tenant shards: consent data spread over several databases.
+
+The primary database (``DATABASE_URL``) is the shard "primary" and holds
+every table. ``SHARD_DATABASE_URLS`` adds databases that hold only the
+consent-data tables (``SHARDED_TABLES``); which one a tenant lives on is
+recorded in the ``tenant_shards`` directory (services/shard_directory.py).
+
+``shard_session(name)`` opens a session that binds the consent-data tables
+to that shard and everything else (API keys, configs, jobs) to the primary,
+so queries are written exactly as for a single database. A transaction that
+writes to both commits them one after the other, not atomically.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import MetaData, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base, create_engine_for, ensure_schema, get_engine, get_sessionmaker
+
+PRIMARY = "primary"
+
+# Tables holding tenant consent data, in foreign-key order (parents first)
+SHARDED_TABLES = (
+    "consents", "consent_history", "idempotency_keys", "grievances",
+    "data_subject_sessions", "audit_seals", "pruned_history",
+)
+
+_engines: Dict[str, AsyncEngine] = {}
+_sessionmakers: Dict[str, async_sessionmaker] = {}
+_metadata: Optional[MetaData] = None
+_schema_ready: set = set()
+_schema_lock = asyncio.Lock()
+
+
+def shard_names() -> List[str]:
+    return [PRIMARY] + [name for name in settings.SHARD_DATABASE_URLS if name != PRIMARY]
+
+
+def shard_engine(name: str) -> AsyncEngine:
+    """Engine of a shard, created on first use"""
+    if name == PRIMARY:
+        return get_engine()
+    engine = _engines.get(name)
+    if engine is None:
+        url = settings.SHARD_DATABASE_URLS.get(name)
+        if url is None:
+            raise ValueError(f"Unknown shard {name!r}")
+        engine = _engines[name] = create_engine_for(url)
+    return engine
+
+
+def sharded_tables() -> list:
+    import app.models  # noqa: F401  (register every table on Base.metadata)
+    return [Base.metadata.tables[name] for name in SHARDED_TABLES]
+
+
+def shard_metadata() -> MetaData:
+    """The consent-data tables as created on a shard: no foreign keys to primary-only tables"""
+    global _metadata
+    if _metadata is None:
+        metadata = MetaData()
+        for table in sharded_tables():
+            copy = table.to_metadata(metadata)
+            for constraint in list(copy.foreign_key_constraints):
+                if constraint.elements[0].target_fullname.split(".")[0] not in SHARDED_TABLES:
+                    for foreign_key in constraint.elements:
+                        foreign_key.parent.foreign_keys.discard(foreign_key)
+                        copy.foreign_keys.discard(foreign_key)
+                    copy.constraints.discard(constraint)
+        _metadata = metadata
+    return _metadata
+
+
+def shard_sessionmaker(name: str) -> async_sessionmaker:
+    if name == PRIMARY:
+        return get_sessionmaker()
+    maker = _sessionmakers.get(name)
+    if maker is None:
+        engine = shard_engine(name)
+        maker = _sessionmakers[name] = async_sessionmaker(
+            bind=get_engine(),
+            binds={table: engine for table in sharded_tables()},
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False
+        )
+    return maker
+
+
+def _missing_tables(sync_conn, metadata: MetaData) -> list:
+    existing = set(inspect(sync_conn).get_table_names())
+    return [name for name in metadata.tables if name not in existing]
+
+
+async def ensure_shard_schema(name: str):
+    """Create a shard's missing tables once per process (the primary's through database.ensure_schema)"""
+    if name in _schema_ready:
+        return
+    if name == PRIMARY:
+        await ensure_schema()
+        _schema_ready.add(name)
+        return
+    async with _schema_lock:
+        if name in _schema_ready:
+            return
+        metadata = shard_metadata()
+        async with shard_engine(name).begin() as conn:
+            if await conn.run_sync(_missing_tables, metadata):
+                await conn.run_sync(metadata.create_all)
+        _schema_ready.add(name)
+
+
+@asynccontextmanager
+async def shard_session(name: str) -> AsyncIterator[AsyncSession]:
+    """Session for data on shard ``name`` (primary-only tables still go to the primary)"""
+    await ensure_shard_schema(name)
+    async with shard_sessionmaker(name)() as session:
+        yield session
+
+
+async def dispose_shards():
+    """Close every shard's connections (for scripts)"""
+    for engine in _engines.values():
+        await engine.dispose()
+    await get_engine().dispose()
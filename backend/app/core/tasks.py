@@ -0,0 +1,258 @@
+"""Supervised background tasks.
+
+Work that outlives a request goes through the ``runtime`` below instead of
+bare ``asyncio.create_task``:
+
+- Named queues (``runtime.queue(name, concurrency, max_pending)``) run
+  submitted coroutine functions, at most ``concurrency`` at a time.
+  ``submit`` returns False instead of queuing more than ``max_pending``, so a
+  slow webhook endpoint can't grow the task set without bound.
+- Periodic jobs (``runtime.periodic(name, interval, fn)``) await ``fn()``
+  every ``interval`` seconds; an error is logged and the next run goes ahead.
+
+The app's startup hook calls ``start()`` and its shutdown hook ``drain()``:
+new work is refused, periodic jobs stop after their current run, queued
+work gets until the deadline to finish and whatever is left is cancelled.
+Queues created with ``drain_first=True`` (work that submits to other
+queues, like the beacon writer queuing webhooks) are drained before the
+others stop taking work.
+``stats()`` reports queue depth and the age of the oldest queued and running
+task (GET /api/admin/tasks).
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.profiling import untrace_current_task
+
+
+def _age(since: Optional[float], now: float) -> Optional[float]:
+    return round(now - since, 3) if since is not None else None
+
+
+class TaskQueue:
+    """Bounded queue of coroutine calls run by up to ``concurrency`` workers"""
+
+    def __init__(self, name: str, concurrency: int, max_pending: int, drain_first: bool = False):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.drain_first = drain_first
+        self.accepting = True
+        self._pending: deque = deque()  # (fn, args, queued at)
+        self._workers: set = set()
+        self._started: Dict[asyncio.Task, float] = {}  # Worker -> when its current call started
+        self.last_error: Optional[str] = None
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "cancelled": 0}
+
+    def submit(self, fn: Callable[..., Awaitable], *args) -> bool:
+        """Queue ``fn(*args)``; returns False when the queue is full or draining"""
+        if not self.accepting or len(self._pending) >= self.max_pending:
+            self.stats["rejected"] += 1
+            return False
+        self._pending.append((fn, args, time.monotonic()))
+        self.stats["submitted"] += 1
+        if len(self._workers) < self.concurrency:
+            self._workers.add(asyncio.create_task(self._work()))
+        return True
+
+    async def _work(self):
+        # May be started from inside a request; don't keep tracing into it
+        untrace_current_task()
+        task = asyncio.current_task()
+        try:
+            while self._pending:
+                fn, args, _ = self._pending.popleft()
+                self._started[task] = time.monotonic()
+                try:
+                    await fn(*args)
+                    self.stats["completed"] += 1
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    print(f"Error in background task {self.name}: {e}")
+                finally:
+                    del self._started[task]
+        finally:
+            # No await between the empty check and here, so submit() never counts a finished worker
+            self._workers.discard(task)
+
+    async def join(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` for the queue to empty; returns whether it did"""
+        deadline = time.monotonic() + timeout
+        while self._workers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.wait(set(self._workers), timeout=remaining)
+        return True
+
+    async def cancel(self) -> int:
+        """Drop queued calls and cancel running ones; returns how many were lost"""
+        lost = len(self._pending) + len(self._started)
+        self._pending.clear()
+        workers = list(self._workers)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self.stats["cancelled"] += lost
+        return lost
+
+    def report(self) -> dict:
+        now = time.monotonic()
+        return {
+            "name": self.name,
+            "concurrency": self.concurrency,
+            "max_pending": self.max_pending,
+            "pending": len(self._pending),
+            "running": len(self._started),
+            "oldest_pending_seconds": _age(self._pending[0][2] if self._pending else None, now),
+            "oldest_running_seconds": _age(min(self._started.values()) if self._started else None, now),
+            **self.stats,
+            "last_error": self.last_error,
+        }
+
+
+class PeriodicJob:
+    """Awaits ``fn()`` every ``interval`` seconds until stopped"""
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], Awaitable]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._run_started: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_duration: Optional[float] = None
+        self.stats = {"runs": 0, "failed": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        untrace_current_task()
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._stopping:
+                break
+            self._run_started = time.monotonic()
+            try:
+                await self.fn()
+            except Exception as e:
+                self.stats["failed"] += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Error in background task {self.name}: {e}")
+            finally:
+                self.stats["runs"] += 1
+                self.last_duration = round(time.monotonic() - self._run_started, 3)
+                self._run_started = None
+
+    def stop(self):
+        """Stop after the current run (if any)"""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def join(self, timeout: float) -> bool:
+        if not self.running:
+            return True
+        await asyncio.wait({self._task}, timeout=max(timeout, 0))
+        return not self.running
+
+    async def cancel(self) -> int:
+        """Cancel the current run; returns 1 if one was interrupted"""
+        if not self.running:
+            return 0
+        interrupted = int(self._run_started is not None)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        return interrupted
+
+    def report(self) -> dict:
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval,
+            "active": self.running,
+            "current_run_seconds": _age(self._run_started, time.monotonic()),
+            "last_duration_seconds": self.last_duration,
+            **self.stats,
+            "last_error": self.last_error,
+        }
+
+
+class TaskRuntime:
+    """Registry of this worker's task queues and periodic jobs"""
+
+    def __init__(self):
+        self.queues: Dict[str, TaskQueue] = {}
+        self.jobs: Dict[str, PeriodicJob] = {}
+        self.started = False
+
+    def queue(self, name: str, concurrency: int, max_pending: int, drain_first: bool = False) -> TaskQueue:
+        """The queue called ``name``, created on first use"""
+        queue = self.queues.get(name)
+        if queue is None:
+            queue = self.queues[name] = TaskQueue(name, concurrency, max_pending, drain_first)
+        return queue
+
+    def periodic(self, name: str, interval: float, fn: Callable[[], Awaitable]) -> PeriodicJob:
+        job = self.jobs.get(name)
+        if job is None:
+            job = self.jobs[name] = PeriodicJob(name, interval, fn)
+        if self.started:
+            job.start()
+        return job
+
+    def start(self):
+        """Start the periodic jobs and accept queued work (again, after a drain)"""
+        self.started = True
+        for queue in self.queues.values():
+            queue.accepting = True
+        for job in self.jobs.values():
+            job.start()
+
+    async def drain(self, timeout: float) -> dict:
+        """Stop taking work, let what's queued or running finish for up to ``timeout`` seconds, cancel the rest"""
+        started = time.monotonic()
+        deadline = started + timeout
+        self.started = False
+        for job in self.jobs.values():
+            job.stop()
+        first = [queue for queue in self.queues.values() if queue.drain_first]
+        rest = list(self.jobs.values()) + [queue for queue in self.queues.values() if not queue.drain_first]
+        cancelled = {}
+        for parts in (first, rest):
+            for part in parts:
+                if isinstance(part, TaskQueue):
+                    part.accepting = False
+            finished = await asyncio.gather(*(part.join(deadline - time.monotonic()) for part in parts))
+            for part, done in zip(parts, finished):
+                if not done:
+                    lost = await part.cancel()
+                    if lost:
+                        cancelled[part.name] = lost
+        if cancelled:
+            print(f"Cancelled unfinished background tasks at shutdown: {cancelled}")
+        return {"seconds": round(time.monotonic() - started, 3), "cancelled": cancelled}
+
+    def stats(self) -> dict:
+        return {
+            "queues": [queue.report() for queue in self.queues.values()],
+            "periodic": [job.report() for job in self.jobs.values()],
+        }
+
+
+runtime = TaskRuntime()
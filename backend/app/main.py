@@ -1,18 +1,36 @@
 """FastAPI Application Entry Point"""
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from app.core.config import settings
-from app.core.database import init_db
-from app.api.routes import config, consent, admin
+from app.core.responses import FastJSONResponse
+from app.core.lazy_routers import LazyRouterMiddleware, include_router_module
+from app.core.profiling import ProfilingMiddleware
+from app.core.rate_limit import RateLimitMiddleware
+
+# Route modules and the URL prefixes they serve
+ROUTERS = {
+    "app.api.routes.config": ("/api/config", "/api/script-configs"),
+    "app.api.routes.consent": ("/api/v1",),
+    "app.api.routes.beacon": ("/api/beacon",),
+    "app.api.routes.retention": ("/api/v1/retention",),
+    "app.api.routes.data_subjects": ("/api/v1/data-subjects",),
+    "app.api.routes.erasure": ("/api/v1/erasure-jobs",),
+    "app.api.routes.imports": ("/api/v1/consent-imports",),
+    "app.api.routes.admin": ("/api/admin",),
+    "app.api.routes.widget": ("/widget",),
+}
 
 app = FastAPI(
     title=settings.APP_NAME,
     description="DPDP Compliant Cookie Consent Management System",
-    version=settings.APP_VERSION
+    version=settings.APP_VERSION,
+    default_response_class=FastJSONResponse
 )
 
+# Rate limiting (added before CORS so 429s still carry CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -22,20 +40,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
-app.include_router(config.router)
-app.include_router(consent.router)
-app.include_router(admin.router)
+# Request profiling / slow-request log
+app.add_middleware(ProfilingMiddleware)
 
-# Serve widget file
-@app.get("/widget/consent-widget.js")
-async def get_widget():
-    """Serve the consent widget JavaScript file"""
-    import os
-    widget_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "widget", "consent-widget.js")
-    if os.path.exists(widget_path):
-        return FileResponse(widget_path, media_type="application/javascript")
-    return {"error": "Widget file not found"}
+# Include routers (on first use when running serverless)
+if settings.LAZY_ROUTERS:
+    app.add_middleware(LazyRouterMiddleware, fastapi_app=app, routers=ROUTERS)
+else:
+    for module_path in ROUTERS:
+        include_router_module(app, module_path)
 
 # Serve dashboard
 @app.get("/dashboard")
@@ -80,12 +93,30 @@ async def root():
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Initialize database and start background jobs"""
+    from app.core.database import init_db
+    from app.core.tasks import runtime
+    from app.services.idempotency import sweep_shards
+    from app.services.audit_chain import run_sealer
+    from app.services.retention import run_retention
+    from app.services.erasure import run_pending_erasures
     await init_db()
+    runtime.periodic("idempotency-sweeper", settings.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS, sweep_shards)
+    runtime.periodic("audit-sealer", settings.AUDIT_SEAL_INTERVAL_SECONDS, run_sealer)
+    runtime.periodic("retention", settings.RETENTION_INTERVAL_SECONDS, run_retention)
+    runtime.periodic("erasure", settings.ERASURE_INTERVAL_SECONDS, run_pending_erasures)
+    runtime.start()
     print("Database initialized")
     print(f"Server running on http://{settings.HOST}:{settings.PORT}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain background tasks (buffered consent beacons are flushed first)"""
+    from app.core.tasks import runtime
+    await runtime.drain(settings.TASK_DRAIN_SECONDS)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,16 +1,34 @@
 """Database models"""
 from app.models.api_key import APIKey
 from app.models.script_config import ScriptConfig
+from app.models.script_config_version import ScriptConfigVersion
 from app.models.consent import Consent
 from app.models.consent_history import ConsentHistory
 from app.models.grievance import Grievance
+from app.models.idempotency_key import IdempotencyKey
+from app.models.audit_seal import AuditSeal
+from app.models.pruned_history import PrunedHistory
+from app.models.retention_policy import RetentionPolicy
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.data_subject import DataSubjectSession
+from app.models.erasure_job import ErasureJob
+from app.models.tenant_shard import TenantShard
 
 __all__ = [
     "APIKey",
     "ScriptConfig",
+    "ScriptConfigVersion",
     "Consent",
     "ConsentHistory",
-    "Grievance"
+    "Grievance",
+    "IdempotencyKey",
+    "AuditSeal",
+    "PrunedHistory",
+    "RetentionPolicy",
+    "JobCheckpoint",
+    "DataSubjectSession",
+    "ErasureJob",
+    "TenantShard"
 ]
 
 
@@ -11,7 +11,11 @@ class APIKey(Base):
     __tablename__ = "api_keys"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    key = Column(String(255), unique=True, nullable=False, index=True)
+    # Keys are stored as their first characters (public, also the rate limiter's bucket name)
+    # and an HMAC of the whole key; see services/api_keys.py
+    key_prefix = Column(String(16), index=True)
+    key_hash = Column(String(64), unique=True, index=True)
+    key = Column(String(255), unique=True, index=True)  # Plaintext of keys not yet migrated by scripts/hash_api_keys.py
     customer_name = Column(String(255), nullable=False)
     customer_email = Column(String(255))
     is_active = Column(Boolean, default=True)
@@ -19,7 +23,7 @@ class APIKey(Base):
     expires_at = Column(DateTime(timezone=True))
     
     def __repr__(self):
-        return f"<APIKey(customer={self.customer_name}, key={self.key[:10]}...)>"
+        return f"<APIKey(customer={self.customer_name}, key={self.key_prefix}...)>"
 
 
 
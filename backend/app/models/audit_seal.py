@@ -0,0 +1,34 @@
+"""Audit log seals"""
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.core.database import Base
+
+
+class AuditSeal(Base):
+    """Merkle root over one sealed batch of a tenant's consent history chain"""
+    __tablename__ = "audit_seals"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    api_key_id = Column(UUID(as_uuid=True), ForeignKey("api_keys.id"), nullable=False)
+
+    # Chain positions covered (inclusive)
+    first_seq = Column(BigInteger, nullable=False)
+    last_seq = Column(BigInteger, nullable=False)
+    row_count = Column(Integer, nullable=False)
+
+    # chain_hash before the first row (the previous seal's chain_hash) and after the last one
+    prev_hash = Column(String(64), nullable=False)
+    chain_hash = Column(String(64), nullable=False)
+    merkle_root = Column(String(64), nullable=False)
+
+    sealed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Two sealers can't both extend the same chain
+        UniqueConstraint('api_key_id', 'first_seq', name='uq_audit_seal_start'),
+    )
+
+    def __repr__(self):
+        return f"<AuditSeal(api_key_id={self.api_key_id}, seq={self.first_seq}-{self.last_seq})>"
@@ -16,6 +16,7 @@ class Consent(Base):
     user_id = Column(String(255), index=True)
     api_key_id = Column(UUID(as_uuid=True), ForeignKey("api_keys.id"), nullable=False)
     script_id = Column(String(100), index=True)  # Link to script config
+    config_version_id = Column(UUID(as_uuid=True), ForeignKey("script_config_versions.id"))  # Config the user saw
     
     # Consent categories
     consent_categories = Column(JSON, nullable=False)
@@ -35,6 +36,7 @@ class Consent(Base):
         Index('idx_session_status', 'session_id', 'status'),
         Index('idx_expires_at', 'expires_at'),
         Index('idx_script_session', 'script_id', 'session_id'),
+        Index('idx_consent_api_key', 'api_key_id', 'id'),
     )
     
     def __repr__(self):
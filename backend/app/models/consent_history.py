@@ -1,5 +1,5 @@
 """Consent History model for audit logging"""
-from sqlalchemy import Column, String, DateTime, JSON, Text, ForeignKey, Index
+from sqlalchemy import Column, String, DateTime, JSON, Text, ForeignKey, Index, BigInteger, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -7,12 +7,16 @@ from app.core.database import Base
 
 
 class ConsentHistory(Base):
-    """Immutable audit log of all consent actions"""
+    """Immutable audit log of all consent actions
+    
+    Rows are hash-chained per tenant and sealed in batches (see services/audit_chain.py)
+    """
     __tablename__ = "consent_history"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     consent_id = Column(UUID(as_uuid=True), ForeignKey("consents.id"), nullable=False, index=True)
     session_id = Column(String(255), nullable=False, index=True)
+    api_key_id = Column(UUID(as_uuid=True), ForeignKey("api_keys.id"))  # Tenant; filled in by the sealer for older rows
     
     # Action details
     action = Column(String(50), nullable=False)
@@ -27,9 +31,20 @@ class ConsentHistory(Base):
     # Additional metadata
     extra_metadata = Column(JSON)
     
+    # Tamper evidence, set when the row is sealed: sha256 of the row's canonical content,
+    # its position in the tenant's chain and sha256(previous chain_hash + row_hash)
+    row_hash = Column(String(64))
+    chain_seq = Column(BigInteger)
+    chain_hash = Column(String(64))
+    
     __table_args__ = (
         Index('idx_consent_timestamp', 'consent_id', 'timestamp'),
         Index('idx_session_timestamp', 'session_id', 'timestamp'),
+        Index('idx_history_chain', 'api_key_id', 'chain_seq', unique=True),
+        Index(
+            'idx_history_unsealed', 'timestamp',
+            postgresql_where=text('chain_seq IS NULL'), sqlite_where=text('chain_seq IS NULL')
+        ),
     )
     
     def __repr__(self):
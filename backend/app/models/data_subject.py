@@ -0,0 +1,28 @@
+"""Data-subject index"""
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class DataSubjectSession(Base):
+    """Sessions a tenant's user_id has been seen with, maintained as consents are written
+    
+    Lets access and erasure requests find a person's consents, history and grievances
+    through indexed lookups instead of scanning by user_id.
+    """
+    __tablename__ = "data_subject_sessions"
+
+    api_key_id = Column(UUID(as_uuid=True), ForeignKey("api_keys.id"), primary_key=True)
+    user_id = Column(String(255), primary_key=True)
+    session_id = Column(String(255), primary_key=True)
+
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_subject_session', 'api_key_id', 'session_id'),
+    )
+
+    def __repr__(self):
+        return f"<DataSubjectSession(user_id={self.user_id}, session_id={self.session_id})>"
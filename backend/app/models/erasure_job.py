@@ -0,0 +1,33 @@
+"""Bulk erasure / anonymization job"""
+from sqlalchemy import Column, String, DateTime, JSON, Text, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.core.database import Base
+
+
+class ErasureJob(Base):
+    """A request to erase or anonymize a tenant's consent data, run in the background in batches"""
+    __tablename__ = "erasure_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    api_key_id = Column(UUID(as_uuid=True), ForeignKey("api_keys.id"), nullable=False)
+
+    mode = Column(String(20), nullable=False, default="delete")  # delete, anonymize
+    subjects = Column(JSON)  # [{"user_id": ..., "session_id": ...}]; NULL = every record of the tenant
+
+    # Status
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed
+    counts = Column(JSON)  # Rows erased or anonymized so far, per table
+    error = Column(Text)  # Last error; the job is retried from its checkpoint
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index('idx_erasure_tenant', 'api_key_id', 'created_at'),
+        Index('idx_erasure_status', 'status', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f"<ErasureJob(id={self.id}, mode={self.mode}, status={self.status})>"
@@ -0,0 +1,32 @@
+"""Idempotency records for replaying consent create responses"""
+from sqlalchemy import Column, String, DateTime, JSON, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """Stored result of a create request, keyed by Idempotency-Key or by session (latest submission)"""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    api_key_id = Column(UUID(as_uuid=True), ForeignKey("api_keys.id"), nullable=False)
+
+    # "key:<Idempotency-Key header>" or "session:<sha256 of tenant/script/session>" (its latest submission)
+    key = Column(String(300), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+
+    consent_id = Column(UUID(as_uuid=True), ForeignKey("consents.id"))
+    response = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint('api_key_id', 'key', name='uq_idempotency_api_key_key'),
+        Index('idx_idempotency_consent', 'consent_id'),
+    )
+
+    def __repr__(self):
+        return f"<IdempotencyKey(key={self.key[:20]}, consent_id={self.consent_id})>"
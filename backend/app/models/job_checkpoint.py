@@ -0,0 +1,20 @@
+"""Checkpoints for resumable background jobs"""
+from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class JobCheckpoint(Base):
+    """Progress of a long-running job, plus a lease so only one worker runs it at a time"""
+    __tablename__ = "job_checkpoints"
+
+    name = Column(String(100), primary_key=True)
+    state = Column(JSON, nullable=False, default=dict)
+
+    lease_owner = Column(String(64))
+    lease_until = Column(DateTime(timezone=True))
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<JobCheckpoint(name={self.name})>"
@@ -0,0 +1,29 @@
+"""Tombstones of removed consent history rows"""
+from sqlalchemy import Column, String, DateTime, BigInteger, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class PrunedHistory(Base):
+    """Chain position and hashes of a sealed history row that was compacted or erased
+    
+    Keeps the tenant's audit chain and seals verifiable without the row's content.
+    """
+    __tablename__ = "pruned_history"
+
+    history_id = Column(UUID(as_uuid=True), primary_key=True)
+    api_key_id = Column(UUID(as_uuid=True), ForeignKey("api_keys.id"), nullable=False)
+    chain_seq = Column(BigInteger, nullable=False)
+    row_hash = Column(String(64), nullable=False)
+    chain_hash = Column(String(64), nullable=False)
+
+    reason = Column(String(50), nullable=False)  # "compacted", "retention", ...
+    pruned_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_pruned_chain', 'api_key_id', 'chain_seq', unique=True),
+    )
+
+    def __repr__(self):
+        return f"<PrunedHistory(history_id={self.history_id}, reason={self.reason})>"
@@ -0,0 +1,24 @@
+"""Per-tenant retention policy"""
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.core.database import Base
+
+
+class RetentionPolicy(Base):
+    """How long a tenant's consent history and inactive consents are kept in full"""
+    __tablename__ = "retention_policies"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    api_key_id = Column(UUID(as_uuid=True), ForeignKey("api_keys.id"), nullable=False, unique=True)
+
+    # Days; NULL falls back to the RETENTION_* settings, 0 disables
+    compact_history_after_days = Column(Integer)  # Superseded history rows are summarized after this
+    inactive_consent_retention_days = Column(Integer)  # Revoked/expired consents are deleted after this
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<RetentionPolicy(api_key_id={self.api_key_id})>"
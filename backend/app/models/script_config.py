@@ -27,6 +27,7 @@ class ScriptConfig(Base):
     # Language Settings
     default_language = Column(String(10), default="en")
     supported_languages = Column(JSON, default=["en"])
+    language_packs = Column(JSON, default=dict)  # {language: {section: {key: text}}} overrides
     
     # Cookie Policy
     cookie_policy_url = Column(String(500))
@@ -39,6 +40,12 @@ class ScriptConfig(Base):
     is_active = Column(Boolean, default=True)
     is_published = Column(Boolean, default=False)
     
+    # Snapshot served to the widget; the columns above are the editable draft
+    published_version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("script_config_versions.id", use_alter=True, name="fk_script_configs_published_version")
+    )
+    
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
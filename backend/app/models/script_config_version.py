@@ -0,0 +1,33 @@
+"""Published script configuration snapshots"""
+from sqlalchemy import Column, String, DateTime, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.core.database import Base
+
+
+class ScriptConfigVersion(Base):
+    """Immutable, content-addressed snapshot of a script configuration as published"""
+    __tablename__ = "script_config_versions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    script_config_id = Column(UUID(as_uuid=True), ForeignKey("script_configs.id"), nullable=False, index=True)
+    script_id = Column(String(100), nullable=False, index=True)
+
+    # sha256 of the canonical JSON of ``content``
+    content_hash = Column(String(64), nullable=False)
+    content = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('script_config_id', 'content_hash', name='uq_script_config_version_hash'),
+    )
+
+    @property
+    def version(self) -> str:
+        """Short form of the content hash used in URLs, ETags and the widget"""
+        return self.content_hash[:12]
+
+    def __repr__(self):
+        return f"<ScriptConfigVersion(script_id={self.script_id}, version={self.version})>"
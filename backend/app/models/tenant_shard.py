@@ -0,0 +1,28 @@
+"""Shard directory"""
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class TenantShard(Base):
+    """Which database holds a tenant's consent data (tenants without a row live on the primary)"""
+    __tablename__ = "tenant_shards"
+
+    api_key_id = Column(UUID(as_uuid=True), ForeignKey("api_keys.id"), primary_key=True)
+    shard = Column(String(50), nullable=False, default="primary")
+
+    # Online moves: "moving" while rows are copied (deletes refused), "frozen" during cutover (writes refused)
+    status = Column(String(20), nullable=False, default="active")  # active, moving, frozen
+    target_shard = Column(String(50))
+    move_started_at = Column(DateTime(timezone=True))
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('idx_tenant_shard', 'shard'),
+    )
+
+    def __repr__(self):
+        return f"<TenantShard(api_key_id={self.api_key_id}, shard={self.shard}, status={self.status})>"
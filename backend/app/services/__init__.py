@@ -0,0 +1,6 @@
+# Service layer (caches, background jobs)
+
+
+
+
+
@@ -0,0 +1,184 @@
+"""API keys, stored hashed.
+
+A key is shown once when it is created. The database keeps only its first
+``API_KEY_PREFIX_LENGTH`` characters (to find the row) and an HMAC-SHA256 of
+the whole key under ``SECRET_KEY``. A keyed hash of a random 32-character key
+can't be brute-forced without the secret, and unlike bcrypt-style hashes it
+costs microseconds, so checking a key on every request stays as cheap as the
+old plaintext lookup: one indexed query by prefix, then a constant-time
+compare of the hash against each (almost always one) matching row.
+Verified keys are also cached per worker for ``API_KEY_CACHE_SECONDS``;
+deactivating or deleting a key through the admin API evicts it on the
+worker that handles the request, other workers drop it when it expires.
+
+Keys created before hashing keep their plaintext in ``APIKey.key`` until
+``scripts/hash_api_keys.py`` migrates them; until then they are still
+accepted by plaintext lookup (``API_KEY_PLAINTEXT_FALLBACK``).
+"""
+import hashlib
+import hmac
+import secrets
+import string
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.api_key import APIKey
+
+ALPHABET = string.ascii_letters + string.digits
+
+
+def generate_api_key() -> str:
+    return "".join(secrets.choice(ALPHABET) for _ in range(settings.API_KEY_LENGTH))
+
+
+def key_prefix(api_key: str) -> str:
+    return api_key[:settings.API_KEY_PREFIX_LENGTH]
+
+
+def hash_api_key(api_key: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), api_key.encode(), hashlib.sha256).hexdigest()
+
+
+async def find_api_key(db: AsyncSession, api_key: str, digest: Optional[str] = None) -> Optional[APIKey]:
+    """The active APIKey row for a presented key, or None"""
+    digest = digest or hash_api_key(api_key)
+    result = await db.execute(
+        select(APIKey).where(
+            and_(
+                APIKey.key_prefix == key_prefix(api_key),
+                APIKey.is_active == True
+            )
+        )
+    )
+    match = None
+    for candidate in result.scalars().all():
+        # Compare every candidate so the timing doesn't depend on which one matched
+        if candidate.key_hash and hmac.compare_digest(candidate.key_hash, digest):
+            match = candidate
+    if match is not None or not settings.API_KEY_PLAINTEXT_FALLBACK:
+        return match
+
+    # Not migrated yet
+    result = await db.execute(
+        select(APIKey).where(
+            and_(
+                APIKey.key == api_key,
+                APIKey.key_hash.is_(None),
+                APIKey.is_active == True
+            )
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+class APIKeyCache:
+    """Recently verified keys by HMAC, per worker
+
+    Hits return a fresh, session-less copy of the row, so a request can't
+    see (or expire) another request's instance. A deactivated key is
+    evicted here by the admin route, but keeps working on other workers for
+    up to ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # digest -> (cached at, column values)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str) -> Optional[APIKey]:
+        entry = self._entries.get(digest)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return APIKey(**entry[1])
+
+    def put(self, digest: str, api_key_obj: APIKey):
+        if self.ttl <= 0:
+            return
+        values = {column.key: getattr(api_key_obj, column.key) for column in APIKey.__table__.columns}
+        self._entries[digest] = (time.monotonic(), values)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def evict(self, digest: str):
+        self._entries.pop(digest, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl_seconds": self.ttl}
+
+
+async def authenticate(db: AsyncSession, api_key: str) -> Optional[APIKey]:
+    """find_api_key, answered from the cache for recently verified keys"""
+    digest = hash_api_key(api_key)
+    api_key_obj = api_key_cache.get(digest)
+    if api_key_obj is None:
+        api_key_obj = await find_api_key(db, api_key, digest)
+        if api_key_obj is not None:
+            api_key_cache.put(digest, api_key_obj)
+    return api_key_obj
+
+
+async def issue_api_key(db: AsyncSession, customer_name: str, customer_email: Optional[str],
+                       expires_at: Optional[datetime] = None):
+    """Add a key; returns (row, plaintext key). The plaintext is not stored; the caller commits"""
+    while True:
+        api_key = generate_api_key()
+        digest = hash_api_key(api_key)
+        exists = await db.scalar(select(APIKey.id).where(APIKey.key_hash == digest))
+        if not exists:
+            break
+    api_key_obj = APIKey(
+        key_prefix=key_prefix(api_key),
+        key_hash=digest,
+        customer_name=customer_name,
+        customer_email=customer_email,
+        is_active=True,
+        expires_at=expires_at
+    )
+    db.add(api_key_obj)
+    await db.flush()
+    return api_key_obj, api_key
+
+
+def key_digest(api_key_obj: APIKey) -> Optional[str]:
+    """The cache key of a row: its stored HMAC, or the HMAC of a not yet migrated plaintext"""
+    if api_key_obj.key_hash:
+        return api_key_obj.key_hash
+    return hash_api_key(api_key_obj.key) if api_key_obj.key else None
+
+
+# Rows that are deleted with their key; rows in any other table referring to it block the delete
+KEY_OWNED_TABLES = ("tenant_shards", "retention_policies")
+
+
+async def key_in_use(db: AsyncSession, api_key_id) -> bool:
+    """Whether anything but the key's own settings refers to it
+
+    ``db`` should be the tenant's ``shard_session``, so consent data is
+    looked up on its shard.
+    """
+    api_keys = APIKey.__table__
+    for table in APIKey.metadata.sorted_tables:
+        if table.name in KEY_OWNED_TABLES:
+            continue
+        for fk in table.foreign_keys:
+            if fk.references(api_keys):
+                if await db.scalar(select(fk.parent).where(fk.parent == api_key_id).limit(1)) is not None:
+                    return True
+    return False
+
+
+api_key_cache = APIKeyCache(ttl=settings.API_KEY_CACHE_SECONDS, max_entries=settings.API_KEY_CACHE_MAX_ENTRIES)
@@ -0,0 +1,290 @@
+"""Tamper-evident consent history: per-tenant hash chain sealed into Merkle roots.
+
+Inserting a history row costs nothing extra. A background sealer (every
+``AUDIT_SEAL_INTERVAL_SECONDS``, or ``POST /api/admin/audit/seal`` where
+nothing runs in the background) picks up unsealed rows in batches and, per
+tenant, in one transaction:
+
+- computes ``row_hash`` = sha256 of the row's canonical content,
+- assigns the next ``chain_seq`` and ``chain_hash`` = sha256(previous
+  chain_hash + row_hash), so editing, deleting or reordering any row breaks
+  every later link, and
+- stores an ``AuditSeal`` with the Merkle root of the batch's row hashes, so
+  one row can be proven against a seal without reading the rest.
+
+Rows are only tamper-evident once sealed; the window is the seal interval.
+Sealers on several workers can run at once: the unique (tenant, first_seq)
+seal constraint lets only one of them extend a chain, the other rolls back.
+
+Retention and erasure remove rows through ``prune_history``, which leaves a
+``PrunedHistory`` tombstone (position and hashes, no content) for every
+sealed row so the chain and seals stay verifiable.
+
+Each shard holds its tenants' chains and seals; the sealer goes over every
+shard and leaves tenants that are being moved between shards alone.
+
+``scripts/verify_audit_log.py`` re-checks everything in parallel.
+"""
+import asyncio
+import hashlib
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Collection, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.shards import shard_names, shard_session
+from app.models.audit_seal import AuditSeal
+from app.models.consent import Consent
+from app.models.consent_history import ConsentHistory
+from app.models.pruned_history import PrunedHistory
+from app.services.shard_directory import moving_tenants
+
+GENESIS_HASH = "0" * 64
+
+# Columns covered by row_hash, in hashing order
+HASHED_COLUMNS = (
+    "id", "consent_id", "session_id", "api_key_id", "action", "previous_categories",
+    "new_categories", "ip_address", "user_agent", "timestamp", "extra_metadata",
+)
+
+
+def _canonical_value(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        # Postgres returns aware datetimes, SQLite naive UTC ones
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat()
+    return value
+
+
+def row_hash(values: Sequence) -> str:
+    """sha256 of a history row given as values in HASHED_COLUMNS order"""
+    canonical = json.dumps(
+        [_canonical_value(value) for value in values],
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def chain_step(prev_hash: str, row_digest: str) -> str:
+    return hashlib.sha256(bytes.fromhex(prev_hash) + bytes.fromhex(row_digest)).hexdigest()
+
+
+def _leaf(row_digest: str) -> bytes:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(row_digest)).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def merkle_root(row_digests: Sequence[str]) -> str:
+    """Merkle root of row hashes (leaf/node prefixed; an odd node is paired with itself)"""
+    level = [_leaf(digest) for digest in row_digests]
+    if not level:
+        return GENESIS_HASH
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [_node(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def merkle_proof(row_digests: Sequence[str], index: int) -> List[Tuple[str, str]]:
+    """Sibling hashes ("left"/"right", hex) from leaf ``index`` up to the root"""
+    level = [_leaf(digest) for digest in row_digests]
+    proof = []
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        sibling = index ^ 1
+        proof.append(("left" if sibling < index else "right", level[sibling].hex()))
+        level = [_node(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+        index //= 2
+    return proof
+
+
+def verify_merkle_proof(row_digest: str, proof: Sequence[Tuple[str, str]], root: str) -> bool:
+    current = _leaf(row_digest)
+    for side, sibling in proof:
+        sibling_bytes = bytes.fromhex(sibling)
+        current = _node(sibling_bytes, current) if side == "left" else _node(current, sibling_bytes)
+    return current.hex() == root
+
+
+def _unsealed_query(limit: int, skip_tenants: Collection[uuid.UUID] = ()):
+    history = ConsentHistory.__table__
+    query = (
+        select(*(history.c[name] for name in HASHED_COLUMNS if name != "api_key_id"), Consent.api_key_id)
+        .join(Consent, Consent.id == history.c.consent_id)
+        .where(history.c.chain_seq.is_(None))
+        .order_by(history.c.timestamp, history.c.id)
+        .limit(limit)
+        # Postgres: rows being sealed can't be pruned underneath us (and vice versa)
+        .with_for_update(of=history, skip_locked=True)
+    )
+    if skip_tenants:
+        query = query.where(Consent.api_key_id.not_in(skip_tenants))
+    return query
+
+
+async def seal_pending(db: AsyncSession, limit: int, skip_tenants: Collection[uuid.UUID] = ()) -> int:
+    """Seal up to ``limit`` unsealed history rows; returns how many were sealed (0 if another sealer won)"""
+    rows = (await db.execute(_unsealed_query(limit, skip_tenants))).all()
+    if not rows:
+        return 0
+
+    by_tenant: Dict[uuid.UUID, List] = {}
+    for row in rows:
+        by_tenant.setdefault(row.api_key_id, []).append(row)
+
+    updates = []
+    seals = []
+    for api_key_id, tenant_rows in by_tenant.items():
+        result = await db.execute(
+            select(AuditSeal.last_seq, AuditSeal.chain_hash)
+            .where(AuditSeal.api_key_id == api_key_id)
+            .order_by(AuditSeal.last_seq.desc())
+            .limit(1)
+        )
+        last = result.first()
+        seq, head = (last.last_seq, last.chain_hash) if last else (0, GENESIS_HASH)
+        prev_hash, first_seq = head, seq + 1
+        digests = []
+        for row in tenant_rows:
+            digest = row_hash([getattr(row, name) for name in HASHED_COLUMNS])
+            seq += 1
+            head = chain_step(head, digest)
+            digests.append(digest)
+            updates.append({
+                "id": row.id, "api_key_id": api_key_id,
+                "row_hash": digest, "chain_seq": seq, "chain_hash": head
+            })
+        seals.append(AuditSeal(
+            api_key_id=api_key_id,
+            first_seq=first_seq,
+            last_seq=seq,
+            row_count=len(tenant_rows),
+            prev_hash=prev_hash,
+            chain_hash=head,
+            merkle_root=merkle_root(digests)
+        ))
+
+    await db.execute(update(ConsentHistory), updates)
+    db.add_all(seals)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return 0
+    return len(rows)
+
+
+async def seal_all(db: AsyncSession, batch_size: int, skip_tenants: Collection[uuid.UUID] = ()) -> int:
+    """Seal until nothing is left (or another sealer is busy with the same rows)"""
+    total = 0
+    while True:
+        sealed = await seal_pending(db, batch_size, skip_tenants)
+        total += sealed
+        if sealed < batch_size:
+            return total
+        await asyncio.sleep(0)
+
+
+async def seal_shards(batch_size: int) -> Dict[str, int]:
+    """Seal pending history on every shard; returns rows sealed per shard"""
+    async with AsyncSessionLocal() as db:
+        moving = await moving_tenants(db)
+    sealed = {}
+    for shard in shard_names():
+        async with shard_session(shard) as db:
+            sealed[shard] = await seal_all(db, batch_size, moving)
+    return sealed
+
+
+async def run_sealer():
+    """Seal new consent history rows (run periodically)"""
+    await seal_shards(settings.AUDIT_SEAL_BATCH_SIZE)
+
+
+async def prune_history(db: AsyncSession, condition, reason: str) -> int:
+    """Delete the history rows matching ``condition``, tombstoning the sealed ones; the caller commits"""
+    history = ConsentHistory.__table__
+    result = await db.execute(
+        delete(history).where(condition).returning(
+            history.c.id, history.c.api_key_id, history.c.chain_seq, history.c.row_hash, history.c.chain_hash
+        )
+    )
+    removed = result.all()
+    tombstones = [
+        {
+            "history_id": row.id,
+            "api_key_id": row.api_key_id,
+            "chain_seq": row.chain_seq,
+            "row_hash": row.row_hash,
+            "chain_hash": row.chain_hash,
+            "reason": reason
+        }
+        for row in removed if row.chain_seq is not None
+    ]
+    if tombstones:
+        await db.execute(insert(PrunedHistory), tombstones)
+    return len(removed)
+
+
+def chain_hashes_query(api_key_id, first_seq: int, last_seq: int):
+    """(chain_seq, row_hash) of a tenant's chain positions, including pruned rows, in order"""
+    present = select(ConsentHistory.chain_seq, ConsentHistory.row_hash).where(
+        ConsentHistory.api_key_id == api_key_id,
+        ConsentHistory.chain_seq.between(first_seq, last_seq)
+    )
+    pruned = select(PrunedHistory.chain_seq, PrunedHistory.row_hash).where(
+        PrunedHistory.api_key_id == api_key_id,
+        PrunedHistory.chain_seq.between(first_seq, last_seq)
+    )
+    combined = union_all(present, pruned).subquery()
+    return select(combined.c.chain_seq, combined.c.row_hash).order_by(combined.c.chain_seq)
+
+
+async def history_proof(db: AsyncSession, history: ConsentHistory) -> Optional[dict]:
+    """Merkle inclusion proof of a sealed history row against its seal"""
+    if history.chain_seq is None:
+        return None
+    result = await db.execute(
+        select(AuditSeal).where(
+            AuditSeal.api_key_id == history.api_key_id,
+            AuditSeal.first_seq <= history.chain_seq,
+            AuditSeal.last_seq >= history.chain_seq
+        )
+    )
+    seal = result.scalar_one_or_none()
+    if seal is None:
+        return None
+    result = await db.execute(chain_hashes_query(history.api_key_id, seal.first_seq, seal.last_seq))
+    digests = [row.row_hash for row in result]
+    current = row_hash([getattr(history, name) for name in HASHED_COLUMNS])
+    return {
+        "history_id": str(history.id),
+        "row_hash": history.row_hash,
+        "row_hash_matches": current == history.row_hash,
+        "chain_seq": history.chain_seq,
+        "chain_hash": history.chain_hash,
+        "proof": [{"side": side, "hash": sibling} for side, sibling in
+                  merkle_proof(digests, history.chain_seq - seal.first_seq)],
+        "seal": {
+            "first_seq": seal.first_seq,
+            "last_seq": seal.last_seq,
+            "prev_hash": seal.prev_hash,
+            "chain_hash": seal.chain_hash,
+            "merkle_root": seal.merkle_root,
+            "sealed_at": seal.sealed_at.isoformat() if seal.sealed_at else None
+        }
+    }
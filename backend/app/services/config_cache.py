@@ -0,0 +1,155 @@
+"""In-process cache of published script configurations.
+
+The public ``/api/config/{script_id}`` payload is built from the config's
+published snapshot (see ``config_versions``), encoded once when it is loaded
+(or when the config is published/rolled back) and served as-is on every request, together with the config's compiled language packs
+(see ``language_packs``). Entries expire after ``CONFIG_CACHE_TTL_SECONDS`` so
+other workers pick up changes; unknown script IDs are cached briefly too so
+that scrapers probing random IDs don't reach the database every time.
+"""
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.responses import PrecompressedBody, json_dumps
+from app.models.script_config import ScriptConfig
+from app.models.script_config_version import ScriptConfigVersion
+from app.services.config_versions import content_hash, snapshot_content, version_resolver
+from app.services.language_packs import compile_language_packs
+
+
+@dataclass(frozen=True)
+class CachedConfig:
+    """Published config plus its pre-encoded public JSON body"""
+    script_id: str
+    api_key_id: uuid.UUID
+    categories: Dict
+    default_language: str
+    supported_languages: List[str]
+    webhook_url: Optional[str]
+    version: str  # Short content hash of the published snapshot (ETag, widget)
+    version_id: Optional[uuid.UUID]  # None for configs published before snapshots existed
+    body: bytes
+    language_packs: Dict[str, PrecompressedBody]  # Compiled widget strings per language
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+def public_config_payload(script_id: str, content: Dict, version: str) -> dict:
+    """Fields of a published snapshot that the widget is allowed to see"""
+    return {
+        "script_id": script_id,
+        "version": version,
+        "domain": content["domain"],
+        "categories": content["categories"],
+        "banner_config": content["banner_config"],
+        "default_language": content["default_language"],
+        "supported_languages": content["supported_languages"],
+        "cookie_policy_url": content["cookie_policy_url"],
+        "webhook_url": content["webhook_url"],
+        "external_tool_url": content["external_tool_url"]
+    }
+
+
+class PublishedConfigCache:
+    """LRU of published configs keyed by script_id"""
+
+    def __init__(self, ttl_seconds: float, negative_ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.negative_ttl = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # script_id -> (expires_at, CachedConfig | None)
+
+    def _store(self, script_id: str, entry: Optional[CachedConfig], ttl: float):
+        self._entries[script_id] = (time.monotonic() + ttl, entry)
+        self._entries.move_to_end(script_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup(self, script_id: str):
+        """Return (hit, entry); entry is None for a cached miss"""
+        item = self._entries.get(script_id)
+        if item is None:
+            return False, None
+        expires_at, entry = item
+        if time.monotonic() > expires_at:
+            del self._entries[script_id]
+            return False, None
+        return True, entry
+
+    def put(self, config: ScriptConfig, snapshot: Optional[ScriptConfigVersion]) -> Optional[CachedConfig]:
+        """Encode and cache a config's published snapshot; unpublished/inactive configs are cached as misses"""
+        if not (config.is_published and config.is_active):
+            self._store(config.script_id, None, self.negative_ttl)
+            return None
+        if snapshot is not None:
+            content, version, version_id = snapshot.content, snapshot.version, snapshot.id
+            version_resolver.remember(config.script_id, version, version_id)
+        else:
+            # Published before snapshots existed: serve the row itself until it is republished
+            content = snapshot_content(config)
+            version, version_id = content_hash(content)[:12], None
+        supported_languages = list(content["supported_languages"])
+        language_packs = compile_language_packs(supported_languages, content.get("language_packs"))
+        payload = public_config_payload(config.script_id, content, version)
+        # Lets the widget request each pack under a versioned, long-cacheable URL
+        payload["language_packs"] = {language: pack.version for language, pack in language_packs.items()}
+        entry = CachedConfig(
+            script_id=config.script_id,
+            api_key_id=config.api_key_id,
+            categories=content["categories"] or {},
+            default_language=content["default_language"],
+            supported_languages=supported_languages,
+            webhook_url=content["webhook_url"],
+            version=version,
+            version_id=version_id,
+            body=json_dumps(payload),
+            language_packs=language_packs,
+        )
+        self._store(config.script_id, entry, self.ttl)
+        return entry
+
+    async def refresh(self, db: AsyncSession, config: ScriptConfig) -> Optional[CachedConfig]:
+        """Re-cache a config after its status or published snapshot changed"""
+        snapshot = None
+        if config.published_version_id is not None:
+            snapshot = await db.get(ScriptConfigVersion, config.published_version_id)
+        return self.put(config, snapshot)
+
+    def invalidate(self, script_id: str):
+        self._entries.pop(script_id, None)
+
+    async def load(self, db: AsyncSession, script_id: str) -> Optional[CachedConfig]:
+        """Return the published config for script_id, reading the database on a miss"""
+        hit, entry = self.lookup(script_id)
+        if hit:
+            return entry
+
+        result = await db.execute(
+            select(ScriptConfig, ScriptConfigVersion)
+            .outerjoin(ScriptConfigVersion, ScriptConfigVersion.id == ScriptConfig.published_version_id)
+            .where(
+                and_(
+                    ScriptConfig.script_id == script_id,
+                    ScriptConfig.is_published == True,
+                    ScriptConfig.is_active == True
+                )
+            )
+        )
+        row = result.first()
+        if row is None:
+            self._store(script_id, None, self.negative_ttl)
+            return None
+        return self.put(*row)
+
+
+config_cache = PublishedConfigCache(
+    ttl_seconds=settings.CONFIG_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.CONFIG_CACHE_NEGATIVE_TTL_SECONDS,
+    max_entries=settings.CONFIG_CACHE_MAX_ENTRIES,
+)
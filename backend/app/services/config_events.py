@@ -0,0 +1,184 @@
+"""Config change notifications for long-lived clients (Server-Sent Events).
+
+Publishing, rolling back, unpublishing or editing a script config emits an
+event on two topics: ``script:<script_id>`` (public; only changes to what
+the widget is served) and ``tenant:<api_key_id>`` (everything, for the
+dashboard and the tenant's own caches).
+
+The hub is built for many idle subscribers per worker: a topic holds only
+its latest event and one shared future that every waiting subscriber awaits,
+so there is no per-subscriber queue. A subscriber that falls behind skips
+straight to the latest event, which is all a cache needs to refetch.
+
+Events reach subscribers on the same worker. With ``CONFIG_EVENTS_REDIS_URL``
+set (and the redis package installed) they are also relayed through Redis
+pub/sub to every other worker, which additionally drops its cached copy of
+the config.
+"""
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.tasks import runtime
+
+REDIS_CHANNEL = "config-events"
+
+# One relay at a time keeps events in publish order
+_relay_queue = runtime.queue("config-event-relay", concurrency=1, max_pending=1000)
+
+
+class _Topic:
+    __slots__ = ("seq", "event", "changed", "subscribers")
+
+    def __init__(self):
+        self.seq = 0
+        self.event: Optional[dict] = None
+        self.changed: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.subscribers = 0
+
+
+class ConfigEventHub:
+    """In-process fan-out of config events, optionally bridged across workers"""
+
+    def __init__(self, max_subscribers: int, redis_url: str = ""):
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self.origin = uuid.uuid4().hex  # Skips our own events coming back from Redis
+        self._topics: Dict[str, _Topic] = {}
+        self._redis = None
+        self._relay_task: Optional[asyncio.Task] = None
+        if redis_url:
+            try:
+                import redis.asyncio as redis_asyncio  # Optional dependency, only needed across workers
+                self._redis = redis_asyncio.from_url(redis_url)
+            except ImportError:
+                print("CONFIG_EVENTS_REDIS_URL is set but redis is not installed; events stay on this worker")
+
+    def _dispatch(self, topics: List[str], event: dict):
+        for name in topics:
+            topic = self._topics.get(name)
+            if topic is None:
+                continue
+            topic.seq += 1
+            topic.event = event
+            changed, topic.changed = topic.changed, asyncio.get_running_loop().create_future()
+            changed.set_result(None)
+
+    def publish(self, topics: List[str], event: dict):
+        """Deliver an event to local subscribers and relay it to other workers"""
+        self._dispatch(topics, event)
+        if self._redis is not None:
+            message = json.dumps({"origin": self.origin, "topics": topics, "event": event})
+            if not _relay_queue.submit(self._relay_out, message):
+                print("Config event relay queue full; other workers will miss an event")
+
+    async def _relay_out(self, message: str):
+        try:
+            await self._redis.publish(REDIS_CHANNEL, message)
+        except Exception as e:
+            print(f"Error relaying config event: {e}")
+
+    async def _relay_in(self):
+        """Receive other workers' events (runs while this worker has subscribers)"""
+        from app.core.profiling import untrace_current_task
+        from app.services.config_cache import config_cache
+        untrace_current_task()
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(REDIS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = json.loads(message["data"])
+                    if data.get("origin") == self.origin:
+                        continue
+                    script_id = data["event"].get("script_id")
+                    if script_id:
+                        config_cache.invalidate(script_id)
+                    self._dispatch(data["topics"], data["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Config event relay disconnected, retrying: {e}")
+                await asyncio.sleep(5)
+
+    def accepting(self) -> bool:
+        """Whether this worker takes another stream (checked before the response starts)"""
+        return self.subscribers < self.max_subscribers
+
+    def _acquire(self, name: str) -> _Topic:
+        topic = self._topics.get(name)
+        if topic is None:
+            topic = self._topics[name] = _Topic()
+        topic.subscribers += 1
+        self.subscribers += 1
+        if self._redis is not None and (self._relay_task is None or self._relay_task.done()):
+            self._relay_task = asyncio.create_task(self._relay_in())
+        return topic
+
+    def _release(self, name: str, topic: _Topic):
+        topic.subscribers -= 1
+        self.subscribers -= 1
+        if topic.subscribers == 0 and self._topics.get(name) is topic:
+            del self._topics[name]
+
+    async def listen(self, name: str, heartbeat: float) -> AsyncIterator[Optional[dict]]:
+        """Yield each new event on a topic, or None after ``heartbeat`` idle seconds"""
+        topic = self._acquire(name)
+        try:
+            seen = topic.seq
+            while True:
+                if topic.seq != seen:
+                    seen = topic.seq
+                    yield topic.event
+                    continue
+                try:
+                    await asyncio.wait_for(asyncio.shield(topic.changed), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._release(name, topic)
+
+    def stats(self) -> dict:
+        return {"subscribers": self.subscribers, "topics": len(self._topics), "relay": self._redis is not None}
+
+
+def script_topic(script_id: str) -> str:
+    return f"script:{script_id}"
+
+
+def tenant_topic(api_key_id) -> str:
+    return f"tenant:{api_key_id}"
+
+
+def notify_config_change(config, event_type: str, version: Optional[str] = None, public: bool = True):
+    """Emit a change event for a script config (public=False: tenant stream only)"""
+    event = {
+        "type": event_type,
+        "script_id": config.script_id,
+        "version": version,
+        "at": datetime.utcnow().isoformat()
+    }
+    topics = [tenant_topic(config.api_key_id)]
+    if public:
+        topics.append(script_topic(config.script_id))
+    config_event_hub.publish(topics, event)
+
+
+def format_sse(event: Optional[dict]) -> bytes:
+    """One SSE message; None becomes a comment line that keeps the connection alive"""
+    if event is None:
+        return b": ping\n\n"
+    data = json.dumps(event, separators=(",", ":"))
+    event_id = f"id: {event['version']}\n" if event.get("version") else ""
+    return f"{event_id}event: {event['type']}\ndata: {data}\n\n".encode("utf-8")
+
+
+config_event_hub = ConfigEventHub(
+    max_subscribers=settings.CONFIG_EVENTS_MAX_SUBSCRIBERS,
+    redis_url=settings.CONFIG_EVENTS_REDIS_URL,
+)
@@ -0,0 +1,128 @@
+"""Immutable published snapshots of script configurations.
+
+``ScriptConfig`` rows are the editable draft. Publishing freezes the
+widget-visible fields into a ``ScriptConfigVersion`` addressed by the sha256
+of their canonical JSON (publishing identical content reuses the existing
+snapshot) and points ``ScriptConfig.published_version_id`` at it. The public
+config, its ETag and the language packs are built from that snapshot only,
+so editing the draft never changes what visitors see until the next publish,
+and rollback is just moving the pointer back.
+
+Consents record the snapshot the visitor was shown (``config_version_id``).
+"""
+import hashlib
+import json
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.script_config import ScriptConfig
+from app.models.script_config_version import ScriptConfigVersion
+
+# Draft fields that are frozen into a snapshot
+SNAPSHOT_FIELDS = (
+    "domain",
+    "categories",
+    "banner_config",
+    "default_language",
+    "supported_languages",
+    "language_packs",
+    "cookie_policy_url",
+    "webhook_url",
+    "external_tool_url",
+)
+
+
+def snapshot_content(config: ScriptConfig) -> Dict:
+    """Widget-visible fields of the draft, as they would be published"""
+    content = {field: getattr(config, field) for field in SNAPSHOT_FIELDS}
+    content["default_language"] = content["default_language"] or "en"
+    content["supported_languages"] = list(content["supported_languages"] or ["en"])
+    content["language_packs"] = content["language_packs"] or {}
+    return content
+
+
+def content_hash(content: Dict) -> str:
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def publish_snapshot(db: AsyncSession, config: ScriptConfig) -> ScriptConfigVersion:
+    """Snapshot the draft (reusing an identical earlier snapshot) and point the config at it.
+
+    The caller commits.
+    """
+    content = snapshot_content(config)
+    digest = content_hash(content)
+    result = await db.execute(
+        select(ScriptConfigVersion).where(
+            and_(
+                ScriptConfigVersion.script_config_id == config.id,
+                ScriptConfigVersion.content_hash == digest
+            )
+        )
+    )
+    version = result.scalar_one_or_none()
+    if version is None:
+        version = ScriptConfigVersion(
+            id=uuid.uuid4(),
+            script_config_id=config.id,
+            script_id=config.script_id,
+            content_hash=digest,
+            content=content
+        )
+        db.add(version)
+        await db.flush()
+    config.published_version_id = version.id
+    config.is_published = True
+    return version
+
+
+async def find_version(db: AsyncSession, config: ScriptConfig, version: str) -> Optional[ScriptConfigVersion]:
+    """Snapshot of this config by id or by (short) content hash"""
+    query = select(ScriptConfigVersion).where(ScriptConfigVersion.script_config_id == config.id)
+    try:
+        query = query.where(ScriptConfigVersion.id == uuid.UUID(version))
+    except ValueError:
+        if len(version) < 12:
+            return None
+        query = query.where(ScriptConfigVersion.content_hash.startswith(version, autoescape=True))
+    result = await db.execute(query)
+    return result.scalars().first()
+
+
+class VersionResolver:
+    """Maps (script_id, short hash) sent by the widget to snapshot ids, with a small LRU"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[tuple, Optional[uuid.UUID]]" = OrderedDict()
+
+    def remember(self, script_id: str, version: str, version_id: Optional[uuid.UUID]):
+        self._ids[(script_id, version)] = version_id
+        self._ids.move_to_end((script_id, version))
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+    async def resolve(self, db: AsyncSession, script_id: str, version: str) -> Optional[uuid.UUID]:
+        key = (script_id, version)
+        if key in self._ids:
+            self._ids.move_to_end(key)
+            return self._ids[key]
+        result = await db.execute(
+            select(ScriptConfigVersion.id).where(
+                and_(
+                    ScriptConfigVersion.script_id == script_id,
+                    ScriptConfigVersion.content_hash.startswith(version, autoescape=True)
+                )
+            )
+        )
+        version_id = result.scalars().first()
+        self.remember(script_id, version, version_id)
+        return version_id
+
+
+version_resolver = VersionResolver()
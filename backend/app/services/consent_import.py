@@ -0,0 +1,512 @@
+"""Bulk import of historical consents exported from another CMP.
+
+Records are read as CSV (with a header row) or NDJSON and cut into chunks of
+``IMPORT_CHUNK_SIZE``. Chunks are validated -- in worker processes when
+``workers`` > 0 -- and each is written to the tenant's shard in one
+transaction: the new consents (``COPY`` on Postgres, executemany elsewhere),
+one "imported" history row per new consent and the data-subject links.
+
+Consent IDs are derived from the tenant, the script and the record's
+external ID (or its session and timestamp), so importing a record twice
+never duplicates it. After every chunk the import's progress (bytes read,
+counts, sample errors) is checkpointed under its import ID; running the
+same import again skips what was already written and carries on.
+
+Recognised columns (CSV header or NDJSON keys, aliases in FIELD_ALIASES):
+session_id (required), created_at (required; ISO 8601 or epoch seconds /
+milliseconds), user_id, id, expires_at, status, ip_address, user_agent, and
+the categories -- either a ``categories`` JSON object or one column per
+category. ``category_map`` renames external categories (e.g. OneTrust's
+C0002) to the script's; other categories are ignored. Category values are
+booleans or yes/no, true/false, 1/0, granted/denied.
+
+A tenant that is being moved to another shard can't be imported into.
+"""
+import asyncio
+import csv
+import json
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import JSON, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, dialect_insert
+from app.core.shards import ensure_shard_schema, shard_engine
+from app.models.consent import Consent
+from app.models.consent_history import ConsentHistory
+from app.models.data_subject import DataSubjectSession
+from app.models.script_config import ScriptConfig
+from app.services.data_subjects import IN_CHUNK
+from app.services.jobs import claim_job, job_state, release_job, save_checkpoint
+from app.services.shard_directory import shard_directory
+
+# Namespace for consent IDs derived from external record IDs
+IMPORT_NAMESPACE = uuid.UUID("b3e0c1f2-6a4d-4e8b-9c7a-1d2f3e4a5b6c")
+
+FORMATS = ("csv", "ndjson")
+
+FIELD_ALIASES = {
+    "id": ("id", "consent_id", "receipt_id", "external_id"),
+    "session_id": ("session_id", "identifier", "data_subject_id", "visitor_id"),
+    "user_id": ("user_id", "customer_id"),
+    "created_at": ("created_at", "timestamp", "consent_date", "interaction_date"),
+    "expires_at": ("expires_at", "expiry_date"),
+    "status": ("status",),
+    "ip_address": ("ip_address", "ip"),
+    "user_agent": ("user_agent",),
+    "categories": ("categories", "consent_categories", "purposes"),
+}
+
+TRUE_VALUES = {"true", "1", "yes", "y", "granted", "accepted", "opt-in", "optin"}
+FALSE_VALUES = {"false", "0", "no", "n", "denied", "rejected", "opt-out", "optout"}
+STATUSES = {"active": "active", "revoked": "revoked", "withdrawn": "revoked", "expired": "expired"}
+
+# Consents without an expiry get the same validity as new ones
+DEFAULT_VALIDITY = timedelta(days=365)
+
+# Rejected records reported by line, per import
+MAX_REPORTED_ERRORS = 20
+
+# Epoch timestamps above this are milliseconds
+_EPOCH_MS_THRESHOLD = 1e11
+
+
+class ConsentImportError(Exception):
+    """The import could not run; status_code is the HTTP status for the API"""
+
+    def __init__(self, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class ImportSpec:
+    """What validation needs to know about an import (sent to worker processes)"""
+    import_id: str
+    api_key_id: uuid.UUID
+    script_id: str
+    format: str
+    categories: List[str]
+    category_map: Dict[str, str] = field(default_factory=dict)
+    header: Optional[List[str]] = None
+
+
+def checkpoint_name(import_id: str) -> str:
+    return f"import:{import_id}"
+
+
+def _field(record: dict, name: str):
+    for alias in FIELD_ALIASES[name]:
+        value = record.get(alias)
+        if value is not None and value != "":
+            return value
+    return None
+
+
+def _text(record: dict, name: str, max_length: int) -> Optional[str]:
+    value = _field(record, name)
+    if value is None:
+        return None
+    value = str(value).strip()
+    if len(value) > max_length:
+        raise ValueError(f"{name} is longer than {max_length} characters")
+    return value or None
+
+
+def _timestamp(value, name: str) -> datetime:
+    """Naive UTC datetime from ISO 8601 text or epoch seconds / milliseconds"""
+    try:
+        if isinstance(value, (int, float)) or (isinstance(value, str) and value.strip().isdigit()):
+            seconds = float(value)
+            if seconds > _EPOCH_MS_THRESHOLD:
+                seconds /= 1000
+            return datetime.utcfromtimestamp(seconds)
+        parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValueError(f"{name} is not a timestamp: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _flag(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if value is None or value == "":
+        return None
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"category value {value!r} is not a yes/no")
+
+
+def _categories(spec: ImportSpec, record: dict) -> Dict[str, bool]:
+    raw = _field(record, "categories")
+    if raw is None:
+        items = record.items()
+    else:
+        if isinstance(raw, str):
+            try:
+                raw = json.loads(raw)
+            except ValueError:
+                raise ValueError("categories is not valid JSON")
+        if not isinstance(raw, dict):
+            raise ValueError("categories is not an object")
+        items = raw.items()
+    categories = {}
+    for key, value in items:
+        name = spec.category_map.get(key, key)
+        if name in spec.categories:
+            flag = _flag(value)
+            if flag is not None:
+                categories[name] = flag
+    if not categories:
+        raise ValueError("no categories of the script")
+    return categories
+
+
+def consent_row(spec: ImportSpec, record: dict) -> dict:
+    """consents row for one external record; raises ValueError if it is invalid"""
+    session_id = _text(record, "session_id", 255)
+    if not session_id:
+        raise ValueError("session_id is missing")
+    created = _field(record, "created_at")
+    if created is None:
+        raise ValueError("created_at is missing")
+    created_at = _timestamp(created, "created_at")
+    expires = _field(record, "expires_at")
+    expires_at = _timestamp(expires, "expires_at") if expires is not None else created_at + DEFAULT_VALIDITY
+    status = STATUSES.get(str(_field(record, "status") or "active").strip().lower())
+    if status is None:
+        raise ValueError(f"unknown status {_field(record, 'status')!r}")
+    external_id = _text(record, "id", 255) or f"{session_id}/{created_at.isoformat()}"
+    return {
+        "id": uuid.uuid5(IMPORT_NAMESPACE, f"{spec.api_key_id}/{spec.script_id}/{external_id}"),
+        "session_id": session_id,
+        "user_id": _text(record, "user_id", 255),
+        "api_key_id": spec.api_key_id,
+        "script_id": spec.script_id,
+        "config_version_id": None,
+        "consent_categories": _categories(spec, record),
+        "ip_address": _text(record, "ip_address", 45),
+        "user_agent": _text(record, "user_agent", 2000),
+        "status": status,
+        "created_at": created_at,
+        "updated_at": created_at,
+        "expires_at": expires_at,
+        "revoked_at": created_at if status == "revoked" else None,
+    }
+
+
+def _decode(spec: ImportSpec, line: bytes) -> dict:
+    text = line.decode("utf-8", errors="replace")
+    if spec.format == "ndjson":
+        try:
+            record = json.loads(text)
+        except ValueError:
+            raise ValueError("invalid JSON")
+        if not isinstance(record, dict):
+            raise ValueError("not a JSON object")
+        return record
+    values = next(csv.reader([text.rstrip("\r\n")]), [])
+    if len(values) != len(spec.header):
+        raise ValueError(f"{len(values)} columns, the header has {len(spec.header)}")
+    return dict(zip(spec.header, values))
+
+
+def validate_chunk(spec: ImportSpec, first_record: int, lines: List[bytes]) -> Tuple[List[dict], int, List[dict]]:
+    """Returns (valid rows, rejected count, a few errors by record number)
+
+    Runs in worker processes, so it only touches its arguments.
+    """
+    rows, rejected, errors = [], 0, []
+    for number, line in enumerate(lines, first_record):
+        try:
+            rows.append(consent_row(spec, _decode(spec, line)))
+        except ValueError as e:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"record": number, "error": str(e)})
+    return rows, rejected, errors
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines, keeping the line endings"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            yield buffer[start:end + 1]
+            start = end + 1
+        buffer = buffer[start:]
+    if buffer:
+        yield buffer
+
+
+async def skip_bytes(chunks: AsyncIterator[bytes], count: int) -> AsyncIterator[bytes]:
+    """The stream without its first ``count`` bytes (to resume an uploaded import)"""
+    async for chunk in chunks:
+        if count >= len(chunk):
+            count -= len(chunk)
+            continue
+        yield chunk[count:]
+        count = 0
+
+
+async def read_records(chunks: AsyncIterator[bytes], format: str, offset: int) -> AsyncIterator[Tuple[bytes, int]]:
+    """(record, offset after it) for every non-blank record; CSV records may span lines"""
+    pending, quotes = [], 0
+    async for line in read_lines(chunks):
+        if offset == 0 and line.startswith(b"\xef\xbb\xbf"):
+            offset += 3
+            line = line[3:]
+        offset += len(line)
+        pending.append(line)
+        if format == "csv":
+            quotes += line.count(b'"')
+            if quotes % 2:
+                continue
+        record = b"".join(pending)
+        pending, quotes = [], 0
+        if record.strip():
+            yield record, offset
+    if pending and b"".join(pending).strip():
+        yield b"".join(pending), offset
+
+
+def _copy_value(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, JSON):
+        return json.dumps(value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+async def _insert_rows(conn: AsyncConnection, engine: AsyncEngine, table, rows: List[dict]):
+    """COPY on asyncpg, executemany elsewhere"""
+    if engine.dialect.driver != "asyncpg":
+        await conn.execute(insert(table), rows)
+        return
+    columns = list(rows[0])
+    records = [tuple(_copy_value(table.c[name], row[name]) for name in columns) for row in rows]
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(table.name, records=records, columns=columns)
+
+
+def _history_row(row: dict, import_id: str) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "consent_id": row["id"],
+        "session_id": row["session_id"],
+        "api_key_id": row["api_key_id"],
+        "action": "imported",
+        "previous_categories": None,
+        "new_categories": row["consent_categories"],
+        "ip_address": row["ip_address"],
+        "user_agent": row["user_agent"],
+        "timestamp": row["created_at"],
+        "extra_metadata": {
+            "source": "import",
+            "import_id": import_id,
+            "timestamp": row["created_at"].isoformat()
+        },
+    }
+
+
+def _subject_links(rows: List[dict]) -> List[dict]:
+    links = {}
+    for row in rows:
+        if row["user_id"]:
+            key = (row["api_key_id"], row["user_id"], row["session_id"])
+            first, last = links.get(key, (row["created_at"], row["created_at"]))
+            links[key] = (min(first, row["created_at"]), max(last, row["created_at"]))
+    return [
+        {"api_key_id": api_key_id, "user_id": user_id, "session_id": session_id,
+         "first_seen_at": first, "last_seen_at": last}
+        for (api_key_id, user_id, session_id), (first, last) in links.items()
+    ]
+
+
+async def write_chunk(engine: AsyncEngine, rows: List[dict], import_id: str) -> int:
+    """Write the consents that aren't stored yet, with history and subject links; returns how many"""
+    rows = list({row["id"]: row for row in rows}.values())
+    consents = Consent.__table__
+    async with engine.begin() as conn:
+        existing = set()
+        ids = [row["id"] for row in rows]
+        for start in range(0, len(ids), IN_CHUNK):
+            result = await conn.execute(select(consents.c.id).where(consents.c.id.in_(ids[start:start + IN_CHUNK])))
+            existing.update(result.scalars().all())
+        new = [row for row in rows if row["id"] not in existing]
+        if not new:
+            return 0
+        await _insert_rows(conn, engine, consents, new)
+        await _insert_rows(conn, engine, ConsentHistory.__table__, [_history_row(row, import_id) for row in new])
+        links = _subject_links(new)
+        if links:
+            table = DataSubjectSession.__table__
+            upsert = dialect_insert(table, engine.dialect.name).on_conflict_do_nothing(
+                index_elements=[table.c.api_key_id, table.c.user_id, table.c.session_id]
+            )
+            await conn.execute(upsert, links)
+    return len(new)
+
+
+def import_report(import_id: str, state: dict) -> dict:
+    seconds = state.get("seconds", 0)
+    return {
+        "import_id": import_id,
+        "script_id": state.get("script_id"),
+        "shard": state.get("shard"),
+        "done": state.get("done", False),
+        "records": state.get("records", 0),
+        "imported": state.get("imported", 0),
+        "duplicates": state.get("duplicates", 0),
+        "rejected": state.get("rejected", 0),
+        "bytes": state.get("offset", 0),
+        "seconds": round(seconds, 2),
+        "records_per_second": round(state.get("records", 0) / seconds) if seconds else None,
+        "write_seconds": round(state.get("write_seconds", 0), 2),
+        "errors": state.get("errors", []),
+    }
+
+
+async def import_progress(api_key_id: uuid.UUID, import_id: str) -> Optional[dict]:
+    """Report of an import of this tenant, or None"""
+    async with AsyncSessionLocal() as db:
+        job = await job_state(db, checkpoint_name(import_id))
+    if job is None or job["state"].get("api_key_id") != str(api_key_id):
+        return None
+    report = import_report(import_id, job["state"])
+    report["running"] = job["running"]
+    return report
+
+
+async def _script_categories(db, api_key_id: uuid.UUID, script_id: str, category_map: Dict[str, str]) -> List[str]:
+    result = await db.execute(
+        select(ScriptConfig.categories).where(
+            ScriptConfig.script_id == script_id, ScriptConfig.api_key_id == api_key_id
+        )
+    )
+    categories = result.scalar_one_or_none()
+    if categories is None:
+        raise ConsentImportError("Script configuration not found", 404)
+    unknown = sorted(set(category_map.values()) - set(categories))
+    if unknown:
+        raise ConsentImportError(f"category_map targets categories the script doesn't have: {unknown}")
+    return list(categories)
+
+
+async def run_import(open_source: Callable[[int], AsyncIterator[bytes]], api_key_id: uuid.UUID, script_id: str,
+                     format: str, import_id: str, category_map: Optional[Dict[str, str]] = None,
+                     workers: int = 0, chunk_size: Optional[int] = None,
+                     log: Optional[Callable[[str], None]] = None) -> dict:
+    """Import consent records; ``open_source(offset)`` streams the input from byte ``offset``
+
+    Returns the import's report. Running an import again resumes it.
+    """
+    if format not in FORMATS:
+        raise ConsentImportError(f"format must be one of {', '.join(FORMATS)}")
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    name = checkpoint_name(import_id)
+    lease = settings.IMPORT_LEASE_SECONDS
+    async with AsyncSessionLocal() as db:
+        categories = await _script_categories(db, api_key_id, script_id, category_map or {})
+        placement = await shard_directory.load(db, api_key_id)
+        if placement.moving:
+            raise ConsentImportError("Consent data is being moved to another shard; retry later", 503)
+        state = await claim_job(db, name, lease)
+        if state is None:
+            raise ConsentImportError("This import is running elsewhere", 409)
+        if state.get("api_key_id", str(api_key_id)) != str(api_key_id) or state.get("script_id", script_id) != script_id:
+            await release_job(db, name)
+            raise ConsentImportError("import_id is already used by another import", 409)
+        if state.get("done"):
+            await release_job(db, name)
+            return import_report(import_id, state)
+        state.update(api_key_id=str(api_key_id), script_id=script_id, format=format, shard=placement.shard)
+        spec = ImportSpec(import_id, api_key_id, script_id, format, categories, category_map or {}, state.get("header"))
+        await ensure_shard_schema(placement.shard)
+        engine = shard_engine(placement.shard)
+
+        started = time.perf_counter()
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        in_flight = deque()
+
+        async def write(result: Tuple[List[dict], int, List[dict]], count: int, end: int):
+            nonlocal started
+            rows, rejected, errors = result
+            if (await shard_directory.load(db, api_key_id)).moving:
+                raise ConsentImportError("Consent data is being moved to another shard; run the import again later", 503)
+            write_started = time.perf_counter()
+            imported = await write_chunk(engine, rows, import_id) if rows else 0
+            now = time.perf_counter()
+            state["write_seconds"] = state.get("write_seconds", 0) + now - write_started
+            state["seconds"] = state.get("seconds", 0) + now - started
+            started = now
+            state["offset"] = end
+            state["records"] = state.get("records", 0) + count
+            state["imported"] = state.get("imported", 0) + imported
+            state["duplicates"] = state.get("duplicates", 0) + len(rows) - imported
+            state["rejected"] = state.get("rejected", 0) + rejected
+            state["errors"] = (state.get("errors", []) + errors)[:MAX_REPORTED_ERRORS]
+            if not await save_checkpoint(db, name, state, lease):
+                await db.rollback()
+                raise ConsentImportError("Lost the import's lease to another run", 409)
+            await db.commit()
+            if log:
+                log(f"{state['records']} records, {state['imported']} imported, {state['rejected']} rejected")
+
+        try:
+            offset = state.get("offset", 0)
+            number = state.get("records", 0) + 1
+            lines, end = [], offset
+            async for record, end in read_records(open_source(offset), format, offset):
+                if spec.header is None and format == "csv":
+                    spec.header = next(csv.reader([record.decode("utf-8", errors="replace").rstrip("\r\n")]))
+                    state["header"] = spec.header
+                    state["offset"] = end
+                    continue
+                lines.append(record)
+                if len(lines) < chunk_size:
+                    continue
+                if pool is None:
+                    await write(validate_chunk(spec, number, lines), len(lines), end)
+                else:
+                    future = asyncio.get_running_loop().run_in_executor(pool, validate_chunk, spec, number, lines)
+                    in_flight.append((future, len(lines), end))
+                    if len(in_flight) >= workers * 2:
+                        future, count, chunk_end = in_flight.popleft()
+                        await write(await future, count, chunk_end)
+                number += len(lines)
+                lines = []
+            while in_flight:
+                future, count, chunk_end = in_flight.popleft()
+                await write(await future, count, chunk_end)
+            if lines:
+                await write(validate_chunk(spec, number, lines), len(lines), end)
+            state["done"] = True
+            state["offset"] = max(state.get("offset", 0), end)
+            await save_checkpoint(db, name, state, lease)
+            await db.commit()
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            await db.rollback()
+            await release_job(db, name)
+    return import_report(import_id, state)
@@ -0,0 +1,183 @@
+"""Data-subject lookups for access and erasure requests.
+
+``data_subject_sessions`` maps (tenant, user_id) to every session the user
+was seen with; it is written in the same transaction as the consent, by the
+consent API (create and update) and by beacon ingest. A
+subject's footprint is then found with a fixed set of indexed queries:
+
+1. the user's sessions (primary key prefix),
+2. consents by user_id or by those sessions (user_id / session indexes),
+3. history by consent_id, and
+4. grievances by user_id or session,
+
+each split into chunks of ``IN_CHUNK`` ids, so the cost grows with the
+size of the footprint, not with the size of the tables. A consent on one of
+the user's sessions that names a different user_id (a shared device) is not
+part of the footprint.
+"""
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import dialect_insert
+from app.models.consent import Consent
+from app.models.consent_history import ConsentHistory
+from app.models.data_subject import DataSubjectSession
+from app.models.grievance import Grievance
+from app.models.idempotency_key import IdempotencyKey
+from app.services.audit_chain import prune_history
+
+IN_CHUNK = 500
+
+CONSENT_COLUMNS = (
+    Consent.id, Consent.session_id, Consent.user_id, Consent.script_id, Consent.consent_categories,
+    Consent.status, Consent.ip_address, Consent.user_agent, Consent.created_at, Consent.updated_at,
+    Consent.expires_at, Consent.revoked_at,
+)
+HISTORY_COLUMNS = (
+    ConsentHistory.id, ConsentHistory.consent_id, ConsentHistory.session_id, ConsentHistory.action,
+    ConsentHistory.previous_categories, ConsentHistory.new_categories, ConsentHistory.ip_address,
+    ConsentHistory.user_agent, ConsentHistory.timestamp, ConsentHistory.extra_metadata,
+)
+GRIEVANCE_COLUMNS = (
+    Grievance.id, Grievance.session_id, Grievance.user_id, Grievance.request_type, Grievance.subject,
+    Grievance.description, Grievance.status, Grievance.created_at, Grievance.resolved_at, Grievance.response,
+)
+
+
+def _chunks(values: List, size: int = IN_CHUNK) -> Iterable[List]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def session_links_upsert(dialect_name: str):
+    """INSERT of data-subject links that only moves last_seen_at for known ones (also for executemany)"""
+    table = DataSubjectSession.__table__
+    upsert = dialect_insert(table, dialect_name)
+    return upsert.on_conflict_do_update(
+        index_elements=[table.c.api_key_id, table.c.user_id, table.c.session_id],
+        set_={"last_seen_at": upsert.excluded.last_seen_at}
+    )
+
+
+async def link_session(db: AsyncSession, api_key_id: uuid.UUID, user_id: Optional[str],
+                       session_id: str, seen_at: datetime):
+    """Record that user_id used session_id (the caller commits)"""
+    if not user_id:
+        return
+    table = DataSubjectSession.__table__
+    await db.execute(
+        session_links_upsert(db.get_bind(clause=table).dialect.name).values(
+            api_key_id=api_key_id, user_id=user_id, session_id=session_id,
+            first_seen_at=seen_at, last_seen_at=seen_at
+        )
+    )
+
+
+def subject_links_filter(user_id: Optional[str], session_id: Optional[str]):
+    """Index rows that go with an erased subject
+
+    A user's rows all go. A session on its own takes every row naming it,
+    whichever user it was linked to, since that session's consents are gone.
+    """
+    if user_id:
+        return DataSubjectSession.user_id == user_id
+    return DataSubjectSession.session_id == session_id
+
+
+async def subject_sessions(db: AsyncSession, api_key_id: uuid.UUID, user_id: str) -> List[str]:
+    result = await db.execute(
+        select(DataSubjectSession.session_id).where(
+            and_(
+                DataSubjectSession.api_key_id == api_key_id,
+                DataSubjectSession.user_id == user_id
+            )
+        )
+    )
+    return list(result.scalars().all())
+
+
+def subject_filter(model, user_id: Optional[str], sessions: List[str]):
+    """Rows of the subject: their user_id, or their sessions unless another user is named"""
+    if user_id is None:
+        return model.session_id.in_(sessions)
+    return or_(
+        model.user_id == user_id,
+        and_(model.session_id.in_(sessions), or_(model.user_id.is_(None), model.user_id == user_id))
+    )
+
+
+async def _subject_rows(db: AsyncSession, model, columns, api_key_id: uuid.UUID,
+                        user_id: Optional[str], sessions: List[str]) -> List[Dict]:
+    rows: Dict = {}
+    # With a user_id, the first chunk also matches by user_id
+    for chunk in _chunks(sessions) if sessions else [[]]:
+        result = await db.execute(
+            select(*columns).where(and_(model.api_key_id == api_key_id, subject_filter(model, user_id, chunk)))
+        )
+        for row in result:
+            rows[row.id] = dict(row._mapping)
+    return list(rows.values())
+
+
+async def subject_scope(db: AsyncSession, api_key_id: uuid.UUID, user_id: Optional[str],
+                        session_id: Optional[str]) -> List[str]:
+    """Sessions covered by a request: the user's indexed sessions plus an explicit one"""
+    sessions = set(await subject_sessions(db, api_key_id, user_id)) if user_id else set()
+    if session_id:
+        sessions.add(session_id)
+    return sorted(sessions)
+
+
+async def find_footprint(db: AsyncSession, api_key_id: uuid.UUID, user_id: Optional[str],
+                         session_id: Optional[str]) -> Dict:
+    """Every consent, history record and grievance of a data subject"""
+    sessions = await subject_scope(db, api_key_id, user_id, session_id)
+    consents = await _subject_rows(db, Consent, CONSENT_COLUMNS, api_key_id, user_id, sessions)
+    history = []
+    for chunk in _chunks([consent["id"] for consent in consents]):
+        result = await db.execute(
+            select(*HISTORY_COLUMNS)
+            .where(ConsentHistory.consent_id.in_(chunk))
+            .order_by(ConsentHistory.timestamp)
+        )
+        history.extend(dict(row._mapping) for row in result)
+    grievances = await _subject_rows(db, Grievance, GRIEVANCE_COLUMNS, api_key_id, user_id, sessions)
+    return {
+        "user_id": user_id,
+        "session_ids": sessions,
+        "consents": consents,
+        "history": history,
+        "grievances": grievances,
+    }
+
+
+async def erase_footprint(db: AsyncSession, api_key_id: uuid.UUID, user_id: Optional[str],
+                          session_id: Optional[str]) -> Dict[str, int]:
+    """Delete a data subject's records (history is tombstoned in the audit chain); the caller commits"""
+    sessions = await subject_scope(db, api_key_id, user_id, session_id)
+    counts = {"consents": 0, "history": 0, "grievances": 0, "sessions": len(sessions)}
+
+    consent_ids = [row["id"] for row in await _subject_rows(db, Consent, (Consent.id,), api_key_id, user_id, sessions)]
+    for chunk in _chunks(consent_ids):
+        counts["history"] += await prune_history(db, ConsentHistory.consent_id.in_(chunk), "erasure")
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.consent_id.in_(chunk)))
+        result = await db.execute(delete(Consent).where(Consent.id.in_(chunk)))
+        counts["consents"] += result.rowcount
+
+    grievance_ids = [
+        row["id"] for row in await _subject_rows(db, Grievance, (Grievance.id,), api_key_id, user_id, sessions)
+    ]
+    for chunk in _chunks(grievance_ids):
+        result = await db.execute(delete(Grievance).where(Grievance.id.in_(chunk)))
+        counts["grievances"] += result.rowcount
+
+    await db.execute(
+        delete(DataSubjectSession).where(
+            and_(DataSubjectSession.api_key_id == api_key_id, subject_links_filter(user_id, session_id))
+        )
+    )
+    return counts
@@ -0,0 +1,295 @@
+"""Bulk erasure and anonymization of consent data.
+
+An ``ErasureJob`` covers either a whole tenant (offboarding) or a list of
+data subjects (user_id and/or session_id, resolved through the data-subject
+index). It runs in the background, one bounded batch per transaction, and
+every batch is set-based: one SELECT of up to ``ERASURE_BATCH_SIZE`` ids,
+then one DELETE/UPDATE per table for those ids. Per target the phases run
+in foreign-key order:
+
+1. ``consents``: history (through ``prune_history``, so sealed rows leave a
+   tombstone and the audit chain still verifies), idempotency keys, then
+   the consents themselves,
+2. ``grievances``,
+3. ``subject_links``: the target's rows in the data-subject index.
+
+``anonymize`` keeps consents and grievances for aggregate reporting but
+clears everything that identifies the person (user_id, session, IP, user
+agent, free text); anonymized consents no longer count as given. History is removed in both modes, because rewriting a
+sealed row would break the audit chain.
+
+The job's position (target, phase, last id) is checkpointed in the same
+transaction as each batch (``JobCheckpoint`` "erasure:<job id>"), so it
+resumes after a crash or redeploy. Between batches the job sleeps to stay
+under ``ERASURE_MAX_DUTY_CYCLE``, which keeps row locks short and leaves
+the database to live consent traffic. Jobs run against the tenant's shard
+and wait while the tenant is being moved to another one.
+"""
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import String, and_, cast, delete, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.shards import shard_session
+from app.core.tasks import runtime
+from app.models.consent import Consent
+from app.models.consent_history import ConsentHistory
+from app.models.data_subject import DataSubjectSession
+from app.models.erasure_job import ErasureJob
+from app.models.grievance import Grievance
+from app.models.idempotency_key import IdempotencyKey
+from app.services.audit_chain import prune_history
+from app.services.data_subjects import subject_filter, subject_links_filter, subject_scope
+from app.services.jobs import claim_job, release_job, save_checkpoint, throttle
+from app.services.shard_directory import shard_directory
+
+MODES = ("delete", "anonymize")
+PHASES = ("consents", "grievances", "subject_links")
+COUNT_KEYS = ("consents", "history", "grievances", "subject_links")
+
+# On-demand runs from the admin API; one at a time, on top of the periodic worker
+erasure_run_queue = runtime.queue("erasure-run", concurrency=1, max_pending=1)
+
+# Status of anonymized consents, and the prefix of their stand-in session id
+ANONYMIZED = "anonymized"
+
+
+def anonymized_session(model):
+    """Per-row stand-in for the session id (the column is NOT NULL): "anonymized:<row id>"
+
+    Distinct per row, so session lookups never see two anonymized rows as one session.
+    """
+    return literal(f"{ANONYMIZED}:") + cast(model.id, String)
+
+
+# Anonymized consents are no longer in force; retention deletes them like revoked ones
+CONSENT_ANONYMIZED = {
+    "user_id": None, "session_id": anonymized_session(Consent), "ip_address": None, "user_agent": None,
+    "status": ANONYMIZED,
+}
+GRIEVANCE_ANONYMIZED = {
+    "user_id": None, "session_id": anonymized_session(Grievance), "subject": None, "description": "[erased]",
+    "response": None, "response_metadata": None,
+}
+
+
+def checkpoint_name(job_id) -> str:
+    return f"erasure:{job_id}"
+
+
+def job_response(job: ErasureJob) -> dict:
+    return {
+        "job_id": str(job.id),
+        "mode": job.mode,
+        "subjects": len(job.subjects) if job.subjects is not None else None,
+        "status": job.status,
+        "counts": job.counts or dict.fromkeys(COUNT_KEYS, 0),
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+async def target_filter(db: AsyncSession, api_key_id: uuid.UUID,
+                        target: Optional[dict]) -> Callable:
+    """model -> WHERE clause selecting one target's rows (target None = the whole tenant)"""
+    if target is None:
+        return lambda model: model.api_key_id == api_key_id
+    user_id, session_id = target.get("user_id"), target.get("session_id")
+    sessions = await subject_scope(db, api_key_id, user_id, session_id)
+    return lambda model: and_(model.api_key_id == api_key_id, subject_filter(model, user_id, sessions))
+
+
+async def _next_ids(db: AsyncSession, model, condition, after: Optional[str], batch_size: int) -> List:
+    query = select(model.id).where(condition).order_by(model.id).limit(batch_size)
+    if after:
+        query = query.where(model.id > uuid.UUID(after))
+    return list((await db.execute(query)).scalars().all())
+
+
+async def _erase_subject_links(db: AsyncSession, api_key_id: uuid.UUID, target: Optional[dict],
+                               batch_size: int) -> int:
+    """Remove a batch of data-subject index rows; returns how many"""
+    links = DataSubjectSession
+    if target is None:
+        user_ids = (await db.execute(
+            select(links.user_id).where(links.api_key_id == api_key_id).distinct().limit(batch_size)
+        )).scalars().all()
+        condition = links.user_id.in_(user_ids)
+    else:
+        condition = subject_links_filter(target.get("user_id"), target.get("session_id"))
+    result = await db.execute(delete(links).where(and_(links.api_key_id == api_key_id, condition)))
+    return result.rowcount
+
+
+async def process_batch(db: AsyncSession, job: ErasureJob, target: Optional[dict], condition: Callable,
+                        phase: str, after: Optional[str], batch_size: int) -> Tuple[Optional[str], dict]:
+    """Erase or anonymize the next batch of one phase; returns (last id, counts)
+
+    The caller commits. A None id means the phase is done.
+    """
+    counts = dict.fromkeys(COUNT_KEYS, 0)
+    anonymize = job.mode == "anonymize"
+
+    if phase == "consents":
+        ids = await _next_ids(db, Consent, condition(Consent), after, batch_size)
+        if not ids:
+            return None, counts
+        counts["history"] = await prune_history(
+            db, ConsentHistory.consent_id.in_(ids), "anonymized" if anonymize else "erasure"
+        )
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.consent_id.in_(ids)))
+        if anonymize:
+            await db.execute(
+                update(Consent).where(Consent.id.in_(ids))
+                .values(**CONSENT_ANONYMIZED, updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            await db.execute(delete(Consent).where(Consent.id.in_(ids)))
+        counts["consents"] = len(ids)
+        return str(ids[-1]), counts
+
+    if phase == "grievances":
+        ids = await _next_ids(db, Grievance, condition(Grievance), after, batch_size)
+        if not ids:
+            return None, counts
+        if anonymize:
+            await db.execute(
+                update(Grievance).where(Grievance.id.in_(ids))
+                .values(**GRIEVANCE_ANONYMIZED, updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            await db.execute(delete(Grievance).where(Grievance.id.in_(ids)))
+        counts["grievances"] = len(ids)
+        return str(ids[-1]), counts
+
+    removed = await _erase_subject_links(db, job.api_key_id, target, batch_size)
+    counts["subject_links"] = removed
+    # The whole tenant's links go a batch of users at a time; a subject's in one statement
+    return ("more" if target is None and removed else None), counts
+
+
+async def run_erasure(job_id: uuid.UUID, max_batches: Optional[int] = None) -> Optional[ErasureJob]:
+    """Run (or resume) one erasure job; returns the job, or None if another worker has it
+    or its tenant is being moved between shards
+    """
+    name = checkpoint_name(job_id)
+    lease = settings.ERASURE_LEASE_SECONDS
+    async with AsyncSessionLocal() as db:
+        api_key_id = await db.scalar(select(ErasureJob.api_key_id).where(ErasureJob.id == job_id))
+        if api_key_id is None:
+            return None
+        placement = await shard_directory.load(db, api_key_id)
+    if placement.moving:
+        return None
+    async with shard_session(placement.shard) as db:
+        state = await claim_job(db, name, lease)
+        if state is None:
+            return None
+        job = None
+        try:
+            job = await db.get(ErasureJob, job_id)
+            if job is None or job.status == "completed":
+                return job
+            if not state.get("position"):
+                state = {"position": {"target": 0, "phase": PHASES[0], "after": None}}
+            if job.status == "pending":
+                job.status = "running"
+                job.started_at = datetime.utcnow()
+                job.counts = dict.fromkeys(COUNT_KEYS, 0)
+            await db.commit()
+
+            targets = job.subjects if job.subjects is not None else [None]
+            batches = 0
+            while state["position"]["target"] < len(targets):
+                position = state["position"]
+                target = targets[position["target"]]
+                condition = await target_filter(db, job.api_key_id, target)
+                if max_batches is not None and batches >= max_batches:
+                    return job
+                if (await shard_directory.load(db, job.api_key_id)).moving:
+                    return job
+                started = time.perf_counter()
+                after, counts = await process_batch(
+                    db, job, target, condition, position["phase"], position["after"], settings.ERASURE_BATCH_SIZE
+                )
+                if after is not None:
+                    state["position"] = {**position, "after": after}
+                elif position["phase"] != PHASES[-1]:
+                    state["position"] = {**position, "phase": PHASES[PHASES.index(position["phase"]) + 1], "after": None}
+                else:
+                    state["position"] = {"target": position["target"] + 1, "phase": PHASES[0], "after": None}
+                job.counts = {key: job.counts.get(key, 0) + counts[key] for key in COUNT_KEYS}
+                if not await save_checkpoint(db, name, state, lease):
+                    await db.rollback()
+                    return None
+                await db.commit()
+                batches += 1
+                await throttle(time.perf_counter() - started, settings.ERASURE_MAX_DUTY_CYCLE)
+
+            job.status = "completed"
+            job.finished_at = datetime.utcnow()
+            state["position"] = None
+            await save_checkpoint(db, name, state, lease)
+            await db.commit()
+            return job
+        except Exception as e:
+            # Recorded for the status endpoint; the next run resumes from the checkpoint
+            await db.rollback()
+            await db.execute(
+                update(ErasureJob).where(ErasureJob.id == job_id).values(error=str(e))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            raise
+        finally:
+            if job is not None:
+                # Returned to the caller: keep its loaded state out of the rollback
+                db.expunge(job)
+            await db.rollback()
+            await release_job(db, name)
+
+
+async def run_pending_erasures(max_batches: Optional[int] = None) -> List[ErasureJob]:
+    """Run unfinished erasure jobs, oldest first"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ErasureJob.id)
+            .where(ErasureJob.status.in_(("pending", "running")))
+            .order_by(ErasureJob.created_at)
+        )
+        job_ids = result.scalars().all()
+    jobs = []
+    for job_id in job_ids:
+        try:
+            job = await run_erasure(job_id, max_batches=max_batches)
+        except Exception as e:
+            print(f"Error running erasure job {job_id}: {e}")
+            continue
+        if job is not None:
+            jobs.append(job)
+    return jobs
+
+
+async def create_erasure_job(db: AsyncSession, api_key_id: uuid.UUID, mode: str,
+                             subjects: Optional[List[Dict]]) -> ErasureJob:
+    """Queue a job; subjects None erases every record of the tenant"""
+    job = ErasureJob(
+        api_key_id=api_key_id,
+        mode=mode,
+        subjects=subjects,
+        status="pending",
+        counts=dict.fromkeys(COUNT_KEYS, 0)
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
@@ -0,0 +1,298 @@
+"""Idempotency and duplicate-submission coalescing for consent creation.
+
+A create request is identified by up to two keys:
+
+- ``key:<Idempotency-Key>`` when the client sends the header (kept for
+  ``IDEMPOTENCY_KEY_TTL_SECONDS``). Reusing it for a different request is
+  an ``IdempotencyConflict``.
+- ``session:<hash of tenant, script_id, session_id>``, which holds the
+  session's latest submission for ``CONSENT_DEDUP_WINDOW_SECONDS``. A
+  request identical to it (same fingerprint: categories, user, action) is
+  a double click or blind retry and replays it; anything else is a new
+  choice and takes its place, so accept -> reject -> accept records all
+  three instead of replaying the first accept.
+
+Idempotency-Key results are also kept in a per-worker memory tier. Session
+slots are only read from the database, because another worker may have
+recorded a newer choice. Concurrent identical requests on one worker wait
+for the first one's result; across workers the unique (api_key_id, key)
+constraint and the conditional upsert of the session slot decide.
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, delete, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.shards import shard_names, shard_session
+from app.models.idempotency_key import IdempotencyKey
+
+
+class IdempotencyConflict(Exception):
+    """The Idempotency-Key was already used for a different request"""
+
+
+def request_fingerprint(api_key_id: uuid.UUID, script_id: Optional[str], session_id: str,
+                        categories: Dict, user_id: Optional[str] = None, action: Optional[str] = None) -> str:
+    """Stable hash of the parts of a create request that make it a duplicate"""
+    canonical = json.dumps(
+        [str(api_key_id), script_id, session_id, user_id, action, categories],
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def session_slot(api_key_id: uuid.UUID, script_id: Optional[str], session_id: str) -> str:
+    """Hash naming the slot that holds a session's latest submission"""
+    canonical = json.dumps([str(api_key_id), script_id, session_id], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def request_keys(idempotency_key: Optional[str], slot: str) -> List[Tuple[str, float]]:
+    """(key, ttl_seconds) pairs a create request is stored under"""
+    keys = []
+    if idempotency_key:
+        keys.append((f"key:{idempotency_key}", settings.IDEMPOTENCY_KEY_TTL_SECONDS))
+    if settings.CONSENT_DEDUP_WINDOW_SECONDS > 0:
+        keys.append((f"session:{slot}", settings.CONSENT_DEDUP_WINDOW_SECONDS))
+    return keys
+
+
+def _is_session_slot(key: str) -> bool:
+    return key.startswith("session:")
+
+
+class IdempotencyStore:
+    """Per-worker memory tier plus in-flight request coalescing"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # (api_key_id, key) -> (expires_at, request_hash, response)
+        self._inflight: Dict[tuple, asyncio.Future] = {}  # (api_key_id, key, request_hash) -> result
+
+    def _remember(self, api_key_id, key: str, ttl: float, request_hash: str, response: dict):
+        if _is_session_slot(key):
+            return
+        scoped = (api_key_id, key)
+        self._entries[scoped] = (time.monotonic() + ttl, request_hash, response)
+        self._entries.move_to_end(scoped)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _from_memory(self, api_key_id, key: str, request_hash: str) -> Optional[dict]:
+        item = self._entries.get((api_key_id, key))
+        if item is None:
+            return None
+        expires_at, stored_hash, response = item
+        if time.monotonic() > expires_at:
+            del self._entries[(api_key_id, key)]
+            return None
+        if stored_hash != request_hash:
+            raise IdempotencyConflict(key)
+        return response
+
+    async def _await_inflight(self, api_key_id, keys, request_hash: str) -> Optional[dict]:
+        for key, _ in keys:
+            future = self._inflight.get((api_key_id, key, request_hash))
+            if future is not None:
+                try:
+                    return await asyncio.shield(future)
+                except Exception:
+                    # The original request failed; let this one try
+                    return None
+        return None
+
+    async def lookup(self, db: AsyncSession, api_key_id, keys: List[Tuple[str, float]],
+                     request_hash: str) -> Optional[dict]:
+        """Return the stored response for the request, or None
+
+        When the response comes from the session slot or an in-flight
+        duplicate, the request's own Idempotency-Key is stored as well, so
+        retrying with it after the dedup window still replays.
+        """
+        for key, _ in keys:
+            response = self._from_memory(api_key_id, key, request_hash)
+            if response is not None:
+                return response
+
+        found = await self.lookup_db(db, api_key_id, keys, request_hash)
+        if found is not None:
+            key, response = found
+            if _is_session_slot(key):
+                await self._store_idempotency_keys(db, api_key_id, keys, request_hash, response)
+            return response
+
+        # Checked last: no await separates a miss here from the caller's claim()
+        response = await self._await_inflight(api_key_id, keys, request_hash)
+        if response is not None:
+            await self._store_idempotency_keys(db, api_key_id, keys, request_hash, response)
+        return response
+
+    async def lookup_db(self, db: AsyncSession, api_key_id, keys: List[Tuple[str, float]],
+                        request_hash: str) -> Optional[Tuple[str, dict]]:
+        """(matching key, stored response) from the database, or None"""
+        ttls = dict(keys)
+        result = await db.execute(
+            select(IdempotencyKey).where(
+                and_(
+                    IdempotencyKey.api_key_id == api_key_id,
+                    IdempotencyKey.key.in_(list(ttls)),
+                    IdempotencyKey.expires_at > datetime.utcnow()
+                )
+            )
+        )
+        # An Idempotency-Key decides over the session slot
+        for row in sorted(result.scalars().all(), key=lambda row: _is_session_slot(row.key)):
+            if row.request_hash != request_hash:
+                if _is_session_slot(row.key):
+                    return None  # The session's latest choice differs: this is a new one
+                raise IdempotencyConflict(row.key)
+            self._remember(api_key_id, row.key, ttls[row.key], row.request_hash, row.response)
+            return row.key, row.response
+        return None
+
+    async def _store_idempotency_keys(self, db: AsyncSession, api_key_id, keys: List[Tuple[str, float]],
+                                      request_hash: str, response: dict):
+        idempotency_keys = [(key, ttl) for key, ttl in keys if not _is_session_slot(key)]
+        if not idempotency_keys:
+            return
+        consent_id = uuid.UUID(response["consent_id"])
+        for key, ttl in idempotency_keys:
+            await upsert_key(db, api_key_id, key, ttl, request_hash, consent_id, response)
+            self._remember(api_key_id, key, ttl, request_hash, response)
+        await db.commit()
+
+    @asynccontextmanager
+    async def claim(self, api_key_id, keys: List[Tuple[str, float]], request_hash: str):
+        """Mark the request in flight; concurrent identical requests wait for its result.
+
+        Yields a callback to publish the response once it is committed.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        claimed = []
+        for key, _ in keys:
+            scoped = (api_key_id, key, request_hash)
+            if scoped not in self._inflight:
+                self._inflight[scoped] = future
+                claimed.append(scoped)
+
+        def complete(response: dict):
+            for key, ttl in keys:
+                self._remember(api_key_id, key, ttl, request_hash, response)
+            if not future.done():
+                future.set_result(response)
+
+        try:
+            yield complete
+        except BaseException as exc:
+            if not future.done():
+                future.set_exception(exc if isinstance(exc, Exception) else asyncio.CancelledError())
+                # Nobody may be waiting; mark the exception as retrieved
+                future.exception()
+            raise
+        finally:
+            for scoped in claimed:
+                if self._inflight.get(scoped) is future:
+                    del self._inflight[scoped]
+
+
+async def upsert_key(db: AsyncSession, api_key_id, key: str, ttl: float, request_hash: str,
+                     consent_id, response: dict) -> bool:
+    """Store a key's result; returns False if a live row for an identical request is already there
+
+    An expired row is replaced. A live session slot holding a different
+    request is replaced too (this one is newer); a live Idempotency-Key row
+    is kept.
+    """
+    now = datetime.utcnow()
+    table = IdempotencyKey.__table__
+    upsert = dialect_insert(table, db.get_bind(clause=table).dialect.name).values(
+        id=uuid.uuid4(), api_key_id=api_key_id, key=key, request_hash=request_hash, consent_id=consent_id,
+        response=response, created_at=now, expires_at=now + timedelta(seconds=ttl)
+    )
+    replace = table.c.expires_at <= now
+    if _is_session_slot(key):
+        replace = or_(replace, table.c.request_hash != upsert.excluded.request_hash)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[table.c.api_key_id, table.c.key],
+        set_={
+            name: upsert.excluded[name]
+            for name in ("request_hash", "consent_id", "response", "created_at", "expires_at")
+        },
+        where=replace
+    )
+    result = await db.execute(upsert)
+    return result.rowcount > 0
+
+
+async def store_keys(db: AsyncSession, api_key_id, keys: List[Tuple[str, float]], request_hash: str,
+                     consent_id, response: dict) -> bool:
+    """Write the request's keys in the consent's transaction
+
+    Returns False if an identical request took the session slot first (the
+    caller rolls back and replays it). If another request already holds the
+    Idempotency-Key, the commit raises IntegrityError.
+    """
+    stored = True
+    for key, ttl in keys:
+        if _is_session_slot(key):
+            stored = await upsert_key(db, api_key_id, key, ttl, request_hash, consent_id, response) and stored
+        else:
+            await clear_expired_keys(db, api_key_id, [(key, ttl)])
+            db.add(IdempotencyKey(
+                api_key_id=api_key_id,
+                key=key,
+                request_hash=request_hash,
+                consent_id=consent_id,
+                response=response,
+                expires_at=datetime.utcnow() + timedelta(seconds=ttl)
+            ))
+    return stored
+
+
+async def clear_expired_keys(db: AsyncSession, api_key_id, keys: List[Tuple[str, float]]):
+    """Drop expired rows for these keys so the unique constraint doesn't block a fresh insert"""
+    await db.execute(
+        delete(IdempotencyKey).where(
+            and_(
+                IdempotencyKey.api_key_id == api_key_id,
+                IdempotencyKey.key.in_([key for key, _ in keys]),
+                IdempotencyKey.expires_at <= datetime.utcnow()
+            )
+        )
+    )
+
+
+async def sweep_expired(db: AsyncSession, batch_size: int = 1000) -> int:
+    """Delete one batch of expired idempotency rows; returns the number removed"""
+    ids = (await db.execute(
+        select(IdempotencyKey.id)
+        .where(IdempotencyKey.expires_at <= datetime.utcnow())
+        .limit(batch_size)
+    )).scalars().all()
+    if not ids:
+        return 0
+    await db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+    await db.commit()
+    return len(ids)
+
+
+async def sweep_shards():
+    """Delete every shard's expired idempotency records (run periodically)"""
+    for shard in shard_names():
+        async with shard_session(shard) as db:
+            while await sweep_expired(db):
+                pass
+
+
+idempotency_store = IdempotencyStore(max_entries=settings.IDEMPOTENCY_MEMORY_MAX_ENTRIES)
@@ -0,0 +1,390 @@
+"""Batched, non-blocking ingestion of widget consent beacons.
+
+The beacon endpoint validates a submission against the cached published
+config and appends it to an in-memory buffer; nothing touches the database
+on the request path. A single writer task drains the buffer every
+``BEACON_FLUSH_INTERVAL_MS`` (or as soon as ``BEACON_BATCH_SIZE`` events are
+waiting) and writes the whole batch in one transaction:
+
+- one executemany upsert into ``consents`` (the last state per consent in
+  the batch wins), and
+- one executemany insert into ``consent_history`` (every event is kept),
+- for submissions that name a user_id, one executemany upsert into the
+  data-subject index.
+
+Events are written to their tenant's shard (one transaction per shard).
+Events of a tenant whose data is being cut over to another shard are held
+back and retried on the next flush. A batch whose write fails goes back to
+the head of the buffer and is retried after a backoff that doubles up to
+``MAX_RETRY_BACKOFF``; after ``BEACON_WRITE_ATTEMPTS`` failures in a row
+its events are dropped and counted (``dropped`` in /api/admin/ingest).
+
+The writer runs on the task runtime's ``consent-ingest`` queue while there
+is anything to write, so it shows in /api/admin/tasks and the runtime's
+shutdown drain flushes the buffer.
+
+Widget interaction batches (preference opens, language switches, category
+toggles) go through the same buffer as history-only events, so they are
+always written after the consent they belong to. Interactions for consents
+the server has never seen are dropped.
+
+Consent IDs are derived from (script_id, session_id, client consent id), so
+a client can only ever update consents that belong to its own session.
+"""
+import asyncio
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select
+
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.shards import ensure_shard_schema, shard_engine
+from app.core.tasks import runtime
+from app.models.consent import Consent
+from app.models.consent_history import ConsentHistory
+from app.services.data_subjects import session_links_upsert
+from app.services.shard_directory import shard_directory
+from app.services.webhooks import queue_webhook
+
+MAX_RETRY_BACKOFF = 10.0  # Seconds
+
+# Namespace for consent IDs derived from widget-generated IDs
+BEACON_NAMESPACE = uuid.UUID("6f1d2a4e-8a57-4c1b-9d1e-2f7c3b5a9e10")
+
+
+def beacon_consent_id(script_id: str, session_id: str, client_consent_id: str) -> uuid.UUID:
+    """Server-side consent ID for a widget-generated consent ID"""
+    return uuid.uuid5(BEACON_NAMESPACE, f"{script_id}/{session_id}/{client_consent_id}")
+
+
+@dataclass
+class ConsentEvent:
+    """One validated consent submission waiting to be written"""
+    consent_id: uuid.UUID
+    api_key_id: uuid.UUID
+    script_id: str
+    session_id: str
+    categories: Dict
+    previous_categories: Optional[Dict]
+    action: str
+    ip_address: Optional[str]
+    user_agent: Optional[str]
+    referer: Optional[str]
+    accept_language: Optional[str]
+    received_at: datetime
+    webhook_url: Optional[str] = None
+    config_version_id: Optional[uuid.UUID] = None  # Published snapshot the banner was rendered from
+    user_id: Optional[str] = None  # Signed-in user the site passed to the widget
+
+
+@dataclass
+class InteractionEvent:
+    """A coalesced widget interaction, stored as a history row without a category change"""
+    consent_id: uuid.UUID
+    api_key_id: uuid.UUID
+    session_id: str
+    action: str
+    count: int
+    data: Optional[Dict]
+    client_time: Optional[datetime]
+    ip_address: Optional[str]
+    user_agent: Optional[str]
+    received_at: datetime
+
+
+class ConsentIngestBuffer:
+    """Bounded buffer with a single batching writer on the runtime's "consent-ingest" queue"""
+
+    def __init__(self, batch_size: int, flush_interval_ms: float, max_pending: int,
+                 write_attempts: int = 5, retry_backoff_ms: float = 200.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.write_attempts = max(1, write_attempts)
+        self.retry_backoff = retry_backoff_ms / 1000
+        # Drained before the webhook queue stops, so the last flush still queues its webhooks
+        self._queue = runtime.queue("consent-ingest", concurrency=1, max_pending=1, drain_first=True)
+        self._pending: deque = deque()
+        self._held: deque = deque()  # Events of frozen tenants, retried on the next flush
+        self._failures = 0  # Failed writes in a row
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writing = False
+        self.stats = {
+            "accepted": 0, "rejected_full": 0, "rejected_draining": 0, "written": 0, "batches": 0, "held": 0,
+            "failed_writes": 0, "retried": 0, "dropped": 0,
+        }
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending) + len(self._held)
+
+    @property
+    def running(self) -> bool:
+        return self._writing
+
+    def _start_writer(self) -> bool:
+        self._wakeup = asyncio.Event()
+        self._writing = self._queue.submit(self._run)
+        return self._writing
+
+    def _release_held(self):
+        self._pending.extendleft(reversed(self._held))
+        self._held.clear()
+
+    def submit(self, event: ConsentEvent) -> bool:
+        """Queue an event; returns False when the buffer is full"""
+        return self.submit_many([event])
+
+    def submit_many(self, events: List) -> bool:
+        """Queue events together; returns False (queuing none) when they don't fit or the worker is shutting down"""
+        if self.pending + len(events) > self.max_pending:
+            self.stats["rejected_full"] += len(events)
+            return False
+        if not self._writing and not self._start_writer():
+            self.stats["rejected_draining"] += len(events)
+            return False
+        self._pending.extend(events)
+        self.stats["accepted"] += len(events)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def _run(self):
+        """Write the buffer in batches until it is empty
+
+        Once the runtime drains, writes without waiting and gives events held
+        for a shard move a while for the move to finish.
+        """
+        held_deadline = None
+        try:
+            while self._pending or self._held:
+                if self._queue.accepting:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+                elif not self._pending:
+                    held_deadline = held_deadline or time.monotonic() + settings.SHARD_DIRECTORY_CACHE_SECONDS * 6
+                    if time.monotonic() > held_deadline:
+                        print(f"Dropping {len(self._held)} consent beacon events held for a shard move")
+                        self.stats["dropped"] += len(self._held)
+                        self._held.clear()
+                        break
+                    await asyncio.sleep(self.flush_interval)
+                self._release_held()
+                while self._pending:
+                    await self._write_next_batch()
+                    if len(self._pending) < self.batch_size and self._queue.accepting:
+                        break
+        finally:
+            # No await after the empty check, so submit_many never misses a finished writer
+            self._writing = False
+
+    async def _write_next_batch(self):
+        batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+        started = time.perf_counter()
+        try:
+            held = await write_batch(batch)
+        except Exception as e:
+            self._failures += 1
+            self.stats["failed_writes"] += 1
+            if self._failures >= self.write_attempts:
+                self._failures = 0
+                self.stats["dropped"] += len(batch)
+                print(f"Dropping consent beacon batch ({len(batch)} events) after {self.write_attempts} attempts: {e}")
+                return
+            # Back to the head of the buffer, so events keep their order
+            self._pending.extendleft(reversed(batch))
+            self.stats["retried"] += len(batch)
+            backoff = min(self.retry_backoff * 2 ** (self._failures - 1), MAX_RETRY_BACKOFF)
+            print(f"Error writing consent beacon batch ({len(batch)} events), retrying in {backoff:.1f}s: {e}")
+            await asyncio.sleep(backoff)
+            return
+        self._failures = 0
+        if held:
+            self._held.extend(held)
+            self.stats["held"] += len(held)
+            held_ids = set(map(id, held))
+            batch = [event for event in batch if id(event) not in held_ids]
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["last_batch_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        dispatch_webhooks(batch)
+
+
+async def write_batch(batch: List) -> List:
+    """Write a batch of events to their tenants' shards; returns the events held back
+
+    Events of tenants whose data is frozen for a shard move are not written.
+    """
+    by_shard: Dict[str, List] = {}
+    held = []
+    placements = {}
+    for event in batch:
+        if event.api_key_id not in placements:
+            placements[event.api_key_id] = await shard_directory.placement(event.api_key_id)
+        placement = placements[event.api_key_id]
+        if placement.frozen:
+            held.append(event)
+        else:
+            by_shard.setdefault(placement.shard, []).append(event)
+    for shard, events in by_shard.items():
+        await write_shard_batch(shard, events)
+    return held
+
+
+async def write_shard_batch(shard: str, batch: List):
+    """Write one shard's consent and interaction events in one transaction"""
+    latest: Dict[uuid.UUID, ConsentEvent] = {}
+    interactions: List[InteractionEvent] = []
+    for event in batch:
+        if isinstance(event, InteractionEvent):
+            interactions.append(event)
+        else:
+            latest[event.consent_id] = event
+
+    consent_rows = [
+        {
+            "id": event.consent_id,
+            "session_id": event.session_id,
+            "user_id": event.user_id,
+            "api_key_id": event.api_key_id,
+            "script_id": event.script_id,
+            "config_version_id": event.config_version_id,
+            "consent_categories": event.categories,
+            "ip_address": event.ip_address,
+            "user_agent": event.user_agent,
+            "status": "active",
+            "created_at": event.received_at,
+            "updated_at": event.received_at,
+            "expires_at": event.received_at + timedelta(days=365),
+        }
+        for event in latest.values()
+    ]
+    # Data-subject index rows, so access and erasure requests find beacon consents too
+    link_rows: Dict[tuple, dict] = {}
+    for event in batch:
+        if isinstance(event, ConsentEvent) and event.user_id:
+            link = (event.api_key_id, event.user_id, event.session_id)
+            first_seen = link_rows[link]["first_seen_at"] if link in link_rows else event.received_at
+            link_rows[link] = {
+                "api_key_id": event.api_key_id, "user_id": event.user_id, "session_id": event.session_id,
+                "first_seen_at": first_seen, "last_seen_at": event.received_at,
+            }
+    history_rows = [
+        {
+            "id": uuid.uuid4(),
+            "consent_id": event.consent_id,
+            "session_id": event.session_id,
+            "api_key_id": event.api_key_id,
+            "action": event.action,
+            "previous_categories": event.previous_categories,
+            "new_categories": event.categories,
+            "ip_address": event.ip_address,
+            "user_agent": event.user_agent,
+            "timestamp": event.received_at,
+            "extra_metadata": {
+                "source": "beacon",
+                "config_version_id": str(event.config_version_id) if event.config_version_id else None,
+                "referer": event.referer,
+                "accept_language": event.accept_language,
+                "timestamp": event.received_at.isoformat()
+            },
+        }
+        for event in batch if isinstance(event, ConsentEvent)
+    ]
+
+    await ensure_shard_schema(shard)
+    engine = shard_engine(shard)
+    async with engine.begin() as conn:
+        if consent_rows:
+            upsert = dialect_insert(Consent.__table__, engine.dialect.name)
+            upsert = upsert.on_conflict_do_update(
+                index_elements=[Consent.__table__.c.id],
+                set_={
+                    "consent_categories": upsert.excluded.consent_categories,
+                    "config_version_id": upsert.excluded.config_version_id,
+                    "ip_address": upsert.excluded.ip_address,
+                    "user_agent": upsert.excluded.user_agent,
+                    "updated_at": upsert.excluded.updated_at,
+                    # A re-submitted beacon is a fresh grant: it reactivates a revoked or expired consent
+                    "status": upsert.excluded.status,
+                    "revoked_at": None,
+                    "expires_at": upsert.excluded.expires_at,
+                    # A later anonymous submission doesn't detach the consent from its user
+                    "user_id": func.coalesce(upsert.excluded.user_id, Consent.__table__.c.user_id),
+                },
+            )
+            await conn.execute(upsert, consent_rows)
+        if link_rows:
+            await conn.execute(session_links_upsert(engine.dialect.name), list(link_rows.values()))
+
+        if interactions:
+            unknown = {event.consent_id for event in interactions} - set(latest)
+            if unknown:
+                result = await conn.execute(select(Consent.id).where(Consent.id.in_(unknown)))
+                known = set(latest) | set(result.scalars().all())
+            else:
+                known = set(latest)
+            history_rows.extend(
+                interaction_history_row(event) for event in interactions if event.consent_id in known
+            )
+
+        if history_rows:
+            await conn.execute(insert(ConsentHistory.__table__), history_rows)
+
+
+def interaction_history_row(event: InteractionEvent) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "consent_id": event.consent_id,
+        "session_id": event.session_id,
+        "api_key_id": event.api_key_id,
+        "action": event.action,
+        "previous_categories": None,
+        "new_categories": None,
+        "ip_address": event.ip_address,
+        "user_agent": event.user_agent,
+        "timestamp": event.received_at,
+        "extra_metadata": {
+            "source": "widget_events",
+            "count": event.count,
+            "data": event.data,
+            "client_time": event.client_time.isoformat() if event.client_time else None,
+            "timestamp": event.received_at.isoformat()
+        },
+    }
+
+
+def dispatch_webhooks(batch: List[ConsentEvent]):
+    """Send one webhook per consent touched by the batch"""
+    latest: Dict[uuid.UUID, ConsentEvent] = {}
+    for event in batch:
+        if isinstance(event, ConsentEvent) and event.webhook_url:
+            latest[event.consent_id] = event
+    for event in latest.values():
+        consent = Consent(
+            id=event.consent_id,
+            session_id=event.session_id,
+            consent_categories=event.categories,
+            status="active",
+            created_at=event.received_at,
+            updated_at=event.received_at,
+            expires_at=event.received_at + timedelta(days=365),
+        )
+        queue_webhook(event.webhook_url, consent, event.action)
+
+
+ingest_buffer = ConsentIngestBuffer(
+    batch_size=settings.BEACON_BATCH_SIZE,
+    flush_interval_ms=settings.BEACON_FLUSH_INTERVAL_MS,
+    max_pending=settings.BEACON_MAX_PENDING,
+    write_attempts=settings.BEACON_WRITE_ATTEMPTS,
+    retry_backoff_ms=settings.BEACON_RETRY_BACKOFF_MS,
+)
@@ -0,0 +1,103 @@
+"""Leases and checkpoints for resumable background jobs.
+
+A job keeps its progress in a ``JobCheckpoint`` row. Whoever holds the
+row's lease runs the job; saving the checkpoint in the same transaction as
+each batch of work (and extending the lease) means a crashed or redeployed
+worker's job is picked up where it stopped once the lease runs out, and two
+workers never run the same job at once.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.job_checkpoint import JobCheckpoint
+
+WORKER_ID = uuid.uuid4().hex
+
+
+async def claim_job(db: AsyncSession, name: str, lease_seconds: float) -> Optional[dict]:
+    """Take the job's lease and return its saved state ({} for a new job), or None if it runs elsewhere"""
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(JobCheckpoint)
+        .where(
+            JobCheckpoint.name == name,
+            or_(
+                JobCheckpoint.lease_until.is_(None),
+                JobCheckpoint.lease_until < now,
+                JobCheckpoint.lease_owner == WORKER_ID
+            )
+        )
+        .values(lease_owner=WORKER_ID, lease_until=now + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        state = await db.scalar(select(JobCheckpoint.state).where(JobCheckpoint.name == name))
+        await db.commit()
+        return dict(state or {})
+
+    exists = await db.scalar(select(JobCheckpoint.name).where(JobCheckpoint.name == name))
+    if exists:
+        await db.rollback()
+        return None
+    db.add(JobCheckpoint(
+        name=name, state={}, lease_owner=WORKER_ID, lease_until=now + timedelta(seconds=lease_seconds)
+    ))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+    return {}
+
+
+async def save_checkpoint(db: AsyncSession, name: str, state: dict, lease_seconds: float) -> bool:
+    """Store progress and extend the lease; the caller commits it with the batch.
+
+    Returns False if the lease was lost, in which case the caller should roll back.
+    """
+    result = await db.execute(
+        update(JobCheckpoint)
+        .where(JobCheckpoint.name == name, JobCheckpoint.lease_owner == WORKER_ID)
+        .values(state=state, lease_until=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+async def release_job(db: AsyncSession, name: str):
+    await db.execute(
+        update(JobCheckpoint)
+        .where(JobCheckpoint.name == name, JobCheckpoint.lease_owner == WORKER_ID)
+        .values(lease_owner=None, lease_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def job_state(db: AsyncSession, name: str) -> Optional[dict]:
+    """Saved state of a job, without taking its lease"""
+    result = await db.execute(
+        select(JobCheckpoint.state, JobCheckpoint.lease_owner, JobCheckpoint.lease_until, JobCheckpoint.updated_at)
+        .where(JobCheckpoint.name == name)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    running = row.lease_until is not None and row.lease_until.replace(tzinfo=None) > datetime.utcnow()
+    return {
+        "state": row.state,
+        "running": running,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None
+    }
+
+
+async def throttle(elapsed: float, max_duty_cycle: float):
+    """Sleep so a job spends at most ``max_duty_cycle`` of its time working (1 disables)"""
+    if 0 < max_duty_cycle < 1:
+        await asyncio.sleep(elapsed * (1 - max_duty_cycle) / max_duty_cycle)
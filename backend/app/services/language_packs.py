@@ -0,0 +1,123 @@
+"""Widget language packs: built-in translations plus per-config overrides.
+
+Each script config can override any widget string per language in
+``ScriptConfig.language_packs`` (``{"hi": {"banner": {"title": "..."}}}``).
+When a config is cached (on publish, or when a worker first loads it) the
+packs for its ``supported_languages`` are merged with the built-in strings,
+serialized and gzip-compressed once. The widget then downloads only the
+pack for the visitor's language.
+
+English without overrides is not compiled: the widget has it built in.
+"""
+from typing import Dict, List, Optional
+
+from app.core.responses import PrecompressedBody, json_dumps, precompress
+
+# Built-in strings, keyed like the widget's t('section.key') lookups.
+# English is the widget's own fallback and is kept in sync with it.
+BUILTIN_PACKS = {
+    "en": {
+        "banner": {
+            "title": "Why we use cookies and other tracking technologies?",
+            "message": "Our site enables script (e.g. cookies) that is able to read, store, and write information on your browser and in your device. The information processed by this script includes data relating to you which may include personal identifiers (e.g. IP address and session details) and browsing activity. We use this information for various purposes - e.g. to deliver content, maintain security, enable user choice, improve our sites, and for marketing purposes. You can reject all non-essential processing by choosing to accept only necessary cookies. To personalize your choice and learn more click here to adjust your preferences",
+            "acceptAll": "Allow All",
+            "rejectAll": "Accept only necessary",
+            "customize": "Adjust my preferences",
+            "learnMore": "Learn more",
+            "cookieNotice": "Cookie Notice"
+        },
+        "modal": {
+            "title": "Preference Center",
+            "description": "How can you manage your preferences?",
+            "save": "Save my Preferences",
+            "cancel": "Cancel",
+            "acceptOnlyNecessary": "Accept only necessary",
+            "turnOn": "Turn ON to enable",
+            "alwaysActive": "Always Active"
+        },
+        "settings": {
+            "link": "Cookie Settings",
+            "alwaysAvailable": "Cookie preferences can be changed at any time"
+        }
+    },
+    "hi": {
+        "banner": {
+            "title": "हम कुकीज़ का उपयोग करते हैं",
+            "message": "हम आपके अनुभव को बेहतर बनाने के लिए कुकीज़ का उपयोग करते हैं।",
+            "acceptAll": "सभी स्वीकार करें",
+            "rejectAll": "सभी अस्वीकार करें",
+            "customize": "अनुकूलित करें",
+            "learnMore": "अधिक जानें"
+        },
+        "modal": {
+            "title": "कुकी वरीयताएं",
+            "description": "अपनी कुकी वरीयताएं प्रबंधित करें।",
+            "save": "वरीयताएं सहेजें",
+            "cancel": "रद्द करें",
+            "turnOn": "सक्षम करने के लिए ON करें"
+        },
+        "settings": {
+            "link": "कुकी सेटिंग्स",
+            "alwaysAvailable": "कुकी वरीयताएं कभी भी बदली जा सकती हैं"
+        }
+    }
+}
+
+
+def merge_pack(base: Dict, overrides: Dict) -> Dict:
+    """Two-level merge of {section: {key: text}}; non-string overrides are ignored"""
+    merged = {section: dict(strings) for section, strings in base.items()}
+    for section, strings in (overrides or {}).items():
+        if isinstance(strings, dict):
+            merged.setdefault(section, {}).update(
+                {key: text for key, text in strings.items() if isinstance(text, str)}
+            )
+    return merged
+
+
+def compile_language_packs(supported_languages: List[str],
+                           overrides: Optional[Dict]) -> Dict[str, PrecompressedBody]:
+    """Pre-encoded pack per supported language that the widget needs to download"""
+    overrides = overrides or {}
+    compiled = {}
+    for language in supported_languages:
+        language_overrides = overrides.get(language)
+        if language == "en" and not language_overrides:
+            continue
+        pack = merge_pack(BUILTIN_PACKS.get(language, {}), language_overrides)
+        if pack:
+            compiled[language] = precompress(json_dumps(pack))
+    return compiled
+
+
+def parse_accept_language(header: str) -> List[str]:
+    """Language tags from an Accept-Language header, most preferred first"""
+    ranked = []
+    for position, item in enumerate(header.split(",")):
+        tag, _, params = item.strip().partition(";")
+        tag = tag.strip().lower()
+        if not tag or tag == "*":
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if quality > 0:
+            ranked.append((-quality, position, tag))
+    return [tag for _, _, tag in sorted(ranked)]
+
+
+def negotiate_language(accept_language: Optional[str], available: List[str], default: str) -> str:
+    """Best available language for the header: exact tag, then primary subtag, then default"""
+    if accept_language:
+        lookup = {language.lower(): language for language in available}
+        for tag in parse_accept_language(accept_language):
+            if tag in lookup:
+                return lookup[tag]
+            primary = tag.split("-", 1)[0]
+            if primary in lookup:
+                return lookup[primary]
+    return default
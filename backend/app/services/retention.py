@@ -0,0 +1,339 @@
+"""Consent retention: history compaction and deletion of inactive consents.
+
+Per tenant (``RetentionPolicy``, falling back to the ``RETENTION_*``
+settings; 0 disables either rule):
+
+- History older than ``compact_history_after_days`` is compacted per
+  consent. The evidence is kept: the first record, the last record before
+  the cutoff, every row that changes which categories are granted (grants,
+  re-grants and withdrawals) and every reject/withdraw action. Each run of
+  superseded rows in between (updates that leave the grants as they were,
+  widget interactions) is replaced by a ``compacted`` history row that
+  summarizes it (count, time span, actions, first and last categories).
+  Rows older than the tenant's watermark (the cutoff of its last finished
+  pass) were already looked at, so a pass only reads the history of
+  consents that have rows between the watermark and the new cutoff.
+- Consents that were revoked, withdrawn or expired more than
+  ``inactive_consent_retention_days`` ago are deleted with their history.
+
+Removed rows go through ``prune_history``, so the audit chain stays
+verifiable. Each tenant is processed on its shard; tenants that are being
+moved between shards are skipped until the next pass. The job walks tenants and consents in id order, one batch per
+transaction. Its position, running totals and the per-tenant watermarks are
+saved in the same transaction (``JobCheckpoint`` "retention"), so an interrupted pass resumes
+where it stopped. After each batch it sleeps long enough to stay under
+``RETENTION_MAX_DUTY_CYCLE`` of the database's time.
+
+The totals estimate reclaimed bytes from the removed rows' content. On
+Postgres the space becomes reusable after (auto)vacuum.
+"""
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.shards import shard_session
+from app.models.api_key import APIKey
+from app.models.consent import Consent
+from app.models.consent_history import ConsentHistory
+from app.models.idempotency_key import IdempotencyKey
+from app.models.retention_policy import RetentionPolicy
+from app.services.audit_chain import prune_history
+from app.services.jobs import claim_job, release_job, save_checkpoint, throttle
+from app.services.shard_directory import shard_directory
+
+JOB_NAME = "retention"
+
+# Actions that are themselves evidence of a withdrawal or refusal
+WITHDRAWAL_ACTIONS = {"rejected_all", "accepted_only_necessary", "withdrawn", "revoked"}
+
+# Rough size of a tombstone / summary row, subtracted from the reclaimed estimate
+TOMBSTONE_BYTES = 200
+
+TOTAL_KEYS = (
+    "consents_scanned", "history_rows_compacted", "summary_rows_written",
+    "consents_deleted", "history_rows_deleted", "bytes_reclaimed_estimate",
+)
+
+
+def _granted(categories) -> set:
+    return {name for name, value in (categories or {}).items() if value}
+
+
+def is_withdrawal(row) -> bool:
+    """Whether a history row records consent being taken back"""
+    if row.action in WITHDRAWAL_ACTIONS:
+        return True
+    return bool(_granted(row.previous_categories) - _granted(row.new_categories))
+
+
+def is_evidence(row) -> bool:
+    """Whether a history row must survive compaction: a withdrawal or any change to what is granted"""
+    return is_withdrawal(row) or _granted(row.previous_categories) != _granted(row.new_categories)
+
+
+def consent_ended_at(consent) -> Optional[datetime]:
+    """When a consent stopped being in force (None while it still is)"""
+    if consent.revoked_at is not None:
+        ended = consent.revoked_at
+    elif consent.status != "active":
+        ended = consent.updated_at
+    elif consent.expires_at is not None and consent.expires_at.replace(tzinfo=None) < datetime.utcnow():
+        ended = consent.expires_at
+    else:
+        return None
+    return ended.replace(tzinfo=None) if ended is not None else None
+
+
+def _row_bytes(row) -> int:
+    content = (row.previous_categories, row.new_categories, row.ip_address, row.user_agent, row.extra_metadata)
+    return len(json.dumps(content, default=str)) + 120
+
+
+async def tenant_windows(db: AsyncSession) -> List[Tuple[uuid.UUID, int, int]]:
+    """(api_key_id, compact_after_days, inactive_retention_days) for tenants with any rule enabled"""
+    result = await db.execute(
+        select(APIKey.id, RetentionPolicy.compact_history_after_days, RetentionPolicy.inactive_consent_retention_days)
+        .outerjoin(RetentionPolicy, RetentionPolicy.api_key_id == APIKey.id)
+        .order_by(APIKey.id)
+    )
+    windows = []
+    for api_key_id, compact_days, inactive_days in result:
+        compact_days = settings.RETENTION_COMPACT_HISTORY_AFTER_DAYS if compact_days is None else compact_days
+        inactive_days = settings.RETENTION_INACTIVE_CONSENT_DAYS if inactive_days is None else inactive_days
+        if compact_days or inactive_days:
+            windows.append((api_key_id, compact_days, inactive_days))
+    return windows
+
+
+def _summary_row(run: List) -> dict:
+    actions: Dict[str, int] = {}
+    covered = 0
+    for row in run:
+        # An earlier summary folds into the new one
+        count = (row.extra_metadata or {}).get("rows", 1) if row.action == "compacted" else 1
+        actions[row.action] = actions.get(row.action, 0) + count
+        covered += count
+    first, last = run[0], run[-1]
+    return {
+        "id": uuid.uuid4(),
+        "consent_id": first.consent_id,
+        "session_id": first.session_id,
+        "api_key_id": first.api_key_id,
+        "action": "compacted",
+        "previous_categories": first.previous_categories,
+        "new_categories": last.new_categories,
+        "ip_address": None,
+        "user_agent": None,
+        "timestamp": last.timestamp,
+        "extra_metadata": {
+            "source": "retention",
+            "rows": covered,
+            "actions": actions,
+            "from": first.timestamp.isoformat() if first.timestamp else None,
+            "to": last.timestamp.isoformat() if last.timestamp else None,
+            "chain_seqs": [first.chain_seq, last.chain_seq],
+        },
+    }
+
+
+def compaction_plan(rows: List) -> Tuple[List[uuid.UUID], List[dict]]:
+    """History rows of one consent (old enough, oldest first) -> ids to remove and the summary rows
+
+    Only runs of two or more consecutive superseded rows are summarized, so a
+    summary never spans a change to the granted categories.
+    """
+    runs, current = [], []
+    for row in rows[1:-1]:
+        if is_evidence(row):
+            runs.append(current)
+            current = []
+        else:
+            current.append(row)
+    runs.append(current)
+    remove_ids, summaries = [], []
+    for run in runs:
+        if len(run) >= 2:
+            remove_ids.extend(row.id for row in run)
+            summaries.append(_summary_row(run))
+    return remove_ids, summaries
+
+
+async def process_batch(db: AsyncSession, api_key_id: uuid.UUID, after: Optional[str],
+                        compact_days: int, inactive_days: int, batch_size: int,
+                        watermark: Optional[datetime] = None) -> Tuple[Optional[str], dict]:
+    """Apply retention to the next batch of a tenant's consents; returns (last consent id, counts)
+
+    With a ``watermark``, only consents with history rows at or after it are
+    compacted. The caller commits. A None consent id means the tenant is done.
+    """
+    counts = dict.fromkeys(TOTAL_KEYS, 0)
+    now = datetime.utcnow()
+    query = (
+        select(Consent.id, Consent.status, Consent.revoked_at, Consent.expires_at, Consent.updated_at)
+        .where(Consent.api_key_id == api_key_id)
+        .order_by(Consent.id)
+        .limit(batch_size)
+    )
+    if after:
+        query = query.where(Consent.id > uuid.UUID(after))
+    consents = (await db.execute(query)).all()
+    if not consents:
+        return None, counts
+    counts["consents_scanned"] = len(consents)
+
+    history = ConsentHistory.__table__
+    expired_ids = []
+    if inactive_days:
+        cutoff = now - timedelta(days=inactive_days)
+        for consent in consents:
+            ended = consent_ended_at(consent)
+            if ended is not None and ended < cutoff:
+                expired_ids.append(consent.id)
+
+    if expired_ids:
+        result = await db.execute(select(history).where(history.c.consent_id.in_(expired_ids)))
+        counts["bytes_reclaimed_estimate"] += sum(_row_bytes(row) - TOMBSTONE_BYTES for row in result)
+        counts["history_rows_deleted"] = await prune_history(
+            db, ConsentHistory.consent_id.in_(expired_ids), "retention"
+        )
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.consent_id.in_(expired_ids)))
+        await db.execute(delete(Consent).where(Consent.id.in_(expired_ids)))
+        counts["consents_deleted"] = len(expired_ids)
+        counts["bytes_reclaimed_estimate"] += 300 * len(expired_ids)
+
+    expired = set(expired_ids)
+    live_ids = [consent.id for consent in consents if consent.id not in expired]
+    if compact_days and live_ids:
+        cutoff = now - timedelta(days=compact_days)
+        if watermark is not None:
+            # Consents without new history since the last pass have nothing new to compact
+            result = await db.execute(
+                select(history.c.consent_id)
+                .where(
+                    history.c.consent_id.in_(live_ids),
+                    history.c.timestamp >= watermark,
+                    history.c.timestamp < cutoff,
+                    history.c.chain_seq.is_not(None)
+                )
+                .distinct()
+            )
+            live_ids = list(result.scalars())
+    if compact_days and live_ids:
+        result = await db.execute(
+            select(history)
+            .where(
+                and_(
+                    history.c.consent_id.in_(live_ids),
+                    history.c.timestamp < cutoff,
+                    # Only rows already in the audit chain
+                    history.c.chain_seq.is_not(None)
+                )
+            )
+            .order_by(history.c.consent_id, history.c.timestamp, history.c.chain_seq)
+        )
+        by_consent: Dict[uuid.UUID, List] = {}
+        for row in result:
+            by_consent.setdefault(row.consent_id, []).append(row)
+
+        remove_ids, summaries = [], []
+        for rows in by_consent.values():
+            ids, consent_summaries = compaction_plan(rows)
+            if consent_summaries:
+                remove_ids.extend(ids)
+                summaries.extend(consent_summaries)
+                removed = set(ids)
+                counts["bytes_reclaimed_estimate"] += sum(
+                    _row_bytes(row) - TOMBSTONE_BYTES for row in rows if row.id in removed
+                ) - TOMBSTONE_BYTES * len(consent_summaries)
+        if remove_ids:
+            counts["history_rows_compacted"] = await prune_history(
+                db, ConsentHistory.id.in_(remove_ids), "compacted"
+            )
+            await db.execute(insert(history), summaries)
+            counts["summary_rows_written"] = len(summaries)
+
+    return str(consents[-1].id), counts
+
+
+async def run_retention(max_batches: Optional[int] = None) -> Optional[dict]:
+    """Run (or resume) a retention pass; returns the job state, or None if another worker has it"""
+    lease = settings.RETENTION_LEASE_SECONDS
+    async with AsyncSessionLocal() as db:
+        state = await claim_job(db, JOB_NAME, lease)
+        if state is None:
+            return None
+        try:
+            if not state.get("position"):
+                state = {
+                    "pass_started_at": datetime.utcnow().isoformat(),
+                    "position": {"tenant": None, "after": None, "done": False},
+                    "totals": dict.fromkeys(TOTAL_KEYS, 0),
+                    "last_pass": state.get("last_pass"),
+                    "lifetime": state.get("lifetime") or dict.fromkeys(TOTAL_KEYS, 0),
+                    "watermarks": state.get("watermarks") or {},
+                }
+            state.setdefault("watermarks", {})
+            windows = await tenant_windows(db)
+            await db.commit()
+            batches = 0
+            for api_key_id, compact_days, inactive_days in windows:
+                position = state["position"]
+                if position["tenant"] and (
+                    str(api_key_id) < position["tenant"] or (str(api_key_id) == position["tenant"] and position["done"])
+                ):
+                    continue
+                after = position["after"] if position["tenant"] == str(api_key_id) else None
+                watermark = state["watermarks"].get(str(api_key_id)) if compact_days else None
+                watermark = datetime.fromisoformat(watermark) if watermark else None
+                placement = await shard_directory.load(db, api_key_id)
+                async with shard_session(placement.shard) as tenant_db:
+                    while True:
+                        if max_batches is not None and batches >= max_batches:
+                            return state
+                        # A tenant being moved to another shard waits for the next pass
+                        if (await shard_directory.load(tenant_db, api_key_id)).moving:
+                            break
+                        started = time.perf_counter()
+                        after, counts = await process_batch(
+                            tenant_db, api_key_id, after, compact_days, inactive_days, settings.RETENTION_BATCH_SIZE,
+                            watermark
+                        )
+                        for key, value in counts.items():
+                            state["totals"][key] += value
+                            state["lifetime"][key] = state["lifetime"].get(key, 0) + value
+                        state["position"] = {"tenant": str(api_key_id), "after": after, "done": after is None}
+                        if after is None and compact_days:
+                            # Every batch's cutoff was at least this late
+                            state["watermarks"][str(api_key_id)] = (
+                                datetime.fromisoformat(state["pass_started_at"]) - timedelta(days=compact_days)
+                            ).isoformat()
+                        # The checkpoint (primary) commits together with the batch (tenant's shard)
+                        if not await save_checkpoint(tenant_db, JOB_NAME, state, lease):
+                            await tenant_db.rollback()
+                            return None
+                        await tenant_db.commit()
+                        batches += 1
+                        # Keep this job's share of database time under the duty cycle
+                        await throttle(time.perf_counter() - started, settings.RETENTION_MAX_DUTY_CYCLE)
+                        if after is None:
+                            break
+
+            state["last_pass"] = {
+                "started_at": state["pass_started_at"],
+                "finished_at": datetime.utcnow().isoformat(),
+                **state["totals"]
+            }
+            state["position"] = None
+            await save_checkpoint(db, JOB_NAME, state, lease)
+            await db.commit()
+            return state
+        finally:
+            await db.rollback()
+            await release_job(db, JOB_NAME)
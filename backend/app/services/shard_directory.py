@@ -0,0 +1,108 @@
+"""Tenant -> shard directory.
+
+``tenant_shards`` (on the primary) records the shard holding each tenant's
+consent data; tenants without a row are on the primary, which is where all
+data lived before sharding. Lookups are cached per worker for
+``SHARD_DIRECTORY_CACHE_SECONDS``: the tenant-move tool waits that long
+after every directory change, so no worker acts on a stale placement.
+
+While a tenant is being moved (services/tenant_move.py) its status is
+``moving`` (rows are being copied; deletions are refused and background
+jobs leave the tenant alone) and then, briefly, ``frozen`` (all writes are
+refused while the last changes are copied and the directory is switched).
+"""
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.shards import PRIMARY, shard_names
+from app.models.tenant_shard import TenantShard
+
+
+@dataclass(frozen=True)
+class Placement:
+    shard: str
+    status: str = "active"
+    target_shard: Optional[str] = None
+
+    @property
+    def moving(self) -> bool:
+        return self.status != "active"
+
+    @property
+    def frozen(self) -> bool:
+        return self.status == "frozen"
+
+
+class ShardDirectory:
+    """Cached api_key_id -> Placement lookups"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 100000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[uuid.UUID, tuple]" = OrderedDict()  # api_key_id -> (expires_at, Placement)
+
+    async def placement(self, api_key_id: uuid.UUID, db: Optional[AsyncSession] = None) -> Placement:
+        item = self._entries.get(api_key_id)
+        if item is not None and time.monotonic() < item[0]:
+            return item[1]
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                placement = await self.load(session, api_key_id)
+        else:
+            placement = await self.load(db, api_key_id)
+        self._entries[api_key_id] = (time.monotonic() + self.ttl, placement)
+        self._entries.move_to_end(api_key_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return placement
+
+    async def load(self, db: AsyncSession, api_key_id: uuid.UUID) -> Placement:
+        """Uncached lookup"""
+        result = await db.execute(
+            select(TenantShard.shard, TenantShard.status, TenantShard.target_shard)
+            .where(TenantShard.api_key_id == api_key_id)
+        )
+        row = result.first()
+        if row is None:
+            return Placement(PRIMARY)
+        return Placement(row.shard, row.status, row.target_shard)
+
+    def invalidate(self, api_key_id: Optional[uuid.UUID] = None):
+        if api_key_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(api_key_id, None)
+
+    def stats(self) -> dict:
+        return {"cached_tenants": len(self._entries), "ttl_seconds": self.ttl}
+
+
+def new_tenant_shard(api_key_id: uuid.UUID) -> str:
+    """Shard for a new tenant: spread over SHARD_NEW_TENANTS by api_key_id"""
+    candidates = [name for name in settings.SHARD_NEW_TENANTS if name in shard_names()] or [PRIMARY]
+    return candidates[zlib.crc32(api_key_id.bytes) % len(candidates)]
+
+
+async def assign_new_tenant(db: AsyncSession, api_key_id: uuid.UUID) -> str:
+    """Record a new tenant's shard (the caller commits)"""
+    shard = new_tenant_shard(api_key_id)
+    db.add(TenantShard(api_key_id=api_key_id, shard=shard, status="active"))
+    return shard
+
+
+async def moving_tenants(db: AsyncSession) -> Set[uuid.UUID]:
+    """Tenants in the middle of a move; background jobs skip them (uncached)"""
+    result = await db.execute(select(TenantShard.api_key_id).where(TenantShard.status != "active"))
+    return set(result.scalars().all())
+
+
+shard_directory = ShardDirectory(ttl_seconds=settings.SHARD_DIRECTORY_CACHE_SECONDS)
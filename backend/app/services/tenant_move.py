@@ -0,0 +1,247 @@
+"""Online move of a tenant's consent data to another shard.
+
+1. The directory marks the tenant ``moving``. Once every worker has seen
+   that (``SHARD_DIRECTORY_CACHE_SECONDS``), API deletions are refused and
+   the sealer, retention and erasure jobs leave the tenant alone, so its
+   rows are only inserted or updated from then on.
+2. Every consent-data table is copied in primary-key order, ``batch_size``
+   rows per transaction, as upserts, so re-running a step is harmless.
+3. Catch-up passes copy the rows written since the previous pass started
+   (by their created/updated timestamps) until a pass is small.
+4. The tenant is ``frozen``: API writes get 503 and beacons wait in the
+   workers' buffers. After the cache TTL the last changes are copied, row
+   counts are compared and the directory is switched to the new shard.
+5. Once no worker can still be reading the old shard, the tenant's rows
+   are deleted there in batches.
+
+An interrupted move is resumed by running it again with the same target,
+or undone with ``abort_move``. ``scripts/move_tenant.py`` runs it.
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import and_, delete, func, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, dialect_insert
+from app.core.shards import PRIMARY, ensure_shard_schema, shard_engine, shard_names, sharded_tables
+from app.models.api_key import APIKey
+from app.models.tenant_shard import TenantShard
+from app.services.jobs import throttle
+from app.services.shard_directory import shard_directory
+
+# Columns stamped when a row is written, used to find rows changed since a pass started
+CHANGED_COLUMNS = {
+    "consents": ("created_at", "updated_at"),
+    "consent_history": ("timestamp",),
+    "idempotency_keys": ("created_at",),
+    "grievances": ("created_at", "updated_at"),
+    "data_subject_sessions": ("last_seen_at",),
+    "audit_seals": ("sealed_at",),
+    "pruned_history": ("pruned_at",),
+}
+
+# Compared before cutover (idempotency keys may expire on the source in the meantime)
+CHECKED_TABLES = (
+    "consents", "consent_history", "grievances", "data_subject_sessions", "audit_seals", "pruned_history",
+)
+
+# A write stamped just before a pass started may commit after it; catch-up passes look back this far
+CATCH_UP_OVERLAP = timedelta(seconds=60)
+MAX_CATCH_UP_PASSES = 5
+
+
+class MoveError(Exception):
+    """The tenant could not be moved (nothing was switched)"""
+
+
+def tenant_rows(table, api_key_id: uuid.UUID):
+    """WHERE clause for a tenant's rows in one consent-data table"""
+    if table.name == "consent_history":
+        # Rows written before the audit chain don't carry api_key_id
+        consents = table.metadata.tables["consents"]
+        return table.c.consent_id.in_(select(consents.c.id).where(consents.c.api_key_id == api_key_id))
+    return table.c.api_key_id == api_key_id
+
+
+def _after(primary_key: list, last: tuple):
+    if len(primary_key) == 1:
+        return primary_key[0] > last[0]
+    return tuple_(*primary_key) > tuple_(*last)
+
+
+def _keys_in(primary_key: list, keys: list):
+    if len(primary_key) == 1:
+        return primary_key[0].in_([key[0] for key in keys])
+    return tuple_(*primary_key).in_([tuple(key) for key in keys])
+
+
+async def copy_table(source: AsyncEngine, target: AsyncEngine, table, api_key_id: uuid.UUID,
+                     batch_size: int, max_duty_cycle: float, since: Optional[datetime] = None) -> int:
+    """Upsert a tenant's rows (or those written since ``since``) from source to target; returns rows copied"""
+    primary_key = list(table.primary_key.columns)
+    condition = tenant_rows(table, api_key_id)
+    if since is not None:
+        condition = and_(condition, or_(*(table.c[name] >= since for name in CHANGED_COLUMNS[table.name])))
+    upsert = dialect_insert(table, target.dialect.name)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=primary_key,
+        set_={column.name: upsert.excluded[column.name] for column in table.columns if not column.primary_key}
+    )
+    copied, last = 0, None
+    while True:
+        started = time.perf_counter()
+        query = select(table).where(condition).order_by(*primary_key).limit(batch_size)
+        if last is not None:
+            query = query.where(_after(primary_key, last))
+        async with source.connect() as conn:
+            rows = (await conn.execute(query)).all()
+        if not rows:
+            return copied
+        async with target.begin() as conn:
+            await conn.execute(upsert, [dict(row._mapping) for row in rows])
+        copied += len(rows)
+        last = tuple(getattr(rows[-1], column.name) for column in primary_key)
+        await throttle(time.perf_counter() - started, max_duty_cycle)
+        if len(rows) < batch_size:
+            return copied
+
+
+async def purge_tenant(engine: AsyncEngine, api_key_id: uuid.UUID, batch_size: int,
+                       max_duty_cycle: float) -> Dict[str, int]:
+    """Delete a tenant's consent data from one shard in batches, children first"""
+    removed = {}
+    for table in reversed(sharded_tables()):
+        primary_key = list(table.primary_key.columns)
+        removed[table.name] = 0
+        while True:
+            started = time.perf_counter()
+            async with engine.begin() as conn:
+                keys = (await conn.execute(
+                    select(*primary_key).where(tenant_rows(table, api_key_id)).limit(batch_size)
+                )).all()
+                if not keys:
+                    break
+                await conn.execute(delete(table).where(_keys_in(primary_key, keys)))
+            removed[table.name] += len(keys)
+            await throttle(time.perf_counter() - started, max_duty_cycle)
+    return removed
+
+
+async def count_rows(engine: AsyncEngine, api_key_id: uuid.UUID) -> Dict[str, int]:
+    counts = {}
+    async with engine.connect() as conn:
+        for table in sharded_tables():
+            if table.name in CHECKED_TABLES:
+                counts[table.name] = await conn.scalar(
+                    select(func.count()).select_from(table).where(tenant_rows(table, api_key_id))
+                )
+    return counts
+
+
+async def _update_directory(api_key_id: uuid.UUID, **values):
+    async with AsyncSessionLocal() as db:
+        entry = await db.get(TenantShard, api_key_id)
+        if entry is None:
+            entry = TenantShard(api_key_id=api_key_id, shard=PRIMARY)
+            db.add(entry)
+        for key, value in values.items():
+            setattr(entry, key, value)
+        await db.commit()
+    shard_directory.invalidate(api_key_id)
+
+
+async def _placement(api_key_id: uuid.UUID):
+    async with AsyncSessionLocal() as db:
+        if await db.get(APIKey, api_key_id) is None:
+            raise MoveError(f"Unknown API key {api_key_id}")
+        return await shard_directory.load(db, api_key_id)
+
+
+async def move_tenant(api_key_id: uuid.UUID, target: str, batch_size: int = 1000, max_duty_cycle: float = 0.5,
+                      keep_source: bool = False, log: Callable[[str], None] = print) -> dict:
+    """Move a tenant's consent data to shard ``target`` while it stays online"""
+    if target not in shard_names():
+        raise MoveError(f"Unknown shard {target!r}")
+    placement = await _placement(api_key_id)
+    if placement.moving and placement.target_shard != target:
+        raise MoveError(f"Tenant is already being moved to {placement.target_shard!r}")
+    source = placement.shard
+    if source == target:
+        log(f"tenant {api_key_id} is already on {target!r}")
+        return {"api_key_id": str(api_key_id), "shard": target, "copied": {}}
+
+    wait = settings.SHARD_DIRECTORY_CACHE_SECONDS + 1
+    source_engine, target_engine = shard_engine(source), shard_engine(target)
+    await ensure_shard_schema(source)
+    await ensure_shard_schema(target)
+    report = {"api_key_id": str(api_key_id), "from": source, "to": target, "copied": {}, "passes": 0}
+    started = time.perf_counter()
+
+    await _update_directory(api_key_id, status="moving", target_shard=target, move_started_at=datetime.utcnow())
+    log(f"moving tenant {api_key_id} from {source!r} to {target!r}; waiting {wait:.0f}s for workers to notice")
+    await asyncio.sleep(wait)
+
+    async def copy_pass(since: Optional[datetime]) -> int:
+        total = 0
+        for table in sharded_tables():
+            copied = await copy_table(
+                source_engine, target_engine, table, api_key_id, batch_size, max_duty_cycle, since
+            )
+            report["copied"][table.name] = report["copied"].get(table.name, 0) + copied
+            total += copied
+        report["passes"] += 1
+        return total
+
+    since = None
+    for number in range(MAX_CATCH_UP_PASSES + 1):
+        pass_started = datetime.utcnow() - CATCH_UP_OVERLAP
+        copied = await copy_pass(since)
+        log(f"{'copy' if since is None else 'catch-up'} pass: {copied} rows")
+        since = pass_started
+        if number > 0 and copied < batch_size:
+            break
+
+    await _update_directory(api_key_id, status="frozen")
+    log(f"frozen for cutover; waiting {wait:.0f}s")
+    frozen_at = time.perf_counter()
+    await asyncio.sleep(wait)
+    try:
+        log(f"final pass: {await copy_pass(since)} rows")
+        source_counts = await count_rows(source_engine, api_key_id)
+        target_counts = await count_rows(target_engine, api_key_id)
+        if source_counts != target_counts:
+            raise MoveError(f"row counts differ after copying: source {source_counts}, target {target_counts}")
+        await _update_directory(api_key_id, shard=target, status="active", target_shard=None, move_started_at=None)
+    except Exception:
+        # Writes resume on the source; running the move again continues from here
+        await _update_directory(api_key_id, status="moving")
+        raise
+    report["frozen_seconds"] = round(time.perf_counter() - frozen_at, 1)
+    report["rows"] = target_counts
+    log(f"switched to {target!r} after {report['frozen_seconds']}s frozen")
+
+    if not keep_source:
+        # Workers may read the old shard until their cached placement expires
+        await asyncio.sleep(wait)
+        report["purged"] = await purge_tenant(source_engine, api_key_id, batch_size, max_duty_cycle)
+        log(f"removed the tenant's rows from {source!r}")
+    report["seconds"] = round(time.perf_counter() - started, 1)
+    return report
+
+
+async def abort_move(api_key_id: uuid.UUID, batch_size: int = 1000, max_duty_cycle: float = 0.5,
+                     log: Callable[[str], None] = print) -> dict:
+    """Stop an unfinished move: the tenant stays where it is and the partial copy is removed"""
+    placement = await _placement(api_key_id)
+    if not placement.moving:
+        raise MoveError("Tenant is not being moved")
+    await _update_directory(api_key_id, status="active", target_shard=None, move_started_at=None)
+    log(f"move of tenant {api_key_id} to {placement.target_shard!r} aborted; removing the partial copy")
+    await asyncio.sleep(settings.SHARD_DIRECTORY_CACHE_SECONDS + 1)
+    purged = await purge_tenant(shard_engine(placement.target_shard), api_key_id, batch_size, max_duty_cycle)
+    return {"api_key_id": str(api_key_id), "shard": placement.shard, "purged": purged}
@@ -0,0 +1,38 @@
+"""Outgoing consent webhooks"""
+from app.core.config import settings
+from app.core.tasks import runtime
+from app.models.consent import Consent
+
+webhook_queue = runtime.queue("webhooks", settings.WEBHOOK_CONCURRENCY, settings.WEBHOOK_MAX_PENDING)
+
+
+def queue_webhook(webhook_url: str, consent: Consent, action: str) -> bool:
+    """Send the webhook in the background; returns False (and drops it) when the queue is full"""
+    if webhook_queue.submit(send_webhook, webhook_url, consent, action):
+        return True
+    print(f"Webhook queue full, dropping {action} webhook for consent {consent.id}")
+    return False
+
+
+async def send_webhook(webhook_url: str, consent: Consent, action: str):
+    """Send consent data to webhook URL"""
+    # Imported here so cold starts don't pay for aiohttp until a webhook fires
+    import aiohttp
+    try:
+        async with aiohttp.ClientSession() as session:
+            payload = {
+                "consent_id": str(consent.id),
+                "session_id": consent.session_id,
+                "action": action,
+                "categories": consent.consent_categories,
+                "status": consent.status,
+                "created_at": consent.created_at.isoformat(),
+                "updated_at": consent.updated_at.isoformat() if consent.updated_at else None,
+                "expires_at": consent.expires_at.isoformat() if consent.expires_at else None
+            }
+            async with session.post(webhook_url, json=payload, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status == 200:
+                    return await response.json()
+    except Exception as e:
+        print(f"Error sending webhook: {e}")
+        return None
@@ -0,0 +1,95 @@
+"""Versioned widget bundle: a small bootstrap script plus content-hashed chunks.
+
+The widget is split into ``widget/consent-widget.js`` (the bootstrap every
+page loads) and ``widget/chunks/*.js`` (banner, preference center, data
+request form, interaction event queue) which the bootstrap fetches on demand.
+
+Files are read once per process. Each chunk is versioned by a hash of its
+content and the bootstrap is served with a manifest of those hashes filled
+in, so chunk URLs (``/widget/chunks/<name>.<hash>.js``) can be cached
+forever and only the bootstrap needs a short cache lifetime. Bodies are
+gzip-compressed up front.
+"""
+import json
+import os
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.responses import PrecompressedBody, precompress
+
+WIDGET_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "widget")
+BOOTSTRAP_FILE = "consent-widget.js"
+CHUNKS_DIR = "chunks"
+MANIFEST_PLACEHOLDER = "/*__CHUNK_MANIFEST__*/{}"
+
+
+class WidgetBundle:
+    """Bootstrap plus chunks as loaded from one widget directory"""
+
+    def __init__(self, bootstrap: PrecompressedBody, chunks: Dict[str, PrecompressedBody]):
+        self.bootstrap = bootstrap
+        self.chunks = chunks
+
+    @classmethod
+    def load(cls, widget_dir: str) -> Optional["WidgetBundle"]:
+        bootstrap_path = os.path.join(widget_dir, BOOTSTRAP_FILE)
+        if not os.path.exists(bootstrap_path):
+            return None
+
+        chunks = {}
+        chunks_dir = os.path.join(widget_dir, CHUNKS_DIR)
+        if os.path.isdir(chunks_dir):
+            for filename in sorted(os.listdir(chunks_dir)):
+                if filename.endswith(".js"):
+                    with open(os.path.join(chunks_dir, filename), "rb") as f:
+                        chunks[filename[:-3]] = precompress(f.read())
+
+        with open(bootstrap_path, encoding="utf-8") as f:
+            source = f.read()
+        manifest = json.dumps({name: asset.version for name, asset in chunks.items()}, separators=(",", ":"))
+        source = source.replace(MANIFEST_PLACEHOLDER, manifest, 1)
+        return cls(precompress(source.encode("utf-8")), chunks)
+
+    def report(self) -> dict:
+        """Delivered sizes, per file and for the common page-load paths"""
+        def size(asset: PrecompressedBody) -> dict:
+            return {"bytes": len(asset.body), "gzip_bytes": len(asset.gzipped), "version": asset.version}
+
+        def total(*names) -> int:
+            assets = [self.bootstrap] + [self.chunks[name] for name in names if name in self.chunks]
+            return sum(len(asset.gzipped) for asset in assets)
+
+        return {
+            "bootstrap": size(self.bootstrap),
+            "chunks": {name: size(asset) for name, asset in self.chunks.items()},
+            "gzip_bytes_by_path": {
+                "returning_visitor": total(),
+                "first_visit": total("banner"),
+                "preferences_opened": total("banner", "preferences", "events"),
+            },
+        }
+
+
+_bundle: Optional[WidgetBundle] = None
+_bundle_mtime: Optional[float] = None
+
+
+def _source_mtime(widget_dir: str) -> Optional[float]:
+    """Newest modification time of the widget sources"""
+    paths = [os.path.join(widget_dir, BOOTSTRAP_FILE)]
+    chunks_dir = os.path.join(widget_dir, CHUNKS_DIR)
+    if os.path.isdir(chunks_dir):
+        paths += [os.path.join(chunks_dir, name) for name in os.listdir(chunks_dir)]
+    mtimes = [os.path.getmtime(path) for path in paths if os.path.exists(path)]
+    return max(mtimes) if mtimes else None
+
+
+def get_widget_bundle() -> Optional[WidgetBundle]:
+    """Loaded once per process; in DEBUG, reloaded when a source file changes"""
+    global _bundle, _bundle_mtime
+    if _bundle is None or settings.DEBUG:
+        mtime = _source_mtime(WIDGET_DIR)
+        if _bundle is None or mtime != _bundle_mtime:
+            _bundle = WidgetBundle.load(WIDGET_DIR)
+            _bundle_mtime = mtime
+    return _bundle
@@ -0,0 +1,53 @@
+"""Alembic environment: migrates the primary database and every tenant shard
+
+Each database keeps its own alembic_version. Shards hold only the
+consent-data tables (app/core/shards.py); revisions skip the other tables
+there through app.core.migrations.
+"""
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+
+import app.models  # noqa: F401  (register every table on Base.metadata)
+from app.core import migrations
+from app.core.database import Base
+from app.core.shards import PRIMARY, dispose_shards, shard_engine, shard_metadata, shard_names
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+
+def run_migrations(connection, shard: str):
+    if connection.dialect.name == "postgresql":
+        migrations.configure_session(connection)
+        connection.commit()
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata if shard == PRIMARY else shard_metadata(),
+        transaction_per_migration=True,
+        shard=shard
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def migrate(shards: list):
+    try:
+        for shard in shards:
+            print(f"Migrating shard {shard!r}")
+            async with shard_engine(shard).connect() as connection:
+                await connection.run_sync(run_migrations, shard)
+    finally:
+        await dispose_shards()
+
+
+if context.is_offline_mode():
+    # Revisions look at the live schema to stay idempotent, so there is no SQL script to print
+    raise SystemExit("Offline (--sql) migrations are not supported")
+
+shard = context.get_x_argument(as_dictionary=True).get("shard")
+if shard is not None and shard not in shard_names():
+    raise SystemExit(f"Unknown shard {shard!r} (configured: {', '.join(shard_names())})")
+asyncio.run(migrate([shard] if shard else shard_names()))
@@ -0,0 +1,283 @@
+"""baseline: the schema of the current models
+
+Creates the tables a database doesn't have yet (with their indexes) and
+leaves existing ones alone, so it also adopts databases created by
+init_db's create_all; 0002 then brings older tables up to date.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 04:51:25.517749
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from app.core import migrations
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Parents first
+TABLES = (
+    "api_keys", "job_checkpoints", "audit_seals", "data_subject_sessions", "erasure_jobs", "grievances",
+    "pruned_history", "retention_policies", "script_configs", "tenant_shards", "script_config_versions",
+    "consents", "consent_history", "idempotency_keys",
+)
+
+
+def upgrade():
+    if migrations.create_table(
+        "api_keys",
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('key_prefix', sa.String(length=16), nullable=True),
+        sa.Column('key_hash', sa.String(length=64), nullable=True),
+        sa.Column('key', sa.String(length=255), nullable=True),
+        sa.Column('customer_name', sa.String(length=255), nullable=False),
+        sa.Column('customer_email', sa.String(length=255), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index(op.f('ix_api_keys_key'), 'api_keys', ['key'], unique=True)
+        op.create_index(op.f('ix_api_keys_key_hash'), 'api_keys', ['key_hash'], unique=True)
+        op.create_index(op.f('ix_api_keys_key_prefix'), 'api_keys', ['key_prefix'], unique=False)
+    migrations.create_table(
+        "job_checkpoints",
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('state', sa.JSON(), nullable=False),
+        sa.Column('lease_owner', sa.String(length=64), nullable=True),
+        sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    migrations.create_table(
+        "audit_seals",
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('api_key_id', sa.Uuid(), nullable=False),
+        sa.Column('first_seq', sa.BigInteger(), nullable=False),
+        sa.Column('last_seq', sa.BigInteger(), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.Column('prev_hash', sa.String(length=64), nullable=False),
+        sa.Column('chain_hash', sa.String(length=64), nullable=False),
+        sa.Column('merkle_root', sa.String(length=64), nullable=False),
+        sa.Column('sealed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('api_key_id', 'first_seq', name='uq_audit_seal_start'),
+    )
+    if migrations.create_table(
+        "data_subject_sessions",
+        sa.Column('api_key_id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.String(length=255), nullable=False),
+        sa.Column('session_id', sa.String(length=255), nullable=False),
+        sa.Column('first_seen_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('last_seen_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.PrimaryKeyConstraint('api_key_id', 'user_id', 'session_id'),
+    ):
+        op.create_index('idx_subject_session', 'data_subject_sessions', ['api_key_id', 'session_id'], unique=False)
+    if migrations.create_table(
+        "erasure_jobs",
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('api_key_id', sa.Uuid(), nullable=False),
+        sa.Column('mode', sa.String(length=20), nullable=False),
+        sa.Column('subjects', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('counts', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index('idx_erasure_status', 'erasure_jobs', ['status', 'created_at'], unique=False)
+        op.create_index('idx_erasure_tenant', 'erasure_jobs', ['api_key_id', 'created_at'], unique=False)
+    if migrations.create_table(
+        "grievances",
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('session_id', sa.String(length=255), nullable=False),
+        sa.Column('user_id', sa.String(length=255), nullable=True),
+        sa.Column('api_key_id', sa.Uuid(), nullable=False),
+        sa.Column('request_type', sa.String(length=50), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=True),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('resolved_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('response', sa.Text(), nullable=True),
+        sa.Column('response_metadata', sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index(op.f('ix_grievances_created_at'), 'grievances', ['created_at'], unique=False)
+        op.create_index(op.f('ix_grievances_session_id'), 'grievances', ['session_id'], unique=False)
+        op.create_index(op.f('ix_grievances_user_id'), 'grievances', ['user_id'], unique=False)
+    if migrations.create_table(
+        "pruned_history",
+        sa.Column('history_id', sa.Uuid(), nullable=False),
+        sa.Column('api_key_id', sa.Uuid(), nullable=False),
+        sa.Column('chain_seq', sa.BigInteger(), nullable=False),
+        sa.Column('row_hash', sa.String(length=64), nullable=False),
+        sa.Column('chain_hash', sa.String(length=64), nullable=False),
+        sa.Column('reason', sa.String(length=50), nullable=False),
+        sa.Column('pruned_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.PrimaryKeyConstraint('history_id'),
+    ):
+        op.create_index('idx_pruned_chain', 'pruned_history', ['api_key_id', 'chain_seq'], unique=True)
+    migrations.create_table(
+        "retention_policies",
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('api_key_id', sa.Uuid(), nullable=False),
+        sa.Column('compact_history_after_days', sa.Integer(), nullable=True),
+        sa.Column('inactive_consent_retention_days', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('api_key_id'),
+    )
+    # Created without its published_version_id foreign key, added once script_config_versions exists
+    configs_created = migrations.create_table(
+        "script_configs",
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('script_id', sa.String(length=100), nullable=False),
+        sa.Column('api_key_id', sa.Uuid(), nullable=False),
+        sa.Column('domain', sa.String(length=255), nullable=False),
+        sa.Column('categories', sa.JSON(), nullable=False),
+        sa.Column('banner_config', sa.JSON(), nullable=False),
+        sa.Column('default_language', sa.String(length=10), nullable=True),
+        sa.Column('supported_languages', sa.JSON(), nullable=True),
+        sa.Column('language_packs', sa.JSON(), nullable=True),
+        sa.Column('cookie_policy_url', sa.String(length=500), nullable=True),
+        sa.Column('webhook_url', sa.String(length=500), nullable=True),
+        sa.Column('external_tool_url', sa.String(length=500), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_published', sa.Boolean(), nullable=True),
+        sa.Column('published_version_id', sa.Uuid(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    if configs_created:
+        op.create_index('idx_script_id_published', 'script_configs', ['script_id', 'is_published', 'is_active'], unique=False)
+        op.create_index(op.f('ix_script_configs_api_key_id'), 'script_configs', ['api_key_id'], unique=False)
+        op.create_index(op.f('ix_script_configs_script_id'), 'script_configs', ['script_id'], unique=True)
+    if migrations.create_table(
+        "tenant_shards",
+        sa.Column('api_key_id', sa.Uuid(), nullable=False),
+        sa.Column('shard', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('target_shard', sa.String(length=50), nullable=True),
+        sa.Column('move_started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.PrimaryKeyConstraint('api_key_id'),
+    ):
+        op.create_index('idx_tenant_shard', 'tenant_shards', ['shard'], unique=False)
+    if migrations.create_table(
+        "script_config_versions",
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('script_config_id', sa.Uuid(), nullable=False),
+        sa.Column('script_id', sa.String(length=100), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('content', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['script_config_id'], ['script_configs.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('script_config_id', 'content_hash', name='uq_script_config_version_hash'),
+    ):
+        op.create_index(op.f('ix_script_config_versions_script_config_id'), 'script_config_versions', ['script_config_id'], unique=False)
+        op.create_index(op.f('ix_script_config_versions_script_id'), 'script_config_versions', ['script_id'], unique=False)
+    if configs_created:
+        migrations.add_foreign_key(
+            "fk_script_configs_published_version", "script_configs", ["published_version_id"],
+            "script_config_versions", ["id"]
+        )
+    if migrations.create_table(
+        "consents",
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('session_id', sa.String(length=255), nullable=False),
+        sa.Column('user_id', sa.String(length=255), nullable=True),
+        sa.Column('api_key_id', sa.Uuid(), nullable=False),
+        sa.Column('script_id', sa.String(length=100), nullable=True),
+        sa.Column('config_version_id', sa.Uuid(), nullable=True),
+        sa.Column('consent_categories', sa.JSON(), nullable=False),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('user_agent', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.ForeignKeyConstraint(['config_version_id'], ['script_config_versions.id']),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index('idx_consent_api_key', 'consents', ['api_key_id', 'id'], unique=False)
+        op.create_index('idx_expires_at', 'consents', ['expires_at'], unique=False)
+        op.create_index('idx_script_session', 'consents', ['script_id', 'session_id'], unique=False)
+        op.create_index('idx_session_status', 'consents', ['session_id', 'status'], unique=False)
+        op.create_index(op.f('ix_consents_created_at'), 'consents', ['created_at'], unique=False)
+        op.create_index(op.f('ix_consents_expires_at'), 'consents', ['expires_at'], unique=False)
+        op.create_index(op.f('ix_consents_script_id'), 'consents', ['script_id'], unique=False)
+        op.create_index(op.f('ix_consents_session_id'), 'consents', ['session_id'], unique=False)
+        op.create_index(op.f('ix_consents_user_id'), 'consents', ['user_id'], unique=False)
+    if migrations.create_table(
+        "consent_history",
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('consent_id', sa.Uuid(), nullable=False),
+        sa.Column('session_id', sa.String(length=255), nullable=False),
+        sa.Column('api_key_id', sa.Uuid(), nullable=True),
+        sa.Column('action', sa.String(length=50), nullable=False),
+        sa.Column('previous_categories', sa.JSON(), nullable=True),
+        sa.Column('new_categories', sa.JSON(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('user_agent', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('extra_metadata', sa.JSON(), nullable=True),
+        sa.Column('row_hash', sa.String(length=64), nullable=True),
+        sa.Column('chain_seq', sa.BigInteger(), nullable=True),
+        sa.Column('chain_hash', sa.String(length=64), nullable=True),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.ForeignKeyConstraint(['consent_id'], ['consents.id']),
+        sa.PrimaryKeyConstraint('id'),
+    ):
+        op.create_index('idx_consent_timestamp', 'consent_history', ['consent_id', 'timestamp'], unique=False)
+        op.create_index('idx_history_chain', 'consent_history', ['api_key_id', 'chain_seq'], unique=True)
+        op.create_index('idx_history_unsealed', 'consent_history', ['timestamp'], unique=False, postgresql_where=sa.text('chain_seq IS NULL'), sqlite_where=sa.text('chain_seq IS NULL'))
+        op.create_index('idx_session_timestamp', 'consent_history', ['session_id', 'timestamp'], unique=False)
+        op.create_index(op.f('ix_consent_history_consent_id'), 'consent_history', ['consent_id'], unique=False)
+        op.create_index(op.f('ix_consent_history_session_id'), 'consent_history', ['session_id'], unique=False)
+        op.create_index(op.f('ix_consent_history_timestamp'), 'consent_history', ['timestamp'], unique=False)
+    if migrations.create_table(
+        "idempotency_keys",
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('api_key_id', sa.Uuid(), nullable=False),
+        sa.Column('key', sa.String(length=300), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('consent_id', sa.Uuid(), nullable=True),
+        sa.Column('response', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id']),
+        sa.ForeignKeyConstraint(['consent_id'], ['consents.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('api_key_id', 'key', name='uq_idempotency_api_key_key'),
+    ):
+        op.create_index('idx_idempotency_consent', 'idempotency_keys', ['consent_id'], unique=False)
+        op.create_index(op.f('ix_idempotency_keys_expires_at'), 'idempotency_keys', ['expires_at'], unique=False)
+
+
+def downgrade():
+    if migrations.is_postgres() and migrations.has_table("script_configs"):
+        op.execute("ALTER TABLE script_configs DROP CONSTRAINT IF EXISTS fk_script_configs_published_version")
+    for table in reversed(TABLES):
+        if migrations.holds(table) and migrations.has_table(table):
+            op.drop_table(table)
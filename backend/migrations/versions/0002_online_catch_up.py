@@ -0,0 +1,66 @@
+"""online catch-up: columns and indexes added to existing tables since the first release
+
+Databases created before these features got the new tables from
+create_all but none of the new columns or indexes on existing tables.
+Everything here is skipped where it already exists (so it's a no-op after
+0001 on a new database) and runs online on Postgres: columns are added
+nullable, indexes are built concurrently, foreign keys are validated
+without blocking writes. API keys still need scripts/hash_api_keys.py to
+fill in their hashes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 05:02:11.408532
+"""
+import sqlalchemy as sa
+
+from app.core import migrations
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Hashed API keys
+    migrations.add_column("api_keys", sa.Column("key_prefix", sa.String(length=16), nullable=True))
+    migrations.add_column("api_keys", sa.Column("key_hash", sa.String(length=64), nullable=True))
+    migrations.drop_not_null("api_keys", "key")
+    migrations.create_index("ix_api_keys_key_prefix", "api_keys", ["key_prefix"])
+    migrations.create_index("ix_api_keys_key_hash", "api_keys", ["key_hash"], unique=True)
+
+    # Language packs and published config snapshots
+    migrations.add_column("script_configs", sa.Column("language_packs", sa.JSON(), nullable=True))
+    migrations.add_column("script_configs", sa.Column("published_version_id", sa.Uuid(), nullable=True))
+    migrations.add_foreign_key(
+        "fk_script_configs_published_version", "script_configs", ["published_version_id"],
+        "script_config_versions", ["id"]
+    )
+    migrations.add_column("consents", sa.Column("config_version_id", sa.Uuid(), nullable=True))
+    migrations.add_foreign_key(
+        "consents_config_version_id_fkey", "consents", ["config_version_id"], "script_config_versions", ["id"]
+    )
+
+    # Consent history sealing; older rows get their tenant now rather than when they are sealed,
+    # so tenant-scoped lookups (e.g. GET /consent/history/{id}/proof) find them
+    migrations.add_column("consent_history", sa.Column("api_key_id", sa.Uuid(), nullable=True))
+    migrations.add_column("consent_history", sa.Column("row_hash", sa.String(length=64), nullable=True))
+    migrations.add_column("consent_history", sa.Column("chain_seq", sa.BigInteger(), nullable=True))
+    migrations.add_column("consent_history", sa.Column("chain_hash", sa.String(length=64), nullable=True))
+    migrations.backfill(
+        "consent_history",
+        "api_key_id = (SELECT consents.api_key_id FROM consents WHERE consents.id = consent_history.consent_id)",
+        "api_key_id IS NULL"
+    )
+    migrations.add_foreign_key("consent_history_api_key_id_fkey", "consent_history", ["api_key_id"], "api_keys", ["id"])
+    migrations.create_index("idx_history_chain", "consent_history", ["api_key_id", "chain_seq"], unique=True)
+    migrations.create_index("idx_history_unsealed", "consent_history", ["timestamp"], where="chain_seq IS NULL")
+
+    # Retention and erasure batches walk a tenant's consents by id
+    migrations.create_index("idx_consent_api_key", "consents", ["api_key_id", "id"])
+
+
+def downgrade():
+    # The columns and indexes are part of the baseline models; nothing to undo
+    pass
@@ -0,0 +1,27 @@
+"""nullable api_keys.key on SQLite
+
+0002 let api_keys.key be NULL on Postgres only; SQLite databases kept the
+NOT NULL from the first release, so creating a (hashed) key failed there.
+drop_not_null now rebuilds the table on SQLite. A no-op on Postgres and on
+databases created from the current models.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 16:40:27.115094
+"""
+
+from app.core import migrations
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    migrations.drop_not_null("api_keys", "key")
+
+
+def downgrade():
+    # Hashed keys have no plaintext; NOT NULL can't come back
+    pass
@@ -0,0 +1,86 @@
+"""Backfill the data-subject index from existing consents.
+
+New consents maintain ``data_subject_sessions`` as they are written; run
+this once after deploying the index so consents stored before it can be
+found by user_id too. Walks every shard's consents in id order, one batch
+per transaction, and is safe to re-run:
+
+    python scripts/backfill_data_subjects.py [--batch-size 5000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select  # noqa: E402
+
+from app.core.database import dialect_insert  # noqa: E402
+from app.core.shards import dispose_shards, ensure_shard_schema, shard_engine, shard_names  # noqa: E402
+from app.models.consent import Consent  # noqa: E402
+from app.models.data_subject import DataSubjectSession  # noqa: E402
+
+
+async def backfill_shard(engine, batch_size: int):
+    """Returns (consents scanned, links added) for one shard"""
+    table = DataSubjectSession.__table__
+    scanned = linked = 0
+    after = None
+    while True:
+        query = (
+            select(Consent.id, Consent.api_key_id, Consent.user_id, Consent.session_id, Consent.created_at)
+            .where(Consent.user_id.is_not(None))
+            .order_by(Consent.id)
+            .limit(batch_size)
+        )
+        if after is not None:
+            query = query.where(Consent.id > after)
+        async with engine.begin() as conn:
+            rows = (await conn.execute(query)).all()
+            if not rows:
+                break
+            links = {}
+            for row in rows:
+                key = (row.api_key_id, row.user_id, row.session_id)
+                first, last = links.get(key, (row.created_at, row.created_at))
+                links[key] = (min(first, row.created_at), max(last, row.created_at))
+            values = [
+                {"api_key_id": api_key_id, "user_id": user_id, "session_id": session_id,
+                 "first_seen_at": first, "last_seen_at": last}
+                for (api_key_id, user_id, session_id), (first, last) in links.items()
+            ]
+            insert = dialect_insert(table, engine.dialect.name).on_conflict_do_nothing(
+                index_elements=[table.c.api_key_id, table.c.user_id, table.c.session_id]
+            )
+            result = await conn.execute(insert, values)
+        scanned += len(rows)
+        linked += max(result.rowcount, 0)
+        after = rows[-1].id
+    return scanned, linked
+
+
+async def run(batch_size: int) -> int:
+    started = time.perf_counter()
+    scanned = linked = 0
+    for name in shard_names():
+        await ensure_shard_schema(name)
+        shard_scanned, shard_linked = await backfill_shard(shard_engine(name), batch_size)
+        scanned += shard_scanned
+        linked += shard_linked
+    await dispose_shards()
+    print(f"scanned {scanned} consents with a user_id, added {linked} subject/session links "
+          f"in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000, help="Consents per transaction")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.batch_size)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark: API key lookup by plaintext vs prefix + HMAC.
+
+Fills a scratch database with --keys API keys (both representations on
+every row) and times, per request, the old lookup (equality on the
+plaintext column) and the new one (services/api_keys.find_api_key: prefix
+index, HMAC, constant-time compare), for valid and unknown keys, and what
+verify_api_key pays for a key it verified within API_KEY_CACHE_SECONDS. Needs
+SQLite with the default URL; pass --database-url to run it on a scratch
+Postgres database instead (it creates and drops the api_keys table there).
+
+    python scripts/bench_api_key_auth.py --keys 10000 --iterations 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import and_, insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from app.core.database import create_engine_for  # noqa: E402
+from app.models.api_key import APIKey  # noqa: E402
+from app.services.api_keys import (  # noqa: E402
+    api_key_cache, authenticate, find_api_key, generate_api_key, hash_api_key, key_prefix
+)
+
+
+async def plaintext_lookup(db: AsyncSession, api_key: str):
+    """verify_api_key's query before keys were hashed"""
+    result = await db.execute(
+        select(APIKey).where(
+            and_(
+                APIKey.key == api_key,
+                APIKey.is_active == True
+            )
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+def percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p99": samples[int(len(samples) * 0.99)],
+    }
+
+
+async def time_lookups(db: AsyncSession, lookup, keys: list, expect_found: bool) -> dict:
+    """Microseconds per lookup"""
+    samples = []
+    for api_key in keys:
+        started = time.perf_counter()
+        found = await lookup(db, api_key)
+        samples.append((time.perf_counter() - started) * 1e6)
+        db.expunge_all()
+        assert (found is not None) == expect_found
+    return percentiles(samples)
+
+
+async def run(args) -> int:
+    scratch = None
+    url = args.database_url
+    if url is None:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        url = f"sqlite+aiosqlite:///{scratch.name}"
+    engine = create_engine_for(url)
+    table = APIKey.__table__
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(table.drop, checkfirst=True)
+            await conn.run_sync(table.create)
+            keys = [generate_api_key() for _ in range(args.keys)]
+            for start in range(0, len(keys), 1000):
+                await conn.execute(insert(table), [
+                    {"id": uuid.uuid4(), "key": key, "key_prefix": key_prefix(key), "key_hash": hash_api_key(key),
+                     "customer_name": "bench", "is_active": True}
+                    for key in keys[start:start + 1000]
+                ])
+        valid = [random.choice(keys) for _ in range(args.iterations)]
+        unknown = [generate_api_key() for _ in range(args.iterations)]
+
+        hash_started = time.perf_counter()
+        for api_key in valid:
+            hash_api_key(api_key)
+        hmac_us = (time.perf_counter() - hash_started) / len(valid) * 1e6
+
+        async with AsyncSession(engine) as db:
+            # Warm up connections and statement caches
+            await time_lookups(db, plaintext_lookup, valid[:100], True)
+            await time_lookups(db, find_api_key, valid[:100], True)
+            results = {
+                "plaintext, valid": await time_lookups(db, plaintext_lookup, valid, True),
+                "prefix+hmac, valid": await time_lookups(db, find_api_key, valid, True),
+                "plaintext, unknown": await time_lookups(db, plaintext_lookup, unknown, False),
+                "prefix+hmac, unknown": await time_lookups(db, find_api_key, unknown, False),
+            }
+            if api_key_cache.ttl > 0:
+                api_key_cache.max_entries = max(api_key_cache.max_entries, len(valid))
+                await time_lookups(db, authenticate, valid, True)
+                results["cached, valid"] = await time_lookups(db, authenticate, valid, True)
+        if args.database_url:
+            async with engine.begin() as conn:
+                await conn.run_sync(table.drop)
+    finally:
+        await engine.dispose()
+        if scratch is not None:
+            os.unlink(scratch.name)
+
+    print(f"{args.keys} keys, {args.iterations} lookups each, {engine.dialect.name}; HMAC alone: {hmac_us:.2f} us")
+    print(f"{'lookup':<24}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    for name, stats in results.items():
+        print(f"{name:<24}{stats['mean']:>10.1f}{stats['p50']:>10.1f}{stats['p99']:>10.1f}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=10000, help="API keys in the table")
+    parser.add_argument("--iterations", type=int, default=5000, help="Lookups per case")
+    parser.add_argument("--database-url", help="Scratch database (default: a temporary SQLite file)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Micro-benchmark: per-response CPU cost of the old and new JSON paths.
+
+Compares FastAPI's default path (response_model validation, jsonable_encoder,
+stdlib json) with the fast path used by the routes (model_dump_json, orjson,
+pre-encoded config bodies) for the config, consent create and consent check
+responses.
+
+    python scripts/bench_responses.py --iterations 20000
+"""
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.api.schemas import ConsentResponse, ConsentStatus  # noqa: E402
+from app.core.responses import FastJSONResponse, PreEncodedJSONResponse, json_dumps, model_response  # noqa: E402
+
+
+def sample_config() -> dict:
+    categories = {}
+    for name in ("necessary", "functional", "analytics", "marketing", "social"):
+        categories[name] = {
+            "name": name.title(),
+            "description": "Cookies used for " + name + " purposes. " * 8,
+            "required": name == "necessary",
+            "vendors": [
+                {"id": f"{name}-{i}", "name": f"Vendor {i}", "cookies": [f"_c{i}_{j}" for j in range(6)],
+                 "privacy_policy": f"https://vendor{i}.example.com/privacy", "retention": "13 months"}
+                for i in range(8)
+            ],
+        }
+    return {
+        "script_id": "abc123def456",
+        "domain": "example.com",
+        "categories": categories,
+        "banner_config": {"position": "bottom", "theme": {"primary": "#1a73e8", "text": "#222"},
+                          "text": {"title": "We use cookies", "message": "x" * 600}},
+        "default_language": "en",
+        "supported_languages": ["en", "hi"],
+        "cookie_policy_url": "https://example.com/cookies",
+        "webhook_url": None,
+        "external_tool_url": None,
+    }
+
+
+def bench(fn, iterations: int) -> float:
+    """Return CPU microseconds per call"""
+    fn()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    config = sample_config()
+    config_body = json_dumps(config)
+    created = {"consent_id": str(uuid.uuid4()), "status": "active", "timestamp": now,
+               "expires_at": now + timedelta(days=365)}
+    check = {"has_consent": True, "consent_id": str(uuid.uuid4()),
+             "categories": {"necessary": True, "analytics": False, "marketing": True}, "last_updated": now}
+
+    cases = [
+        ("config", lambda: JSONResponse(jsonable_encoder(config)).body,
+         lambda: PreEncodedJSONResponse(config_body).body),
+        ("config (encode per request)", lambda: JSONResponse(jsonable_encoder(config)).body,
+         lambda: FastJSONResponse(config).body),
+        ("consent create", lambda: JSONResponse(jsonable_encoder(ConsentResponse(**created))).body,
+         lambda: model_response(ConsentResponse(**created)).body),
+        ("consent check", lambda: JSONResponse(jsonable_encoder(ConsentStatus(**check))).body,
+         lambda: model_response(ConsentStatus(**check)).body),
+    ]
+
+    print(f"{'response':<30}{'default us':>12}{'fast us':>12}{'speedup':>10}  ({len(config_body)} byte config)")
+    for name, default_fn, fast_fn in cases:
+        default_us = bench(default_fn, args.iterations)
+        fast_us = bench(fast_fn, args.iterations)
+        print(f"{name:<30}{default_us:>12.2f}{fast_us:>12.2f}{default_us / fast_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
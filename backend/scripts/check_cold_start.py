@@ -0,0 +1,88 @@
+"""Measure the serverless cold-start import time against a budget.
+
+Imports the Vercel entry point (api/index.py) in fresh interpreters and
+exits non-zero if the median import time exceeds the budget, with the
+slowest imports for finding the culprit. tests/test_cold_start.py runs the
+same checks as part of the test suite.
+
+    python scripts/check_cold_start.py --budget-ms 1000 --runs 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent.parent / "api"
+
+CHILD = (
+    "import sys, time\n"
+    "sys.path.insert(0, {api_dir!r})\n"
+    "started = time.perf_counter()\n"
+    "import index\n"
+    "print((time.perf_counter() - started) * 1000)\n"
+)
+
+DEFAULT_BUDGET_MS = 1000.0
+
+# Modules that must not be imported during a cold start
+DEFERRED_MODULES = ("aiohttp", "app.api.routes.consent", "app.models", "sqlalchemy.ext.asyncio")
+
+
+def measure_once() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(api_dir=str(API_DIR))],
+        check=True, capture_output=True, text=True,
+        env={**os.environ, "VERCEL": "1"},
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def import_breakdown(top: int):
+    """Return (cumulative_us, module) for the slowest imports plus all module names"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(api_dir=str(API_DIR))],
+        check=True, capture_output=True, text=True,
+        env={**os.environ, "VERCEL": "1"},
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), match.group(4)))
+    modules = {name for _, name in rows}
+    return sorted(rows, reverse=True)[:top], modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings = [measure_once() for _ in range(args.runs)]
+    median = statistics.median(timings)
+    slowest, modules = import_breakdown(args.top)
+
+    print(f"cold-start import: median {median:.0f}ms over {args.runs} runs "
+          f"(min {min(timings):.0f}ms, max {max(timings):.0f}ms), budget {args.budget_ms:.0f}ms")
+    print("slowest imports (cumulative):")
+    for cumulative_us, name in slowest:
+        print(f"  {cumulative_us / 1000:8.1f}ms  {name}")
+
+    failed = False
+    eager = [name for name in DEFERRED_MODULES if name in modules]
+    if eager:
+        print(f"FAIL: imported during cold start but should be deferred: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: median import time {median:.0f}ms exceeds budget {args.budget_ms:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Migrate API keys stored in plaintext to prefix + HMAC (app/services/api_keys.py).
+
+Run ``alembic upgrade head`` first: it adds the key_prefix/key_hash columns
+and builds their indexes without locking the table. Then two steps, so the
+keys keep working throughout a rolling deploy:
+
+    python scripts/hash_api_keys.py                    # before deploying
+    python scripts/hash_api_keys.py --clear-plaintext  # once every worker runs the new code
+
+The first run fills in the hash columns for every key, in batches ordered by
+id, one transaction per batch. Old workers keep using the plaintext column;
+new ones use the hash. The second run blanks the plaintext of every
+migrated key. Both are safe to re-run. SECRET_KEY must be the one the app
+uses.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import bindparam, inspect, select, update  # noqa: E402
+
+from app.core.database import get_engine  # noqa: E402
+from app.models.api_key import APIKey  # noqa: E402
+from app.services.api_keys import hash_api_key, key_prefix  # noqa: E402
+
+
+def _columns(sync_conn) -> dict:
+    return {column["name"]: column for column in inspect(sync_conn).get_columns("api_keys")}
+
+
+async def has_hash_columns(engine) -> bool:
+    async with engine.connect() as conn:
+        columns = await conn.run_sync(_columns)
+    return {"key_prefix", "key_hash"} <= set(columns)
+
+
+async def hash_keys(engine, batch_size: int) -> int:
+    hashed, after = 0, None
+    while True:
+        query = (
+            select(APIKey.id, APIKey.key)
+            .where(APIKey.key_hash.is_(None), APIKey.key.is_not(None))
+            .order_by(APIKey.id)
+            .limit(batch_size)
+        )
+        if after is not None:
+            query = query.where(APIKey.id > after)
+        async with engine.begin() as conn:
+            rows = (await conn.execute(query)).all()
+            if not rows:
+                return hashed
+            await conn.execute(
+                update(APIKey.__table__)
+                .where(APIKey.__table__.c.id == bindparam("row_id"))
+                .values(key_prefix=bindparam("prefix"), key_hash=bindparam("digest")),
+                [{"row_id": row.id, "prefix": key_prefix(row.key), "digest": hash_api_key(row.key)} for row in rows]
+            )
+        hashed += len(rows)
+        after = rows[-1].id
+
+
+async def clear_plaintext(engine, batch_size: int) -> int:
+    async with engine.connect() as conn:
+        columns = await conn.run_sync(_columns)
+    if not columns["key"]["nullable"]:
+        print("api_keys.key is NOT NULL in this database; keys are hashed but the plaintext stays "
+              "until `alembic upgrade head` rebuilds the table")
+        return 0
+    cleared = 0
+    while True:
+        async with engine.begin() as conn:
+            ids = (await conn.execute(
+                select(APIKey.id).where(APIKey.key.is_not(None), APIKey.key_hash.is_not(None)).limit(batch_size)
+            )).scalars().all()
+            if not ids:
+                return cleared
+            await conn.execute(update(APIKey).where(APIKey.id.in_(ids)).values(key=None))
+        cleared += len(ids)
+
+
+async def run(args) -> int:
+    engine = get_engine()
+    started = time.perf_counter()
+    try:
+        if args.clear_plaintext:
+            cleared = await clear_plaintext(engine, args.batch_size)
+            print(f"cleared the plaintext of {cleared} keys in {time.perf_counter() - started:.1f}s")
+        elif not await has_hash_columns(engine):
+            print("api_keys has no key_prefix/key_hash columns yet; run `alembic upgrade head` first")
+            return 1
+        else:
+            hashed = await hash_keys(engine, args.batch_size)
+            print(f"hashed {hashed} keys in {time.perf_counter() - started:.1f}s")
+    finally:
+        await engine.dispose()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clear-plaintext", action="store_true",
+                        help="Blank the plaintext of hashed keys (after the deploy)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Keys per transaction")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
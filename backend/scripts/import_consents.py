@@ -0,0 +1,82 @@
+"""Import historical consents exported from another CMP (OneTrust and the like).
+
+Streams a CSV or NDJSON file into the tenant's shard, validating chunks in
+one worker process per CPU, and prints a throughput report. Run the same
+command again to resume an interrupted import (see
+app/services/consent_import.py for the accepted columns):
+
+    python scripts/import_consents.py export.csv --api-key-id <uuid> --script-id <id> \\
+        --category-map '{"C0001": "necessary", "C0002": "analytics"}' [--workers 8]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.database import ensure_schema  # noqa: E402
+from app.core.shards import dispose_shards  # noqa: E402
+from app.services.consent_import import ConsentImportError, run_import  # noqa: E402
+
+READ_SIZE = 1 << 20
+
+
+def file_chunks(path: Path):
+    async def read(offset: int):
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while True:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+    return read
+
+
+def default_import_id(path: Path, script_id: str) -> str:
+    """Same file and script -> same import, so re-running resumes it"""
+    return "file-" + hashlib.sha256(f"{path.resolve()}:{script_id}".encode()).hexdigest()[:32]
+
+
+async def run(args) -> int:
+    path = Path(args.file)
+    fmt = args.format or ("ndjson" if path.suffix in (".ndjson", ".jsonl") else "csv")
+    category_map = json.loads(args.category_map) if args.category_map else {}
+    await ensure_schema()
+    try:
+        report = await run_import(
+            file_chunks(path), args.api_key_id, args.script_id, fmt,
+            args.import_id or default_import_id(path, args.script_id), category_map,
+            workers=args.workers, chunk_size=args.chunk_size, log=None if args.quiet else print
+        )
+    except ConsentImportError as e:
+        print(f"error: {e}")
+        return 1
+    finally:
+        await dispose_shards()
+    print(json.dumps(report, indent=2))
+    return 0 if report["done"] else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", help="CSV (with header row) or NDJSON export")
+    parser.add_argument("--api-key-id", type=uuid.UUID, required=True)
+    parser.add_argument("--script-id", required=True, help="Script whose categories the records are mapped onto")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="Default: from the file extension")
+    parser.add_argument("--category-map", help="JSON object: external category -> script category")
+    parser.add_argument("--import-id", help="Checkpoint name (default: derived from the file path and script)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Validation processes; 0 validates inline")
+    parser.add_argument("--chunk-size", type=int, help="Records per chunk (default IMPORT_CHUNK_SIZE)")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final report")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
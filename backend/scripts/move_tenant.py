@@ -0,0 +1,64 @@
+"""Move a tenant's consent data to another shard while it stays online.
+
+Copies the tenant's rows in batches, catches up with writes made during the
+copy, freezes writes for a few seconds to copy the last changes and switch
+the shard directory, then removes the rows from the old shard (see
+app/services/tenant_move.py). Run it again to resume an interrupted move:
+
+    python scripts/move_tenant.py --api-key-id <uuid> --to eu2 [--batch-size 1000]
+    python scripts/move_tenant.py --api-key-id <uuid> --abort
+
+Shards are configured with SHARD_DATABASE_URLS; the primary database is
+"primary". Locally, point them at separate SQLite files:
+
+    SHARD_DATABASE_URLS='{"s1": "sqlite+aiosqlite:///./shard1.db"}'
+"""
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.database import ensure_schema  # noqa: E402
+from app.core.shards import dispose_shards  # noqa: E402
+from app.services.tenant_move import MoveError, abort_move, move_tenant  # noqa: E402
+
+
+async def run(args) -> int:
+    await ensure_schema()
+    try:
+        if args.abort:
+            report = await abort_move(args.api_key_id, args.batch_size, args.max_duty_cycle)
+        else:
+            report = await move_tenant(
+                args.api_key_id, args.to, args.batch_size, args.max_duty_cycle, keep_source=args.keep_source
+            )
+    except MoveError as e:
+        print(f"error: {e}")
+        return 1
+    finally:
+        await dispose_shards()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-key-id", type=uuid.UUID, required=True)
+    parser.add_argument("--to", help="Target shard name")
+    parser.add_argument("--abort", action="store_true", help="Cancel an unfinished move and drop the partial copy")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per transaction")
+    parser.add_argument("--max-duty-cycle", type=float, default=0.5,
+                        help="Share of time spent copying; the rest is sleep")
+    parser.add_argument("--keep-source", action="store_true", help="Leave the tenant's rows on the old shard")
+    args = parser.parse_args()
+    if not args.abort and not args.to:
+        parser.error("--to is required unless --abort is given")
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
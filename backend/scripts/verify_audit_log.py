@@ -0,0 +1,167 @@
+"""Verify the sealed consent history chain (see app/services/audit_chain.py).
+
+Streams each tenant's sealed history rows in chain order and checks, one
+seal at a time across all cores, that every row still hashes to its
+row_hash, that the chain links are intact, that no row is missing and that
+the Merkle root matches the seal. Seals are checked to follow on from each
+other. Rows removed by retention or erasure are checked through their
+tombstones (hashes only). Exits non-zero if anything does not match.
+
+    python scripts/verify_audit_log.py [--api-key-id <uuid>] [--shard <name>] [--workers 8]
+
+Every configured shard is checked unless --shard is given.
+
+The chain proves nothing was changed or removed up to its latest seal; keep
+the latest chain_hash per tenant somewhere outside the database to also
+detect the tail being cut off.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import false, func, null, select, true, type_coerce, union_all  # noqa: E402
+
+from app.core.shards import dispose_shards, ensure_shard_schema, shard_engine, shard_names  # noqa: E402
+from app.models.audit_seal import AuditSeal  # noqa: E402
+from app.models.consent_history import ConsentHistory  # noqa: E402
+from app.models.pruned_history import PrunedHistory  # noqa: E402
+from app.services.audit_chain import GENESIS_HASH, HASHED_COLUMNS, chain_step, merkle_root, row_hash  # noqa: E402
+
+
+def verify_segment(seal: dict, rows: list) -> list:
+    """Check the rows of one seal (runs in a worker process); returns problems found"""
+    problems = []
+    label = f"tenant {seal['api_key_id']} seal {seal['first_seq']}-{seal['last_seq']}"
+    seqs = [row[-3] for row in rows]
+    if seqs != list(range(seal["first_seq"], seal["last_seq"] + 1)):
+        problems.append(f"{label}: expected {seal['row_count']} rows, found {len(rows)} (rows missing or moved)")
+
+    prev = seal["prev_hash"]
+    digests = []
+    for row in rows:
+        values, stored_digest, seq, stored_chain, pruned = row[:-4], row[-4], row[-3], row[-2], row[-1]
+        digest = stored_digest if pruned else row_hash(values)
+        digests.append(digest)
+        if digest != stored_digest:
+            problems.append(f"{label}: row {values[0]} (seq {seq}) was modified after sealing")
+        if chain_step(prev, stored_digest) != stored_chain:
+            problems.append(f"{label}: chain broken at seq {seq}")
+        prev = stored_chain
+    if prev != seal["chain_hash"]:
+        problems.append(f"{label}: chain head does not match the seal")
+    if merkle_root(digests) != seal["merkle_root"]:
+        problems.append(f"{label}: Merkle root does not match the seal")
+    return problems
+
+
+async def verify_tenant(conn, pool, api_key_id, fetch_size: int, max_in_flight: int, problems: list) -> int:
+    result = await conn.execute(
+        select(AuditSeal).where(AuditSeal.api_key_id == api_key_id).order_by(AuditSeal.first_seq)
+    )
+    seals = [dict(row._mapping) for row in result]
+    if not seals:
+        return 0
+
+    prev_seq, prev_hash = 0, GENESIS_HASH
+    for seal in seals:
+        if seal["first_seq"] != prev_seq + 1 or seal["prev_hash"] != prev_hash:
+            problems.append(f"tenant {api_key_id}: seal {seal['first_seq']}-{seal['last_seq']} "
+                            f"does not follow on from seq {prev_seq}")
+        prev_seq, prev_hash = seal["last_seq"], seal["chain_hash"]
+
+    history = ConsentHistory.__table__
+    present = select(
+        *(history.c[name] for name in HASHED_COLUMNS),
+        history.c.row_hash, history.c.chain_seq, history.c.chain_hash, false().label("pruned")
+    ).where(history.c.api_key_id == api_key_id, history.c.chain_seq.is_not(None))
+    pruned = select(
+        *(PrunedHistory.history_id if name == "id" else type_coerce(null(), history.c[name].type).label(name)
+          for name in HASHED_COLUMNS),
+        PrunedHistory.row_hash, PrunedHistory.chain_seq, PrunedHistory.chain_hash, true().label("pruned")
+    ).where(PrunedHistory.api_key_id == api_key_id)
+    combined = union_all(present, pruned).subquery()
+    query = (
+        select(combined)
+        .order_by(combined.c.chain_seq)
+        .execution_options(yield_per=fetch_size)
+    )
+    loop = asyncio.get_running_loop()
+    in_flight = deque()
+    seal_index, segment, verified = 0, [], 0
+
+    async def submit(seal, rows):
+        in_flight.append(loop.run_in_executor(pool, verify_segment, seal, rows))
+        if len(in_flight) >= max_in_flight:
+            problems.extend(await in_flight.popleft())
+
+    stream = await conn.stream(query)
+    async for row in stream:
+        row = tuple(row)
+        while seal_index < len(seals) and row[-3] > seals[seal_index]["last_seq"]:
+            await submit(seals[seal_index], segment)
+            seal_index, segment = seal_index + 1, []
+        if seal_index == len(seals):
+            problems.append(f"tenant {api_key_id}: row {row[0]} has chain seq {row[-3]} outside any seal")
+            continue
+        segment.append(row)
+        verified += 1
+    while seal_index < len(seals):
+        await submit(seals[seal_index], segment)
+        seal_index, segment = seal_index + 1, []
+    while in_flight:
+        problems.extend(await in_flight.popleft())
+    return verified
+
+
+async def run(api_key_id, shard, workers: int, fetch_size: int) -> int:
+    problems = []
+    started = time.perf_counter()
+    verified = unsealed = tenant_count = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name in [shard] if shard else shard_names():
+            await ensure_shard_schema(name)
+            async with shard_engine(name).connect() as conn:
+                if api_key_id:
+                    tenants = [api_key_id]
+                else:
+                    result = await conn.execute(select(AuditSeal.api_key_id).distinct())
+                    tenants = result.scalars().all()
+                shard_problems = []
+                for tenant in tenants:
+                    verified += await verify_tenant(conn, pool, tenant, fetch_size, workers * 2, shard_problems)
+                problems.extend(f"[{name}] {problem}" for problem in shard_problems)
+                tenant_count += len(tenants)
+                unsealed += await conn.scalar(
+                    select(func.count()).select_from(ConsentHistory).where(ConsentHistory.chain_seq.is_(None))
+                )
+    await dispose_shards()
+
+    elapsed = time.perf_counter() - started
+    print(f"verified {verified} rows for {tenant_count} tenant(s) in {elapsed:.1f}s "
+          f"({verified / elapsed if elapsed else 0:,.0f} rows/s, {workers} workers); {unsealed} rows not sealed yet")
+    for problem in problems:
+        print(f"  {problem}")
+    print("OK" if not problems else f"{len(problems)} problem(s) found")
+    return 1 if problems else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-key-id", type=uuid.UUID, help="Only verify this tenant")
+    parser.add_argument("--shard", help="Only verify this shard")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--fetch-size", type=int, default=5000, help="Rows fetched per round trip")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.api_key_id, args.shard, args.workers, args.fetch_size)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Report the delivered size and parse time of the code-split widget.
+
+Sizes are what the server sends (bootstrap with its chunk manifest filled in,
+gzip-compressed). Parse/compile time is measured with Node's V8 (``vm.Script``)
+when ``node`` is on the PATH; it is a relative number, not a browser timing.
+Pass ``--max-bootstrap-gzip`` to fail when the bootstrap grows past a budget.
+
+    python scripts/widget_size_report.py --max-bootstrap-gzip 8000
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.widget_assets import WIDGET_DIR, WidgetBundle  # noqa: E402
+
+# Compiles each source N times and prints the median in ms
+NODE_PARSE_TIMER = """
+const vm = require('vm');
+const sources = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const runs = Number(process.argv[1]);
+const result = {};
+for (const [name, source] of Object.entries(sources)) {
+    const times = [];
+    for (let i = 0; i < runs; i++) {
+        const started = process.hrtime.bigint();
+        new vm.Script(source, { filename: name + '-' + i + '.js' });
+        times.push(Number(process.hrtime.bigint() - started) / 1e6);
+    }
+    times.sort((a, b) => a - b);
+    result[name] = times[Math.floor(times.length / 2)];
+}
+console.log(JSON.stringify(result));
+"""
+
+
+def parse_times(bundle: WidgetBundle, runs: int) -> dict:
+    node = shutil.which("node")
+    if node is None:
+        return {}
+    sources = {name: asset.body.decode("utf-8") for name, asset in bundle.chunks.items()}
+    sources["consent-widget"] = bundle.bootstrap.body.decode("utf-8")
+    output = subprocess.run(
+        [node, "-e", NODE_PARSE_TIMER, str(runs)],
+        input=json.dumps(sources), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--max-bootstrap-gzip", type=int, default=None)
+    args = parser.parse_args()
+
+    bundle = WidgetBundle.load(WIDGET_DIR)
+    if bundle is None:
+        print("Widget not found")
+        return 1
+
+    report = bundle.report()
+    times = parse_times(bundle, args.runs)
+
+    print(f"{'file':<24}{'bytes':>10}{'gzip':>10}{'parse ms':>10}")
+    bootstrap_ms = f"{times['consent-widget']:.2f}" if times else "-"
+    print(f"{'consent-widget.js':<24}{report['bootstrap']['bytes']:>10}{report['bootstrap']['gzip_bytes']:>10}{bootstrap_ms:>10}")
+    for name, size in report["chunks"].items():
+        parse_ms = f"{times[name]:.2f}" if name in times else "-"
+        print(f"{'chunks/' + name + '.js':<24}{size['bytes']:>10}{size['gzip_bytes']:>10}{parse_ms:>10}")
+    print()
+    for path, gzip_bytes in report["gzip_bytes_by_path"].items():
+        print(f"{path:<24}{gzip_bytes:>10} bytes gzip")
+    if not times:
+        print("(node not found; parse times skipped)")
+
+    if args.max_bootstrap_gzip is not None and report["bootstrap"]["gzip_bytes"] > args.max_bootstrap_gzip:
+        print(f"FAIL: bootstrap is {report['bootstrap']['gzip_bytes']} bytes gzip, budget {args.max_bootstrap_gzip}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Shared fixtures.
+
+Tests run against throwaway SQLite databases (the primary and one extra
+shard, "eu2") on a single event loop. HTTP calls go through httpx's ASGI
+transport, so the startup hook and its background jobs don't run; tests
+call the services they exercise directly. Every test gets its own tenant.
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+import pytest
+
+_data_dir = tempfile.mkdtemp(prefix="consent-manager-tests-")
+os.environ.pop("POSTGRES_URL", None)
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_data_dir}/primary.db"
+os.environ["SHARD_DATABASE_URLS"] = json.dumps({"eu2": f"sqlite+aiosqlite:///{_data_dir}/eu2.db"})
+os.environ["DEBUG"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["ADMIN_TOKEN"] = "test-admin-token"
+
+from sqlalchemy.dialects.postgresql import UUID  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+ADMIN_HEADERS = {"X-Admin-Token": "test-admin-token"}
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    # The models use Postgres' UUID type; SQLAlchemy stores it as hex text on SQLite
+    return "CHAR(32)"
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    from app.core.shards import dispose_shards
+    loop.run_until_complete(dispose_shards())
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def run(loop):
+    """Run a coroutine to completion on the shared event loop"""
+    from app.core.database import init_db
+    loop.run_until_complete(init_db())
+    return loop.run_until_complete
+
+
+@pytest.fixture
+def client(run):
+    import httpx
+    from app.main import app
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+    yield client
+    run(client.aclose())
+
+
+async def _new_tenant(name: str, shard: str = "primary"):
+    from app.core.database import AsyncSessionLocal
+    from app.models.tenant_shard import TenantShard
+    from app.services.api_keys import issue_api_key
+    async with AsyncSessionLocal() as db:
+        api_key_obj, api_key = await issue_api_key(db, name, f"{name}@example.com")
+        db.add(TenantShard(api_key_id=api_key_obj.id, shard=shard))
+        await db.commit()
+    return api_key_obj, api_key
+
+
+@pytest.fixture
+def tenant(run, request):
+    """(APIKey row, plaintext key) of a new tenant on the primary"""
+    return run(_new_tenant(request.node.name))
+
+
+@pytest.fixture
+def new_tenant(run, request):
+    """Factory for more tenants: new_tenant(shard="eu2")"""
+    counter = iter(range(1000))
+    return lambda shard="primary": run(_new_tenant(f"{request.node.name}-{next(counter)}", shard))
+
+
+@pytest.fixture
+def published_script(run, client, tenant):
+    """Factory: create and publish a script config for the tenant, returning its script_id"""
+    _, api_key = tenant
+    counter = iter(range(1000))
+
+    def publish(**fields):
+        body = {
+            "domain": "example.com",
+            "categories": {"necessary": {"required": True}, "analytics": {"required": False}},
+            "banner_config": {},
+            "script_id": f"{tenant[0].id.hex[:12]}-{next(counter)}",
+            **fields,
+        }
+        headers = {"X-API-Key": api_key}
+        response = run(client.post("/api/script-configs", json=body, headers=headers))
+        assert response.status_code == 200, response.text
+        script_id = response.json()["script_id"]
+        response = run(client.post(f"/api/script-configs/{script_id}/publish", headers=headers))
+        assert response.status_code == 200, response.text
+        return script_id
+    return publish
@@ -0,0 +1,102 @@
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import migrations
+from app.services.api_keys import issue_api_key
+from tests.conftest import ADMIN_HEADERS
+
+# api_keys as the first release created it on SQLite
+FIRST_RELEASE_API_KEYS = [
+    """CREATE TABLE api_keys (
+        id CHAR(32) NOT NULL PRIMARY KEY,
+        "key" VARCHAR(255) NOT NULL,
+        customer_name VARCHAR(255) NOT NULL,
+        customer_email VARCHAR(255),
+        is_active BOOLEAN,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        expires_at DATETIME
+    )""",
+    'CREATE UNIQUE INDEX ix_api_keys_key ON api_keys ("key")',
+    """INSERT INTO api_keys (id, "key", customer_name, is_active)
+       VALUES ('0' || hex(randomblob(15)), 'legacy-plaintext-key', 'Old', 1)""",
+]
+
+
+def _migrate(path, steps):
+    engine = sa.create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            steps(conn)
+    engine.dispose()
+
+
+async def _issue(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            api_key_obj, _ = await issue_api_key(db, "New", "new@example.com")
+            await db.commit()
+            return api_key_obj.key
+    finally:
+        await engine.dispose()
+
+
+def test_upgraded_sqlite_database_can_create_keys(run, tmp_path):
+    path = tmp_path / "old.db"
+
+    def first_release(conn):
+        for statement in FIRST_RELEASE_API_KEYS:
+            conn.execute(sa.text(statement))
+        migrations.add_column("api_keys", sa.Column("key_prefix", sa.String(length=16), nullable=True))
+        migrations.add_column("api_keys", sa.Column("key_hash", sa.String(length=64), nullable=True))
+
+    _migrate(path, first_release)
+    # What key creation ran into after 0002 on SQLite
+    with pytest.raises(IntegrityError):
+        run(_issue(path))
+
+    _migrate(path, lambda conn: migrations.drop_not_null("api_keys", "key"))
+    assert run(_issue(path)) is None
+
+    engine = sa.create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        inspector = sa.inspect(conn)
+        assert next(c for c in inspector.get_columns("api_keys") if c["name"] == "key")["nullable"]
+        indexes = {index["name"]: index["unique"] for index in inspector.get_indexes("api_keys")}
+        assert indexes["ix_api_keys_key"]
+        assert conn.scalar(sa.text("SELECT count(*) FROM api_keys WHERE \"key\" = 'legacy-plaintext-key'")) == 1
+    engine.dispose()
+
+
+def check(run, client, api_key):
+    return run(client.get("/api/v1/consent/check", params={"session_id": "s"}, headers={"X-API-Key": api_key}))
+
+
+def test_deactivated_key_is_evicted_from_the_cache(run, client, tenant):
+    api_key_obj, api_key = tenant
+    assert check(run, client, api_key).status_code == 200  # Now cached
+
+    url = f"/api/admin/api-keys/{api_key_obj.id}/deactivate"
+    assert run(client.post(url)).status_code == 401
+    assert run(client.post(url, headers=ADMIN_HEADERS)).status_code == 200
+    assert check(run, client, api_key).status_code == 401
+
+
+def test_only_keys_without_data_can_be_deleted(run, client, tenant, new_tenant):
+    api_key_obj, api_key = tenant
+    body = {"session_id": "visitor", "consent_categories": {"analytics": True}}
+    assert run(client.post("/api/v1/consent/create", json=body, headers={"X-API-Key": api_key})).status_code == 200
+    response = run(client.delete(f"/api/admin/api-keys/{api_key_obj.id}", headers=ADMIN_HEADERS))
+    assert response.status_code == 409
+
+    unused_obj, unused = new_tenant(shard="eu2")
+    assert check(run, client, unused).status_code == 200
+    response = run(client.delete(f"/api/admin/api-keys/{unused_obj.id}", headers=ADMIN_HEADERS))
+    assert response.status_code == 200
+    assert check(run, client, unused).status_code == 401
+    keys = run(client.get("/api/admin/api-keys")).json()
+    assert str(unused_obj.id) not in {key["id"] for key in keys}
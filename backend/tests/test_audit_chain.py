@@ -0,0 +1,111 @@
+from sqlalchemy import select, update
+
+from app.core.database import AsyncSessionLocal
+from app.core.shards import shard_engine
+from app.models.consent_history import ConsentHistory
+from app.services.audit_chain import prune_history, verify_merkle_proof
+from scripts.verify_audit_log import verify_tenant
+from tests.conftest import ADMIN_HEADERS
+
+
+def record_history(run, client, api_key, changes):
+    headers = {"X-API-Key": api_key}
+    body = {"session_id": "visitor", "consent_categories": {"analytics": True}}
+    consent_id = run(client.post("/api/v1/consent/create", json=body, headers=headers)).json()["consent_id"]
+    for granted in changes:
+        body = {"session_id": "visitor", "consent_categories": {"analytics": granted}}
+        assert run(client.put(f"/api/v1/consent/{consent_id}", json=body, headers=headers)).status_code == 200
+
+
+def history_ids(run, api_key_id):
+    async def load():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ConsentHistory.id).where(ConsentHistory.api_key_id == api_key_id)
+                .order_by(ConsentHistory.chain_seq)
+            )
+            return result.scalars().all()
+    return run(load())
+
+
+def proof(run, client, api_key, history_id):
+    return run(client.get(f"/api/v1/consent/history/{history_id}/proof", headers={"X-API-Key": api_key}))
+
+
+def chain_problems(run, api_key_id):
+    async def verify():
+        problems = []
+        async with shard_engine("primary").connect() as conn:
+            verified = await verify_tenant(conn, None, api_key_id, 100, 2, problems)
+        return verified, problems
+    return run(verify())
+
+
+def seal(run, client):
+    response = run(client.post("/api/admin/audit/seal", headers=ADMIN_HEADERS))
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_audit_routes_need_the_admin_token(run, client):
+    assert run(client.get("/api/admin/audit")).status_code == 401
+    assert run(client.post("/api/admin/audit/seal")).status_code == 401
+    assert run(client.get("/api/admin/audit", headers=ADMIN_HEADERS)).json()["unsealed"] >= 0
+
+
+def test_sealed_rows_prove_against_the_merkle_root(run, client, tenant):
+    api_key_obj, api_key = tenant
+    record_history(run, client, api_key, [False, True, False])
+    first, *_ = history_ids(run, api_key_obj.id)
+    assert proof(run, client, api_key, first).status_code == 409  # Not sealed yet
+
+    assert seal(run, client)["sealed"] >= 4
+    for history_id in history_ids(run, api_key_obj.id):
+        response = proof(run, client, api_key, history_id)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["row_hash_matches"]
+        pairs = [(step["side"], step["hash"]) for step in body["proof"]]
+        assert verify_merkle_proof(body["row_hash"], pairs, body["seal"]["merkle_root"])
+        assert not verify_merkle_proof("0" * 64, pairs, body["seal"]["merkle_root"])
+    assert chain_problems(run, api_key_obj.id) == (4, [])
+
+
+def test_editing_a_sealed_row_is_detected(run, client, tenant):
+    api_key_obj, api_key = tenant
+    record_history(run, client, api_key, [False])
+    seal(run, client)
+    first, _ = history_ids(run, api_key_obj.id)
+
+    async def tamper():
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(ConsentHistory).where(ConsentHistory.id == first)
+                             .values(new_categories={"analytics": False}))
+            await db.commit()
+
+    run(tamper())
+    assert not proof(run, client, api_key, first).json()["row_hash_matches"]
+    _, problems = chain_problems(run, api_key_obj.id)
+    assert any("modified after sealing" in problem for problem in problems)
+
+
+def test_chain_still_verifies_after_pruning(run, client, tenant):
+    api_key_obj, api_key = tenant
+    record_history(run, client, api_key, [False, True, False])
+    seal(run, client)
+    ids = history_ids(run, api_key_obj.id)
+
+    async def prune():
+        async with AsyncSessionLocal() as db:
+            removed = await prune_history(db, ConsentHistory.id.in_(ids[1:3]), "retention")
+            await db.commit()
+            return removed
+
+    assert run(prune()) == 2
+    assert history_ids(run, api_key_obj.id) == [ids[0], ids[3]]
+    # Tombstones keep the chain and the remaining rows' proofs intact
+    assert chain_problems(run, api_key_obj.id) == (4, [])
+    for history_id in (ids[0], ids[3]):
+        body = proof(run, client, api_key, history_id).json()
+        pairs = [(step["side"], step["hash"]) for step in body["proof"]]
+        assert verify_merkle_proof(body["row_hash"], pairs, body["seal"]["merkle_root"])
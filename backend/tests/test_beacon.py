@@ -0,0 +1,44 @@
+import gzip
+import json
+
+from app.core.config import settings
+
+
+def events_body(count, **extra):
+    return json.dumps({
+        "v": 1, "c": "client-consent", "s": "visitor", "t": 1700000000000,
+        "e": [["preferences_opened", n, None, 1] for n in range(count)], **extra
+    }).encode()
+
+
+def post_events(run, client, script_id, body):
+    return run(client.post(f"/api/beacon/{script_id}/events", content=body, headers={"Content-Type": "text/plain"}))
+
+
+def test_gzip_event_batch_is_accepted(run, client, published_script, monkeypatch):
+    script_id = published_script()
+    monkeypatch.setattr(settings, "BEACON_SYNC_WRITES", True)
+    assert post_events(run, client, script_id, gzip.compress(events_body(3))).status_code == 204
+    assert post_events(run, client, script_id, events_body(3)).status_code == 204
+
+
+def test_event_batch_size_limits(run, client, published_script, monkeypatch):
+    script_id = published_script()
+    monkeypatch.setattr(settings, "BEACON_EVENTS_MAX_BYTES", 512)
+    monkeypatch.setattr(settings, "BEACON_EVENTS_MAX_DECODED_BYTES", 4096)
+
+    # Too large as sent
+    assert post_events(run, client, script_id, events_body(1, pad="x" * 600)).status_code == 413
+    # Small on the wire, but inflates past the decoded limit
+    bomb = gzip.compress(events_body(1, pad="x" * 100_000))
+    assert len(bomb) <= 512
+    assert post_events(run, client, script_id, bomb).status_code == 413
+    assert post_events(run, client, script_id, b"\x1f\x8b not really gzip").status_code == 400
+
+
+def test_event_batch_count_limit(run, client, published_script, monkeypatch):
+    script_id = published_script()
+    monkeypatch.setattr(settings, "BEACON_EVENTS_MAX_EVENTS", 5)
+    monkeypatch.setattr(settings, "BEACON_SYNC_WRITES", True)
+    assert post_events(run, client, script_id, gzip.compress(events_body(5))).status_code == 204
+    assert post_events(run, client, script_id, gzip.compress(events_body(6))).status_code == 422
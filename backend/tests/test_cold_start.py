@@ -0,0 +1,37 @@
+import os
+import statistics
+
+from app.core import shards
+from scripts.check_cold_start import DEFAULT_BUDGET_MS, DEFERRED_MODULES, import_breakdown, measure_once
+
+# Same budget as scripts/check_cold_start.py; override with COLD_START_BUDGET_MS on slower runners
+BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", DEFAULT_BUDGET_MS))
+
+
+def test_deferred_modules_are_not_imported_at_cold_start():
+    _, modules = import_breakdown(top=0)
+    assert [name for name in DEFERRED_MODULES if name in modules] == []
+
+
+def test_cold_start_import_within_budget():
+    assert statistics.median(measure_once() for _ in range(3)) <= BUDGET_MS
+
+
+def test_tenant_shard_schema_is_checked_once_per_process(run, client, new_tenant, monkeypatch):
+    _, api_key = new_tenant(shard="eu2")
+    checks = []
+    missing_tables = shards._missing_tables
+
+    def counting_missing_tables(sync_conn, metadata):
+        checks.append(metadata)
+        return missing_tables(sync_conn, metadata)
+
+    monkeypatch.setattr(shards, "_missing_tables", counting_missing_tables)
+    shards._schema_ready.discard("eu2")
+
+    for _ in range(3):
+        response = run(client.get("/api/v1/consent/check", params={"session_id": "s1"},
+                                  headers={"X-API-Key": api_key}))
+        assert response.status_code == 200
+    assert len(checks) == 1
+    assert "eu2" in shards._schema_ready
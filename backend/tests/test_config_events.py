@@ -0,0 +1,87 @@
+import asyncio
+
+from app.core.config import settings
+from app.services.config_events import ConfigEventHub, config_event_hub, format_sse
+
+
+def test_hub_delivers_latest_event_to_every_subscriber(run):
+    async def scenario():
+        hub = ConfigEventHub(max_subscribers=2)
+
+        async def first_event(topic):
+            events = hub.listen(topic, heartbeat=5)
+            try:
+                return await events.__anext__()
+            finally:
+                await events.aclose()
+
+        waiting = [asyncio.ensure_future(first_event("script:a")) for _ in range(2)]
+        other = asyncio.ensure_future(first_event("script:b"))
+        await asyncio.sleep(0)
+        assert hub.stats()["subscribers"] == 3 and not hub.accepting()
+
+        hub.publish(["script:a"], {"type": "published", "version": "v1"})
+        hub.publish(["script:a"], {"type": "published", "version": "v2"})
+        events = await asyncio.gather(*waiting)
+        assert not other.done()
+        other.cancel()
+        await asyncio.gather(other, return_exceptions=True)
+        return events, hub.stats()
+
+    events, stats = run(scenario())
+    # Subscribers that fell behind skip to the latest event
+    assert [event["version"] for event in events] == ["v2", "v2"]
+    assert stats == {"subscribers": 0, "topics": 0, "relay": False}
+
+
+def test_idle_subscriber_gets_heartbeats(run):
+    async def scenario():
+        hub = ConfigEventHub(max_subscribers=1)
+        events = hub.listen("script:a", heartbeat=0.01)
+        try:
+            return await events.__anext__()
+        finally:
+            await events.aclose()
+
+    assert run(scenario()) is None
+    assert format_sse(None) == b": ping\n\n"
+    assert format_sse({"type": "published", "version": "v1"}).startswith(b"id: v1\nevent: published\n")
+
+
+def test_long_poll_returns_the_next_change(run, client, tenant, published_script):
+    _, api_key = tenant
+    headers = {"X-API-Key": api_key}
+    script_id = published_script()
+    current = run(client.get(f"/api/config/{script_id}")).headers["ETag"].strip('"')
+
+    async def change_while_polling():
+        poll = asyncio.ensure_future(client.get(f"/api/config/{script_id}/events", params={"since": current}))
+        while config_event_hub.subscribers == 0:
+            await asyncio.sleep(0.01)
+        await client.put(f"/api/script-configs/{script_id}", json={"domain": "new.example.com"}, headers=headers)
+        published = await client.post(f"/api/script-configs/{script_id}/publish", headers=headers)
+        return await poll, published.json()["version"]
+
+    response, version = run(change_while_polling())
+    assert response.status_code == 200
+    assert response.json()["type"] == "published"
+    assert response.json()["version"] == version != current
+
+    # A stale version answers at once
+    stale = run(client.get(f"/api/config/{script_id}/events", params={"since": current}))
+    assert stale.json() == {"type": "version", "script_id": script_id, "version": version}
+
+
+def test_long_poll_times_out_and_respects_the_subscriber_limit(run, client, published_script, monkeypatch):
+    script_id = published_script()
+    current = run(client.get(f"/api/config/{script_id}")).headers["ETag"].strip('"')
+    url = f"/api/config/{script_id}/events"
+
+    monkeypatch.setattr(settings, "CONFIG_EVENTS_HEARTBEAT_SECONDS", 0.01)
+    assert run(client.get(url, params={"since": current})).status_code == 204
+
+    monkeypatch.setattr(config_event_hub, "max_subscribers", 0)
+    response = run(client.get(url, params={"since": current}))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+    assert run(client.get(url)).status_code == 503
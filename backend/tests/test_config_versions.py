@@ -0,0 +1,44 @@
+def test_publish_freezes_a_snapshot_that_can_be_rolled_back(run, client, tenant, published_script):
+    _, api_key = tenant
+    headers = {"X-API-Key": api_key}
+    script_id = published_script()
+    base = f"/api/script-configs/{script_id}"
+
+    def served():
+        response = run(client.get(f"/api/config/{script_id}"))
+        assert response.status_code == 200
+        return response.headers["ETag"].strip('"'), response.json()
+
+    first, first_body = served()
+    assert first_body["domain"] == "example.com"
+
+    # Editing the draft doesn't change what the widget gets until it is published
+    assert run(client.put(base, json={"domain": "shop.example.com"}, headers=headers)).status_code == 200
+    assert served()[0] == first
+    second = run(client.post(f"{base}/publish", headers=headers)).json()["version"]
+    assert second != first
+    version, body = served()
+    assert (version, body["domain"]) == (second, "shop.example.com")
+    # Publishing unchanged content reuses the snapshot
+    assert run(client.post(f"{base}/publish", headers=headers)).json()["version"] == second
+
+    versions = run(client.get(f"{base}/versions", headers=headers)).json()["versions"]
+    assert {version["version"]: version["is_current"] for version in versions} == {first: False, second: True}
+
+    response = run(client.post(f"{base}/rollback", json={"version": first}, headers=headers))
+    assert response.status_code == 200
+    assert served() == (first, first_body)
+    versions = run(client.get(f"{base}/versions", headers=headers)).json()["versions"]
+    assert {version["version"]: version["is_current"] for version in versions} == {first: True, second: False}
+    # The draft keeps the later edit
+    assert run(client.get(base, headers=headers)).json()["domain"] == "shop.example.com"
+
+    assert run(client.post(f"{base}/rollback", json={"version": "0" * 12}, headers=headers)).status_code == 404
+
+
+def test_other_tenants_cannot_roll_back(run, client, published_script, new_tenant):
+    script_id = published_script()
+    _, other = new_tenant()
+    response = run(client.post(f"/api/script-configs/{script_id}/rollback", json={"version": "0" * 12},
+                               headers={"X-API-Key": other}))
+    assert response.status_code == 404
@@ -0,0 +1,84 @@
+from sqlalchemy import func, select
+
+from app.core.database import AsyncSessionLocal
+from app.models.consent import Consent
+from app.models.consent_history import ConsentHistory
+from app.models.data_subject import DataSubjectSession
+from app.models.script_config import ScriptConfig
+from app.services.consent_import import run_import
+
+CSV = (
+    "id,session_id,user_id,created_at,analytics\n"
+    "r1,s1,u1,2024-01-01T10:00:00,yes\n"
+    "r2,s2,,2024-01-02T10:00:00,no\n"
+    "r3,s3,u1,2024-01-03T10:00:00,granted\n"
+    "r4,s4,,2024-01-04T10:00:00,denied\n"
+    "r5,s5,u2,2024-01-05T10:00:00,1\n"
+).encode()
+
+
+async def _script(api_key_id, script_id):
+    async with AsyncSessionLocal() as db:
+        db.add(ScriptConfig(
+            script_id=script_id, api_key_id=api_key_id, domain="example.com",
+            categories={"necessary": {"required": True}, "analytics": {"required": False}}, banner_config={}
+        ))
+        await db.commit()
+
+
+async def _counts(api_key_id):
+    async with AsyncSessionLocal() as db:
+        return {
+            model.__tablename__: await db.scalar(
+                select(func.count()).select_from(model).where(model.api_key_id == api_key_id)
+            )
+            for model in (Consent, ConsentHistory, DataSubjectSession)
+        }
+
+
+def source(data, fail_after=None):
+    """open_source for run_import; optionally breaks off like a dropped upload"""
+    def open_source(offset):
+        async def chunks():
+            for position in range(offset, len(data), 40):
+                if fail_after is not None and position >= fail_after:
+                    raise ConnectionError("upload interrupted")
+                yield data[position:position + 40]
+        return chunks()
+    return open_source
+
+
+def test_rerunning_an_import_writes_nothing_twice(run, tenant):
+    api_key_obj, _ = tenant
+    script_id = f"import-{api_key_obj.id.hex[:8]}"
+    run(_script(api_key_obj.id, script_id))
+
+    report = run(run_import(source(CSV), api_key_obj.id, script_id, "csv", "first", chunk_size=2))
+    assert (report["imported"], report["rejected"], report["done"]) == (5, 0, True)
+    expected = {"consents": 5, "consent_history": 5, "data_subject_sessions": 3}
+    assert run(_counts(api_key_obj.id)) == expected
+
+    # Same import again: already done, nothing is read
+    again = run(run_import(source(CSV), api_key_obj.id, script_id, "csv", "first", chunk_size=2))
+    assert again["imported"] == 5 and again["records"] == 5
+    # Same file under a new import ID: every record is recognised as a duplicate
+    duplicate = run(run_import(source(CSV), api_key_obj.id, script_id, "csv", "second", chunk_size=2))
+    assert (duplicate["imported"], duplicate["duplicates"]) == (0, 5)
+    assert run(_counts(api_key_obj.id)) == expected
+
+
+def test_interrupted_import_resumes_where_it_stopped(run, tenant):
+    api_key_obj, _ = tenant
+    script_id = f"import-{api_key_obj.id.hex[:8]}"
+    run(_script(api_key_obj.id, script_id))
+
+    try:
+        run(run_import(source(CSV, fail_after=120), api_key_obj.id, script_id, "csv", "resumed", chunk_size=2))
+    except ConnectionError:
+        pass
+    partial = run(_counts(api_key_obj.id))["consents"]
+    assert 0 < partial < 5
+
+    report = run(run_import(source(CSV), api_key_obj.id, script_id, "csv", "resumed", chunk_size=2))
+    assert (report["records"], report["imported"], report["duplicates"]) == (5, 5, 0)
+    assert run(_counts(api_key_obj.id)) == {"consents": 5, "consent_history": 5, "data_subject_sessions": 3}
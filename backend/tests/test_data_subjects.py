@@ -0,0 +1,84 @@
+from datetime import datetime
+
+from app.core.database import AsyncSessionLocal
+from app.services.data_subjects import find_footprint
+from app.services.erasure import create_erasure_job, run_erasure
+from app.services.ingest import ConsentEvent, beacon_consent_id, write_batch
+
+GRANTED = {"analytics": True}
+
+
+def create(run, client, api_key, session_id, user_id=None):
+    body = {"session_id": session_id, "user_id": user_id, "consent_categories": GRANTED}
+    response = run(client.post("/api/v1/consent/create", json=body, headers={"X-API-Key": api_key}))
+    assert response.status_code == 200, response.text
+    return response.json()["consent_id"]
+
+
+def footprint(run, api_key_id, user_id=None, session_id=None):
+    async def find():
+        async with AsyncSessionLocal() as db:
+            return await find_footprint(db, api_key_id, user_id, session_id)
+    return run(find())
+
+
+def test_update_links_the_session_to_the_user(run, client, tenant):
+    api_key_obj, api_key = tenant
+    consent_id = create(run, client, api_key, "anonymous-visit")
+    assert footprint(run, api_key_obj.id, "user-1")["consents"] == []
+
+    body = {"session_id": "anonymous-visit", "user_id": "user-1", "consent_categories": {"analytics": False}}
+    response = run(client.put(f"/api/v1/consent/{consent_id}", json=body, headers={"X-API-Key": api_key}))
+    assert response.status_code == 200, response.text
+    found = footprint(run, api_key_obj.id, "user-1")
+    assert found["session_ids"] == ["anonymous-visit"]
+    assert [str(consent["id"]) for consent in found["consents"]] == [consent_id]
+
+
+def test_beacon_ingest_links_the_session_to_the_user(run, tenant):
+    api_key_obj, _ = tenant
+    now = datetime.utcnow()
+
+    def event(client_consent_id, user_id):
+        return ConsentEvent(
+            consent_id=beacon_consent_id("shop", "browser-1", client_consent_id), api_key_id=api_key_obj.id,
+            script_id="shop", session_id="browser-1", categories=GRANTED, previous_categories=None,
+            action="created", ip_address=None, user_agent=None, referer=None, accept_language=None,
+            received_at=now, user_id=user_id
+        )
+
+    assert run(write_batch([event("c1", "user-2")])) == []
+    # A later anonymous save of the same consent keeps it attributed
+    assert run(write_batch([event("c1", None)])) == []
+    found = footprint(run, api_key_obj.id, "user-2")
+    assert found["session_ids"] == ["browser-1"]
+    assert [consent["user_id"] for consent in found["consents"]] == ["user-2"]
+
+
+def test_session_erasure_removes_the_users_links_to_it(run, client, tenant):
+    api_key_obj, api_key = tenant
+    create(run, client, api_key, "laptop", "user-3")
+    phone = create(run, client, api_key, "phone", "user-3")
+
+    response = run(client.delete("/api/v1/data-subjects/footprint", params={"session_id": "laptop"},
+                                 headers={"X-API-Key": api_key}))
+    assert response.status_code == 200
+    found = footprint(run, api_key_obj.id, "user-3")
+    assert found["session_ids"] == ["phone"]
+    assert [str(consent["id"]) for consent in found["consents"]] == [phone]
+
+
+def test_session_erasure_job_removes_the_users_links_to_it(run, client, tenant):
+    api_key_obj, api_key = tenant
+    create(run, client, api_key, "laptop", "user-4")
+    create(run, client, api_key, "phone", "user-4")
+
+    async def erase():
+        async with AsyncSessionLocal() as db:
+            job = await create_erasure_job(db, api_key_obj.id, "delete", [{"session_id": "laptop"}])
+        return await run_erasure(job.id)
+
+    job = run(erase())
+    assert job.status == "completed"
+    assert job.counts["subject_links"] == 1
+    assert footprint(run, api_key_obj.id, "user-4")["session_ids"] == ["phone"]
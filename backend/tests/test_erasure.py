@@ -0,0 +1,125 @@
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.consent import Consent
+from app.services.erasure import checkpoint_name, create_erasure_job, erasure_run_queue, run_erasure
+from app.services.jobs import job_state
+from tests.conftest import ADMIN_HEADERS
+
+
+def create_consents(run, client, api_key, count):
+    for n in range(count):
+        body = {"session_id": f"visitor-{n}", "consent_categories": {"analytics": True}}
+        response = run(client.post("/api/v1/consent/create", json=body, headers={"X-API-Key": api_key}))
+        assert response.status_code == 200, response.text
+
+
+async def _consent_count(api_key_id):
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(Consent).where(Consent.api_key_id == api_key_id))
+
+
+def test_admin_erasure_routes_need_the_admin_token(run, client, tenant):
+    api_key_obj, _ = tenant
+    body = {"api_key_id": str(api_key_obj.id), "confirm_tenant": str(api_key_obj.id)}
+    assert run(client.post("/api/admin/erasure-jobs", json=body)).status_code == 401
+    assert run(client.get("/api/admin/erasure-jobs")).status_code == 401
+    assert run(client.post("/api/admin/erasure-jobs/run")).status_code == 401
+
+
+def test_whole_tenant_erasure_needs_confirmation(run, client, tenant):
+    api_key_obj, _ = tenant
+    body = {"api_key_id": str(api_key_obj.id)}
+    response = run(client.post("/api/admin/erasure-jobs", json=body, headers=ADMIN_HEADERS))
+    assert response.status_code == 422
+    body["confirm_tenant"] = "some-other-tenant"
+    assert run(client.post("/api/admin/erasure-jobs", json=body, headers=ADMIN_HEADERS)).status_code == 422
+    body["confirm_tenant"] = str(api_key_obj.id)
+    response = run(client.post("/api/admin/erasure-jobs", json=body, headers=ADMIN_HEADERS))
+    assert response.status_code == 202
+    assert response.json()["status"] == "pending"
+
+
+def test_run_is_queued_not_inline(run, client, tenant, monkeypatch):
+    api_key_obj, api_key = tenant
+    monkeypatch.setattr(settings, "ERASURE_MAX_DUTY_CYCLE", 1.0)
+    create_consents(run, client, api_key, 2)
+    body = {"api_key_id": str(api_key_obj.id), "confirm_tenant": str(api_key_obj.id)}
+    job_id = run(client.post("/api/admin/erasure-jobs", json=body, headers=ADMIN_HEADERS)).json()["job_id"]
+
+    response = run(client.post("/api/admin/erasure-jobs/run", headers=ADMIN_HEADERS))
+    assert response.status_code == 202
+    assert run(erasure_run_queue.join(10))
+    jobs = run(client.get("/api/admin/erasure-jobs", headers=ADMIN_HEADERS)).json()
+    assert next(job for job in jobs if job["job_id"] == job_id)["status"] == "completed"
+    assert run(_consent_count(api_key_obj.id)) == 0
+
+
+def test_erasure_resumes_from_its_checkpoint(run, client, tenant, monkeypatch):
+    api_key_obj, api_key = tenant
+    monkeypatch.setattr(settings, "ERASURE_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "ERASURE_MAX_DUTY_CYCLE", 1.0)
+    create_consents(run, client, api_key, 5)
+
+    async def new_job():
+        async with AsyncSessionLocal() as db:
+            return (await create_erasure_job(db, api_key_obj.id, "delete", None)).id
+
+    async def position(job_id):
+        async with AsyncSessionLocal() as db:
+            return (await job_state(db, checkpoint_name(job_id)))["state"]["position"]
+
+    job_id = run(new_job())
+    # Each call stands in for a worker that stops after one batch
+    job = run(run_erasure(job_id, max_batches=1))
+    assert job.status == "running"
+    assert job.counts["consents"] == 2
+    assert run(position(job_id))["phase"] == "consents"
+    assert run(_consent_count(api_key_obj.id)) == 3
+
+    job = run(run_erasure(job_id, max_batches=1))
+    assert job.counts["consents"] == 4
+    assert run(_consent_count(api_key_obj.id)) == 1
+
+    for _ in range(10):
+        job = run(run_erasure(job_id, max_batches=1))
+        if job.status == "completed":
+            break
+    assert job.status == "completed"
+    assert job.counts["consents"] == 5
+    assert run(_consent_count(api_key_obj.id)) == 0
+
+
+def test_anonymized_consents_are_no_longer_given(run, client, tenant, monkeypatch):
+    api_key_obj, api_key = tenant
+    monkeypatch.setattr(settings, "ERASURE_MAX_DUTY_CYCLE", 1.0)
+    create_consents(run, client, api_key, 2)
+
+    async def anonymize():
+        async with AsyncSessionLocal() as db:
+            subjects = [{"session_id": "visitor-0"}, {"session_id": "visitor-1"}]
+            job = await create_erasure_job(db, api_key_obj.id, "anonymize", subjects)
+        return await run_erasure(job.id)
+
+    async def anonymized_rows():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Consent.id, Consent.session_id, Consent.status).where(Consent.api_key_id == api_key_obj.id)
+            )
+            return result.all()
+
+    def has_consent(session_id):
+        response = run(client.get("/api/v1/consent/check", params={"session_id": session_id},
+                                  headers={"X-API-Key": api_key}))
+        assert response.status_code == 200
+        return response.json()["has_consent"]
+
+    job = run(anonymize())
+    assert (job.status, job.counts["consents"]) == ("completed", 2)
+    rows = run(anonymized_rows())
+    assert {row.status for row in rows} == {"anonymized"}
+    assert len({row.session_id for row in rows}) == 2
+    assert all(row.session_id.startswith("anonymized:") for row in rows)
+    for session_id in ["visitor-0", "visitor-1", "anonymized"] + [row.session_id for row in rows]:
+        assert not has_consent(session_id)
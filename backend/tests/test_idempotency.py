@@ -0,0 +1,82 @@
+from sqlalchemy import delete, select
+
+from app.core.database import AsyncSessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+ACCEPT = {"session_id": "visitor-1", "consent_categories": {"analytics": True, "marketing": True}}
+REJECT = {"session_id": "visitor-1", "consent_categories": {"analytics": False, "marketing": False}}
+
+
+def create(run, client, api_key, body, idempotency_key=None):
+    headers = {"X-API-Key": api_key}
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    response = run(client.post("/api/v1/consent/create", json=body, headers=headers))
+    assert response.status_code == 200, response.text
+    return response
+
+
+async def _keys(api_key_id):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(IdempotencyKey.key).where(IdempotencyKey.api_key_id == api_key_id))
+        return sorted(result.scalars().all())
+
+
+async def _drop_session_slots(api_key_id):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.api_key_id == api_key_id, IdempotencyKey.key.like("session:%")
+        ))
+        await db.commit()
+
+
+def test_idempotency_key_replays(run, client, tenant):
+    _, api_key = tenant
+    first = create(run, client, api_key, ACCEPT, "order-1")
+    retry = create(run, client, api_key, ACCEPT, "order-1")
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["consent_id"] == first.json()["consent_id"]
+
+
+def test_idempotency_key_reused_for_other_request(run, client, tenant):
+    _, api_key = tenant
+    create(run, client, api_key, ACCEPT, "order-2")
+    response = run(client.post("/api/v1/consent/create", json=REJECT,
+                               headers={"X-API-Key": api_key, "Idempotency-Key": "order-2"}))
+    assert response.status_code == 422
+
+
+def test_double_submit_is_coalesced(run, client, tenant):
+    _, api_key = tenant
+    first = create(run, client, api_key, ACCEPT)
+    second = create(run, client, api_key, ACCEPT)
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert second.json()["consent_id"] == first.json()["consent_id"]
+
+
+def test_toggle_records_every_choice(run, client, tenant):
+    _, api_key = tenant
+    accept = create(run, client, api_key, ACCEPT)
+    reject = create(run, client, api_key, REJECT)
+    accept_again = create(run, client, api_key, ACCEPT)
+    assert "Idempotent-Replayed" not in reject.headers
+    assert "Idempotent-Replayed" not in accept_again.headers
+    assert len({r.json()["consent_id"] for r in (accept, reject, accept_again)}) == 3
+
+    # Only the latest choice is coalesced
+    repeat = create(run, client, api_key, ACCEPT)
+    assert repeat.json()["consent_id"] == accept_again.json()["consent_id"]
+
+
+def test_session_replay_stores_the_idempotency_key(run, client, tenant):
+    api_key_obj, api_key = tenant
+    first = create(run, client, api_key, ACCEPT, "attempt-1")
+    retry = create(run, client, api_key, ACCEPT, "attempt-2")
+    assert retry.json()["consent_id"] == first.json()["consent_id"]
+    assert [key for key in run(_keys(api_key_obj.id)) if key.startswith("key:")] == ["key:attempt-1", "key:attempt-2"]
+
+    # After the dedup window the second key still replays
+    run(_drop_session_slots(api_key_obj.id))
+    later = create(run, client, api_key, ACCEPT, "attempt-2")
+    assert later.headers["Idempotent-Replayed"] == "true"
+    assert later.json()["consent_id"] == first.json()["consent_id"]
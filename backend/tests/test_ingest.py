@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.core.database import AsyncSessionLocal
+from app.core.tasks import TaskRuntime
+from app.models.consent import Consent
+from app.services import ingest
+from app.services.ingest import ConsentEvent, ConsentIngestBuffer, beacon_consent_id
+from tests.conftest import ADMIN_HEADERS
+
+
+def make_buffer():
+    return ConsentIngestBuffer(batch_size=3, flush_interval_ms=1, max_pending=100, write_attempts=3, retry_backoff_ms=1)
+
+
+def test_failed_batch_is_retried_in_order(monkeypatch):
+    written, failures = [], [RuntimeError("db down"), RuntimeError("db down")]
+
+    async def flaky_write_batch(batch):
+        if failures:
+            raise failures.pop()
+        written.extend(batch)
+        return []
+
+    monkeypatch.setattr(ingest, "write_batch", flaky_write_batch)
+    buffer = make_buffer()
+    buffer._pending.extend(["a", "b", "c", "d"])
+
+    async def drain():
+        while buffer._pending:
+            await buffer._write_next_batch()
+
+    asyncio.run(drain())
+    assert written == ["a", "b", "c", "d"]
+    assert buffer.stats["retried"] == 6
+    assert buffer.stats["dropped"] == 0
+    assert buffer.stats["written"] == 4
+
+
+def test_batch_is_dropped_after_max_attempts(monkeypatch):
+    async def failing_write_batch(batch):
+        raise RuntimeError("constraint violation")
+
+    monkeypatch.setattr(ingest, "write_batch", failing_write_batch)
+    buffer = make_buffer()
+    buffer._pending.extend(["a", "b", "c", "d"])
+
+    async def attempt(times):
+        for _ in range(times):
+            await buffer._write_next_batch()
+
+    asyncio.run(attempt(3))
+    assert buffer.stats["failed_writes"] == 3
+    assert buffer.stats["dropped"] == 3
+    assert list(buffer._pending) == ["d"]
+
+
+def test_admin_reports_dropped_events(run, client):
+    assert run(client.get("/api/admin/ingest")).status_code == 401
+    response = run(client.get("/api/admin/ingest", headers=ADMIN_HEADERS))
+    assert response.status_code == 200
+    assert {"dropped", "retried", "failed_writes"} <= set(response.json())
+
+
+def test_operator_status_routes_need_the_admin_token(run, client):
+    for path in ("/api/admin/tasks", "/api/admin/events"):
+        assert run(client.get(path)).status_code == 401
+        assert run(client.get(path, headers=ADMIN_HEADERS)).status_code == 200
+    queues = run(client.get("/api/admin/tasks", headers=ADMIN_HEADERS)).json()["queues"]
+    assert "consent-ingest" in {queue["name"] for queue in queues}
+
+
+def test_runtime_drain_flushes_the_buffer_before_other_queues_stop(monkeypatch):
+    written, webhooks = [], []
+    tasks = TaskRuntime()
+    webhook_queue = tasks.queue("webhooks", concurrency=1, max_pending=10)
+
+    async def fake_write_batch(batch):
+        written.extend(batch)
+        return []
+
+    async def send(batch):
+        pass
+
+    monkeypatch.setattr(ingest, "runtime", tasks)
+    monkeypatch.setattr(ingest, "write_batch", fake_write_batch)
+    monkeypatch.setattr(ingest, "dispatch_webhooks", lambda batch: webhooks.append(webhook_queue.submit(send, batch)))
+
+    async def scenario():
+        buffer = ConsentIngestBuffer(batch_size=10, flush_interval_ms=100, max_pending=100)
+        assert buffer.submit_many(["a", "b"])
+        assert buffer.running
+        report = await tasks.drain(5)
+        return buffer, report
+
+    buffer, report = asyncio.run(scenario())
+    assert written == ["a", "b"]
+    assert webhooks == [True]  # The webhook queue still took the last flush's webhooks
+    assert report["cancelled"] == {}
+    assert not buffer.running
+    assert not buffer.submit("c")
+    assert buffer.stats["rejected_draining"] == 1
+
+
+async def _revoke(consent_id):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Consent).where(Consent.id == consent_id).values(status="revoked", revoked_at=datetime.utcnow())
+        )
+        await db.commit()
+
+
+def test_beacon_regrant_reactivates_a_revoked_consent(run, client, tenant):
+    api_key_obj, api_key = tenant
+    consent_id = beacon_consent_id("shop", "visitor", "c1")
+
+    def event(categories):
+        return ConsentEvent(
+            consent_id=consent_id, api_key_id=api_key_obj.id, script_id="shop", session_id="visitor",
+            categories=categories, previous_categories=None, action="created", ip_address=None,
+            user_agent=None, referer=None, accept_language=None, received_at=datetime.utcnow()
+        )
+
+    def has_consent():
+        response = run(client.get("/api/v1/consent/check", params={"session_id": "visitor"},
+                                  headers={"X-API-Key": api_key}))
+        return response.json()["has_consent"]
+
+    assert run(ingest.write_batch([event({"analytics": True})])) == []
+    run(_revoke(consent_id))
+    assert not has_consent()
+
+    assert run(ingest.write_batch([event({"analytics": False})])) == []
+    assert has_consent()
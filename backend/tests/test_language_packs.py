@@ -0,0 +1,41 @@
+import json
+
+from app.services.language_packs import BUILTIN_PACKS, negotiate_language
+
+
+def test_negotiation_prefers_quality_then_primary_subtag():
+    available = ["en", "hi", "pt-BR"]
+    assert negotiate_language("fr;q=1, hi-IN;q=0.8, en;q=0.5", available, "en") == "hi"
+    assert negotiate_language("pt-br", available, "en") == "pt-BR"
+    assert negotiate_language("en;q=0.2, hi;q=0", available, "hi") == "en"
+    assert negotiate_language("de, *", available, "hi") == "hi"
+    assert negotiate_language(None, available, "en") == "en"
+
+
+def test_i18n_route_negotiates_accept_language(run, client, published_script):
+    script_id = published_script(
+        supported_languages=["en", "hi"], language_packs={"hi": {"banner": {"title": "Custom title"}}}
+    )
+    url = f"/api/config/{script_id}/i18n"
+
+    hindi = run(client.get(url, headers={"Accept-Language": "hi-IN,hi;q=0.9,en;q=0.5"}))
+    assert hindi.status_code == 200
+    assert hindi.headers["Content-Language"] == "hi"
+    assert hindi.headers["Vary"] == "Accept-Language, Accept-Encoding"
+    pack = json.loads(hindi.content)
+    assert pack["banner"]["title"] == "Custom title"
+    assert pack["banner"]["acceptAll"] == BUILTIN_PACKS["hi"]["banner"]["acceptAll"]
+
+    # Unsupported language: the config's default, which is the widget's built-in English
+    fallback = run(client.get(url, headers={"Accept-Language": "fr-FR"}))
+    assert fallback.headers["Content-Language"] == "en"
+    assert fallback.headers["Vary"] == "Accept-Language, Accept-Encoding"
+    assert fallback.content == b"{}"
+
+
+def test_explicit_language_does_not_vary_on_accept_language(run, client, published_script):
+    script_id = published_script(supported_languages=["en", "hi"])
+    response = run(client.get(f"/api/config/{script_id}/i18n/hi", headers={"Accept-Language": "en"}))
+    assert response.headers["Content-Language"] == "hi"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert run(client.get(f"/api/config/{script_id}/i18n/fr")).status_code == 404
@@ -0,0 +1,138 @@
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy.exc import DBAPIError
+
+from app.core import migrations
+from app.core.config import settings
+
+
+class LockNotAvailable(Exception):
+    pgcode = migrations.LOCK_NOT_AVAILABLE
+
+
+@pytest.fixture
+def migrate(tmp_path):
+    """migrate(steps, shard="primary"): run steps(conn) under Alembic operations on a throwaway SQLite database"""
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+
+    def run_steps(steps, shard="primary"):
+        with engine.connect() as conn:
+            with Operations.context(MigrationContext.configure(conn, opts={"shard": shard})):
+                result = steps(conn)
+            conn.commit()
+        return result
+
+    yield run_steps
+    engine.dispose()
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    """Sleeps the helpers would have taken"""
+    waits = []
+    monkeypatch.setattr(migrations.time, "sleep", waits.append)
+    return waits
+
+
+def statement_failing(errors):
+    """A statement that raises each of ``errors`` in turn, then succeeds"""
+    calls = []
+
+    def statement():
+        calls.append(1)
+        if errors:
+            raise DBAPIError("ALTER TABLE consents ...", None, errors.pop(0))
+        return "done"
+    return statement, calls
+
+
+def test_lock_timeouts_are_retried_with_backoff(migrate, waits):
+    statement, calls = statement_failing([LockNotAvailable(), LockNotAvailable(), LockNotAvailable()])
+    assert migrate(lambda conn: migrations._retrying(statement)) == "done"
+    assert len(calls) == 4
+    assert waits == [0.5, 1.0, 2.0]
+
+
+def test_other_errors_and_exhausted_retries_are_raised(migrate, waits, monkeypatch):
+    statement, calls = statement_failing([ValueError("syntax error")])
+    with pytest.raises(DBAPIError):
+        migrate(lambda conn: migrations._retrying(statement))
+    assert (len(calls), waits) == (1, [])
+
+    monkeypatch.setattr(settings, "MIGRATION_LOCK_RETRIES", 2)
+    statement, calls = statement_failing([LockNotAvailable() for _ in range(5)])
+    with pytest.raises(DBAPIError):
+        migrate(lambda conn: migrations._retrying(statement))
+    assert len(calls) == 3
+    assert waits == [0.5, 1.0]
+
+
+def create_consents(conn, count):
+    conn.execute(sa.text("CREATE TABLE consents (id INTEGER PRIMARY KEY, status VARCHAR(20), region VARCHAR(10))"))
+    conn.execute(sa.text("INSERT INTO consents (id, status) VALUES (:id, 'active')"),
+                 [{"id": n} for n in range(1, count + 1)])
+
+
+def region_counts(conn):
+    return dict(conn.execute(sa.text("SELECT coalesce(region, 'none'), count(*) FROM consents GROUP BY 1")).all())
+
+
+def test_backfill_updates_in_batches_and_resumes(migrate, waits, monkeypatch):
+    monkeypatch.setattr(settings, "MIGRATION_BACKFILL_MAX_DUTY_CYCLE", 1.0)
+
+    def interrupted(conn):
+        create_consents(conn, 7)
+        # A row the app already wrote, and a first run that stopped after a few rows
+        conn.execute(sa.text("UPDATE consents SET region = 'eu' WHERE id IN (2, 3)"))
+
+    migrate(interrupted)
+    updated = migrate(lambda conn: migrations.backfill("consents", "region = 'in'", "region IS NULL", batch_size=2))
+    assert updated == 5
+    assert migrate(region_counts) == {"eu": 2, "in": 5}
+    assert waits == []  # Duty cycle 1.0: no pauses
+
+    # Re-running finds nothing left to do
+    assert migrate(lambda conn: migrations.backfill("consents", "region = 'in'", "region IS NULL", batch_size=2)) == 0
+
+
+def test_backfill_pauses_to_stay_under_the_duty_cycle(migrate, waits, monkeypatch):
+    monkeypatch.setattr(settings, "MIGRATION_BACKFILL_MAX_DUTY_CYCLE", 0.25)
+    clock = iter(n / 10 for n in range(1000))
+    monkeypatch.setattr(migrations.time, "perf_counter", lambda: next(clock))
+
+    migrate(lambda conn: create_consents(conn, 5))
+    assert migrate(lambda conn: migrations.backfill("consents", "region = 'in'", "region IS NULL", batch_size=2)) == 5
+    # Each batch took 0.1s on the fake clock; at 25% busy it is followed by 0.3s of sleep
+    assert waits == pytest.approx([0.3, 0.3, 0.3])
+
+
+def test_shards_skip_tables_they_do_not_hold(migrate):
+    def create_tables(conn):
+        conn.execute(sa.text("CREATE TABLE api_keys (id INTEGER PRIMARY KEY, key_hash VARCHAR(64))"))
+        conn.execute(sa.text("INSERT INTO api_keys (id) VALUES (1)"))
+        create_consents(conn, 1)
+
+    migrate(create_tables, shard="eu2")
+
+    def changes(conn):
+        migrations.add_column("api_keys", sa.Column("key_prefix", sa.String(16), nullable=True))
+        migrations.add_column("consents", sa.Column("source", sa.String(20), nullable=True))
+        return migrations.backfill("api_keys", "key_hash = 'x'", "key_hash IS NULL")
+
+    assert migrate(changes, shard="eu2") == 0
+
+    def columns(conn):
+        inspector = sa.inspect(conn)
+        return {table: {c["name"] for c in inspector.get_columns(table)} for table in ("api_keys", "consents")}
+
+    found = migrate(columns)
+    assert "key_prefix" not in found["api_keys"]
+    assert "source" in found["consents"]
+
+
+def test_new_not_null_columns_must_go_through_backfill(migrate):
+    migrate(lambda conn: create_consents(conn, 1))
+    with pytest.raises(ValueError, match="backfill"):
+        migrate(lambda conn: migrations.add_column("consents", sa.Column("source", sa.String(20), nullable=False)))
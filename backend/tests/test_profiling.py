@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.profiling import StackSampler, profiler
+from tests.conftest import ADMIN_HEADERS
+
+
+def _busy_profiled(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _busy_other(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampler_only_counts_the_profiled_task(run):
+    async def profiled():
+        sampler = StackSampler(1.0)
+        sampler.start()
+        for _ in range(10):
+            _busy_profiled(0.01)
+            await asyncio.sleep(0)
+        return sampler.stop()
+
+    async def other():
+        for _ in range(10):
+            _busy_other(0.01)
+            await asyncio.sleep(0)
+
+    async def scenario():
+        counts, _ = await asyncio.gather(profiled(), other())
+        return counts
+
+    stacks = run(scenario())
+    assert any("_busy_profiled" in stack for stack in stacks)
+    assert not any("_busy_other" in stack for stack in stacks)
+    assert any(stack.endswith(";(waiting)") for stack in stacks)
+
+
+def test_arming_requires_admin_token(run, client, monkeypatch):
+    assert not settings.PROFILING_ENABLED
+    response = run(client.post("/api/admin/profiling", json={"requests": 1}))
+    assert response.status_code == 401
+    response = run(client.post("/api/admin/profiling", json={"requests": 1}, headers=ADMIN_HEADERS))
+    assert response.status_code == 403
+
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    response = run(client.post("/api/admin/profiling", json={"requests": 1}, headers=ADMIN_HEADERS))
+    assert response.status_code == 200
+    assert response.json()["remaining"] == 1
+    profiler.arm(0)
+
+
+def test_profile_is_written(run, client, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_OUTPUT_DIR", str(tmp_path))
+    profiler.arm(1, "/api/admin/tasks")
+    response = run(client.get("/api/admin/tasks", headers=ADMIN_HEADERS))
+    assert response.status_code == 200
+    assert "server-timing" in response.headers
+    assert len(list(tmp_path.glob("*.folded"))) == 1
@@ -0,0 +1,45 @@
+import asyncio
+
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter, rate_limiter, request_keys
+from app.services.api_keys import key_prefix
+
+
+def test_rejected_request_takes_no_tokens():
+    limiter = RateLimiter()
+    limiter.defaults = {"ip": (0.001, 2), "script": (0.001, 5), "key": (0.001, 5)}
+
+    async def scenario():
+        abusive = [await limiter.check(["ip:10.0.0.1", "script:shop"]) for _ in range(10)]
+        others = [await limiter.check([f"ip:10.0.1.{n}", "script:shop"]) for n in range(4)]
+        return abusive, others
+
+    abusive, others = asyncio.run(scenario())
+    assert [retry_after == 0 for retry_after in abusive] == [True, True] + [False] * 8
+    # The script bucket only paid for the abusive IP's two admitted requests
+    assert [retry_after == 0 for retry_after in others] == [True, True, True, False]
+
+
+def test_middleware_checks_ip_first_and_ignores_unverified_keys():
+    scope = {
+        "path": "/api/config/shop",
+        "headers": [(b"x-api-key", b"forged-key")],
+        "query_string": b"",
+        "client": ("203.0.113.9", 5000),
+    }
+    assert request_keys(scope) == ["ip:203.0.113.9", "script:shop"]
+
+
+def test_key_quota_is_charged_after_verification(run, client, tenant, monkeypatch):
+    _, api_key = tenant
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(rate_limiter.quotas, f"key:{key_prefix(api_key)}", (0.001, 1))
+
+    def check(key):
+        return run(client.get("/api/v1/consent/check", params={"session_id": "s"}, headers={"X-API-Key": key}))
+
+    assert check(key_prefix(api_key) + "forged").status_code == 401
+    assert check(api_key).status_code == 200
+    limited = check(api_key)
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
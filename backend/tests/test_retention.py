@@ -0,0 +1,101 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.consent import Consent
+from app.models.consent_history import ConsentHistory
+from app.models.retention_policy import RetentionPolicy
+from app.services.jobs import job_state
+from app.services.retention import JOB_NAME, run_retention
+from tests.conftest import ADMIN_HEADERS
+
+GRANTED = {"analytics": True}
+DENIED = {"analytics": False}
+
+# (action, previous, new); the first and last rows are always kept
+HISTORY = [
+    ("created", None, GRANTED),
+    ("updated", GRANTED, GRANTED),
+    ("banner_shown", GRANTED, GRANTED),
+    ("withdrawn", GRANTED, DENIED),
+    ("updated", DENIED, DENIED),
+    ("updated", DENIED, DENIED),
+    ("updated", DENIED, GRANTED),  # Re-grant
+    ("updated", GRANTED, GRANTED),
+    ("updated", GRANTED, GRANTED),
+    ("updated", GRANTED, GRANTED),
+]
+
+
+async def _seed(api_key_id, consent_id=None, rows=HISTORY, first_seq=1, days_ago=100):
+    async with AsyncSessionLocal() as db:
+        if consent_id is None:
+            consent_id = uuid.uuid4()
+            db.add(RetentionPolicy(api_key_id=api_key_id, compact_history_after_days=30))
+            db.add(Consent(id=consent_id, session_id="visitor", api_key_id=api_key_id, consent_categories=GRANTED))
+        start = datetime.utcnow() - timedelta(days=days_ago)
+        for n, (action, previous, new) in enumerate(rows):
+            db.add(ConsentHistory(
+                consent_id=consent_id, session_id="visitor", api_key_id=api_key_id, action=action,
+                previous_categories=previous, new_categories=new,
+                timestamp=start + timedelta(hours=n), chain_seq=first_seq + n,
+                row_hash="0" * 64, chain_hash="0" * 64
+            ))
+        await db.commit()
+    return consent_id
+
+
+async def _history(consent_id):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ConsentHistory).where(ConsentHistory.consent_id == consent_id).order_by(ConsentHistory.timestamp)
+        )
+        return [(row.action, row.previous_categories, row.new_categories) for row in result.scalars()]
+
+
+def test_compaction_keeps_every_change_to_the_grants(run, tenant, monkeypatch):
+    api_key_obj, _ = tenant
+    monkeypatch.setattr(settings, "RETENTION_MAX_DUTY_CYCLE", 1.0)
+    consent_id = run(_seed(api_key_obj.id))
+
+    assert run(run_retention()) is not None
+    summary = ("compacted", GRANTED, GRANTED)
+    assert run(_history(consent_id)) == [
+        ("created", None, GRANTED), summary,
+        ("withdrawn", GRANTED, DENIED), ("compacted", DENIED, DENIED),
+        ("updated", DENIED, GRANTED), summary,
+        ("updated", GRANTED, GRANTED),
+    ]
+
+
+def test_next_pass_starts_from_the_watermark(run, tenant, monkeypatch):
+    api_key_obj, _ = tenant
+    monkeypatch.setattr(settings, "RETENTION_MAX_DUTY_CYCLE", 1.0)
+    consent_id = run(_seed(api_key_obj.id))
+    run(run_retention())
+
+    async def watermark():
+        async with AsyncSessionLocal() as db:
+            return (await job_state(db, JOB_NAME))["state"]["watermarks"].get(str(api_key_id))
+
+    api_key_id = api_key_obj.id
+    first = run(watermark())
+    assert first is not None
+
+    # Rows from before the watermark were already considered and are not read again
+    late = [("updated", GRANTED, GRANTED)] * 3
+    run(_seed(api_key_id, consent_id, late, first_seq=100, days_ago=200))
+    before = run(_history(consent_id))
+    state = run(run_retention())
+    assert state["last_pass"]["history_rows_compacted"] == 0
+    assert run(_history(consent_id)) == before
+    assert run(watermark()) >= first
+
+
+def test_admin_retention_routes_need_the_admin_token(run, client):
+    assert run(client.get("/api/admin/retention")).status_code == 401
+    assert run(client.post("/api/admin/retention/run")).status_code == 401
+    assert run(client.get("/api/admin/retention", headers=ADMIN_HEADERS)).status_code == 200
@@ -0,0 +1,72 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.core.shards import shard_engine
+from app.models.consent import Consent
+from app.models.consent_history import ConsentHistory
+from app.services import tenant_move
+from tests.conftest import ADMIN_HEADERS
+
+
+async def _no_wait(seconds):
+    pass
+
+
+async def _old_consent(api_key_id):
+    """A consent written long before the move, so only its update can bring it into a catch-up pass"""
+    consent_id = uuid.uuid4()
+    created = datetime.utcnow() - timedelta(days=3)
+    async with AsyncSessionLocal() as db:
+        db.add(Consent(
+            id=consent_id, session_id="visitor", api_key_id=api_key_id, consent_categories={"analytics": True},
+            status="active", created_at=created, updated_at=created, expires_at=created + timedelta(days=365)
+        ))
+        await db.commit()
+    return consent_id
+
+
+async def _on_shard(shard, table, condition):
+    async with shard_engine(shard).connect() as conn:
+        return (await conn.execute(select(table).where(condition))).all()
+
+
+def test_catch_up_copies_consents_updated_during_the_move(run, client, tenant, monkeypatch):
+    api_key_obj, api_key = tenant
+    consent_id = run(_old_consent(api_key_obj.id))
+    # The cache-expiry waits are not what this test is about
+    monkeypatch.setattr(tenant_move, "asyncio", SimpleNamespace(sleep=_no_wait))
+
+    real_copy_table = tenant_move.copy_table
+    updated = []
+
+    async def copy_then_update(source, target, table, api_key_id, batch_size, max_duty_cycle, since=None):
+        copied = await real_copy_table(source, target, table, api_key_id, batch_size, max_duty_cycle, since)
+        if table.name == "consents" and since is None:
+            # The visitor changes their mind after the bulk copy read the row
+            body = {"session_id": "visitor", "consent_categories": {"analytics": False}}
+            response = await client.put(f"/api/v1/consent/{consent_id}", json=body, headers={"X-API-Key": api_key})
+            updated.append(response.status_code)
+        return copied
+
+    monkeypatch.setattr(tenant_move, "copy_table", copy_then_update)
+    report = run(tenant_move.move_tenant(api_key_obj.id, "eu2", log=lambda message: None))
+
+    assert updated == [200]
+    assert report["rows"]["consents"] == 1
+    [moved] = run(_on_shard("eu2", Consent.__table__, Consent.__table__.c.id == consent_id))
+    assert moved.consent_categories == {"analytics": False}
+    history = run(_on_shard("eu2", ConsentHistory.__table__, ConsentHistory.__table__.c.consent_id == consent_id))
+    assert [row.action for row in history] == ["updated"]
+    assert run(_on_shard("primary", Consent.__table__, Consent.__table__.c.id == consent_id)) == []
+
+
+def test_shard_overview_needs_the_admin_token(run, client, new_tenant):
+    new_tenant(shard="eu2")
+    assert run(client.get("/api/admin/shards")).status_code == 401
+    response = run(client.get("/api/admin/shards", headers=ADMIN_HEADERS))
+    assert response.status_code == 200
+    assert {"primary", "eu2"} <= {shard["name"] for shard in response.json()["shards"]}
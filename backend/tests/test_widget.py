@@ -0,0 +1,50 @@
+from app.services.widget_assets import WIDGET_DIR, WidgetBundle
+
+
+def test_bootstrap_leaves_optional_code_to_chunks():
+    bundle = WidgetBundle.load(WIDGET_DIR)
+    bootstrap = bundle.bootstrap.body.decode("utf-8")
+    assert {"banner", "preferences", "data-request", "events"} <= set(bundle.chunks)
+    # Manifest filled in; the event queue and chunk-only strings are not in the bootstrap
+    assert f'"events":"{bundle.chunks["events"].version}"' in bootstrap
+    assert "CompressionStream" not in bootstrap
+    assert "Preference Center" not in bootstrap
+
+
+def test_returning_visitor_only_loads_the_bootstrap(run, client):
+    report = run(client.get("/api/admin/widget")).json()
+    paths = report["gzip_bytes_by_path"]
+    assert paths["returning_visitor"] == report["bootstrap"]["gzip_bytes"]
+    assert paths["returning_visitor"] < paths["first_visit"] < paths["preferences_opened"]
+
+
+def test_widget_is_served_gzipped_and_revalidated_by_etag(run, client):
+    bundle = WidgetBundle.load(WIDGET_DIR)
+    plain = run(client.get("/widget/consent-widget.js", headers={"Accept-Encoding": "identity"}))
+    assert plain.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+    assert plain.content == bundle.bootstrap.body
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    gzipped = run(client.get("/widget/consent-widget.js", headers={"Accept-Encoding": "gzip, br"}))
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.content == bundle.bootstrap.body  # httpx decodes it
+    assert gzipped.headers["ETag"] == plain.headers["ETag"] == bundle.bootstrap.etag
+
+    revalidated = run(client.get("/widget/consent-widget.js", headers={"If-None-Match": bundle.bootstrap.etag}))
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == bundle.bootstrap.etag
+    assert "Cache-Control" in revalidated.headers
+
+    stale = run(client.get("/widget/consent-widget.js", headers={"If-None-Match": '"not-the-version"'}))
+    assert stale.status_code == 200
+
+
+def test_versioned_chunks_are_immutable(run, client):
+    events = WidgetBundle.load(WIDGET_DIR).chunks["events"]
+    current = run(client.get(f"/widget/chunks/events.{events.version}.js"))
+    assert current.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert current.content == events.body
+    assert run(client.get("/widget/chunks/events.0ld.js")).headers["Cache-Control"] == "no-cache"
+    assert run(client.get("/widget/chunks/missing.js")).status_code == 404
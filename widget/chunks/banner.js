@@ -0,0 +1,334 @@
+/**
+ * Consent widget chunk: first-visit consent banner
+ * Only loaded for visitors who have not made a choice yet
+ */
+
+(window.ConsentWidgetChunks = window.ConsentWidgetChunks || {}).banner = function(widget) {
+    'use strict';
+
+    const { config, t, loadChunk, saveConsent, createPersistentSettingsLink, showPreferencesModal } = widget;
+
+    widget.addEnglishDefaults({
+        banner: {
+            title: "Why we use cookies and other tracking technologies?",
+            message: "Our site enables script (e.g. cookies) that is able to read, store, and write information on your browser and in your device. The information processed by this script includes data relating to you which may include personal identifiers (e.g. IP address and session details) and browsing activity. We use this information for various purposes - e.g. to deliver content, maintain security, enable user choice, improve our sites, and for marketing purposes. You can reject all non-essential processing by choosing to accept only necessary cookies. To personalize your choice and learn more click here to adjust your preferences",
+            acceptAll: "Allow All",
+            rejectAll: "Accept only necessary",
+            customize: "Adjust my preferences",
+            learnMore: "Learn more",
+            cookieNotice: "Cookie Notice"
+        }
+    });
+
+    // Create banner - OneTrust style (centered modal)
+    function createBanner() {
+        if (document.getElementById('consent-banner')) return;
+        
+        const position = config.bannerConfig.position || 'bottom';
+        const primaryColor = config.bannerConfig.colors?.primary || '#00A862'; // OneTrust green
+        
+        // OneTrust uses centered modal, but we support bottom too
+        if (position === 'center') {
+            // Centered modal style (OneTrust)
+            const overlay = document.createElement('div');
+            overlay.id = 'consent-banner-overlay';
+            overlay.style.cssText = `
+                position: fixed;
+                top: 0;
+                left: 0;
+                right: 0;
+                bottom: 0;
+                background: rgba(0, 0, 0, 0.5);
+                z-index: 10000;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                padding: 20px;
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
+            `;
+            
+            const banner = document.createElement('div');
+            banner.id = 'consent-banner';
+            banner.setAttribute('role', 'dialog');
+            banner.setAttribute('aria-label', t('banner.title'));
+            banner.style.cssText = `
+                background: #f5f5f5;
+                border-radius: 8px;
+                max-width: 800px;
+                width: 100%;
+                max-height: 90vh;
+                overflow-y: auto;
+                box-shadow: 0 10px 40px rgba(0,0,0,0.3);
+                position: relative;
+            `;
+            
+            banner.innerHTML = `
+                <div style="padding: 30px; display: flex; gap: 20px; align-items: flex-start;">
+                    <!-- Cookie Icon -->
+                    <div style="flex-shrink: 0; width: 60px; height: 60px; display: flex; align-items: center; justify-content: center;">
+                        <svg width="48" height="48" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg">
+                            <path d="M12 2C6.48 2 2 6.48 2 12s4.48 10 10 10 10-4.48 10-10S17.52 2 12 2zm-2 15l-5-5 1.41-1.41L10 14.17l7.59-7.59L19 8l-9 9z" fill="#00A862"/>
+                            <circle cx="8.5" cy="10.5" r="1" fill="#00A862"/>
+                            <circle cx="15.5" cy="10.5" r="1" fill="#00A862"/>
+                            <circle cx="12" cy="15" r="1" fill="#00A862"/>
+                        </svg>
+                    </div>
+                    
+                    <!-- Content -->
+                    <div style="flex: 1; min-width: 0;">
+                        <h3 style="margin: 0 0 16px 0; font-size: 20px; font-weight: 600; color: #1a1a1a; line-height: 1.3;">
+                            ${t('banner.title')}
+                        </h3>
+                        <p style="margin: 0 0 20px 0; font-size: 14px; color: #4a4a4a; line-height: 1.6;">
+                            ${t('banner.message')}
+                            ${config.cookiePolicyUrl ? ` <a href="${config.cookiePolicyUrl}" target="_blank" style="color: ${primaryColor}; text-decoration: underline; font-weight: 600;">${t('banner.cookieNotice')}</a>` : ''}
+                        </p>
+                        
+                        <!-- Buttons - Stacked vertically (OneTrust style) -->
+                        <div style="display: flex; flex-direction: column; gap: 10px;">
+                            <button id="consent-accept-all" style="
+                                padding: 14px 24px; 
+                                background: ${primaryColor}; 
+                                color: white; 
+                                border: none; 
+                                border-radius: 6px; 
+                                cursor: pointer; 
+                                font-size: 14px; 
+                                font-weight: 600; 
+                                transition: all 0.2s;
+                                width: 100%;
+                                text-align: center;
+                            ">
+                                ${t('banner.acceptAll')}
+                            </button>
+                            <button id="consent-reject-all" style="
+                                padding: 14px 24px; 
+                                background: ${primaryColor}; 
+                                color: white; 
+                                border: none; 
+                                border-radius: 6px; 
+                                cursor: pointer; 
+                                font-size: 14px; 
+                                font-weight: 600; 
+                                transition: all 0.2s;
+                                width: 100%;
+                                text-align: center;
+                            ">
+                                ${t('banner.rejectAll')}
+                            </button>
+                            <button id="consent-customize" style="
+                                padding: 14px 24px; 
+                                background: transparent; 
+                                color: ${primaryColor}; 
+                                border: 2px solid ${primaryColor}; 
+                                border-radius: 6px; 
+                                cursor: pointer; 
+                                font-size: 14px; 
+                                font-weight: 600; 
+                                transition: all 0.2s;
+                                width: 100%;
+                                text-align: center;
+                            ">
+                                ${t('banner.customize')}
+                            </button>
+                        </div>
+                    </div>
+                </div>
+            `;
+            
+            overlay.appendChild(banner);
+            document.body.appendChild(overlay);
+            
+            // Close on overlay click
+            overlay.addEventListener('click', (e) => {
+                if (e.target === overlay) {
+                    // Don't close on overlay click for OneTrust style - user must make a choice
+                }
+            });
+            
+            // Add hover effects
+            const buttons = banner.querySelectorAll('button');
+            buttons.forEach(btn => {
+                btn.addEventListener('mouseenter', function() {
+                    if (this.id === 'consent-customize') {
+                        this.style.background = primaryColor + '10';
+                    } else {
+                        this.style.opacity = '0.9';
+                        this.style.transform = 'translateY(-1px)';
+                    }
+                });
+                btn.addEventListener('mouseleave', function() {
+                    if (this.id === 'consent-customize') {
+                        this.style.background = 'transparent';
+                    } else {
+                        this.style.opacity = '1';
+                        this.style.transform = 'translateY(0)';
+                    }
+                });
+            });
+            
+            // Event listeners
+            document.getElementById('consent-accept-all').addEventListener('click', () => {
+                const allCategories = {};
+                Object.keys(config.categories).forEach(key => {
+                    allCategories[key] = true;
+                });
+                saveConsent(allCategories, 'accepted_all');
+                overlay.remove();
+                createPersistentSettingsLink();
+            });
+            
+            document.getElementById('consent-reject-all').addEventListener('click', () => {
+                const essentialOnly = {};
+                Object.keys(config.categories).forEach(key => {
+                    essentialOnly[key] = config.categories[key].required || false;
+                });
+                saveConsent(essentialOnly, 'rejected_all');
+                overlay.remove();
+                createPersistentSettingsLink();
+            });
+            
+            // Start fetching the preference center as soon as it looks likely to be needed
+            document.getElementById('consent-customize').addEventListener('mouseenter', () => loadChunk('preferences').catch(() => {}));
+            document.getElementById('consent-customize').addEventListener('click', () => {
+                overlay.remove();
+                showPreferencesModal();
+            });
+            
+        } else {
+            // Original bottom banner style (fallback)
+            const banner = document.createElement('div');
+            banner.id = 'consent-banner';
+            banner.setAttribute('role', 'banner');
+            banner.setAttribute('aria-label', t('banner.title'));
+            
+            banner.style.cssText = `
+                position: fixed;
+                ${position === 'top' ? 'top: 0;' : 'bottom: 0;'}
+                left: 0;
+                right: 0;
+                background: #ffffff;
+                padding: 24px 0;
+                box-shadow: 0 ${position === 'top' ? '2px' : '-2px'} 20px rgba(0,0,0,0.15);
+                z-index: 10000;
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
+                border-top: ${position === 'bottom' ? '1px solid #e0e0e0' : 'none'};
+                border-bottom: ${position === 'top' ? '1px solid #e0e0e0' : 'none'};
+            `;
+            
+            banner.innerHTML = `
+                <div style="max-width: 1400px; margin: 0 auto; padding: 0 20px;">
+                    <div style="display: flex; align-items: flex-start; justify-content: space-between; gap: 30px; flex-wrap: wrap;">
+                        <div style="flex: 1; min-width: 300px; max-width: 800px;">
+                            <h3 style="margin: 0 0 12px 0; font-size: 20px; font-weight: 600; color: #1a1a1a;">${t('banner.title')}</h3>
+                            <p style="margin: 0 0 12px 0; font-size: 14px; color: #4a4a4a; line-height: 1.7;">
+                                ${t('banner.message')}
+                            </p>
+                            ${config.cookiePolicyUrl ? `
+                                <p style="margin: 0; font-size: 13px;">
+                                    <a href="${config.cookiePolicyUrl}" target="_blank" style="color: ${primaryColor}; text-decoration: underline; font-weight: 500;">${t('banner.cookieNotice')}</a>
+                                </p>
+                            ` : ''}
+                        </div>
+                        <div style="display: flex; gap: 12px; flex-wrap: wrap; align-items: center; flex-shrink: 0;">
+                            <button id="consent-accept-all" style="
+                                padding: 12px 24px; 
+                                background: ${primaryColor}; 
+                                color: white; 
+                                border: none; 
+                                border-radius: 6px; 
+                                cursor: pointer; 
+                                font-size: 14px; 
+                                font-weight: 600; 
+                                transition: all 0.2s;
+                                white-space: nowrap;
+                                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                            ">
+                                ${t('banner.acceptAll')}
+                            </button>
+                            <button id="consent-reject-all" style="
+                                padding: 12px 24px; 
+                                background: ${primaryColor}; 
+                                color: white; 
+                                border: none; 
+                                border-radius: 6px; 
+                                cursor: pointer; 
+                                font-size: 14px; 
+                                font-weight: 600; 
+                                transition: all 0.2s;
+                                white-space: nowrap;
+                                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                            ">
+                                ${t('banner.rejectAll')}
+                            </button>
+                            <button id="consent-customize" style="
+                                padding: 12px 24px; 
+                                background: ${primaryColor}; 
+                                color: white; 
+                                border: none; 
+                                border-radius: 6px; 
+                                cursor: pointer; 
+                                font-size: 14px; 
+                                font-weight: 600; 
+                                transition: all 0.2s;
+                                white-space: nowrap;
+                                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                            ">
+                                ${t('banner.customize')}
+                            </button>
+                        </div>
+                    </div>
+                </div>
+            `;
+            
+            document.body.appendChild(banner);
+            
+            // Add hover effects
+            const buttons = banner.querySelectorAll('button');
+            buttons.forEach(btn => {
+                btn.addEventListener('mouseenter', function() {
+                    this.style.opacity = '0.9';
+                    this.style.transform = 'translateY(-1px)';
+                    this.style.boxShadow = '0 4px 8px rgba(0,0,0,0.15)';
+                });
+                btn.addEventListener('mouseleave', function() {
+                    this.style.opacity = '1';
+                    this.style.transform = 'translateY(0)';
+                    this.style.boxShadow = '0 2px 4px rgba(0,0,0,0.1)';
+                });
+                btn.addEventListener('mousedown', function() {
+                    this.style.transform = 'translateY(0)';
+                });
+            });
+            
+            // Event listeners
+            document.getElementById('consent-accept-all').addEventListener('click', () => {
+                const allCategories = {};
+                Object.keys(config.categories).forEach(key => {
+                    allCategories[key] = true;
+                });
+                saveConsent(allCategories, 'accepted_all');
+                banner.remove();
+                createPersistentSettingsLink();
+            });
+            
+            document.getElementById('consent-reject-all').addEventListener('click', () => {
+                const essentialOnly = {};
+                Object.keys(config.categories).forEach(key => {
+                    essentialOnly[key] = config.categories[key].required || false;
+                });
+                saveConsent(essentialOnly, 'rejected_all');
+                banner.remove();
+                createPersistentSettingsLink();
+            });
+            
+            document.getElementById('consent-customize').addEventListener('mouseenter', () => loadChunk('preferences').catch(() => {}));
+            document.getElementById('consent-customize').addEventListener('click', () => {
+                showPreferencesModal();
+                banner.remove();
+            });
+        }
+    }
+
+    return { show: createBanner };
+};
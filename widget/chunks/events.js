@@ -0,0 +1,129 @@
+/**
+ * Consent widget chunk: interaction event queue
+ * Loaded by consent-widget.js when the first interaction is tracked, or on a
+ * page load that finds events left over from an earlier page
+ */
+
+(window.ConsentWidgetChunks = window.ConsentWidgetChunks || {}).events = function(widget) {
+    'use strict';
+
+    const { config, getSessionId, EVENT_QUEUE_KEY } = widget;
+
+    // Interaction events (preference opens, language switches, category toggles)
+    // are queued in localStorage, coalesced, and sent as one batch when the page
+    // is hidden. Anything that can't be sent is retried on a later page load.
+    const MAX_QUEUED_EVENTS = 100;
+    let eventQueueVersion = 0;
+    let preparedEventBatch = null; // { version, body } gzip-compressed ahead of page hide
+
+    function loadEventQueue() {
+        try {
+            return JSON.parse(localStorage.getItem(EVENT_QUEUE_KEY)) || [];
+        } catch (error) {
+            return [];
+        }
+    }
+
+    function saveEventQueue(queue) {
+        try {
+            localStorage.setItem(EVENT_QUEUE_KEY, JSON.stringify(queue));
+        } catch (error) {
+            // Storage full or unavailable - events are best effort
+        }
+    }
+
+    // Record an interaction; repeats of the same event are merged into a count
+    function trackEvent(type, data) {
+        const queue = loadEventQueue();
+        const key = type + ':' + (data ? (data.category || data.language || '') : '');
+        const existing = queue.find(event => event.k === key);
+        if (existing) {
+            existing.d = data || null;
+            existing.n += 1;
+            existing.ts = Date.now();
+        } else {
+            queue.push({ k: key, t: type, d: data || null, n: 1, ts: Date.now() });
+            if (queue.length > MAX_QUEUED_EVENTS) {
+                queue.splice(0, queue.length - MAX_QUEUED_EVENTS);
+            }
+        }
+        saveEventQueue(queue);
+        eventQueueVersion += 1;
+        prepareEventBatch();
+    }
+
+    // Compact batch format: times are offsets from the first event
+    function encodeEventBatch(queue) {
+        const base = Math.min(...queue.map(event => event.ts));
+        return JSON.stringify({
+            v: 1,
+            c: localStorage.getItem('consent_id'),
+            s: getSessionId(),
+            t: base,
+            e: queue.map(event => [event.t, event.ts - base, event.d, event.n])
+        });
+    }
+
+    // Compress in the background so the page-hide flush can send synchronously
+    async function prepareEventBatch() {
+        if (typeof CompressionStream === 'undefined') return;
+        const version = eventQueueVersion;
+        try {
+            const stream = new Blob([encodeEventBatch(loadEventQueue())]).stream()
+                .pipeThrough(new CompressionStream('gzip'));
+            const compressed = await new Response(stream).arrayBuffer();
+            if (version === eventQueueVersion) {
+                // text/plain keeps sendBeacon free of CORS preflights; the server sniffs gzip
+                preparedEventBatch = { version: version, body: new Blob([compressed], { type: 'text/plain' }) };
+            }
+        } catch (error) {
+            preparedEventBatch = null;
+        }
+    }
+
+    function eventsUrl() {
+        return `${config.apiUrl}/api/beacon/${encodeURIComponent(config.scriptId)}/events`;
+    }
+
+    function dropSentEvents(sentUpTo) {
+        saveEventQueue(loadEventQueue().filter(event => event.ts > sentUpTo));
+        preparedEventBatch = null;
+    }
+
+    // Flush on page hide; events only go out once there is a consent to attach them to
+    function flushEvents() {
+        const queue = loadEventQueue();
+        if (!queue.length || !localStorage.getItem('consent_id')) return;
+        const sentUpTo = Math.max(...queue.map(event => event.ts));
+        const body = preparedEventBatch && preparedEventBatch.version === eventQueueVersion
+            ? preparedEventBatch.body
+            : encodeEventBatch(queue);
+        try {
+            if (navigator.sendBeacon && navigator.sendBeacon(eventsUrl(), body)) {
+                dropSentEvents(sentUpTo);
+            }
+        } catch (error) {
+            // Keep the queue for the next page load
+        }
+    }
+
+    // Retry events left over from earlier page loads
+    function flushPendingEvents() {
+        const queue = loadEventQueue();
+        if (!queue.length || !localStorage.getItem('consent_id')) return;
+        const sentUpTo = Math.max(...queue.map(event => event.ts));
+        fetch(eventsUrl(), {
+            method: 'POST',
+            body: encodeEventBatch(queue),
+            keepalive: true,
+            headers: { 'Content-Type': 'text/plain' }
+        }).then(response => {
+            // 4xx means the batch will never be accepted; don't retry it forever
+            if (response.ok || (response.status >= 400 && response.status < 500 && response.status !== 429)) {
+                dropSentEvents(sentUpTo);
+            }
+        }).catch(() => {});
+    }
+
+    return { track: trackEvent, flush: flushEvents, flushPending: flushPendingEvents };
+};
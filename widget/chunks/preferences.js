@@ -0,0 +1,574 @@
+/**
+ * Consent widget chunk: preference center modal
+ * Loaded by consent-widget.js the first time the preferences are opened
+ */
+
+(window.ConsentWidgetChunks = window.ConsentWidgetChunks || {}).preferences = function(widget) {
+    'use strict';
+
+    const { config, t, getLanguage, setLanguage, loadChunk, saveConsent, trackEvent, createPersistentSettingsLink } = widget;
+
+    widget.addEnglishDefaults({
+        modal: {
+            title: "Preference Center",
+            description: "How can you manage your preferences?",
+            save: "Save my Preferences",
+            cancel: "Cancel",
+            acceptOnlyNecessary: "Accept only necessary",
+            turnOn: "Turn ON to enable",
+            alwaysActive: "Always Active"
+        }
+    });
+
+    // Show preferences modal
+    function showPreferencesModal() {
+        // Remove existing modal
+        const existing = document.getElementById('consent-modal');
+        if (existing) existing.remove();
+        trackEvent('preferences_opened');
+        
+        // DPDP COMPLIANT: All cookies OFF by default except Essential (locked)
+        const hasConsentId = localStorage.getItem('consent_id');
+        let currentCategories = {};
+        
+        // Always initialize: All OFF except Essential (DPDP requirement)
+        Object.keys(config.categories).forEach(key => {
+            // Essential cookies are always ON, everything else is OFF by default
+            currentCategories[key] = config.categories[key].required || false;
+        });
+        
+        // If user has given consent before, use their saved preferences
+        if (hasConsentId) {
+            try {
+                const saved = JSON.parse(localStorage.getItem('consent_categories') || '{}');
+                // Only use saved values if they are explicitly true, otherwise keep default (false)
+                Object.keys(config.categories).forEach(key => {
+                    if (saved[key] === true) {
+                        currentCategories[key] = true;
+                    }
+                });
+            } catch (e) {
+                console.error('Error parsing saved consent:', e);
+            }
+        }
+        
+        // Ensure essential is always true (cannot be disabled)
+        Object.keys(config.categories).forEach(key => {
+            if (config.categories[key].required) {
+                currentCategories[key] = true;
+            }
+        });
+        
+        // Create modal
+        const modal = document.createElement('div');
+        modal.id = 'consent-modal';
+        modal.setAttribute('role', 'dialog');
+        modal.setAttribute('aria-label', t('modal.title'));
+        modal.setAttribute('aria-modal', 'true');
+        modal.style.cssText = `
+            position: fixed; top: 0; left: 0; right: 0; bottom: 0; 
+            background: rgba(0,0,0,0.5); z-index: 10001; 
+            display: flex; align-items: center; justify-content: center;
+            padding: 20px;
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+        `;
+        
+        // Language selector
+        let languageSelector = '';
+        if (config.supportedLanguages.length > 1) {
+            languageSelector = `
+                <select id="consent-language" style="padding: 5px 10px; border: 1px solid #ddd; border-radius: 4px; font-size: 14px;">
+                    ${config.supportedLanguages.map(lang => 
+                        `<option value="${lang}" ${lang === getLanguage() ? 'selected' : ''}>${lang.toUpperCase()}</option>`
+                    ).join('')}
+                </select>
+            `;
+        }
+        
+        // OneTrust-style: Two-panel layout with tabs
+        const primaryColor = config.bannerConfig.colors?.primary || '#00A862';
+        let selectedTab = 'categories'; // 'categories' or 'data-request'
+        let selectedCategory = null;
+        const categoryKeys = Object.keys(config.categories);
+        if (categoryKeys.length > 0) {
+            selectedCategory = categoryKeys[0]; // Default to first category
+        }
+        
+        // Build left panel navigation with tabs
+        let leftNavHTML = '<h3 style="margin: 0 0 20px 0; font-size: 16px; font-weight: 600; color: #333;">' + t('modal.description') + '</h3>';
+        
+        // Tab navigation
+        leftNavHTML += `
+            <div style="display: flex; gap: 0; margin-bottom: 20px; border-bottom: 1px solid #e0e0e0;">
+                <div 
+                    class="pref-tab" 
+                    data-tab="categories"
+                    style="
+                        padding: 10px 16px;
+                        cursor: pointer;
+                        border-bottom: 2px solid ${selectedTab === 'categories' ? primaryColor : 'transparent'};
+                        color: ${selectedTab === 'categories' ? primaryColor : '#666'};
+                        font-weight: ${selectedTab === 'categories' ? '600' : '400'};
+                        font-size: 14px;
+                        transition: all 0.2s;
+                    "
+                >
+                    Cookie Categories
+                </div>
+                <div 
+                    class="pref-tab" 
+                    data-tab="data-request"
+                    style="
+                        padding: 10px 16px;
+                        cursor: pointer;
+                        border-bottom: 2px solid ${selectedTab === 'data-request' ? primaryColor : 'transparent'};
+                        color: ${selectedTab === 'data-request' ? primaryColor : '#666'};
+                        font-weight: ${selectedTab === 'data-request' ? '600' : '400'};
+                        font-size: 14px;
+                        transition: all 0.2s;
+                    "
+                >
+                    Data Request
+                </div>
+            </div>
+        `;
+        
+        // Category navigation (shown when categories tab is selected)
+        leftNavHTML += '<div id="category-nav-list" style="display: flex; flex-direction: column; gap: 0;">';
+        Object.keys(config.categories).forEach(key => {
+            const category = config.categories[key];
+            const isSelected = key === selectedCategory && selectedTab === 'categories';
+            leftNavHTML += `
+                <div 
+                    class="category-nav-item" 
+                    data-category-key="${key}"
+                    style="
+                        padding: 12px 16px;
+                        cursor: pointer;
+                        border-left: 4px solid ${isSelected ? primaryColor : 'transparent'};
+                        background: ${isSelected ? '#f5f5f5' : 'transparent'};
+                        transition: all 0.2s;
+                        font-size: 14px;
+                        color: ${isSelected ? '#1a1a1a' : '#666'};
+                        font-weight: ${isSelected ? '600' : '400'};
+                    "
+                >
+                    ${category.name}
+                </div>
+            `;
+        });
+        leftNavHTML += '</div>';
+        
+        // Build right panel content for selected category
+        function buildRightPanelContent(categoryKey) {
+            const category = config.categories[categoryKey];
+            const isChecked = currentCategories[categoryKey] === true;
+            const isDisabled = category.required || false;
+            const vendors = category.vendors || [];
+            
+            let content = `
+                <h2 style="margin: 0 0 16px 0; font-size: 18px; font-weight: 600; color: #1a1a1a; display: flex; align-items: center; justify-content: space-between;">
+                    <span>${category.name}</span>
+                    ${isDisabled ? `<span style="color: ${primaryColor}; font-size: 14px; font-weight: 500;">${t('modal.alwaysActive')}</span>` : ''}
+                </h2>
+                <p style="margin: 0 0 24px 0; font-size: 14px; color: #666; line-height: 1.6;">
+                    ${category.description}
+                </p>
+            `;
+            
+            // Toggle switch - DPDP: All non-essential OFF by default
+            if (!isDisabled) {
+                content += `
+                    <div style="margin-top: 20px; padding: 16px; background: #f9f9f9; border-radius: 6px; display: flex; align-items: center; justify-content: space-between;">
+                        <span style="font-size: 14px; font-weight: 500; color: #333;">Enable ${category.name}</span>
+                        <label style="position: relative; display: inline-block; width: 50px; height: 26px;">
+                            <input 
+                                type="checkbox" 
+                                class="consent-toggle" 
+                                data-category="${categoryKey}"
+                                ${isChecked ? 'checked' : ''}
+                                style="opacity: 0; width: 0; height: 0;"
+                            >
+                            <span class="toggle-slider" style="
+                                position: absolute; cursor: pointer;
+                                top: 0; left: 0; right: 0; bottom: 0;
+                                background-color: ${isChecked ? primaryColor : '#ccc'};
+                                transition: 0.3s; border-radius: 26px;
+                            ">
+                                <span style="
+                                    position: absolute; content: '';
+                                    height: 20px; width: 20px; left: 3px; bottom: 3px;
+                                    background-color: white; transition: 0.3s; border-radius: 50%;
+                                    transform: ${isChecked ? 'translateX(24px)' : 'translateX(0)'};
+                                "></span>
+                            </span>
+                        </label>
+                    </div>
+                `;
+            }
+            
+            // Vendor List (OneTrust style) - only show if vendors exist
+            if (vendors.length > 0) {
+                content += `
+                    <div style="margin-top: 30px;">
+                        <h3 style="margin: 0 0 16px 0; font-size: 16px; font-weight: 600; color: #1a1a1a;">Vendor List</h3>
+                        <div style="display: flex; flex-direction: column; gap: 12px;">
+                `;
+                
+                vendors.forEach((vendor, index) => {
+                    const vendorId = `vendor-${categoryKey}-${index}`;
+                    const isExpanded = false; // Start collapsed
+                    content += `
+                        <div class="vendor-item" data-vendor-id="${vendorId}" style="
+                            border: 1px solid #e0e0e0;
+                            border-radius: 6px;
+                            overflow: hidden;
+                            background: #ffffff;
+                        ">
+                            <div style="
+                                padding: 14px 16px;
+                                display: flex;
+                                align-items: center;
+                                justify-content: space-between;
+                                cursor: pointer;
+                                background: #fafafa;
+                                transition: background 0.2s;
+                            " onclick="toggleVendorDetails('${vendorId}')">
+                                <div style="display: flex; align-items: center; gap: 12px; flex: 1;">
+                                    <span style="
+                                        font-size: 16px;
+                                        color: ${primaryColor};
+                                        transition: transform 0.3s;
+                                        transform: rotate(0deg);
+                                    " id="${vendorId}-arrow">▶</span>
+                                    <span style="font-size: 14px; font-weight: 500; color: #333;">${vendor.name}</span>
+                                    ${vendor.parent_company ? `<span style="font-size: 12px; color: #666;">(${vendor.parent_company})</span>` : ''}
+                                </div>
+                                ${!isDisabled ? `
+                                    <label style="position: relative; display: inline-block; width: 50px; height: 26px; margin-left: 12px;" onclick="event.stopPropagation();">
+                                        <input 
+                                            type="checkbox" 
+                                            class="vendor-toggle" 
+                                            data-category="${categoryKey}"
+                                            data-vendor="${vendor.name}"
+                                            ${isChecked ? 'checked' : ''}
+                                            ${isDisabled ? 'disabled' : ''}
+                                            style="opacity: 0; width: 0; height: 0;"
+                                        >
+                                        <span class="toggle-slider" style="
+                                            position: absolute; cursor: ${isDisabled ? 'not-allowed' : 'pointer'};
+                                            top: 0; left: 0; right: 0; bottom: 0;
+                                            background-color: ${isChecked ? primaryColor : '#ccc'};
+                                            transition: 0.3s; border-radius: 26px;
+                                        ">
+                                            <span style="
+                                                position: absolute; content: '';
+                                                height: 20px; width: 20px; left: 3px; bottom: 3px;
+                                                background-color: white; transition: 0.3s; border-radius: 50%;
+                                                transform: ${isChecked ? 'translateX(24px)' : 'translateX(0)'};
+                                            "></span>
+                                        </span>
+                                    </label>
+                                ` : `<span style="color: ${primaryColor}; font-size: 12px; font-weight: 500; margin-left: 12px;">${t('modal.alwaysActive')}</span>`}
+                            </div>
+                            <div id="${vendorId}-details" style="
+                                display: none;
+                                padding: 16px;
+                                border-top: 1px solid #e0e0e0;
+                                background: #ffffff;
+                            ">
+                                ${vendor.description ? `<p style="margin: 0 0 12px 0; font-size: 13px; color: #666; line-height: 1.5;"><strong>Description:</strong> ${vendor.description}</p>` : ''}
+                                ${vendor.parent_company ? `<p style="margin: 0 0 12px 0; font-size: 13px; color: #666;"><strong>Parent Company:</strong> ${vendor.parent_company}</p>` : ''}
+                                <p style="margin: 0 0 8px 0; font-size: 13px; color: #666;"><strong>Default Category:</strong> ${category.name}</p>
+                                ${vendor.privacy_policy_url ? `<p style="margin: 0 0 8px 0; font-size: 13px;"><strong>Privacy Policy Link:</strong> <a href="${vendor.privacy_policy_url}" target="_blank" style="color: ${primaryColor}; text-decoration: underline;">${vendor.privacy_policy_url}</a></p>` : ''}
+                                ${vendor.cookie_policy_url ? `<p style="margin: 0 0 0 0; font-size: 13px;"><strong>Cookie Policy Link:</strong> <a href="${vendor.cookie_policy_url}" target="_blank" style="color: ${primaryColor}; text-decoration: underline;">${vendor.cookie_policy_url}</a></p>` : ''}
+                            </div>
+                        </div>
+                    `;
+                });
+                
+                content += `
+                        </div>
+                    </div>
+                `;
+            }
+            
+            return content;
+        }
+        
+        // Toggle vendor details (OneTrust style expand/collapse)
+        window.toggleVendorDetails = function(vendorId) {
+            const detailsDiv = document.getElementById(vendorId + '-details');
+            const arrow = document.getElementById(vendorId + '-arrow');
+            if (detailsDiv.style.display === 'none') {
+                detailsDiv.style.display = 'block';
+                arrow.style.transform = 'rotate(90deg)';
+            } else {
+                detailsDiv.style.display = 'none';
+                arrow.style.transform = 'rotate(0deg)';
+            }
+        };
+        
+        modal.innerHTML = `
+            <div style="
+                background: white; border-radius: 8px; 
+                max-width: 1000px; width: 100%; max-height: 90vh;
+                overflow: hidden; box-shadow: 0 10px 40px rgba(0,0,0,0.2);
+                display: flex; flex-direction: column;
+            ">
+                <div style="padding: 25px 30px; border-bottom: 1px solid #e0e0e0; display: flex; justify-content: space-between; align-items: center; background: #ffffff;">
+                    <h2 style="margin: 0; font-size: 22px; font-weight: 600; color: #1a1a1a; letter-spacing: -0.3px;">${t('modal.title')}</h2>
+                    ${languageSelector}
+                </div>
+                <div style="display: flex; flex: 1; overflow: hidden;">
+                    <!-- Left Panel: Category Navigation -->
+                    <div style="width: 280px; border-right: 1px solid #e0e0e0; padding: 25px; overflow-y: auto; background: #fafafa;">
+                        ${leftNavHTML}
+                    </div>
+                    <!-- Right Panel: Category Details or Data Request -->
+                    <div style="flex: 1; padding: 30px; overflow-y: auto; background: #ffffff;" id="category-details-panel">
+                        ${buildRightPanelContent(selectedCategory)}
+                    </div>
+                </div>
+                <div style="padding: 25px; border-top: 1px solid #eee; display: flex; gap: 12px; justify-content: flex-end; flex-wrap: wrap; background: #ffffff;">
+                    <button id="consent-save" style="
+                        padding: 12px 24px; background: ${primaryColor}; color: white;
+                        border: none; border-radius: 6px; cursor: pointer;
+                        font-size: 14px; font-weight: 600;
+                        transition: all 0.2s;
+                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                    ">${t('modal.save')}</button>
+                    <button id="consent-accept-only" style="
+                        padding: 12px 24px; background: ${primaryColor}; color: white;
+                        border: none; border-radius: 6px; cursor: pointer;
+                        font-size: 14px; font-weight: 600;
+                        transition: all 0.2s;
+                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                    ">${t('modal.acceptOnlyNecessary')}</button>
+                </div>
+            </div>
+        `;
+        
+        document.body.appendChild(modal);
+        
+        // Language selector
+        if (languageSelector) {
+            document.getElementById('consent-language').addEventListener('change', (e) => {
+                const language = e.target.value;
+                trackEvent('language_switched', { language: language });
+                setLanguage(language).then(showPreferencesModal); // Recreate modal with new language
+            });
+        }
+        
+        // Tab navigation handlers
+        const prefTabs = modal.querySelectorAll('.pref-tab');
+        prefTabs.forEach(tab => {
+            tab.addEventListener('click', function() {
+                const tabName = this.dataset.tab;
+                selectedTab = tabName;
+                
+                // Update tab highlighting
+                prefTabs.forEach(t => {
+                    const isSelected = t.dataset.tab === tabName;
+                    t.style.borderBottomColor = isSelected ? primaryColor : 'transparent';
+                    t.style.color = isSelected ? primaryColor : '#666';
+                    t.style.fontWeight = isSelected ? '600' : '400';
+                });
+                
+                // Show/hide category navigation
+                const categoryNav = document.getElementById('category-nav-list');
+                if (tabName === 'categories') {
+                    categoryNav.style.display = 'flex';
+                } else {
+                    categoryNav.style.display = 'none';
+                }
+                
+                // Update right panel content
+                const detailsPanel = document.getElementById('category-details-panel');
+                if (tabName === 'categories') {
+                    detailsPanel.innerHTML = buildRightPanelContent(selectedCategory);
+                    // Re-attach category toggle listeners
+                    attachCategoryToggleListeners();
+                } else {
+                    // The request form is its own chunk, fetched the first time the tab is opened
+                    loadChunk('data-request').then(form => {
+                        if (selectedTab !== 'data-request') return;
+                        detailsPanel.innerHTML = form.render(primaryColor);
+                        form.attach(modal);
+                    }).catch(error => console.error('Consent Manager: Error loading data request form', error));
+                }
+            });
+        });
+        
+        // Category navigation click handlers
+        function attachCategoryToggleListeners() {
+            const navItems = modal.querySelectorAll('.category-nav-item');
+            navItems.forEach(item => {
+                item.addEventListener('click', function() {
+                    const categoryKey = this.dataset.categoryKey;
+                    selectedCategory = categoryKey;
+                    
+                    // Update navigation highlighting
+                    navItems.forEach(nav => {
+                        const isSelected = nav.dataset.categoryKey === categoryKey;
+                        nav.style.borderLeftColor = isSelected ? primaryColor : 'transparent';
+                        nav.style.background = isSelected ? '#f5f5f5' : 'transparent';
+                        nav.style.color = isSelected ? '#1a1a1a' : '#666';
+                        nav.style.fontWeight = isSelected ? '600' : '400';
+                    });
+                    
+                    // Update right panel content
+                    const detailsPanel = document.getElementById('category-details-panel');
+                    detailsPanel.innerHTML = buildRightPanelContent(categoryKey);
+                    
+                    // Re-attach category toggle event listener
+                    const toggle = detailsPanel.querySelector('.consent-toggle');
+                    if (toggle) {
+                        toggle.addEventListener('change', function() {
+                            const catKey = this.dataset.category;
+                            const isChecked = this.checked;
+                            trackEvent('category_toggled', { category: catKey, enabled: isChecked });
+                            const slider = this.nextElementSibling;
+                            slider.style.backgroundColor = isChecked ? primaryColor : '#ccc';
+                            slider.querySelector('span').style.transform = isChecked ? 'translateX(24px)' : 'translateX(0)';
+                            
+                            // Sync vendor toggles with category toggle
+                            const vendorToggles = detailsPanel.querySelectorAll('.vendor-toggle');
+                            vendorToggles.forEach(vt => {
+                                vt.checked = isChecked;
+                                const vSlider = vt.nextElementSibling;
+                                vSlider.style.backgroundColor = isChecked ? primaryColor : '#ccc';
+                                vSlider.querySelector('span').style.transform = isChecked ? 'translateX(24px)' : 'translateX(0)';
+                            });
+                        });
+                    }
+                    
+                    // Attach vendor toggle listeners
+                    const vendorToggles = detailsPanel.querySelectorAll('.vendor-toggle');
+                    vendorToggles.forEach(vt => {
+                        vt.addEventListener('change', function() {
+                            const isChecked = this.checked;
+                            const slider = this.nextElementSibling;
+                            slider.style.backgroundColor = isChecked ? primaryColor : '#ccc';
+                            slider.querySelector('span').style.transform = isChecked ? 'translateX(24px)' : 'translateX(0)';
+                            
+                            // If any vendor is enabled, enable the category
+                            const categoryToggle = detailsPanel.querySelector('.consent-toggle');
+                            if (categoryToggle && !categoryToggle.disabled) {
+                                const anyVendorEnabled = Array.from(detailsPanel.querySelectorAll('.vendor-toggle')).some(v => v.checked);
+                                if (anyVendorEnabled && !categoryToggle.checked) {
+                                    categoryToggle.checked = true;
+                                    const catSlider = categoryToggle.nextElementSibling;
+                                    catSlider.style.backgroundColor = primaryColor;
+                                    catSlider.querySelector('span').style.transform = 'translateX(24px)';
+                                }
+                            }
+                        });
+                    });
+                });
+            });
+        }
+        
+        // Initialize category navigation listeners
+        attachCategoryToggleListeners();
+        
+        // Toggle switches (category toggles)
+        const toggles = modal.querySelectorAll('.consent-toggle');
+        toggles.forEach(toggle => {
+            toggle.addEventListener('change', function() {
+                const category = this.dataset.category;
+                const isChecked = this.checked;
+                trackEvent('category_toggled', { category: category, enabled: isChecked });
+                const slider = this.nextElementSibling;
+                slider.style.backgroundColor = isChecked ? primaryColor : '#ccc';
+                slider.querySelector('span').style.transform = isChecked ? 'translateX(24px)' : 'translateX(0)';
+                
+                // Sync vendor toggles with category toggle
+                const detailsPanel = document.getElementById('category-details-panel');
+                const vendorToggles = detailsPanel.querySelectorAll('.vendor-toggle');
+                vendorToggles.forEach(vt => {
+                    if (vt.dataset.category === category) {
+                        vt.checked = isChecked;
+                        const vSlider = vt.nextElementSibling;
+                        vSlider.style.backgroundColor = isChecked ? primaryColor : '#ccc';
+                        vSlider.querySelector('span').style.transform = isChecked ? 'translateX(24px)' : 'translateX(0)';
+                    }
+                });
+            });
+        });
+        
+        // Vendor toggle switches (sync with category)
+        const vendorToggles = modal.querySelectorAll('.vendor-toggle');
+        vendorToggles.forEach(vt => {
+            vt.addEventListener('change', function() {
+                const category = this.dataset.category;
+                const isChecked = this.checked;
+                const slider = this.nextElementSibling;
+                slider.style.backgroundColor = isChecked ? primaryColor : '#ccc';
+                slider.querySelector('span').style.transform = isChecked ? 'translateX(24px)' : 'translateX(0)';
+                
+                // If any vendor is enabled, enable the category
+                const categoryToggle = modal.querySelector(`.consent-toggle[data-category="${category}"]`);
+                if (categoryToggle && !categoryToggle.disabled) {
+                    const allVendorToggles = modal.querySelectorAll(`.vendor-toggle[data-category="${category}"]`);
+                    const anyVendorEnabled = Array.from(allVendorToggles).some(v => v.checked);
+                    if (anyVendorEnabled && !categoryToggle.checked) {
+                        categoryToggle.checked = true;
+                        const catSlider = categoryToggle.nextElementSibling;
+                        catSlider.style.backgroundColor = primaryColor;
+                        catSlider.querySelector('span').style.transform = 'translateX(24px)';
+                    }
+                }
+            });
+        });
+        
+        // Save button
+        document.getElementById('consent-save').addEventListener('click', () => {
+            const categories = {};
+            toggles.forEach(toggle => {
+                const category = toggle.dataset.category;
+                categories[category] = toggle.checked;
+            });
+            
+            // Ensure essential is always true
+            Object.keys(config.categories).forEach(key => {
+                if (config.categories[key].required) {
+                    categories[key] = true;
+                }
+            });
+            
+            saveConsent(categories, 'customized');
+            modal.remove();
+            createPersistentSettingsLink();
+        });
+        
+        // Accept only necessary button
+        document.getElementById('consent-accept-only').addEventListener('click', () => {
+            const essentialOnly = {};
+            Object.keys(config.categories).forEach(key => {
+                essentialOnly[key] = config.categories[key].required || false;
+            });
+            saveConsent(essentialOnly, 'accepted_only_necessary');
+            modal.remove();
+            createPersistentSettingsLink();
+        });
+        
+        // Close on backdrop click
+        modal.addEventListener('click', (e) => {
+            if (e.target === modal) {
+                modal.remove();
+            }
+        });
+        
+        // Close on Escape key
+        const handleEscape = (e) => {
+            if (e.key === 'Escape') {
+                modal.remove();
+                document.removeEventListener('keydown', handleEscape);
+            }
+        };
+        document.addEventListener('keydown', handleEscape);
+    }
+
+    return { show: showPreferencesModal };
+};